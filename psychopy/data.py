@@ -7,7 +7,6 @@
 
 from __future__ import absolute_import
 
-from pandas import DataFrame, read_csv
 import cPickle
 import string
 import sys
@@ -15,7 +14,6 @@ import os
 import time
 import copy
 import numpy
-from scipy import optimize, special
 import inspect  # so that Handlers can find the script that called them
 import codecs
 import weakref
@@ -23,21 +21,45 @@ import re
 import warnings
 import collections
 
-try:
-    # import openpyxl
-    from openpyxl.cell import get_column_letter
-    from openpyxl.reader.excel import load_workbook
-    haveOpenpyxl = True
-except ImportError:
-    haveOpenpyxl = False
+# openpyxl is slow to import, so whether it can be used is only checked (by
+# _haveOpenpyxl) when it is first needed
+haveOpenpyxl = None
 
 from psychopy import logging
 from psychopy.tools.arraytools import extendArr, shuffleArray
 from psychopy.tools.fileerrortools import handleFileCollision
 from psychopy.tools.filetools import openOutputFile, genDelimiter
 import psychopy
+
+# these are slow to import and only needed by some of the handlers, so they
+# are only imported when first used
+lazyImports = """
+from pandas import DataFrame, read_csv
+from scipy import optimize, special
 from psychopy.contrib.quest import QuestObject  # used for QuestHandler
 from psychopy.contrib.psi import PsiObject  # used for PsiHandler
+"""
+try:
+    from psychopy.contrib.lazy_import import lazy_import
+    lazy_import(globals(), lazyImports)
+except Exception:
+    exec(lazyImports)
+
+
+def _haveOpenpyxl():
+    """Whether openpyxl can be used, importing the parts of it used here
+    the first time this is called
+    """
+    global haveOpenpyxl, get_column_letter, load_workbook
+    if haveOpenpyxl is None:
+        try:
+            from openpyxl.cell import get_column_letter
+            from openpyxl.reader.excel import load_workbook
+            haveOpenpyxl = True
+        except ImportError:
+            haveOpenpyxl = False
+    return haveOpenpyxl
+
 
 _experiments = weakref.WeakValueDictionary()
 _nonalphanumeric_re = re.compile(r'\W')  # will match all bad var name chars
@@ -638,7 +660,7 @@ class _BaseTrialHandler(object):
 
         # NB this was based on the limited documentation (1 page wiki) for
         # openpyxl v1.0
-        if not haveOpenpyxl:
+        if not _haveOpenpyxl():
             raise ImportError('openpyxl is required for saving files in'
                               ' Excel (xlsx) format, but was not found.')
             # return -1
@@ -2663,7 +2685,7 @@ def importConditions(fileName, returnFieldNames=False, selection=""):
                 thisTrial[fieldName] = row[fieldN]
             trialList.append(thisTrial)
     else:
-        if not haveOpenpyxl:
+        if not _haveOpenpyxl():
             raise ImportError('openpyxl is required for loading excel '
                               'format files, but it was not found.')
         try:
@@ -3290,7 +3312,7 @@ class StairHandler(_BaseTrialHandler):
                               'trials completed. Nothing saved')
             return -1
         # NB this was based on the limited documentation for openpyxl v1.0
-        if not haveOpenpyxl:
+        if not _haveOpenpyxl():
             raise ImportError('openpyxl is required for saving files in '
                               'Excel (xlsx) format, but was not found.')
             # return -1
@@ -0,0 +1,76 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of drawing many drifting and rotating gratings.
+
+With shaders, a GratingStim is drawn from vertex arrays, so changing its
+phase, ori, sf or pos every frame costs almost nothing. This prints the time
+per frame to update and draw N gratings that way and through the display
+list (which is recompiled on every change, as in older versions), and the
+same for RadialStims drifting in angular and radial phase.
+"""
+
+from __future__ import division
+
+from psychopy import visual, core, event
+import numpy
+
+nFrames = 100
+
+win = visual.Window([1024, 768], units='pix', monitor='testMonitor')
+if not win._haveShaders:
+    print 'This benchmark needs shaders'
+    core.quit()
+
+
+def timeFrames(stims, update):
+    """median time (ms) per frame to update and draw all the stims"""
+    times = []
+    for frameN in range(nFrames):
+        t0 = core.getTime()
+        for stim in stims:
+            update(stim, frameN)
+            stim.draw()
+        win.flip()
+        times.append(core.getTime() - t0)
+        if event.getKeys():
+            core.quit()
+    return numpy.median(times) * 1000
+
+
+def drift(stim, frameN):
+    stim.phase = frameN / 20
+    stim.ori = frameN
+
+
+def driftRadial(stim, frameN):
+    stim.angularPhase = frameN / 50
+    stim.radialPhase = frameN / 20
+
+
+print '%10s %16s %16s' % ('gratings', 'vertex arrays', 'display list')
+for nStims in [1, 10, 50, 100]:
+    xys = numpy.random.random([nStims, 2]) * 700 - 350
+    gratings = [visual.GratingStim(win, tex='sin', mask='gauss', size=80,
+                                   sf=0.05, pos=xy, autoLog=False)
+                for xy in xys]
+    withArrays = timeFrames(gratings, drift)
+    for grating in gratings:
+        grating._drawWithArrays = False  # the display list path
+    withLists = timeFrames(gratings, drift)
+    print '%10i %13.3f ms %13.3f ms' % (nStims, withArrays, withLists)
+
+print '\n%10s %16s' % ('radials', 'time per frame')
+for nStims in [1, 10, 50]:
+    xys = numpy.random.random([nStims, 2]) * 700 - 350
+    radials = [visual.RadialStim(win, tex='sqrXsqr', size=80, pos=xy,
+                                 angularCycles=4, radialCycles=2,
+                                 autoLog=False)
+               for xy in xys]
+    print '%10i %13.3f ms' % (nStims, timeFrames(radials, driftRadial))
+
+win.close()
+core.quit()
+
+# The contents of this file are in the public domain.
@@ -0,0 +1,60 @@
+#!/usr/bin/env python2
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of changing some of the elements of an ElementArrayStim.
+
+Setting a whole attribute (e.g. stim.oris = newOris) recomputes the
+vertices of all elements on the next draw, while stim.setElements(indices,
+oris=...) only recomputes those of the changed elements. This prints the
+time per frame to update and draw a 5000 element array, for a range of
+numbers of changed elements.
+"""
+
+from __future__ import division
+
+from psychopy import visual, core, event
+import numpy
+
+nElements = 5000
+nFrames = 100
+
+win = visual.Window([1024, 768], units='pix', monitor='testMonitor')
+xys = numpy.random.random([nElements, 2]) * 700 - 350
+stim = visual.ElementArrayStim(win, nElements=nElements, sizes=10, sfs=0.2,
+    xys=xys, elementTex='sin', elementMask='gauss', autoLog=False)
+
+
+def timeFrames(update):
+    """median time (ms) per frame of update() and stim.draw()"""
+    times = []
+    for frameN in range(nFrames):
+        t0 = core.getTime()
+        update(frameN)
+        stim.draw()
+        times.append(core.getTime() - t0)
+        win.flip()
+        if event.getKeys():
+            core.quit()
+    return numpy.median(times) * 1000
+
+
+print '%10s %16s %16s' % ('changed', 'whole array', 'setElements')
+for nChanged in [1, 10, 100, 1000, nElements]:
+    changed = numpy.arange(nChanged)
+
+    def setWholeArray(frameN):
+        oris = stim.oris
+        oris[changed] = frameN
+        stim.oris = oris
+
+    def setSomeElements(frameN):
+        stim.setElements(changed, oris=frameN, log=False)
+
+    print '%10i %13.3f ms %13.3f ms' % (nChanged,
+        timeFrames(setWholeArray), timeFrames(setSomeElements))
+
+win.close()
+core.quit()
+
+# The contents of this file are in the public domain.
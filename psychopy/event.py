@@ -11,26 +11,20 @@ See demo_mouse.py and i{demo_joystick.py} for examples
 
 from __future__ import absolute_import
 
+import sys
 import copy
 import numpy
 
 # try to import pyglet & pygame and hope the user has at least one of them!
-try:
-    from pygame import mouse, locals, joystick, display
-    import pygame.key
-    import pygame.event as evt
-    havePygame = True
-except ImportError:
-    havePygame = False
+# (pygame is slow to import and only used with pygame windows, so it is only
+# imported, by _havePygame, when first needed)
+havePygame = None
 try:
     import pyglet
     havePyglet = True
 except ImportError:
     havePyglet = False
-if havePygame:
-    usePygame = True  # will become false later if win not initialised
-else:
-    usePygame = False
+usePygame = True  # will become false later if win not initialised
 
 import psychopy.core
 from psychopy.tools.monitorunittools import cm2pix, deg2pix, pix2cm, pix2deg
@@ -38,6 +32,28 @@ from psychopy import logging
 from psychopy.constants import NOT_STARTED
 
 
+def _havePygame():
+    """Whether pygame can be used, importing the parts of it used here the
+    first time this is called
+    """
+    global havePygame, mouse, locals, joystick, display, pygame, evt
+    if havePygame is None:
+        try:
+            from pygame import mouse, locals, joystick, display
+            import pygame.key
+            import pygame.event as evt
+            havePygame = True
+        except ImportError:
+            havePygame = False
+    return havePygame
+
+
+def _pygameDisplayInit():
+    """Whether pygame is in use (without importing it if it isn't)"""
+    return (sys.modules.get('pygame.display') is not None and
+            _havePygame() and display.get_init())
+
+
 if havePyglet:
     # importing from mouse takes ~250ms, so do it now
     from pyglet.window.mouse import LEFT, MIDDLE, RIGHT
@@ -250,7 +266,7 @@ def getKeys(keyList=None, timeStamped=False):
     """
     keys = []
 
-    if havePygame and display.get_init():
+    if _pygameDisplayInit():
         # see if pygame has anything instead (if it exists)
         for evts in evt.get(locals.KEYDOWN):
             # pygame has no keytimes
@@ -399,7 +415,7 @@ class Mouse(object):
         self.movedistance = 0.0
         # if pygame isn't initialised then we must use pyglet
         global usePygame
-        if havePygame and not pygame.display.get_init():
+        if not _pygameDisplayInit():
             usePygame = False
         if not usePygame:
             global mouseButtons
@@ -735,7 +751,7 @@ def clearEvents(eventType=None):
             If this is not None then only events of the given type are cleared
     """
     # pyglet
-    if not havePygame or not display.get_init():
+    if not _pygameDisplayInit():
         # for each (pyglet) window, dispatch its events before checking event
         # buffer
         defDisplay = pyglet.window.get_platform().get_default_display()
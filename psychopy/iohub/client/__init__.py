@@ -13,28 +13,67 @@ Distributed under the terms of the GNU General Public License (GPL version 3 or
 
 import os,sys
 import time
+import numbers
 import subprocess
 from collections import deque
 import json
 import signal
+import numpy as N
 from weakref import proxy
 
 import psychopy.logging as psycho_logging
 
 import psutil
 
-from .. import IO_HUB_DIRECTORY,isIterable, load, dump, Loader, Dumper, updateDict
+from .. import IO_HUB_DIRECTORY,isIterable, dump, Dumper, updateDict
 from .. import MessageDialog, win32MessagePump
 from .. import print2err,printExceptionDetailsToStdErr,ioHubError
 from ..devices import Computer, DeviceEvent, import_device
 from ..devices.experiment import MessageEvent, LogEvent
 from ..constants import DeviceConstants, EventConstants
 from .. import _DATA_STORE_AVAILABLE
+from .. import configcache
 
 currentSec= Computer.currentSec
 
 _currentSessionInfo=None
 
+def getTrialListDtype(trial_list, min_string_length=256):
+    """
+    Returns the numpy dtype description used for the condition variable
+    table of a psychopy TrialHandler trialList (a list of dicts, each with
+    the same keys).
+
+    The type of each column is inferred from the values in every row of
+    trial_list, not only the first one: columns holding only integers are
+    saved as i4 (i8 if a value does not fit), columns holding only numbers as
+    f8, and all other columns as strings. String columns are made wide
+    enough for the longest value found in the trial list, and are never less
+    than min_string_length characters wide so values set while the
+    experiment runs also fit. None values are ignored.
+    """
+    i4_info=N.iinfo(N.int32)
+    numpy_trial_condition_types=[]
+    for cond_name in trial_list[0].keys():
+        values=[trial[cond_name] for trial in trial_list
+                            if trial.get(cond_name) is not None]
+        if values and all(isinstance(v,numbers.Integral) for v in values):
+            if all(i4_info.min<=v<=i4_info.max for v in values):
+                numpy_dtype=(cond_name,'i4')
+            else:
+                numpy_dtype=(cond_name,'i8')
+        elif values and all(isinstance(v,numbers.Real) for v in values):
+            numpy_dtype=(cond_name,'f8')
+        else:
+            max_length=min_string_length
+            for v in values:
+                if isinstance(v,unicode):
+                    v=v.encode('utf-8')
+                max_length=max(max_length,len(str(v)))
+            numpy_dtype=(cond_name,'S',max_length)
+        numpy_trial_condition_types.append(numpy_dtype)
+    return numpy_trial_condition_types
+
 
 
 #
@@ -282,6 +321,7 @@ class ioHubConnection(object):
         self._iohub_server_config=None
 
         self._shutdown_attempted=False
+        self._startup_timer=configcache.StartupTimer()
         self.iohub_status = self._startServer(ioHubConfig, ioHubConfigAbsPath)
         if self.iohub_status != "OK":
             raise RuntimeError("Error starting ioHub server: %s"%(self.iohub_status))
@@ -592,24 +632,12 @@ class ioHubConnection(object):
             #
             io.addTrialHandlerRecord(trial.values())
 
+        The column types of the table are inferred from all rows of
+        trials.trialList (see getTrialListDtype), so string values are not
+        truncated.
         """
-        trial=trials.trialList[0]
-        numpy_trial_condition_types=[]
-        for cond_name,cond_val in trial.iteritems():
-            if isinstance(cond_val,basestring):
-                numpy_dtype=(cond_name,'S',256)
-            elif isinstance(cond_val,int):
-                numpy_dtype=(cond_name,'i4')
-            elif isinstance(cond_val,long):
-                numpy_dtype=(cond_name,'i8')
-            elif isinstance(cond_val,float):
-                numpy_dtype=(cond_name,'f8')
-            else:
-                numpy_dtype=(cond_name,'S',256)
-            numpy_trial_condition_types.append(numpy_dtype)
-
-            class ConditionVariableDescription:
-                _numpyConditionVariableDescriptor=numpy_trial_condition_types
+        class ConditionVariableDescription:
+            _numpyConditionVariableDescriptor=getTrialListDtype(trials.trialList)
 
         self.initializeConditionVariableTable(ConditionVariableDescription)
 
@@ -618,6 +646,10 @@ class ioHubConnection(object):
         Adds the values from a TriaHandler row / record to the iohub data file
         for future data analysis use.
 
+        Rows are buffered by the ioHub Server and written to the data file in
+        blocks of data_store.condition_variable_block_size rows; call
+        flushDataStoreFile() to write any buffered rows immediately.
+
         :param cv_row:
         :return: None
         """
@@ -770,6 +802,39 @@ class ioHubConnection(object):
         r=self._sendToHubServer(('RPC','setProcessAffinity',processor_list))
         return r[2]
 
+    def getStartupTimings(self):
+        """
+        Returns the time taken by each phase of starting the ioHub Process,
+        as measured by both the experiment process and the ioHub Process.
+
+        Args:
+            None
+
+        Returns:
+            dict: with keys 'client' and 'server', each a list of (phase_name, duration_sec) pairs in the order the phases were run.
+        """
+        r=self._sendToHubServer(('RPC','getStartupTimings'))
+        return dict(client=self._startup_timer.items(),
+                    server=[tuple(t) for t in r[2]])
+
+    def getHubMetrics(self, include_bins=False, reset=False):
+        """
+        Returns the run time metrics recorded by the ioHub Process: the
+        duration of each device's _poll() call, device native event buffer
+        depths, the global event buffer depth, the number of events not yet
+        flushed to the ioDataStore, and the device to hub and hub to
+        client latencies of events.
+
+        Args:
+            include_bins (bool): If True, the non empty histogram bins of each metric are included as a list of (bin_lower_edge, count) pairs.
+            reset (bool): If True, all metrics are reset after being read.
+
+        Returns:
+            dict: metric name -> dict with count, mean, min, max, p50, p95 and p99 keys, or None if hub_metrics are disabled in the ioHub config.
+        """
+        r=self._sendToHubServer(('RPC','getHubMetrics',[include_bins,reset]))
+        return r[2]
+
     def addDeviceToMonitor(self,device_class, device_config={}):
         """
         Adds a device to the ioHub Process for event monitoring after the
@@ -848,7 +913,9 @@ class ioHubConnection(object):
 
         rootScriptPath = os.path.dirname(sys.argv[0])
 
-        hub_defaults_config=load(file(os.path.join(IO_HUB_DIRECTORY,'default_config.yaml'),'r'), Loader=Loader)
+        self._startup_timer.start('load_config')
+
+        hub_defaults_config=configcache.loadYaml(os.path.join(IO_HUB_DIRECTORY,'default_config.yaml'))
 
 
         if ioHubConfigAbsPath is None and ioHubConfig is None:
@@ -866,7 +933,7 @@ class ioHubConnection(object):
                     return "ERROR: ioHubConfig:ioDataStore must contain both a 'experiment_info' and a 'session_info' key with a dict value each."
 
         elif ioHubConfigAbsPath  is not None and ioHubConfig is None:
-            ioHubConfig=load(file(ioHubConfigAbsPath,u'r'), Loader=Loader)
+            ioHubConfig=configcache.loadYaml(ioHubConfigAbsPath)
         else:
             return "ERROR: Both a ioHubConfig dict object AND a path to an ioHubConfig file can not be provided."
 
@@ -888,6 +955,7 @@ class ioHubConnection(object):
                 tfile.close()
 
         self._iohub_server_config=ioHubConfig
+        self._startup_timer.stop('load_config')
 
         from psychopy.iohub.net import UDPClientConnection
 
@@ -925,9 +993,12 @@ class ioHubConnection(object):
             self._osxKillAndFreePort()
 
         # start subprocess, get pid, and get psutil process object for affinity and process priority setting
-        self._server_process = subprocess.Popen(subprocessArgList,stdout=subprocess.PIPE)
-        Computer.iohub_process_id = self._server_process.pid
-        Computer.iohub_process = psutil.Process(self._server_process.pid)
+        with self._startup_timer.phase('start_process'):
+            self._server_process = subprocess.Popen(subprocessArgList,stdout=subprocess.PIPE)
+            Computer.iohub_process_id = self._server_process.pid
+            Computer.iohub_process = psutil.Process(self._server_process.pid)
+
+        self._startup_timer.start('wait_for_server_ready')
 
         hubonline=False
         stdout_read_data=""
@@ -964,6 +1035,8 @@ class ioHubConnection(object):
                     return "ioHub startup failed, reveived IOHUB_FAILED"
                 else:
                     stdout_read_data+="startup_read: {0}\n".format(r)
+        self._startup_timer.stop('wait_for_server_ready')
+
         # If ioHub server did not repond correctly, terminate process and exit the program.
         if hubonline is False:
             try:
@@ -1421,7 +1494,7 @@ def launchHubServer(**kwargs):
     monitor_devices_config=None
     if kwargs.get('iohub_config_name'):
         # Load the specified iohub configuration file, converting it to a python dict.
-        io_config=load(file(kwargs.get('iohub_config_name'),'r'), Loader=Loader)
+        io_config=configcache.loadYaml(kwargs.get('iohub_config_name'))
         monitor_devices_config=io_config.get('monitor_devices')
 
     ioConfig=None
@@ -1575,7 +1648,7 @@ class ioHubExperimentRuntime(object):
 
         # load the experiment config settings from the experiment_config.yaml file.
         # The file must be in the same directory as the experiment script.
-        self.configuration=load(file( os.path.join(self.configFilePath,self.configFileName),u'r'), Loader=Loader)
+        self.configuration=configcache.loadYaml(os.path.join(self.configFilePath,self.configFileName))
 
         import random
         random.seed(Computer.getTime()*1000.123)
@@ -1793,8 +1866,8 @@ class ioHubExperimentRuntime(object):
         Merges two iohub configuration files into one and saves it to a file
         using the path/file name in merged_save_to_path.
         """
-        base_config=load(file(base_config_file_path,'r'), Loader=Loader)
-        update_from_config=load(file(update_from_config_file_path,'r'), Loader=Loader)
+        base_config=configcache.loadYaml(base_config_file_path)
+        update_from_config=configcache.loadYaml(update_from_config_file_path)
 
 
         def merge(update, base):
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+ioHub
+.. file: ioHub/configcache.py
+
+Copyright (C) 2012-2013 iSolver Software Solutions
+Distributed under the terms of the GNU General Public License (GPL version 3 or any later version).
+
+Caching of parsed and compiled ioHub configuration data.
+
+Starting the ioHub Process parses a number of yaml files (the experiment's
+iohub_config.yaml, default_config.yaml, and for every device its
+default_<device>.yaml and supported_config_settings.yaml) and then merges and
+validates each device configuration. None of that changes between runs unless
+one of the input files (or the experiment supplied device settings) changes,
+so the results are pickled to a cache folder, keyed on the sha1 hash of all
+inputs used to create them.
+
+The cache folder defaults to an 'iohub_config_cache-<user id>' folder in the
+system temp dir and can be changed with the IOHUB_CONFIG_CACHE_DIR environment
+variable. Setting IOHUB_DISABLE_CONFIG_CACHE=1 disables the cache.
+
+As loading a pickle can run arbitrary code, the cache folder is created
+private to the user (mode 0700) and (where the OS has user ids) is only used
+if it is owned by the user and can not be written to by anyone else.
+"""
+import os
+import hashlib
+import tempfile
+from contextlib import contextmanager
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from psychopy.clock import monotonicClock
+from psychopy.iohub import load, Loader, OrderedDict, print2err
+
+#: Bump when the format of cached objects changes so old entries are ignored.
+CACHE_FORMAT_VERSION = 1
+
+if hasattr(os, 'getuid'):
+    _default_cache_name = 'iohub_config_cache-%d' % os.getuid()
+else:
+    # the temp dir is already per user (on Windows)
+    _default_cache_name = 'iohub_config_cache'
+CACHE_DIRECTORY = os.environ.get('IOHUB_CONFIG_CACHE_DIR',
+                                 os.path.join(tempfile.gettempdir(),
+                                              _default_cache_name))
+enabled = os.environ.get('IOHUB_DISABLE_CONFIG_CACHE', '0') in ('', '0')
+
+# In-process caches. _file_hashes maps path -> ((mtime, size), sha1) so that a
+# file is only re-read when it has changed; _pickled holds the pickled bytes of
+# cache entries already loaded by this process. Entries are always unpickled
+# on access so callers get their own copy and can modify it freely.
+_file_hashes = {}
+_pickled = {}
+# cache folders found to be unsafe to use, reported once each
+_unsafe_directories = set()
+
+
+def fileHash(file_path):
+    """Return the sha1 hex digest of the contents of file_path."""
+    st = os.stat(file_path)
+    stamp = (st.st_mtime, st.st_size)
+    cached = _file_hashes.get(file_path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    with open(file_path, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    _file_hashes[file_path] = stamp, digest
+    return digest
+
+
+def _canonical(obj):
+    # dict pickling order depends on insertion history, so convert dicts to
+    # sorted item tuples so that equal settings always give the same key.
+    if isinstance(obj, dict):
+        return tuple(sorted((k, _canonical(v)) for k, v in obj.iteritems()))
+    if isinstance(obj, (list, tuple)):
+        return tuple(_canonical(v) for v in obj)
+    return obj
+
+
+def compileKey(*key_parts):
+    """Return a cache key for the given (picklable) key parts.
+
+    File contents should be included in a key using their fileHash(), so the
+    key changes whenever any of the input files do.
+    """
+    data = pickle.dumps(_canonical((CACHE_FORMAT_VERSION,) + key_parts),
+                        pickle.HIGHEST_PROTOCOL)
+    return hashlib.sha1(data).hexdigest()
+
+
+def _cacheFilePath(key):
+    return os.path.join(CACHE_DIRECTORY, key + '.pkl')
+
+
+def _checkCacheDirectory(create=False):
+    """Return True if the cache folder exists (or was created, if create is
+    True) and is private to the user, so its entries can be trusted.
+    """
+    try:
+        if not os.path.isdir(CACHE_DIRECTORY):
+            if not create:
+                return False
+            os.makedirs(CACHE_DIRECTORY, 0700)
+        if not hasattr(os, 'getuid'):
+            return True
+        st = os.stat(CACHE_DIRECTORY)
+    except (IOError, OSError), e:
+        print2err("Warning: could not create iohub config cache folder: ", e)
+        return False
+    if st.st_uid == os.getuid() and not st.st_mode & 0022:
+        return True
+    if CACHE_DIRECTORY not in _unsafe_directories:
+        _unsafe_directories.add(CACHE_DIRECTORY)
+        print2err("Warning: not using the iohub config cache folder ",
+                  CACHE_DIRECTORY, ", as it is not owned by the user or can "
+                  "be written to by others.")
+    return False
+
+
+def getCached(key):
+    """Return a fresh copy of the object stored under key, or None if the
+    key is not in the cache.
+    """
+    if not enabled:
+        return None
+    data = _pickled.get(key)
+    if data is None:
+        if not _checkCacheDirectory():
+            return None
+        try:
+            with open(_cacheFilePath(key), 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            return None
+        _pickled[key] = data
+    try:
+        return pickle.loads(data)
+    except Exception:
+        # corrupt / incompatible entry; ignore it, it will be rewritten.
+        _pickled.pop(key, None)
+        return None
+
+
+def storeCached(key, obj):
+    """Pickle obj into the cache under key. Errors writing the cache file are
+    reported but otherwise ignored, the cache is only an optimisation.
+    """
+    if not enabled:
+        return False
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    _pickled[key] = data
+    if not _checkCacheDirectory(create=True):
+        return False
+    try:
+        # write to a temp file and rename it so that a concurrently starting
+        # ioHub process never reads a partially written entry.
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIRECTORY, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        final_path = _cacheFilePath(key)
+        if os.path.exists(final_path):
+            os.remove(final_path)
+        os.rename(tmp_path, final_path)
+        return True
+    except (IOError, OSError), e:
+        print2err("Warning: could not write iohub config cache entry: ", e)
+        return False
+
+
+def loadYaml(file_path):
+    """Cached equivalent of load(file(file_path,'r'), Loader=Loader).
+
+    The parsed yaml is cached keyed on the hash of the file contents, so an
+    edited file is always re-parsed.
+    """
+    key = compileKey('yaml', fileHash(file_path))
+    contents = getCached(key)
+    if contents is None:
+        with open(file_path, 'r') as f:
+            contents = load(f, Loader=Loader)
+        storeCached(key, contents)
+    return contents
+
+
+def clearCache():
+    """Remove all cache entries, both in memory and on disk."""
+    _file_hashes.clear()
+    _pickled.clear()
+    if os.path.isdir(CACHE_DIRECTORY):
+        for fname in os.listdir(CACHE_DIRECTORY):
+            if fname.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(CACHE_DIRECTORY, fname))
+                except OSError:
+                    pass
+
+
+class StartupTimer(object):
+    """Records the duration of each named phase of the ioHub startup.
+
+    Example::
+
+        timer = StartupTimer()
+        with timer.phase('load_config'):
+            config = loadYaml(path)
+        print timer.report()
+    """
+    def __init__(self):
+        self.timings = OrderedDict()
+        self._start_times = {}
+
+    @contextmanager
+    def phase(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def start(self, name):
+        self._start_times[name] = monotonicClock.getTime()
+
+    def stop(self, name):
+        stime = self._start_times.pop(name, None)
+        if stime is not None:
+            self.add(name, monotonicClock.getTime() - stime)
+
+    def add(self, name, duration):
+        self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def total(self):
+        return sum(self.timings.values())
+
+    def items(self):
+        return self.timings.items()
+
+    def report(self):
+        lines = ["{0:<40} {1:8.2f} msec".format(name, dur * 1000.0)
+                 for name, dur in self.timings.iteritems()]
+        lines.append("{0:<40} {1:8.2f} msec".format('total',
+                                                   self.total() * 1000.0))
+        return '\n'.join(lines)
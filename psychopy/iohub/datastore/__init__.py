@@ -58,6 +58,13 @@ class ioHubpyTablesFile():
         
         self.flushCounter = self.settings.get('flush_interval', 32)
         self._eventCounter = 0
+
+        # Condition variable rows are buffered in a preallocated array and
+        # appended to the EXP_CV table in blocks of cvBlockSize rows.
+        self.cvBlockSize = max(1, self.settings.get('condition_variable_block_size', 16))
+        self._EXP_COND_DTYPE = None
+        self._cvRowBuffer = None
+        self._cvRowCount = 0
         
         self.TABLES = dict()
         self._eventGroupMappings = dict()
@@ -392,12 +399,17 @@ class ioHubpyTablesFile():
         #ioHub.print2err("Session ID set to: ",self.active_session_id)
         return self.active_session_id
 
+    #: Condition variable table columns that get a table index (if the
+    #: column exists), so trials can be looked up quickly by session / trial.
+    CV_INDEX_COLUMNS = ('SESSION_ID', 'TRIAL_ID', 'TRIAL_INDEX', 'TRIAL_START')
+
     def _initializeConditionVariableTable(self,experiment_id,session_id,np_dtype):
         experimentConditionVariableTable=None
         exp_session=[('EXPERIMENT_ID','i4'),('SESSION_ID','i4')]
         exp_session.extend(np_dtype)
         np_dtype=exp_session
         #print2err('np_dtype: ',np_dtype,' ',type(np_dtype))
+        self.flushConditionVariableRows()
         self._EXP_COND_DTYPE=N.dtype(np_dtype)
         try:
             expCondTableName="EXP_CV_%d"%(experiment_id)
@@ -407,6 +419,7 @@ class ioHubpyTablesFile():
             try:
                 experimentConditionVariableTable=self.emrtFile.createTable(self.emrtFile.root.data_collection.condition_variables,expCondTableName,self._EXP_COND_DTYPE,title='Condition Variable Values for Experiment ID %d'%(experiment_id))
                 self.TABLES['EXP_CV']=experimentConditionVariableTable
+                self._indexConditionVariableTable(experimentConditionVariableTable)
                 self.emrtFile.flush()
             except Exception:
                 printExceptionDetailsToStdErr()
@@ -416,31 +429,57 @@ class ioHubpyTablesFile():
             printExceptionDetailsToStdErr()
             return False
         self._activeRunTimeConditionVariableTable=experimentConditionVariableTable
+        self._cvRowBuffer=N.zeros(self.cvBlockSize,dtype=self._EXP_COND_DTYPE)
+        self._cvRowCount=0
         return True
 
+    def _indexConditionVariableTable(self,cvtable):
+        for cname in self.CV_INDEX_COLUMNS:
+            if cname in cvtable.colnames:
+                try:
+                    column=cvtable.cols._f_col(cname)
+                    if not column.is_indexed:
+                        column.createIndex()
+                except Exception:
+                    print2err('Error creating index for condition variable column: ',cname)
+                    printExceptionDetailsToStdErr()
+
     def _addRowToConditionVariableTable(self,experiment_id,session_id,data):
-        if self.emrtFile and 'EXP_CV' in self.TABLES and self._EXP_COND_DTYPE is not None:
+        if self.emrtFile and 'EXP_CV' in self.TABLES and self._cvRowBuffer is not None:
             temp=[experiment_id,session_id]
             temp.extend(data)
             data=temp            
             try:
-                etable=self.TABLES['EXP_CV']
                 #print2err('data: ',data,' ',type(data))
 
                 for i,d in enumerate(data):
                     if isinstance(d,(list,tuple)):
                         data[i]=tuple(d)
 
-                np_array= N.array([tuple(data),],dtype=self._EXP_COND_DTYPE)
-                etable.append(np_array)
-
-                self.bufferedFlush()
+                # Assigning the row to the buffer converts it to the table
+                # dtype, so bad values are reported for the row that has them.
+                self._cvRowBuffer[self._cvRowCount]=tuple(data)
+                self._cvRowCount+=1
+                if self._cvRowCount==self.cvBlockSize:
+                    self.flushConditionVariableRows()
                 return True
 
             except Exception:
                 printExceptionDetailsToStdErr()
         return False
 
+    def flushConditionVariableRows(self):
+        """
+        Appends any buffered condition variable rows to the EXP_CV table.
+        """
+        if self._cvRowCount and 'EXP_CV' in self.TABLES:
+            try:
+                self.TABLES['EXP_CV'].append(self._cvRowBuffer[:self._cvRowCount])
+                self.flush()
+            except Exception:
+                printExceptionDetailsToStdErr()
+        self._cvRowCount=0
+
     def addMetaDataToFile(self,metaData):
         pass
 
@@ -550,6 +589,7 @@ class ioHubpyTablesFile():
             printExceptionDetailsToStdErr()
 
     def close(self):
+        self.flushConditionVariableRows()
         self.flush()
         self._activeRunTimeConditionVariableTable=None
         self.emrtFile.close()
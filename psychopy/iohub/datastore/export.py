@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""
+ioHub
+.. file: ioHub/datastore/export.py
+
+Copyright (C) 2012-2013 iSolver Software Solutions
+Distributed under the terms of the GNU General Public License (GPL version 3 or any later version).
+
+Export ioHub DataStore files to one flat CSV or Parquet file per event type.
+
+The work is split into one task per (datastore file, event table) and the
+tasks are run by a pool of processes. Each task reads its event table in
+large chunks, only reading the columns that are being exported, and writes
+one output file per event type found in the table. If the experiment saved
+condition variables (ioHubConnection.addTrialHandlerRecord), the condition
+variable values of the trial each event occurred in are added as extra
+columns; an event is within a trial if its time is between the trial's
+TRIAL_START and TRIAL_END condition variable values (the column names used
+can be changed).
+
+Usage::
+
+    python -m psychopy.iohub.datastore.export -o exported events1.hdf5 events2.hdf5
+
+Run with --help for all options.
+"""
+from __future__ import division
+
+import os
+import sys
+import csv
+import time
+import argparse
+import multiprocessing
+
+import numpy as N
+import tables
+
+#: Number of rows read from an event table at a time.
+DEFAULT_CHUNK_SIZE = 100000
+
+#: Columns of the condition variable table that are not exported.
+CV_INDEX_COLUMNS = ('EXPERIMENT_ID', 'SESSION_ID')
+
+
+class ExportTask(object):
+    """Everything needed to export one event table of one datastore file."""
+    def __init__(self, file_path, table_path, class_names, output_dir,
+                 output_format='csv', columns=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, trial_start_col='TRIAL_START',
+                 trial_end_col='TRIAL_END', trial_events_only=False):
+        self.file_path = file_path
+        self.table_path = table_path
+        self.class_names = class_names  # event type id -> event class name
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.trial_start_col = trial_start_col
+        self.trial_end_col = trial_end_col
+        self.trial_events_only = trial_events_only
+
+
+class _CSVWriter(object):
+    def __init__(self, path, column_names):
+        self._file = open(path, 'wb')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(column_names)
+
+    def write(self, columns):
+        self._writer.writerows(zip(*[c.tolist() for c in columns]))
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter(object):
+    def __init__(self, path, column_names):
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self._path = path
+        self._names = column_names
+        self._writer = None
+
+    def write(self, columns):
+        pa = self._pa
+        batch = pa.Table.from_arrays([pa.array(c) for c in columns],
+                                     self._names)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, batch.schema)
+        self._writer.write_table(batch)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+_WRITERS = dict(csv=_CSVWriter, parquet=_ParquetWriter)
+
+
+def getEventTables(hub_file):
+    """Returns a dict of event table path -> {event type id: class name}
+    for all event types saved in the open datastore file."""
+    event_tables = dict()
+    mappings = hub_file.root.class_table_mapping.read()
+    for row in mappings[mappings['class_type_id'] == 1]:
+        event_tables.setdefault(row['table_path'], {})[
+            int(row['class_id'])] = row['class_name']
+    return event_tables
+
+
+def readConditionVariables(hub_file, trial_start_col, trial_end_col):
+    """Returns (cv_names, trials_by_session) for the condition variable table
+    of the datastore file, or (None, None) if there is none. trials_by_session
+    maps session_id -> (trial starts, trial ends, {cv name: values}), sorted
+    by trial start time."""
+    try:
+        cv_group = hub_file.root.data_collection.condition_variables
+    except tables.NoSuchNodeError:
+        return None, None
+    cv_tables = [t for n, t in sorted(cv_group._v_leaves.items())
+                 if n.startswith('EXP_CV_')]
+    if not cv_tables:
+        return None, None
+    cv = cv_tables[0].read()
+    names = cv.dtype.names
+    if (trial_start_col not in names or trial_end_col not in names
+            or 'SESSION_ID' not in names):
+        return None, None
+    cv_names = [n for n in names if n not in CV_INDEX_COLUMNS]
+    trials_by_session = dict()
+    for session_id in N.unique(cv['SESSION_ID']):
+        scv = cv[cv['SESSION_ID'] == session_id]
+        scv = scv[N.argsort(scv[trial_start_col], kind='mergesort')]
+        trials_by_session[int(session_id)] = (
+            scv[trial_start_col].astype(N.float64),
+            scv[trial_end_col].astype(N.float64),
+            dict((n, scv[n]) for n in cv_names))
+    return cv_names, trials_by_session
+
+
+def _missingValues(dtype, count):
+    if dtype.kind in 'SU':
+        return N.zeros(count, dtype)
+    if dtype.kind in 'fc':
+        return N.full(count, N.nan, dtype)
+    # int and bool columns become float so that nan can be used.
+    return N.full(count, N.nan, N.float64)
+
+
+def joinConditionVariables(session_ids, event_times, cv_names,
+                           trials_by_session):
+    """Returns (in_trial mask, [cv value arrays]) for the given events.
+    Values for events that are not within a trial are nan for numeric
+    columns and empty for string columns."""
+    count = len(event_times)
+    in_trial = N.zeros(count, dtype=bool)
+    trial_index = N.zeros(count, dtype=N.intp)
+    for session_id, (starts, ends, cv_values) in trials_by_session.items():
+        smask = session_ids == session_id
+        if not smask.any():
+            continue
+        stimes = event_times[smask]
+        sindex = N.searchsorted(starts, stimes, side='right') - 1
+        valid = sindex >= 0
+        valid[valid] = stimes[valid] <= ends[sindex[valid]]
+        in_trial[smask] = valid
+        trial_index[smask] = N.where(valid, sindex, 0)
+
+    cv_columns = []
+    for name in cv_names:
+        column = None
+        for session_id, (starts, ends, cv_values) in trials_by_session.items():
+            values = cv_values[name]
+            if column is None:
+                column = _missingValues(values.dtype, count)
+            mask = in_trial & (session_ids == session_id)
+            column[mask] = values[trial_index[mask]]
+        cv_columns.append(column)
+    return in_trial, cv_columns
+
+
+def exportEventTable(task):
+    """Exports one event table; run by the export process pool.
+
+    Returns (task, {event class name: rows written}, elapsed_sec).
+    """
+    stime = time.time()
+    rows_written = dict()
+    writers = dict()
+    hub_file = tables.openFile(task.file_path, 'r')
+    try:
+        table = hub_file.getNode(task.table_path)
+        columns = task.columns or list(table.colnames)
+        columns = [c for c in columns if c in table.colnames]
+        read_columns = list(columns)
+        for c in ('session_id', 'type', 'time'):
+            if c not in read_columns:
+                read_columns.append(c)
+
+        cv_names, trials_by_session = readConditionVariables(
+            hub_file, task.trial_start_col, task.trial_end_col)
+        out_names = list(columns)
+        if cv_names:
+            out_names.extend(n if n not in columns else 'cv_' + n
+                             for n in cv_names)
+
+        file_label = os.path.splitext(os.path.basename(task.file_path))[0]
+        out_dir = os.path.join(task.output_dir, file_label)
+        if not os.path.isdir(out_dir):
+            try:
+                os.makedirs(out_dir)
+            except OSError:
+                # created by another export process
+                pass
+
+        for start in xrange(0, table.nrows, task.chunk_size):
+            stop = min(start + task.chunk_size, table.nrows)
+            data = dict((c, table.read(start, stop, field=c))
+                        for c in read_columns)
+
+            in_trial = None
+            cv_columns = []
+            if cv_names:
+                in_trial, cv_columns = joinConditionVariables(
+                    data['session_id'], data['time'], cv_names,
+                    trials_by_session)
+
+            event_types = data['type']
+            for type_id in N.unique(event_types):
+                class_name = task.class_names.get(int(type_id))
+                if class_name is None:
+                    continue
+                mask = event_types == type_id
+                if task.trial_events_only and in_trial is not None:
+                    mask &= in_trial
+                if not mask.any():
+                    continue
+                out_columns = [data[c][mask] for c in columns]
+                out_columns.extend(c[mask] for c in cv_columns)
+
+                writer = writers.get(class_name)
+                if writer is None:
+                    out_path = os.path.join(out_dir, '{0}.{1}'.format(
+                        class_name, task.output_format))
+                    writer = _WRITERS[task.output_format](out_path,
+                                                          out_names)
+                    writers[class_name] = writer
+                writer.write(out_columns)
+                rows_written[class_name] = (rows_written.get(class_name, 0) +
+                                            int(mask.sum()))
+    finally:
+        for writer in writers.values():
+            writer.close()
+        hub_file.close()
+    return task, rows_written, time.time() - stime
+
+
+def createExportTasks(file_paths, output_dir, **task_kwargs):
+    """Returns a list of ExportTask's, one per event table with data in each
+    of the given datastore files."""
+    tasks = []
+    for file_path in file_paths:
+        hub_file = tables.openFile(file_path, 'r')
+        try:
+            for table_path, class_names in getEventTables(hub_file).items():
+                nrows = hub_file.getNode(table_path).nrows
+                if nrows > 0:
+                    tasks.append((nrows, ExportTask(file_path, table_path,
+                                                    class_names, output_dir,
+                                                    **task_kwargs)))
+        finally:
+            hub_file.close()
+    # start the biggest tables first so the pool finishes evenly.
+    tasks.sort(key=lambda t: t[0], reverse=True)
+    return [task for size, task in tasks]
+
+
+def exportDataStoreFiles(file_paths, output_dir, processes=None,
+                         progress=True, **task_kwargs):
+    """Exports all event data in the given ioHub DataStore files to
+    output_dir/<datastore file name>/<event class name>.<format>.
+
+    Args:
+        file_paths (list): ioHub DataStore (.hdf5) file paths.
+        output_dir (str): Folder the exported files are saved in.
+        processes (int): Number of export processes to use. Default is the number of cpu's.
+        progress (bool): If True, progress and throughput are printed to stdout.
+        task_kwargs: Any of output_format ('csv' or 'parquet'), columns, chunk_size, trial_start_col, trial_end_col or trial_events_only.
+
+    Returns:
+        dict: (file path, event class name) -> number of rows exported.
+    """
+    stime = time.time()
+    tasks = createExportTasks(file_paths, output_dir, **task_kwargs)
+    if task_kwargs.get('output_format') == 'parquet':
+        import pyarrow.parquet  # fail early if pyarrow is not installed
+    results = dict()
+    total_rows = 0
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    processes = max(1, min(processes, len(tasks)))
+
+    if processes == 1:
+        task_results = (exportEventTable(t) for t in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        task_results = pool.imap_unordered(exportEventTable, tasks)
+
+    try:
+        for i, (task, rows_written, task_dur) in enumerate(task_results):
+            task_rows = sum(rows_written.values())
+            total_rows += task_rows
+            for class_name, count in rows_written.items():
+                key = (task.file_path, class_name)
+                results[key] = results.get(key, 0) + count
+            if progress:
+                elapsed = time.time() - stime
+                print ("[{0}/{1}] {2}:{3} {4} rows in {5:.2f} sec; "
+                       "total {6} rows, {7:.0f} rows/sec".format(
+                           i + 1, len(tasks),
+                           os.path.basename(task.file_path),
+                           task.table_path, task_rows, task_dur, total_rows,
+                           total_rows / elapsed if elapsed > 0 else 0.0))
+                sys.stdout.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Export ioHub DataStore files to one CSV or Parquet file '
+                    'per event type.')
+    parser.add_argument('files', nargs='+', help='ioHub .hdf5 files')
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help='folder to save exported files to')
+    parser.add_argument('-f', '--format', default='csv',
+                        choices=sorted(_WRITERS.keys()),
+                        help='output file format')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of export processes (default: cpu count)')
+    parser.add_argument('-c', '--columns', default=None,
+                        help='comma separated event columns to export '
+                             '(default: all)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='rows read from a table at a time')
+    parser.add_argument('--trial-start-col', default='TRIAL_START',
+                        help='condition variable holding trial start times')
+    parser.add_argument('--trial-end-col', default='TRIAL_END',
+                        help='condition variable holding trial end times')
+    parser.add_argument('--trial-events-only', action='store_true',
+                        help='only export events that occurred within a trial')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='do not print progress')
+    args = parser.parse_args(argv)
+
+    columns = None
+    if args.columns:
+        columns = [c.strip() for c in args.columns.split(',') if c.strip()]
+
+    stime = time.time()
+    results = exportDataStoreFiles(args.files, args.output_dir,
+                                   processes=args.processes,
+                                   progress=not args.quiet,
+                                   output_format=args.format,
+                                   columns=columns,
+                                   chunk_size=args.chunk_size,
+                                   trial_start_col=args.trial_start_col,
+                                   trial_end_col=args.trial_end_col,
+                                   trial_events_only=args.trial_events_only)
+    if not args.quiet:
+        total_rows = sum(results.values())
+        dur = time.time() - stime
+        print "Exported {0} rows from {1} file(s) in {2:.2f} sec.".format(
+            total_rows, len(args.files), dur)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
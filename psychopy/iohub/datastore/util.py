@@ -14,6 +14,7 @@ from tables import *
 import os
 from collections import namedtuple
 import json
+import numpy as N
 
 from psychopy import gui, iohub
 from psychopy.iohub import FileDialog
@@ -295,31 +296,59 @@ class ExperimentDataAccessUtility(object):
 
     def getConditionVariables(self,filter=None):
         """
-        **Docstr TBC.**
+        Returns the condition variable rows of the experiment that match all
+        of the filter conditions, as a list of ConditionSetInstance
+        namedtuples.
+
+        filter is a dict of column name -> (comparison, value) pairs, for
+        example dict(SESSION_ID=('==',2),BLOCK=('>',1)). The ' in '
+        comparison accepts a list of values. By default the rows of all
+        sessions of the experiment are returned.
+
+        The comparisons are evaluated in a single table query, which uses the
+        indexes created on the SESSION_ID and trial columns of the table.
         """
+        cv_group=self.hdfFile.root.data_collection.condition_variables
+        ecv="EXP_CV_%d"%(self._experimentID,)
+        if ecv not in cv_group._v_leaves:
+            return []
+        ecvTable=cv_group._v_leaves[ecv]
+
         if filter is None:
             session_ids=[]
             for s in self.getExperimentMetaData()[0].sessions:
                 session_ids.append(s.session_id)
             filter=dict(session_id=(' in ',session_ids))
 
-        ConditionSetInstance=None
+        colnames=ecvTable.colnames
+        ConditionSetInstance = namedtuple('ConditionSetInstance', colnames)
+        # column names are matched case insensitively (session_id==SESSION_ID)
+        column_names=dict((c.lower(),c) for c in colnames)
 
+        # the values are passed to the query as condvars, not formatted
+        # into the condition string
+        conditions=[]
+        condvars={}
+        in_filters=[]
         for conditionVarName, conditionVarComparitor in filter.iteritems():
             avComparison, value = conditionVarComparitor
-
-            cv_group=self.hdfFile.root.data_collection.condition_variables
-            cvrows=[]
-            ecv="EXP_CV_%d"%(self._experimentID,)
-            if ecv in cv_group._v_leaves:
-                ecvTable=cv_group._v_leaves[ecv]
-
-                if ConditionSetInstance is None:
-                    colnam=ecvTable.colnames
-                    ConditionSetInstance = namedtuple('ConditionSetInstance', colnam)
-
-                cvrows.extend([ConditionSetInstance(*r[:]) for r in ecvTable if all([eval("{0} {1} {2}".format(r[conditionVarName],conditionVarComparitor[0],conditionVarComparitor[1])) for conditionVarName, conditionVarComparitor in filter.iteritems()])])
-        return cvrows
+            cname=column_names.get(conditionVarName.lower(),conditionVarName)
+            if avComparison.strip()=='in':
+                in_filters.append((cname,value))
+            else:
+                if isinstance(value,unicode):
+                    value=value.encode('utf-8') # string columns hold bytes
+                vname='filter_value_%d'%(len(condvars),)
+                condvars[vname]=value
+                conditions.append("(%s %s %s)"%(cname,avComparison.strip(),vname))
+
+        if conditions:
+            cvrows=ecvTable.readWhere(' & '.join(conditions),condvars=condvars)
+        else:
+            cvrows=ecvTable.read()
+        for cname,values in in_filters:
+            cvrows=cvrows[N.in1d(cvrows[cname],values)]
+        return [ConditionSetInstance(*r) for r in cvrows.tolist()]
 
     def getValuesForVariables(self,cv, value, cvNames):
         """
@@ -12,7 +12,8 @@ Created on Thu Mar 14 16:32:33 2013
 import socket
 import os
 
-from psychopy.iohub import module_directory, load, dump, Loader, Dumper, print2err
+from psychopy.iohub import module_directory, print2err
+from psychopy.iohub import configcache
 
 
 class ValidationError(Exception):
@@ -348,7 +349,7 @@ CONFIG_VALIDATION_KEY_WORD_MAPPINGS=dict(IOHUB_STRING=isValidString,
 # load a support_settings_values.yaml
 
 def loadYamlFile(yaml_file_path,print_file=False):
-    yaml_file_contents=load(file(yaml_file_path,'r'), Loader=Loader)
+    yaml_file_contents=configcache.loadYaml(yaml_file_path)
 #    if print_file:
 #        print 'yaml_file_contents:'
 #        print 'file: ',yaml_file_path
@@ -415,19 +416,36 @@ def validateConfigDictToFuncMapping(param_validation_func_mapping,current_device
             validation_results['not_found'].append((config_param,config_value))
     return validation_results
 
-def validateDeviceConfiguration(relative_module_path,device_class_name,current_device_config):
-    validation_file_path=os.path.join(_current_dir,relative_module_path[len('psychopy.iohub.devices.'):].replace('.',os.path.sep),'supported_config_settings_{0}.yaml'.format(device_class_name.lower()))
+def getValidationFilePath(relative_module_path,device_class_name):
+    device_dir=os.path.join(_current_dir,relative_module_path[len('psychopy.iohub.devices.'):].replace('.',os.path.sep))
+    validation_file_path=os.path.join(device_dir,'supported_config_settings_{0}.yaml'.format(device_class_name.lower()))
     if not os.path.exists(validation_file_path):
-        validation_file_path=os.path.join(_current_dir,relative_module_path[len('psychopy.iohub.devices.'):].replace('.',os.path.sep),'supported_config_settings.yaml')
-    #print2err("{0} using config settings file: ".format(device_class_name.lower()),validation_file_path)
-    device_settings_validation_dict=loadYamlFile(validation_file_path,print_file=True)
-    device_settings_validation_dict=device_settings_validation_dict[device_settings_validation_dict.keys()[0]]
+        validation_file_path=os.path.join(device_dir,'supported_config_settings.yaml')
+    return validation_file_path
+
+# validation file hash -> param_validation_func_mapping, so the mapping for a
+# device type is only built once per process.
+_validator_mappings=dict()
+
+def getConfigParamValidatorMapping(validation_file_path):
+    file_hash=configcache.fileHash(validation_file_path)
+    param_validation_func_mapping=_validator_mappings.get(file_hash)
+    if param_validation_func_mapping is None:
+        device_settings_validation_dict=loadYamlFile(validation_file_path,print_file=True)
+        device_settings_validation_dict=device_settings_validation_dict[device_settings_validation_dict.keys()[0]]
+
+        param_validation_func_mapping=dict()
+        parent_config_param_path=None
+        buildConfigParamValidatorMapping(device_settings_validation_dict,param_validation_func_mapping,parent_config_param_path)
+        _validator_mappings[file_hash]=param_validation_func_mapping
+    return param_validation_func_mapping
 
-    param_validation_func_mapping=dict()
-    parent_config_param_path=None
-    buildConfigParamValidatorMapping(device_settings_validation_dict,param_validation_func_mapping,parent_config_param_path)
+def validateDeviceConfiguration(relative_module_path,device_class_name,current_device_config):
+    validation_file_path=getValidationFilePath(relative_module_path,device_class_name)
+    #print2err("{0} using config settings file: ".format(device_class_name.lower()),validation_file_path)
+    param_validation_func_mapping=getConfigParamValidatorMapping(validation_file_path)
 
-#    ioHub.print2err("#### buildConfigParamValidatorMapping results:\n\ncurrent_device_config: {0}\n\n validation_rules config: {1}\n\n Config Constants Mapping: {2}\n".format(current_device_config,device_settings_validation_dict,param_validation_func_mapping))
+#    ioHub.print2err("#### buildConfigParamValidatorMapping results:\n\ncurrent_device_config: {0}\n\n Config Constants Mapping: {1}\n".format(current_device_config,param_validation_func_mapping))
 
     validation_results=validateConfigDictToFuncMapping(param_validation_func_mapping,current_device_config,None)
 
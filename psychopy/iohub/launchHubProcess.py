@@ -13,26 +13,29 @@ from psychopy.iohub import Computer
 Computer.is_iohub_process = True
 from psychopy.iohub.server import ioServer
 
-from psychopy.iohub import updateDict,printExceptionDetailsToStdErr, print2err, MonotonicClock, load, Loader
+from psychopy.iohub import updateDict,printExceptionDetailsToStdErr, print2err, MonotonicClock
+from psychopy.iohub import configcache
 
 def run(rootScriptPathDir,configFilePath):
     psychopy.iohub.EXP_SCRIPT_DIRECTORY = rootScriptPathDir
 
-    import tempfile
-    tdir=tempfile.gettempdir()
-    cdir,cfile=os.path.split(configFilePath)
-    if tdir==cdir:
-        tf=open(configFilePath)
-        ioHubConfig=json.loads(tf.read())
-        tf.close()
-        os.remove(configFilePath)
-    else:
-        ioHubConfig=load(file(configFilePath,'r'), Loader=Loader)
-
-    hub_defaults_config=load(file(os.path.join(psychopy.iohub.IO_HUB_DIRECTORY,'default_config.yaml'),'r'), Loader=Loader)
-    updateDict(ioHubConfig,hub_defaults_config)
+    startup_timer=configcache.StartupTimer()
+    with startup_timer.phase('load_config'):
+        import tempfile
+        tdir=tempfile.gettempdir()
+        cdir,cfile=os.path.split(configFilePath)
+        if tdir==cdir:
+            tf=open(configFilePath)
+            ioHubConfig=json.loads(tf.read())
+            tf.close()
+            os.remove(configFilePath)
+        else:
+            ioHubConfig=configcache.loadYaml(configFilePath)
+
+        hub_defaults_config=configcache.loadYaml(os.path.join(psychopy.iohub.IO_HUB_DIRECTORY,'default_config.yaml'))
+        updateDict(ioHubConfig,hub_defaults_config)
     try:
-        s = ioServer(rootScriptPathDir, ioHubConfig)
+        s = ioServer(rootScriptPathDir, ioHubConfig, startup_timer)
     except Exception,e:
         printExceptionDetailsToStdErr()
         sys.stdout.flush()
@@ -46,18 +49,25 @@ def run(rootScriptPathDir,configFilePath):
     
     try:
         s.log('Receiving datagrams on :9000')
-        s.udpService.start()
+        with startup_timer.phase('start_udp_server'):
+            s.udpService.start()
+        s.log("ioHub Server startup timings:\n"+startup_timer.report())
 
 
         if Computer.system == 'win32':
             gevent.spawn(s.pumpMsgTasklet, s.config.get('windows_msgpump_interval', 0.00375))
 
+        metrics_dump_interval=s.config.get('hub_metrics',{}).get('dump_interval',0)
+
         if hasattr(gevent,'run'):
             for m in s.deviceMonitors:
                 m.start()
     
             gevent.spawn(s.processEventsTasklet, 0.01)
 
+            if s.metrics and metrics_dump_interval>0:
+                gevent.spawn(s.metricsDumpTasklet, metrics_dump_interval)
+
             sys.stdout.write("IOHUB_READY\n\r\n\r")
 
             #print2err("Computer.psychopy_process: ", Computer.psychopy_process)
@@ -76,6 +86,9 @@ def run(rootScriptPathDir,configFilePath):
                 m.start()
                 glets.append(m)
             glets.append(gevent.spawn(s.processEventsTasklet,0.01))
+
+            if s.metrics and metrics_dump_interval>0:
+                glets.append(gevent.spawn(s.metricsDumpTasklet, metrics_dump_interval))
     
             sys.stdout.write("IOHUB_READY\n\r\n\r")
             sys.stdout.flush()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+ioHub
+.. file: ioHub/metrics.py
+
+Copyright (C) 2012-2013 iSolver Software Solutions
+Distributed under the terms of the GNU General Public License (GPL version 3 or any later version).
+
+Low overhead run time metrics for the ioHub Server.
+
+The ioServer records device _poll() durations, device native event buffer
+depths, the global event buffer depth, the number of events waiting to be
+flushed to the ioDataStore, and event latencies:
+
+    * device_to_hub: logged_time - device_time of each event processed.
+    * hub_to_client: the age of each event (current time - event time) when
+      it is returned to the experiment process by getEvents().
+
+All values are stored in Histogram objects that preallocate their bin counts,
+so adding a value never allocates memory.
+"""
+from bisect import bisect_right
+import numpy as N
+
+from psychopy.iohub import OrderedDict
+
+
+def logBinEdges(min_value, max_value, bins_per_decade=10):
+    """Log spaced histogram bin edges from min_value to max_value."""
+    decades = N.log10(max_value) - N.log10(min_value)
+    return N.logspace(N.log10(min_value), N.log10(max_value),
+                      int(round(decades * bins_per_decade)) + 1)
+
+
+#: Bin edges used for durations and latencies; 1 usec to 10 sec.
+TIME_BIN_EDGES = logBinEdges(1.0e-6, 10.0)
+
+#: Bin edges used for buffer / queue depths.
+DEPTH_BIN_EDGES = N.hstack(([0, 1, 2, 4], logBinEdges(8, 65536, 4)))
+
+
+class Histogram(object):
+    """Fixed bin histogram with running count, sum, min and max.
+
+    Values below the first bin edge are counted in the first bin, values at or
+    above the last edge in the last (overflow) bin.
+    """
+    __slots__ = ['edges', 'counts', 'count', 'total', 'min', 'max', '_edges']
+
+    def __init__(self, edges):
+        self.edges = N.asarray(edges, dtype=N.float64)
+        # bisect on a list is much faster than numpy for single values.
+        self._edges = self.edges.tolist()
+        self.counts = N.zeros(len(self.edges), dtype=N.int64)
+        self.reset()
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        i = bisect_right(self._edges, value) - 1
+        self.counts[i if i > 0 else 0] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def addArray(self, values):
+        """Add all values in a 1D array (or list) at once."""
+        values = N.asarray(values, dtype=N.float64)
+        if values.size == 0:
+            return
+        indices = N.searchsorted(self.edges, values, side='right') - 1
+        N.clip(indices, 0, len(self.counts) - 1, out=indices)
+        self.counts += N.bincount(indices, minlength=len(self.counts))
+        self.count += values.size
+        self.total += float(values.sum())
+        vmin = float(values.min())
+        vmax = float(values.max())
+        if self.min is None or vmin < self.min:
+            self.min = vmin
+        if self.max is None or vmax > self.max:
+            self.max = vmax
+
+    def mean(self):
+        if self.count:
+            return self.total / self.count
+        return None
+
+    def percentile(self, pct):
+        """Approximate percentile (0 - 100), given as the lower edge of the
+        bin the percentile falls in."""
+        if self.count == 0:
+            return None
+        i = int(N.searchsorted(N.cumsum(self.counts),
+                               self.count * pct / 100.0))
+        return float(self.edges[min(i, len(self.edges) - 1)])
+
+    def summary(self, include_bins=False):
+        s = dict(count=self.count, mean=self.mean(), min=self.min,
+                 max=self.max, p50=self.percentile(50),
+                 p95=self.percentile(95), p99=self.percentile(99))
+        if include_bins:
+            nz = N.nonzero(self.counts)[0]
+            s['bins'] = [(float(self.edges[i]), int(self.counts[i]))
+                         for i in nz]
+        return s
+
+
+class HubMetrics(object):
+    """The set of Histograms recorded by the ioServer."""
+    def __init__(self):
+        self.poll_duration = OrderedDict()
+        self.native_buffer_depth = OrderedDict()
+        self.event_buffer_depth = Histogram(DEPTH_BIN_EDGES)
+        self.datastore_queue_size = Histogram(DEPTH_BIN_EDGES)
+        self.device_to_hub_latency = Histogram(TIME_BIN_EDGES)
+        self.hub_to_client_latency = Histogram(TIME_BIN_EDGES)
+
+    def addDevice(self, device_name):
+        if device_name not in self.poll_duration:
+            self.poll_duration[device_name] = Histogram(TIME_BIN_EDGES)
+            self.native_buffer_depth[device_name] = Histogram(DEPTH_BIN_EDGES)
+
+    def _histograms(self):
+        for dname, h in self.poll_duration.iteritems():
+            yield 'poll_duration.' + dname, h
+        for dname, h in self.native_buffer_depth.iteritems():
+            yield 'native_buffer_depth.' + dname, h
+        for name in ('event_buffer_depth', 'datastore_queue_size',
+                     'device_to_hub_latency', 'hub_to_client_latency'):
+            yield name, getattr(self, name)
+
+    def reset(self):
+        for name, h in self._histograms():
+            h.reset()
+
+    def summary(self, include_bins=False):
+        """Returns a dict of metric name -> summary dict for all metrics."""
+        return dict((name, h.summary(include_bins))
+                    for name, h in self._histograms())
+
+    def summaryLines(self):
+        """One short line of text per metric that has data; used when
+        saving the metrics to the ioDataStore as log events."""
+        lines = []
+        for name, h in self._histograms():
+            if h.count:
+                lines.append("hub_metrics {0} n={1} mean={2:.6g} p95={3:.6g}"
+                             " max={4:.6g}".format(name, h.count, h.mean(),
+                                                   h.percentile(95), h.max))
+        return lines
@@ -14,15 +14,17 @@ import gevent
 from gevent.server import DatagramServer
 from gevent import Greenlet
 import os,sys
+import threading
 from operator import itemgetter
 from collections import deque
 import psychopy.iohub
 from psychopy.iohub import OrderedDict, convertCamelToSnake, IO_HUB_DIRECTORY
-from psychopy.iohub import load, dump, Loader, Dumper
 from psychopy.iohub import print2err, printExceptionDetailsToStdErr, ioHubError
 from psychopy.iohub import DeviceConstants, EventConstants
 from psychopy.iohub import Computer, DeviceEvent, import_device
-from psychopy.iohub.devices.deviceConfigValidation import validateDeviceConfiguration
+from psychopy.iohub.devices.deviceConfigValidation import validateDeviceConfiguration, getValidationFilePath
+from psychopy.iohub import configcache
+from psychopy.iohub.metrics import HubMetrics
 currentSec= Computer.currentSec
 
 try:
@@ -141,6 +143,10 @@ class udpServer(DatagramServer):
 
             if len(currentEvents)>0:
                 currentEvents=sorted(currentEvents, key=itemgetter(DeviceEvent.EVENT_HUB_TIME_INDEX))
+                metrics=self.iohub.metrics
+                if metrics:
+                    ctime=Computer.getTime()
+                    metrics.hub_to_client_latency.addArray([ctime-e[DeviceEvent.EVENT_HUB_TIME_INDEX] for e in currentEvents])
                 self.sendResponse(('GET_EVENTS_RESULT',currentEvents),replyTo)
             else:
                 self.sendResponse(('GET_EVENTS_RESULT', None),replyTo)
@@ -418,8 +424,36 @@ class udpServer(DatagramServer):
     def setProcessAffinity(self, processorList):
         return Computer.setCurrentProcessAffinity(processorList)
 
+    def getStartupTimings(self):
+        """
+        Returns a list of [phase_name, duration_sec] pairs giving the time
+        taken by each phase of the ioHub Server startup.
+        """
+        return [[name,dur] for name,dur in self.iohub.startup_timer.items()]
+
+    def getHubMetrics(self, include_bins=False, reset=False):
+        """
+        Returns a dict of metric name -> summary dict for all metrics being
+        recorded by the ioHub Server, or None if metrics are disabled.
+        See psychopy.iohub.metrics for details.
+        """
+        metrics=self.iohub.metrics
+        if metrics is None:
+            return None
+        result=metrics.summary(include_bins)
+        if reset:
+            metrics.reset()
+        return result
+
+    def resetHubMetrics(self):
+        if self.iohub.metrics:
+            self.iohub.metrics.reset()
+            return True
+        return False
+
     def flushIODataStoreFile(self):
         if self.iohub.emrt_file:
+            self.iohub.emrt_file.flushConditionVariableRows()
             self.iohub.emrt_file.emrtFile.flush()
             return True
         return False
@@ -436,19 +470,28 @@ class udpServer(DatagramServer):
             sys.exit(1)
 
 class DeviceMonitor(Greenlet):
-    def __init__(self, device,sleep_interval):
+    def __init__(self, device,sleep_interval,metrics=None):
         Greenlet.__init__(self)
         self.device = device
         self.sleep_interval=sleep_interval
         self.running=False
-        
+        self.poll_duration=None
+        if metrics:
+            device_name=device.__class__.__name__
+            metrics.addDevice(device_name)
+            self.poll_duration=metrics.poll_duration[device_name]
+
     def _run(self):
         self.running = True
         ctime=Computer.currentSec
+        poll_duration=self.poll_duration
         while self.running is True:
             stime=ctime()
             self.device._poll()
-            i=self.sleep_interval-(ctime()-stime)
+            ptime=ctime()-stime
+            if poll_duration:
+                poll_duration.add(ptime)
+            i=self.sleep_interval-ptime
             if i > 0.0:
                 gevent.sleep(i)
             else:
@@ -463,7 +506,7 @@ class ioServer(object):
     deviceDict={}
     _logMessageBuffer=deque(maxlen=128)
     _pyglet_window_hnds=[]
-    def __init__(self, rootScriptPathDir, config=None):
+    def __init__(self, rootScriptPathDir, config=None, startup_timer=None):
         self._session_id=None
         self._experiment_id=None
 
@@ -482,6 +525,19 @@ class ioServer(object):
         self._hookDevice=None
         ioServer.eventBuffer=deque(maxlen=config.get('global_event_buffer',2048))
 
+        if startup_timer is None:
+            startup_timer=configcache.StartupTimer()
+        self.startup_timer=startup_timer
+
+        self.metrics=None
+        if config.get('hub_metrics',{}).get('enable',True):
+            self.metrics=HubMetrics()
+
+        # Import the device modules on a background thread while the
+        # datastore file is being created; import_device then finds them
+        # already loaded.
+        self._device_import_thread=self._prefetchDeviceModules(config.get('monitor_devices',()))
+
         self._running=True
         
         # start UDP service
@@ -493,7 +549,7 @@ class ioServer(object):
                 experiment_datastore_config=config.get('data_store')
                 default_datastore_config_path=os.path.join(IO_HUB_DIRECTORY,'datastore','default_datastore.yaml')
                 #print2err('default_datastore_config_path: ',default_datastore_config_path)
-                _dslabel,default_datastore_config=load(file(default_datastore_config_path,'r'), Loader=Loader).popitem()
+                _dslabel,default_datastore_config=configcache.loadYaml(default_datastore_config_path).popitem()
 
                 for default_key,default_value in default_datastore_config.iteritems():
                     if default_key not in experiment_datastore_config:
@@ -503,7 +559,8 @@ class ioServer(object):
                     #print2err("Creating ioDataStore....")
 
                     resultsFilePath=rootScriptPathDir
-                    self.createDataStoreFile(experiment_datastore_config.get('filename','events')+'.hdf5',resultsFilePath,'a',experiment_datastore_config)
+                    with self.startup_timer.phase('create_datastore'):
+                        self.createDataStoreFile(experiment_datastore_config.get('filename','events')+'.hdf5',resultsFilePath,'a',experiment_datastore_config)
 
                     #print2err("Created ioDataStore.")
         except Exception:
@@ -511,13 +568,19 @@ class ioServer(object):
             printExceptionDetailsToStdErr()
 
 
+        with self.startup_timer.phase('device_module_imports'):
+            if self._device_import_thread:
+                self._device_import_thread.join()
+                self._device_import_thread=None
+
         #built device list and config from initial yaml config settings
         try:
             for iodevice in config.get('monitor_devices',()):
                 for device_class_name,deviceConfig in iodevice.iteritems():
                     #print2err("======================================================")
                     #print2err("Started load process for: {0}".format(device_class_name))
-                    self.createNewMonitoredDevice(device_class_name,deviceConfig)
+                    with self.startup_timer.phase('create_device.%s'%(device_class_name,)):
+                        self.createNewMonitoredDevice(device_class_name,deviceConfig)
         except Exception:
             print2err("Error during device creation ....")
             printExceptionDetailsToStdErr()
@@ -545,6 +608,82 @@ class ioServer(object):
         #print2err("-- ioServer Init Complete -- ")
         
 
+    @staticmethod
+    def getDeviceModulePath(device_class_name):
+        """
+        Returns the (device_module_path, device_class_name) for a device class
+        name as given in the iohub config, which can include a sub package
+        path, i.e. 'eyetracker.hw.sr_research.eyelink.EyeTracker'.
+        """
+        device_class_name=str(device_class_name)
+        class_name_start=device_class_name.rfind('.')
+        device_module_path='psychopy.iohub.devices.'
+        if class_name_start>0:
+            device_module_path="{0}{1}".format(device_module_path,device_class_name[:class_name_start].lower())
+            device_class_name=device_class_name[class_name_start+1:]
+        else:
+            device_module_path="{0}{1}".format(device_module_path,device_class_name.lower())
+        return device_module_path,device_class_name
+
+    def _prefetchDeviceModules(self,monitor_devices):
+        module_paths=[]
+        for iodevice in monitor_devices:
+            for device_class_name in iodevice.keys():
+                device_module_path=self.getDeviceModulePath(device_class_name)[0]
+                if device_module_path not in sys.modules and device_module_path not in module_paths:
+                    module_paths.append(device_module_path)
+        if not module_paths:
+            return None
+
+        def importModules():
+            for module_path in module_paths:
+                try:
+                    __import__(module_path)
+                except Exception:
+                    # Errors are reported when the device is created and the
+                    # import is retried by import_device.
+                    pass
+
+        import_thread=threading.Thread(target=importModules,name='iohub_device_imports')
+        import_thread.daemon=True
+        import_thread.start()
+        return import_thread
+
+    def compileDeviceConfig(self,device_module_path,device_class_name,device_config,dconfigPath):
+        """
+        Merges the device defaults into device_config and validates the result,
+        updating device_config in place. The merged config and any validation
+        errors are cached, keyed on the device settings given by the experiment
+        and the hash of the device's default and supported settings yaml files.
+        """
+        cache_key=None
+        try:
+            cache_key=configcache.compileKey('device_config',device_module_path,device_class_name,
+                                             device_config,
+                                             configcache.fileHash(dconfigPath),
+                                             configcache.fileHash(getValidationFilePath(device_module_path,device_class_name)))
+        except Exception:
+            # unpicklable / unhashable experiment settings; just don't cache.
+            pass
+
+        compiled=None
+        if cache_key:
+            compiled=configcache.getCached(cache_key)
+        if compiled:
+            merged_config,config_errors=compiled
+            device_config.clear()
+            device_config.update(merged_config)
+            if config_errors:
+                self._all_device_config_errors[device_module_path]=config_errors
+            return
+
+        _dclass,default_device_config=configcache.loadYaml(dconfigPath).popitem()
+        #print2err("Device Defaults:\n\tdevice_class: {0}\n\tdefault_device_config:{1}\n".format(device_class_name,default_device_config))
+        self.processDeviceConfigDictionary(device_module_path, device_class_name, device_config,default_device_config)
+
+        if cache_key:
+            configcache.storeCached(cache_key,(device_config,self._all_device_config_errors.get(device_module_path)))
+
     def processDeviceConfigDictionary(self,device_module_path, device_class_name, device_config_dict,default_device_config_dict):
         for default_config_param,default_config_value in default_device_config_dict.iteritems():
             if default_config_param not in device_config_dict:            
@@ -705,14 +844,14 @@ class ioServer(object):
                     
                 if  device_class_name == 'Mouse' and 'Mouse' not in self._hookDevice:
                     #print2err("Hooking OSX Mouse.....")
-                    mouseHookMonitor=DeviceMonitor(deviceDict['Mouse'],0.004)
+                    mouseHookMonitor=DeviceMonitor(deviceDict['Mouse'],0.004,self.metrics)
                     self.deviceMonitors.append(mouseHookMonitor)
                     deviceDict['Mouse']._CGEventTapEnable(deviceDict['Mouse']._tap, True)
                     self._hookDevice.append('Mouse')
                     #print2err("Done Hooking OSX Mouse.....")
                 if device_class_name == 'Keyboard'  and 'Keyboard' not in self._hookDevice:
                     #print2err("Hooking OSX Keyboard.....")
-                    kbHookMonitor=DeviceMonitor(deviceDict['Keyboard'],0.004)
+                    kbHookMonitor=DeviceMonitor(deviceDict['Keyboard'],0.004,self.metrics)
                     self.deviceMonitors.append(kbHookMonitor)
                     deviceDict['Keyboard']._CGEventTapEnable(deviceDict['Keyboard']._tap, True)
                     self._hookDevice.append('Keyboard')
@@ -729,15 +868,8 @@ class ioServer(object):
         #print2err("addDeviceToMonitor:\n\tdevice_class: {0}\n\texperiment_device_config:{1}\n".format(device_class_name,device_config))
 
         DeviceClass=None
-        class_name_start=device_class_name.rfind('.')
-        iohub_sub_mod='psychopy.iohub.'
-        iohub_submod_path_length=len(iohub_sub_mod)
-        device_module_path=iohub_sub_mod+'devices.'
-        if class_name_start>0:
-            device_module_path="{0}{1}".format(device_module_path,device_class_name[:class_name_start].lower())   
-            device_class_name=device_class_name[class_name_start+1:]
-        else:
-            device_module_path="{0}{1}".format(device_module_path,device_class_name.lower())
+        iohub_submod_path_length=len('psychopy.iohub.')
+        device_module_path,device_class_name=self.getDeviceModulePath(device_class_name)
 
         #print2err("Processing device, device_class_name: {0}, device_module_path: {1}".format(device_class_name, device_module_path))
          
@@ -747,11 +879,7 @@ class ioServer(object):
         #print2err("Loading Device Defaults file:\n\tdevice_class: {0}\n\tdeviceConfigFile:{1}\n".format(device_class_name,dconfigPath))
         self.log("Loading Device Defaults file: %s"%(device_class_name,))
 
-        _dclass,default_device_config=load(file(dconfigPath,'r'), Loader=Loader).popitem()
-
-        #print2err("Device Defaults:\n\tdevice_class: {0}\n\tdefault_device_config:{1}\n".format(device_class_name,default_device_config))
-        
-        self.processDeviceConfigDictionary(device_module_path, device_class_name, device_config,default_device_config)
+        self.compileDeviceConfig(device_module_path,device_class_name,device_config,dconfigPath)
 
         if device_module_path in self._all_device_config_errors:
             # Complete device config verification.
@@ -785,11 +913,13 @@ class ioServer(object):
 
             self.devices.append(deviceInstance)
             ioServer.deviceDict[device_class_name]=deviceInstance
+            if self.metrics:
+                self.metrics.addDevice(device_class_name)
 
             if 'device_timer' in device_config:
                 interval = device_config['device_timer']['interval']
                 self.log("%s has requested a timer with period %.5f"%(device_class_name, interval))
-                dPoller=DeviceMonitor(deviceInstance,interval)
+                dPoller=DeviceMonitor(deviceInstance,interval,self.metrics)
                 self.deviceMonitors.append(dPoller)
 
             monitoringEventIDs=[]
@@ -843,22 +973,46 @@ class ioServer(object):
             pytablesfile.flush()
             pytablesfile.close()
             
+    def metricsDumpTasklet(self,dump_interval):
+        """
+        Saves a summary of the current hub metrics as DATA level log events
+        every dump_interval seconds.
+        """
+        while self._running:
+            gevent.sleep(dump_interval)
+            if self.metrics:
+                for line in self.metrics.summaryLines():
+                    self.log(line,'DATA')
+
     def processEventsTasklet(self,sleep_interval):
         while self._running:
             stime=Computer.getTime()
             self.processDeviceEvents()
+            if self.metrics:
+                self.metrics.event_buffer_depth.add(len(self.eventBuffer))
+                if self.emrt_file:
+                    self.metrics.datastore_queue_size.add(self.emrt_file._eventCounter)
             dur = sleep_interval - (Computer.getTime()-stime)
             gevent.sleep(max(0.0, dur))
 
     def processDeviceEvents(self):
+        metrics=self.metrics
         for device in self.devices:
             try:
                 events = device._getNativeEventBuffer()
 
+                if metrics and len(events) > 0:
+                    metrics.native_buffer_depth[device.__class__.__name__].add(len(events))
+                    device_to_hub_latency=metrics.device_to_hub_latency
+                else:
+                    device_to_hub_latency=None
+
                 while len(events) > 0:
                     evt = events.popleft()
                     e = device._getIOHubEventObject(evt)
                     if e is not None:
+                        if device_to_hub_latency:
+                            device_to_hub_latency.add(e[DeviceEvent.EVENT_LOGGED_TIME_INDEX]-e[DeviceEvent.EVENT_DEVICE_TIME_INDEX])
                         for l in device._getEventListeners(e[DeviceEvent.EVENT_TYPE_ID_INDEX]):
                             l._handleEvent(e)
 
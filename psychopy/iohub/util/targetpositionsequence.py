@@ -28,7 +28,9 @@ To use this module, the following high level steps are generally preformed:
   position displayed and the events collected during the display duration for
   each position.
 """
-from ... import visual, core
+from ... import core
+from psychopy.contrib.lazy_import import lazy_import
+lazy_import(globals(), "from psychopy import visual")
 from . import win32MessagePump, Trigger, TimeTrigger, DeviceEventTrigger, OrderedDict
 from ..constants import EventConstants
 from .. import ioHubConnection
@@ -897,6 +899,9 @@ class TargetPosSequenceStim(object):
         """
         Return a list of numpy ndarrays, each containing joined eye sample
         and previous / next experiment message data for the sample's time.
+
+        Samples are matched to the message period they occurred in with a
+        single np.searchsorted call on the message times of each position.
         """
         
         #preprocess message events
@@ -927,14 +932,19 @@ class TargetPosSequenceStim(object):
         
         current_target_pos=-1.0,-1.0
         current_targ_state=0        
+        sample_field_count=len(self.sample_msg_dtype)-8
         target_pos_samples=[]
         for pindex,samples in enumerate(self.saved_pos_samples):       
-            last_msg,messages= self.target_pos_msgs[pindex][0], self.target_pos_msgs[pindex][1:]
-            samplesforposition=[]
-            pos_sample_count=len(samples)
-            si=0
-            for current_msg in messages:
-                last_msg_time=last_msg[0]
+            messages=self.target_pos_msgs[pindex]
+            msg_count=len(messages)
+
+            # Update the target position and state for each message. The
+            # values set by a message are valid from the message time until
+            # the time of the next message.
+            interval_pos=np.zeros((max(msg_count-1,0),2))
+            interval_state=np.zeros(max(msg_count-1,0),dtype=np.int)
+            for mi in range(msg_count-1):
+                last_msg=messages[mi]
                 last_msg_type=last_msg[2]
                 if last_msg_type == 'START_DRAW':
                     if not current_targ_state& self.TARGET_STATIONARY:
@@ -967,35 +977,41 @@ class TargetPosSequenceStim(object):
                     current_targ_state-=current_targ_state& self.TARGET_EXPANDING
                     current_targ_state-=current_targ_state& self.TARGET_CONTRACTING
                     current_target_pos=float(last_msg[6]),float(last_msg[7])
-                
-                while si < pos_sample_count:
-                    sample=samples[si]               
-                    if sample.time >= last_msg_time and sample.time < current_msg[0]:
-                        sarray=[pindex, last_msg_time, last_msg_type,
-                                current_msg[0], current_msg[2],
-                                current_target_pos[0], current_target_pos[1],
-                                current_targ_state]
-                        sarray.extend(getSampleData(sample))
-                        sndarray=np.asarray(tuple(sarray),dtype= self.sample_msg_dtype)
-                        samplesforposition.append(sndarray)
-                        si+=1
-                    elif sample.time >= current_msg[0]:
-                        break
-                    else:
-                        si+=1
-                last_msg=current_msg
+                interval_pos[mi]=current_target_pos
+                interval_state[mi]=current_targ_state
+
+            msg_times=np.asarray([m[0] for m in messages],dtype=np.float64)
+            msg_types=np.asarray([m[2] for m in messages])
+            sample_data=np.asarray([getSampleData(s) for s in samples],
+                            dtype=np.float64).reshape(-1,sample_field_count)
+
+            # Index of the message each sample follows; samples before the
+            # first or after the last message of the position are dropped.
+            mindex=np.searchsorted(msg_times,sample_data[:,0],side='right')-1
+            in_interval=(mindex>=0)&(mindex<msg_count-1)
+            mindex=mindex[in_interval]
             
-            # convert any position fields to degrees if needed
-            possamples=np.asanyarray(samplesforposition)
+            possamples=np.zeros(mindex.shape[0],dtype=self.sample_msg_dtype)
+            possamples['targ_pos_ix']=pindex
+            if mindex.shape[0]:
+                possamples['last_msg_time']=msg_times[mindex]
+                possamples['last_msg_type']=msg_types[mindex]
+                possamples['next_msg_time']=msg_times[mindex+1]
+                possamples['next_msg_type']=msg_types[mindex+1]
+                possamples['targ_pos_x']=interval_pos[mindex,0]
+                possamples['targ_pos_y']=interval_pos[mindex,1]
+                possamples['targ_state']=interval_state[mindex]
+                for fi,fname in enumerate(possamples.dtype.names[8:]):
+                    possamples[fname]=sample_data[in_interval,fi]
             target_pos_samples.append(possamples)
             
         # So we now have a list len == number target positions. Each element 
-        # of the list is a list of all eye sample / message data for a
-        # target position. Each element of the data list for a single target 
-        # position is itself a list that that contains combined info about
-        # an eye sample and message info valid for when the sample time was.
+        # of the list is a structured array of all eye sample / message data
+        # for a target position. Each element of the array for a single target 
+        # position contains combined info about an eye sample and message
+        # info valid for when the sample time was.
         
-        return np.asanyarray(target_pos_samples)
+        return target_pos_samples
 
 ################ Validation #######################
 """
@@ -1317,22 +1333,132 @@ class ValidationProcedure(object):
         rootScriptPath = os.path.dirname(sys.argv[0])
         return normjoin(rootScriptPath,file_name)
     
+    def _calculatePositionStats(self, samples, position_count, eye_fields):
+        """
+        Calculates the accuracy and precision stats for every target position
+        using array operations on the samples from all positions at once.
+        samples must be ordered by targ_pos_ix and then eye_time, as
+        returned by concatenating the arrays from getSampleMessageData().
+
+        Returns a dict of per position arrays along with the sample masks
+        used at each filtering stage.
+        """
+        def positionBounds(pos_ix):
+            return np.searchsorted(pos_ix, np.arange(position_count+1))
+
+        pos_ix=samples['targ_pos_ix']
+        stime=samples['eye_time']
+        stationary=samples['targ_state']==self.targetsequence.TARGET_STATIONARY
+
+        # first / last stationary sample time of each position
+        stationary_times=stime[stationary]
+        sbounds=positionBounds(pos_ix[stationary])
+        has_stationary=sbounds[1:]>sbounds[:-1]
+        first_stime=np.zeros(position_count,dtype=stime.dtype)
+        last_stime=np.zeros(position_count,dtype=stime.dtype)
+        first_stime[has_stationary]=stationary_times[sbounds[:-1][has_stationary]]
+        last_stime[has_stationary]=stationary_times[sbounds[1:][has_stationary]-1]
+
+        filter_stime=(last_stime-self.accuracy_period_start).astype(stime.dtype)
+        filter_etime=(last_stime-self.accuracy_period_stop).astype(stime.dtype)
+        time_filtered=stationary&(stime>=filter_stime[pos_ix])&(
+                                                    stime<filter_etime[pos_ix])
+        used=time_filtered&(samples['eye_status']<=1)
+
+        filtered_count=np.bincount(pos_ix[time_filtered],minlength=position_count)
+        used_count=np.bincount(pos_ix[used],minlength=position_count)
+        valid_perc=used_count/np.maximum(filtered_count,1)
+
+        # gaze position and error of the used samples, averaged over eyes.
+        used_samples=samples[used]
+        used_ix=used_samples['targ_pos_ix']
+        target_x=used_samples['targ_pos_x']
+        target_y=used_samples['targ_pos_y']
+        gaze_x=np.zeros(used_ix.shape[0])
+        gaze_y=np.zeros(used_ix.shape[0])
+        error=np.zeros(used_ix.shape[0])
+        for fx,fy in eye_fields:
+            gaze_x+=used_samples[fx]
+            gaze_y+=used_samples[fy]
+            error+=np.hypot(target_x-used_samples[fx],target_y-used_samples[fy])
+        gaze_x/=len(eye_fields)
+        gaze_y/=len(eye_fields)
+        error/=len(eye_fields)
+
+        # accuracy: min, max, mean and stdev of the error for each position.
+        passed=used_count>0
+        count=np.maximum(used_count,1)
+        mean_error=np.bincount(used_ix,weights=error,minlength=position_count)/count
+        stdev_error=np.sqrt(np.bincount(used_ix,weights=(error-mean_error[used_ix])**2,
+                                        minlength=position_count)/count)
+        min_error=np.zeros(position_count)
+        max_error=np.zeros(position_count)
+        ubounds=positionBounds(used_ix)
+        if passed.any():
+            min_error[passed]=np.minimum.reduceat(error,ubounds[:-1][passed])
+            max_error[passed]=np.maximum.reduceat(error,ubounds[:-1][passed])
+
+        # precision: RMS of the sample to sample gaze position change.
+        same_pos=used_ix[1:]==used_ix[:-1]
+        s2s_ix=used_ix[1:][same_pos]
+        s2s_dist=np.hypot(np.diff(gaze_x),np.diff(gaze_y))[same_pos]
+        s2s_count=np.bincount(s2s_ix,minlength=position_count)
+        rms_s2s=np.sqrt(np.bincount(s2s_ix,weights=s2s_dist**2,
+                                    minlength=position_count)/np.maximum(s2s_count,1))
+
+        return dict(stationary=stationary,
+                    time_filtered=time_filtered,
+                    used=used,
+                    first_stime=first_stime,
+                    last_stime=last_stime,
+                    filter_stime=filter_stime,
+                    filter_etime=filter_etime,
+                    valid_perc=valid_perc,
+                    passed=passed,
+                    used_bounds=ubounds,
+                    gaze_x=gaze_x,
+                    gaze_y=gaze_y,
+                    target_x=target_x,
+                    target_y=target_y,
+                    min_error=min_error,
+                    max_error=max_error,
+                    mean_error=mean_error,
+                    stdev_error=stdev_error,
+                    rms_s2s_precision=rms_s2s)
+
     def _createPlot(self):
         try:
             self.validation_results=None
             sample_array=self.targetsequence.getSampleMessageData()
-            if self.results_in_degrees:
-                for postdat in sample_array:
-                    postdat['targ_pos_x'], postdat['targ_pos_y']=self.pix2deg(
-                    postdat['targ_pos_x'],postdat['targ_pos_y'])
+            position_count=len(sample_array)
+            samples=np.concatenate(sample_array)
 
-                    postdat['left_eye_x'], postdat['left_eye_y']=self.pix2deg(
-                    postdat['left_eye_x'],postdat['left_eye_y'])
+            if 'left_eye_x' in samples.dtype.names:
+                eye_fields=(('left_eye_x','left_eye_y'),
+                            ('right_eye_x','right_eye_y'))
+            else:
+                eye_fields=(('eye_x','eye_y'),)
+
+            if self.results_in_degrees:
+                # convert the target and eye positions of all samples with
+                # one pix2deg call.
+                xy_fields=(('targ_pos_x','targ_pos_y'),)+eye_fields
+                scount=samples.shape[0]
+                deg_x,deg_y=self.pix2deg(
+                        np.concatenate([samples[fx] for fx,fy in xy_fields]),
+                        np.concatenate([samples[fy] for fx,fy in xy_fields]))
+                for i,(fx,fy) in enumerate(xy_fields):
+                    samples[fx]=deg_x[i*scount:(i+1)*scount]
+                    samples[fy]=deg_y[i*scount:(i+1)*scount]
+
+            stats=self._calculatePositionStats(samples,position_count,eye_fields)
+            if not stats['passed'].any():
+                # no position has valid samples, so there is nothing to plot
+                print "\nAccuracy Stats Not Calculated: No Valid Samples"
+                self.io.sendMessageEvent("No valid samples at any target position", 'VALIDATION')
+                self.io.sendMessageEvent("Validation Report Complete", 'VALIDATION')
+                return None, None
 
-                    postdat['right_eye_x'], postdat['right_eye_y']=self.pix2deg(
-                    postdat['right_eye_x'],postdat['right_eye_y'])
-                
-                
             pixw,pixh=self.display_size
             # Validation Accuracy Analysis
             
@@ -1343,70 +1469,52 @@ class ValidationProcedure(object):
 
             cm = pl.cm.get_cmap('RdYlBu')
     
-            min_error=100000.0
-            max_error=0.0
-            summed_error=0.0
-            point_count=0
-
             self.io.sendMessageEvent("Results",'VALIDATION')
             results=dict(display_size=self.display_size,
-                         position_count=len(sample_array),
-                         positions_failed_processing=0,
+                         position_count=position_count,
+                         positions_failed_processing=int(position_count-
+                                                         stats['passed'].sum()),
                          target_positions=[p for p in self.targetsequence.positions],
                          position_results=[])
 
             self.io.sendMessageEvent("display_size: {0}".format(self.display_size), 'VALIDATION')
-            self.io.sendMessageEvent("target position_count: {0}".format(len(sample_array)), 'VALIDATION')
+            self.io.sendMessageEvent("target position_count: {0}".format(position_count), 'VALIDATION')
             self.io.sendMessageEvent("target_positions: {0}".format([p for p in self.targetsequence.positions]), 'VALIDATION')
 
-            for pindex,samplesforpos in enumerate(sample_array):
+            # split the samples used at each filtering stage by position.
+            all_bounds=np.searchsorted(samples['targ_pos_ix'],np.arange(position_count+1))
+            stage_samples=[(stage,samples[stats[stage]]) for stage in
+                                    ('stationary','time_filtered','used')]
+            stage_bounds=[np.searchsorted(s['targ_pos_ix'],np.arange(position_count+1))
+                                for stage,s in stage_samples]
+            ubounds=stats['used_bounds']
+
+            for pindex in range(position_count):
                 self.io.sendMessageEvent("Target Position Results: {0}".format(pindex), 'VALIDATION')
 
-                stationary_samples=samplesforpos[samplesforpos['targ_state'] == 
-                                            self.targetsequence.TARGET_STATIONARY]
-            
-                last_stime=stationary_samples[-1]['eye_time']
-                first_stime=stationary_samples[0]['eye_time']
+                first_stime=stats['first_stime'][pindex]
+                last_stime=stats['last_stime'][pindex]
+                filter_stime=stats['filter_stime'][pindex]
+                filter_etime=stats['filter_etime'][pindex]
+                accuracy_calc_good_sample_perc=stats['valid_perc'][pindex]
+                stage_pos_samples=[s[b[pindex]:b[pindex+1]] for (stage,s),b in 
+                                            zip(stage_samples,stage_bounds)]
 
-                filter_stime=last_stime- self.accuracy_period_start
-                filter_etime=last_stime- self.accuracy_period_stop
-            
-                all_samples_for_accuracy_calc=stationary_samples[
-                                    stationary_samples['eye_time']>=filter_stime]    
-                all_samples_for_accuracy_calc=all_samples_for_accuracy_calc[
-                            all_samples_for_accuracy_calc['eye_time']<filter_etime]    
-                
-                good_samples_for_accuracy_calc=all_samples_for_accuracy_calc[
-                                    all_samples_for_accuracy_calc['eye_status']<=1]
-            
-                all_samples_for_accuracy_count=all_samples_for_accuracy_calc.shape[0]
-                good_accuracy_sample_count= good_samples_for_accuracy_calc.shape[0]            
-                accuracy_calc_good_sample_perc=good_accuracy_sample_count/float(
-                                                    all_samples_for_accuracy_count)
-            
-                # stationary_period_sample_count=stationary_samples.shape[0]
-                # target_period_sample_count=samplesforpos.shape[0]
-                # print 'target_period_sample_count:',target_period_sample_count
-                # print 'stationary_period_sample_count:',stationary_period_sample_count
-                # print 'all_samples_for_accuracy_count:',all_samples_for_accuracy_count
-                # print 'good_accuracy_sample_count:',good_accuracy_sample_count
-                # print 'accuracy_calc_good_sample_perc:',accuracy_calc_good_sample_perc
-                
                 # Ordered dictionary of the different levels of samples 
                 # selected during filtering for valid samples to use in 
                 # accuracy calculations.
                 sample_msg_data_filtering=OrderedDict(
                                       # All samples from target period.
-                                      all_samples=samplesforpos, 
+                                      all_samples=samples[all_bounds[pindex]:all_bounds[pindex+1]], 
                                       # Sample during stationary period at 
                                       # end of target presentation display.
-                                      stationary_samples=stationary_samples,
+                                      stationary_samples=stage_pos_samples[0],
                                       # Samples that occurred within the 
                                       # defined time selection period. 
-                                      time_filtered_samples=all_samples_for_accuracy_calc,
+                                      time_filtered_samples=stage_pos_samples[1],
                                       # Samples from the selection period that 
                                       # do not have missing data
-                                      used_samples=good_samples_for_accuracy_calc
+                                      used_samples=stage_pos_samples[2]
                                       )
                                       
                 position_results=dict(pos_index=pindex,
@@ -1419,48 +1527,28 @@ class ValidationProcedure(object):
                 self.io.sendMessageEvent("filter_samples_time_range: {0}".format([filter_stime,filter_etime]), 'VALIDATION')
                 self.io.sendMessageEvent("valid_filtered_sample_perc: {0}".format(accuracy_calc_good_sample_perc), 'VALIDATION')
 
-                if accuracy_calc_good_sample_perc == 0.0:
+                if not stats['passed'][pindex]:
                     position_results['calculation_status']='FAILED'
-                    results['positions_failed_processing']+=1
                 else:
-                    time=good_samples_for_accuracy_calc[:]['eye_time']
-                
-                    target_x=good_samples_for_accuracy_calc[:]['targ_pos_x']
-                    target_y=good_samples_for_accuracy_calc[:]['targ_pos_y']
-                
-                    left_x=good_samples_for_accuracy_calc[:]['left_eye_x']
-                    left_y=good_samples_for_accuracy_calc[:]['left_eye_y']
-                    left_pupil=good_samples_for_accuracy_calc[:]['left_pupil_size']
-                    left_error_x=target_x-left_x
-                    left_error_y=target_y-left_y
-                    left_error_xy=np.hypot(left_error_x,left_error_y)
-                
-                    right_x=good_samples_for_accuracy_calc[:]['right_eye_x']
-                    right_y=good_samples_for_accuracy_calc[:]['right_eye_y']
-                    right_pupil=good_samples_for_accuracy_calc[:]['right_pupil_size']    
-                    right_error_x=target_x-right_x
-                    right_error_y=target_y-right_y    
-                    right_error_xy=np.hypot(right_error_x,right_error_y)
-                    
-                    lr_x=(left_x+right_x)/2.0
-                    lr_y=(left_y+right_y)/2.0
-                    lr_error=(right_error_xy+left_error_xy)/2.0
-                    lr_error_max=lr_error.max()
-                    lr_error_min=lr_error.min()
-                    lr_error_mean=lr_error.mean()
-                    lr_error_std=np.std(lr_error)
-                    
-                    min_error=min(min_error,lr_error_min)
-                    max_error=max(max_error,lr_error_max)
-                    summed_error+=lr_error_mean
-                    point_count+=1.0
-                    
+                    used_slice=slice(ubounds[pindex],ubounds[pindex+1])
+                    time=stage_pos_samples[2]['eye_time']
+                    target_x=stats['target_x'][used_slice]
+                    target_y=stats['target_y'][used_slice]
+                    lr_x=stats['gaze_x'][used_slice]
+                    lr_y=stats['gaze_y'][used_slice]
+                    lr_error_min=stats['min_error'][pindex]
+                    lr_error_max=stats['max_error'][pindex]
+                    lr_error_mean=stats['mean_error'][pindex]
+                    lr_error_std=stats['stdev_error'][pindex]
+                    rms_s2s=stats['rms_s2s_precision'][pindex]
+
                     position_results['calculation_status']='PASSED'
                     position_results['target_position']=(target_x[0],target_y[0])
                     position_results['min_error']=lr_error_min
                     position_results['max_error']=lr_error_max
                     position_results['mean_error']=lr_error_mean
                     position_results['stdev_error']=lr_error_std
+                    position_results['rms_s2s_precision']=rms_s2s
 
                     self.io.sendMessageEvent("calculation_status: {0}".format('PASSED'), 'VALIDATION')
                     self.io.sendMessageEvent("target_position: {0}".format((target_x[0],target_y[0])), 'VALIDATION')
@@ -1468,9 +1556,10 @@ class ValidationProcedure(object):
                     self.io.sendMessageEvent("max_error: {0}".format(lr_error_max), 'VALIDATION')
                     self.io.sendMessageEvent("mean_error: {0}".format(lr_error_mean), 'VALIDATION')
                     self.io.sendMessageEvent("stdev_error: {0}".format(lr_error_std), 'VALIDATION')
+                    self.io.sendMessageEvent("rms_s2s_precision: {0}".format(rms_s2s), 'VALIDATION')
                     self.io.sendMessageEvent("Done Target Position Results : {0}".format(pindex), 'VALIDATION')
 
-                    normed_time = (time-time.min())/(time.max()-time.min())
+                    normed_time = (time-time.min())/max(time.max()-time.min(),1e-9)
                     
                     pl.scatter(target_x[0], 
                                target_y[0], 
@@ -1503,7 +1592,10 @@ class ValidationProcedure(object):
             pl.xlabel("Horizontal Position (%s)"%(unit_type))
             pl.ylabel("Vertical Position (%s)"%(unit_type))
             
-            mean_error=summed_error/point_count
+            passed=stats['passed']
+            min_error=stats['min_error'][passed].min()
+            max_error=stats['max_error'][passed].max()
+            mean_error=stats['mean_error'][passed].mean()
             pl.title("Validation Accuracy (%s)\nMin: %.2f, Max: %.2f, Mean %.2f"%(
                                     unit_type,min_error,max_error,mean_error))
                                     
@@ -1532,6 +1624,7 @@ class ValidationProcedure(object):
             print
     
         self.io.sendMessageEvent("Validation Report Complete", 'VALIDATION')
+        return None, None
 
     def getValidationResults(self):
         return self.validation_results
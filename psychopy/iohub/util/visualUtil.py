@@ -14,9 +14,14 @@ from __future__ import division
 
 import time
 import weakref
-from ... import visual, core
+from ... import core
 from . import win32MessagePump
 
+# psychopy.visual (and pyglet) is only imported when first used, so that
+# importing iohub (e.g. in the iohub server process) doesn't load it
+from psychopy.contrib.lazy_import import lazy_import
+lazy_import(globals(), "from psychopy import visual")
+
 getTime = core.getTime
 ###########################################
 #
@@ -523,15 +528,15 @@ class DeviceEventTrigger(Trigger):
 #   -this tries to ensure a more consistent motion, regardless of when the
 #    position update is applied to the stimulus during the retrace interval
 
-import scipy
-pi = scipy.pi
-dot = scipy.dot
-sin = scipy.sin
-cos = scipy.cos
-ar = scipy.array
-rand = scipy.rand
-arange = scipy.arange
-rad = scipy.deg2rad
+import numpy
+pi = numpy.pi
+dot = numpy.dot
+sin = numpy.sin
+cos = numpy.cos
+ar = numpy.array
+rand = numpy.random.rand
+arange = numpy.arange
+rad = numpy.deg2rad
 
 
 class SinusoidalMotion(object):
@@ -19,21 +19,28 @@ messages, (which PsychoPy doesn't use) using the commands::
     from psychopy import logging
     logging.console.setLevel(logging.CRITICAL)
 
+Messages are written to the targets when logging.flush() is called. For long
+sessions logging.setAsyncWriting() moves that work to a background thread:
+messages are then formatted and written in batches, with the streams flushed
+periodically, while the experiment only appends them to a (bounded) queue.
+
 """
 # Part of the PsychoPy library
 # Copyright (C) 2015 Jonathan Peirce
 # Distributed under the terms of the GNU General Public License (GPL).
 
 # Much of the code below is based conceptually, if not syntactically, on the
-# python logging module but it's simpler (no threading) and maintaining a
-# stack of log entries for later writing (don't want files written while
-# drawing)
+# python logging module but it's simpler (no threading, unless using the
+# optional writer thread) and maintaining a stack of log entries for later
+# writing (don't want files written while drawing)
 
 from __future__ import absolute_import
 
 from os import path
 import sys
 import codecs
+import threading
+from collections import deque
 from psychopy import clock
 
 _packagePath = path.split(__file__)[0]
@@ -109,6 +116,29 @@ def setDefaultClock(clock):
     defaultClock = clock
 
 
+class LazyMessage(object):
+    """A message that is only formatted (format % args) when it is written
+    to a log target, so that logging a message nobody reads (or logging
+    from a time-critical loop) costs little. The args should not be changed
+    after logging them (copy mutable values).
+    """
+    __slots__ = ('format', 'args')
+
+    def __init__(self, format, args):
+        self.format = format
+        self.args = args
+
+    def __str__(self):
+        return self.format % self.args
+
+    def __unicode__(self):
+        return unicode(self.format % self.args)
+
+    def formatted(self):
+        """The formatted message; unicode if the format or any arg is"""
+        return self.format % self.args
+
+
 class _LogEntry(object):
 
     def __init__(self, level, message, t=None, obj=None):
@@ -199,19 +229,33 @@ class _Logger(object):
 
     """
 
-    def __init__(self, format="%(t).4f \t%(levelname)s \t%(message)s"):
+    def __init__(self, format="%(t).4f \t%(levelname)s \t%(message)s",
+                 historyLength=1000):
         """The string-formatted elements %(xxxx)f can be used, where
         each xxxx is an attribute of the LogEntry.
         e.g. t, t_ms, level, levelname, message
+
+        The last historyLength entries written are kept in self.flushed.
         """
         super(_Logger, self).__init__()
         self.targets = []
-        self.flushed = []
+        self.flushed = deque(maxlen=historyLength)
         self.toFlush = []
         self.format = format
         self.lowestTarget = 50
+        # the optional writer thread, see setAsync()
+        self._writer = None
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self.maxQueued = 100000
+        self.flushInterval = 0.5
+        self.nDropped = 0
+        self._nDroppedReported = 0
+        self.nWriteFailed = 0  # entries the writer thread failed to write
+        self._writeFailedReported = False
 
     def __del__(self):
+        self.setAsync(False)
         self.flush()
         # unicode logged to coder output window can cause logger failure, with
         # error message pointing here. this is despite it being ok to log to
@@ -249,28 +293,140 @@ class _Logger(object):
         if t is None:
             global defaultClock
             t = defaultClock.getTime()
-        # add message to list
-        self.toFlush.append(
-            _LogEntry(t=t, level=level, message=message, obj=obj))
+        entry = _LogEntry(t=t, level=level, message=message, obj=obj)
+        if self._writer is None:
+            # add message to list
+            self.toFlush.append(entry)
+        elif len(self._queue) < self.maxQueued:
+            self._queue.append(entry)  # written by the writer thread
+        else:
+            self.nDropped += 1
 
-    def flush(self):
-        """Process all current messages to each target
+    def _write(self, entries):
+        """Format the entries and write them to each target, in one write
+        (and stream flush) per target.
         """
-        # loop through targets then entries in toFlush
+        # loop through targets then entries
         # so that stream.flush can be called just once
         formatted = {}  # keep a dict - so only do the formatting once
         for target in self.targets:
-            for thisEntry in self.toFlush:
+            lines = []
+            for thisEntry in entries:
                 if thisEntry.level >= target.level:
                     if not thisEntry in formatted:
+                        if isinstance(thisEntry.message, LazyMessage):
+                            # not str(), which fails on unicode args
+                            thisEntry.message = thisEntry.message.formatted()
                         # convert the entry into a formatted string
                         formatted[thisEntry] = self.format % thisEntry.__dict__
-                    target.write(formatted[thisEntry] + '\n')
-            if hasattr(target.stream, 'flush'):
-                target.stream.flush()
+                    lines.append(formatted[thisEntry])
+            if lines:
+                lines.append('')  # for the final newline
+                target.write('\n'.join(lines))  # flushes the stream
         # finished processing entries - move them to self.flushed
-        self.flushed.extend(self.toFlush)
+        self.flushed.extend(entries)
+
+    def flush(self):
+        """Process all current messages to each target
+        """
+        if self._writer is not None and self._writer.is_alive():
+            # wait for the writer thread to write everything queued so far
+            done = threading.Event()
+            with self._cond:
+                self._queue.append(done)
+                self._cond.notify()
+            done.wait()
+            return
+        entries = self.toFlush
         self.toFlush = []  # a new empty list
+        while self._queue:  # left by a stopped writer thread
+            entry = self._queue.popleft()
+            if isinstance(entry, _LogEntry):
+                entries.append(entry)
+        self._write(entries)
+
+    def setAsync(self, value=True, flushInterval=0.5, maxQueued=100000):
+        """Write the log on a background thread (value=True), or when
+        flush() is called (value=False, the default).
+
+        With the writer thread, log() only queues the entries (at most
+        maxQueued of them, more are dropped and counted in nDropped). They
+        are formatted and written, with the streams flushed, every
+        flushInterval seconds, and flush() waits for everything logged
+        before it to be written. Entries it fails to write (e.g. to a closed
+        stream) are counted in nWriteFailed, and the first failure is
+        reported on sys.stderr.
+        """
+        self.flushInterval = flushInterval
+        self.maxQueued = maxQueued
+        if value and self._writer is None:
+            self._queue.extend(self.toFlush)
+            self.toFlush = []
+            self._writer = threading.Thread(target=self._writeLoop,
+                                            name='LogWriter')
+            self._writer.daemon = True
+            self._writer.start()
+        elif not value and self._writer is not None:
+            writer = self._writer
+            self._writer = None  # stops the loop
+            with self._cond:
+                self._cond.notify()
+            writer.join()
+            self.flush()  # anything logged while stopping
+
+    def _writeLoop(self):
+        while self._writer is threading.current_thread():
+            with self._cond:
+                if not self._queue:
+                    self._cond.wait(self.flushInterval)
+            entries = []
+            flushes = []
+            while self._queue:
+                entry = self._queue.popleft()
+                if isinstance(entry, _LogEntry):
+                    entries.append(entry)
+                else:
+                    flushes.append(entry)  # an Event set once written
+            if self.nDropped > self._nDroppedReported:
+                msg = ("The log queue was full, %i messages were dropped" %
+                       (self.nDropped - self._nDroppedReported))
+                self._nDroppedReported = self.nDropped
+                entries.append(_LogEntry(WARNING, msg,
+                                         t=defaultClock.getTime()))
+            if entries or flushes:
+                try:
+                    self._write(entries)
+                except Exception as err:
+                    # e.g. a closed stream, keep the thread going
+                    self._writeFailed(entries, err)
+            for done in flushes:
+                done.set()
+
+    def _writeFailed(self, entries, err):
+        """Count the entries the writer thread failed to write, reporting
+        the first failure on sys.stderr (the log itself may be what failed).
+        """
+        self.nWriteFailed += len(entries)
+        if self._writeFailedReported:
+            return
+        self._writeFailedReported = True
+        try:
+            sys.stderr.write("psychopy.logging: failed to write %i log "
+                             "messages (%s: %s), further failures are only "
+                             "counted in getStats()\n" %
+                             (len(entries), type(err).__name__, err))
+        except Exception:
+            pass  # nowhere left to report it
+
+    def getStats(self):
+        """Returns a dict of the number of entries queued for the writer
+        thread, dropped because the queue was full, that failed to be
+        written, and kept in the history.
+        """
+        return {'queued': len(self._queue) + len(self.toFlush),
+                'dropped': self.nDropped,
+                'failed': self.nWriteFailed,
+                'history': len(self.flushed)}
 
 root = _Logger()
 console = LogFile()
@@ -282,6 +438,16 @@ def flush(logger=root):
     logger.flush()
 
 
+def setAsyncWriting(value=True, flushInterval=0.5, maxQueued=100000,
+                    logger=root):
+    """Format and write log messages on a background thread, in batches
+    every flushInterval seconds, rather than when flush() is called (see
+    _Logger.setAsync). Message times are still those of the logging calls
+    (or of the flip for Window.logOnFlip).
+    """
+    logger.setAsync(value, flushInterval=flushInterval, maxQueued=maxQueued)
+
+
 def critical(msg, t=None, obj=None):
     """log.critical(message)
     Send the message to any receiver of logging info (e.g. a LogFile)
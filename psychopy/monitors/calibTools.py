@@ -20,8 +20,17 @@ import sys
 from copy import deepcopy, copy
 
 import numpy
+
+# scipy is only needed to calibrate, so imported when first used
+lazyImports = """
 import scipy.optimize as optim
 from scipy import interpolate
+"""
+try:
+    from psychopy.contrib.lazy_import import lazy_import
+    lazy_import(globals(), lazyImports)
+except Exception:
+    exec(lazyImports)
 
 DEBUG = False
 
@@ -608,9 +617,8 @@ class Monitor(object):
                     # scale to 0:1
                     lumsPre[gun, :] = ((lumsPre[gun, :] - lumsPre[gun, 0]) /
                                        (lumsPre[gun, -1] - lumsPre[gun, 0]))
-                    self._gammaInterpolator.append(interp1d(lumsPre[gun, :],
-                                                            levelsPre,
-                                                            kind='linear'))
+                    self._gammaInterpolator.append(interpolate.interp1d(
+                        lumsPre[gun, :], levelsPre, kind='linear'))
                     # interpFunc = Interpolation.InterpolatingFunction(
                     #    (lumsPre[gun,:],), levelsPre)
                     # polyFunc = interpFunc.fitPolynomial(3)
@@ -637,7 +645,7 @@ class Monitor(object):
 
             # get the min,max lums
             gammaGrid = self.getGammaGrid()
-            if gammaGrid != None:
+            if gammaGrid is not None:
                 # if we have info about min and max luminance then use it
                 minLum = gammaGrid[1, 0]
                 maxLum = gammaGrid[1:4, 1]
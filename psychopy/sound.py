@@ -42,7 +42,7 @@ import sys
 from os import path
 import threading
 from sys import platform, exit, stdout
-from psychopy import event, core, logging, prefs
+from psychopy import core, logging, prefs
 from psychopy.constants import (STARTED, PLAYING, PAUSED, FINISHED, STOPPED,
                                 NOT_STARTED, FOREVER)
 from psychopy.tools import attributetools
@@ -184,6 +184,23 @@ class _baseVisualTest(object):
         win.flip()
         str(gabor) #check that str(xxx) is working
 
+    def test_gratingArrays(self):
+        win = self.win
+        grating = visual.GratingStim(win, mask='gauss', ori=20, phase=0.3,
+            sf=3.0/self.scaleFactor, size=self.scaleFactor)
+        if not grating.useShaders:
+            pytest.skip("only drawn with vertex arrays with shaders")
+        #drawing from arrays should look the same as from the display list
+        grating.phase += 0.25
+        grating.draw()
+        withArrays = numpy.array(win._getFrame(buffer='back'), dtype=int)
+        win.flip()
+        grating._drawWithArrays = False
+        grating.draw()
+        withList = numpy.array(win._getFrame(buffer='back'), dtype=int)
+        win.flip()
+        assert numpy.abs(withArrays - withList).max() <= 1
+
     @pytest.mark.bufferimage
     def test_bufferImage(self):
         """BufferImage inherits from ImageStim, so test .ori. .pos etc there not here
@@ -200,6 +217,30 @@ class _baseVisualTest(object):
         utils.compareScreenshot('bufferimg_gabor_%s.png' %(self.contextName), win, crit=8)
         win.flip()
 
+    def test_bufferImageGPU(self):
+        win = self.win
+        gabor = visual.PatchStim(win, mask='gauss', ori=-45,
+            pos=[0.6*self.scaleFactor, -0.6*self.scaleFactor],
+            sf=2.0/self.scaleFactor, size=2*self.scaleFactor,
+            interpolate=True)
+        rect = (-1, 1, 0.5, -0.5)  # not symmetric
+        cpuStim = visual.BufferImageStim(win, stim=[gabor], rect=rect)
+        gpuStim = visual.BufferImageStim(win, stim=[gabor], rect=rect,
+                                         gpuCapture=True)
+        assert numpy.all(gpuStim.size == cpuStim.size)
+        assert numpy.all(numpy.array(gpuStim.getCapturedImage()) ==
+                         numpy.array(cpuStim.getCapturedImage()))
+        # the same texture is used again
+        gabor.ori = 45
+        texID = gpuStim._texID.value
+        gpuStim.recapture(stim=[gabor])
+        cpuStim.recapture(stim=[gabor])
+        assert gpuStim._texID.value == texID
+        assert numpy.all(numpy.array(gpuStim.getCapturedImage()) ==
+                         numpy.array(cpuStim.getCapturedImage()))
+        gpuStim.draw()
+        win.flip()
+
     #def testMaskMatrix(self):
     #    #aims to draw the exact same stimulus as in testGabor, but using filters
     #    win=self.win
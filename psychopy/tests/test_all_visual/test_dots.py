@@ -0,0 +1,119 @@
+"""Test the (vectorized) update of visual.DotStim against the per-dot logic
+it replaced
+"""
+import numpy
+from numpy import pi
+import pytest
+
+from psychopy import visual
+from psychopy.tests import utils
+
+
+def _oldUpdate(stim, xy, dirs, life):
+    """The DotStim update as it was before being vectorized, on copies of
+    the dots' state. Returns the dead (replaced) dots.
+    """
+    signal = stim._signalDots
+    if stim.dotLife > 0:
+        life -= 1
+        dead = (life <= 0.0)
+        life[dead] = stim.dotLife
+    else:
+        dead = numpy.zeros(stim.nDots, dtype=bool)
+
+    if stim.noiseDots == 'walk':
+        sig = numpy.random.rand((~signal).sum())
+        dirs[~signal] = sig * pi * 2
+        xy[:, 0] += stim.speed * numpy.cos(dirs)
+        xy[:, 1] += stim.speed * numpy.sin(dirs)
+    elif stim.noiseDots == 'direction':
+        xy[:, 0] += stim.speed * numpy.cos(dirs)
+        xy[:, 1] += stim.speed * numpy.sin(dirs)
+    elif stim.noiseDots == 'position':
+        xy[signal, 0] += stim.speed * numpy.cos(dirs[signal])
+        xy[signal, 1] += stim.speed * numpy.sin(dirs[signal])
+        dead = dead + (~signal)
+
+    if stim.fieldShape in (None, 'square', 'sqr'):
+        dead0 = (numpy.abs(xy[:, 0]) > 0.5)
+        dead1 = (numpy.abs(xy[:, 1]) > 0.5)
+        dead = dead + dead0 + dead1
+    elif stim.fieldShape == 'circle':
+        normXY = xy / 0.5
+        dead = dead + (numpy.hypot(normXY[:, 0], normXY[:, 1]) > 1)
+
+    if sum(dead):
+        xy[dead, :] = stim._newDotsXY(sum(dead))
+    return dead
+
+
+@utils.skip_under_travis
+class Test_DotStim(object):
+    def setup_class(self):
+        self.win = visual.Window([128, 128], units='pix', autoLog=False)
+
+    def teardown_class(self):
+        self.win.close()
+
+    def _compare(self, stim, nFrames=30, seed=42):
+        """Update the stim and the old logic with the same random numbers,
+        yield their states and the dots the old logic replaced
+        """
+        for frame in range(nFrames):
+            xy = stim._verticesBase.copy()
+            dirs = stim._dotsDir.copy()
+            life = stim._dotsLife.copy()
+            numpy.random.seed(seed + frame)
+            dead = _oldUpdate(stim, xy, dirs, life)
+            numpy.random.seed(seed + frame)
+            stim._update_dotsXY()
+            yield xy, dirs, life, dead
+
+    @pytest.mark.parametrize('noiseDots', ['direction', 'walk', 'position'])
+    def test_sameAsPerDot(self, noiseDots):
+        numpy.random.seed(1)
+        stim = visual.DotStim(self.win, nDots=500, coherence=0.5,
+                              fieldShape='sqr', dotLife=5, speed=0.05,
+                              noiseDots=noiseDots, autoLog=False)
+        for xy, dirs, life, dead in self._compare(stim):
+            assert numpy.allclose(stim._verticesBase, xy)
+            assert numpy.allclose(stim._dotsDir, dirs)
+            assert (stim._dotsLife == life).all()
+        # some dots died of old age or left the field
+        assert dead.any()
+
+    def test_circleField(self):
+        numpy.random.seed(1)
+        stim = visual.DotStim(self.win, nDots=500, coherence=0.5,
+                              fieldShape='circle', dotLife=5, speed=0.1,
+                              autoLog=False)
+        for xy, dirs, life, dead in self._compare(stim):
+            # the same dots wrap around / are replaced (new ones are now
+            # placed differently) and the others move in the same way
+            assert numpy.allclose(stim._verticesBase[~dead], xy[~dead])
+            assert (stim._dotsLife == life).all()
+            # new dots are inside the field
+            radius = numpy.hypot(stim._verticesBase[:, 0],
+                                 stim._verticesBase[:, 1])
+            assert (radius <= 0.5).all()
+
+    def test_noLifetime(self):
+        numpy.random.seed(1)
+        stim = visual.DotStim(self.win, nDots=200, fieldShape='sqr',
+                              dotLife=-1, speed=0.2, autoLog=False)
+        for xy, dirs, life, dead in self._compare(stim, nFrames=10):
+            assert numpy.allclose(stim._verticesBase, xy)
+        assert (numpy.abs(stim._verticesBase) <= 0.5).all()
+
+    def test_signalDotsDifferent(self):
+        stim = visual.DotStim(self.win, nDots=300, coherence=0.3,
+                              signalDots='different', autoLog=False)
+        signalDir = stim.dir * pi / 180
+        previous = stim._signalDots.copy()
+        for frame in range(5):
+            stim._update_dotsXY()
+            # exactly coherence*nDots signal dots, a new set each frame
+            assert stim._signalDots.sum() == 90
+            assert (stim._dotsDir[stim._signalDots] == signalDir).all()
+            assert (stim._signalDots != previous).any()
+            previous = stim._signalDots.copy()
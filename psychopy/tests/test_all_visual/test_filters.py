@@ -0,0 +1,51 @@
+from psychopy.visual import filters
+import numpy
+import pytest
+
+"""Filters and noise textures, no window needed
+"""
+
+
+def test_imfftStack():
+    images = numpy.random.random((3, 32, 32))
+    spectra = filters.imfft(images)
+    assert numpy.allclose(spectra[1], filters.imfft(images[1]))
+    assert numpy.allclose(filters.imifft(spectra), images)
+
+
+def test_butterworthCached():
+    lp = filters.butter2d_lp((64, 32), 0.3, 2)
+    lp[...] = 0  # must not change the cached grid
+    assert numpy.allclose(filters.butter2d_lp((64, 32), 0.3, 2).max(), 1,
+                          atol=0.01)
+    hp = filters.butter2d_hp((64, 32), 0.3, 2)
+    assert numpy.allclose(hp + filters.butter2d_lp((64, 32), 0.3, 2), 1)
+
+
+class TestFilteredNoise(object):
+    def test_make(self):
+        noise = filters.FilteredNoise((64, 48), 'lowpass', cutoff=0.2,
+                                      contrast=0.5, seed=1)
+        textures = noise.make(10)
+        assert textures.shape == (10, 64, 48)
+        assert numpy.allclose(numpy.abs(textures).max(axis=2).max(axis=1),
+                              0.5)
+        # little energy above the cutoff
+        spectrum = numpy.abs(numpy.fft.rfft2(textures[0]))
+        assert (spectrum * (noise.kernel < 0.01)).sum() < 0.05 * spectrum.sum()
+
+    def test_threadsAndBackground(self):
+        args = dict(size=64, filterType='bandpass', cutin=0.05, cutoff=0.3)
+        oneThread = filters.FilteredNoise(seed=2, **args).make(7)
+        noise = filters.FilteredNoise(nThreads=3, seed=2, **args)
+        assert numpy.allclose(noise.make(7), oneThread)
+        noise.makeInBackground(5)
+        assert noise.getBackground().shape == (5, 64, 64)
+        with pytest.raises(RuntimeError):
+            noise.getBackground()
+
+    def test_badArgs(self):
+        with pytest.raises(ValueError):
+            filters.FilteredNoise(64, 'notch')
+        with pytest.raises(ValueError):
+            filters.FilteredNoise(64, cutoff=2.0)
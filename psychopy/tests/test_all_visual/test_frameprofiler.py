@@ -0,0 +1,73 @@
+"""Test recording the phases of Window.flip() with visual.frameprofiler
+"""
+import os
+import shutil
+from tempfile import mkdtemp
+
+import numpy
+from psychopy.visual import frameprofiler
+from psychopy.visual.frameprofiler import FrameProfiler
+
+
+def _recordFrames(profiler, intervals):
+    """Record frames flipping after the given intervals, each phase taking
+    1 ms (and no FBO)"""
+    t = 0.0
+    for interval in intervals:
+        t += interval
+        profiler.startFrame(t - 0.004)
+        profiler.mark(frameprofiler.AUTODRAW, t - 0.003)
+        profiler.mark(frameprofiler.EVENTS, t - 0.002)
+        profiler.mark(frameprofiler.FLIP, t)
+        profiler.endFrame(t + 0.001)
+
+
+class Test_FrameProfiler(object):
+    def setup(self):
+        self.temp_dir = mkdtemp(prefix='psychopy-tests-frameprofiler')
+
+    def teardown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_phases(self):
+        profiler = FrameProfiler(nFrames=10, framePeriod=0.01)
+        _recordFrames(profiler, [0.01, 0.01, 0.03, 0.01])
+        assert profiler.nDropped == 1
+        assert profiler.getDropped().tolist() == [False, False, True, False]
+        phases = profiler.getPhases()
+        numpy.testing.assert_allclose(phases['interval'][1:],
+                                      [0.01, 0.03, 0.01])
+        numpy.testing.assert_allclose(phases['autoDraw'], 0.001)
+        # skipped phases take no time
+        assert (phases['renderFBO'] == 0).all()
+        numpy.testing.assert_allclose(phases['userDraw'][1:],
+                                      [0.005, 0.025, 0.005])
+        stats = profiler.getStats()
+        assert stats['nFrames'] == 4
+        assert abs(stats['interval']['max'] - 30) < 1e-6
+        counts, edges = profiler.getHistogram('interval', bins=4,
+                                              range=(0, 40))
+        assert counts.tolist() == [0, 2, 0, 1]
+
+    def test_ring(self):
+        profiler = FrameProfiler(nFrames=3)
+        _recordFrames(profiler, [0.01] * 5)
+        times = profiler.getTimestamps()
+        assert times.shape == (3, len(frameprofiler.phases))
+        # the oldest frames were overwritten, the others are in order
+        numpy.testing.assert_allclose(times[:, frameprofiler.FLIP],
+                                      [0.03, 0.04, 0.05])
+        assert profiler.nDropped == 0  # no framePeriod to check against
+
+    def test_save(self):
+        profiler = FrameProfiler(nFrames=10, framePeriod=0.01)
+        _recordFrames(profiler, [0.01, 0.03])
+        csvName = os.path.join(self.temp_dir, 'frames.csv')
+        profiler.save(csvName)
+        lines = open(csvName).read().splitlines()
+        assert lines[0].split(',')[0] == 'userDraw'
+        assert len(lines) == 3
+        npyName = os.path.join(self.temp_dir, 'frames.npy')
+        profiler.save(npyName)
+        numpy.testing.assert_array_equal(numpy.load(npyName),
+                                         profiler.getTimestamps())
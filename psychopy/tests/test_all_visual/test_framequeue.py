@@ -0,0 +1,81 @@
+"""Test decoding movie frames ahead of time with visual.framequeue
+"""
+import threading
+
+import numpy
+from psychopy.visual.framequeue import FrameQueue
+
+
+class _Decoder(object):
+    """Returns frames filled with their frame number, one frame at a time
+    if released by the test"""
+    def __init__(self, frameInterval, blocking=False):
+        self.frameInterval = frameInterval
+        self.blocking = blocking
+        self.semaphore = threading.Semaphore(0)
+        self.times = []
+
+    def getFrame(self, t):
+        if self.blocking:
+            self.semaphore.acquire()
+        self.times.append(t)
+        frame = numpy.empty((2, 3, 3), numpy.uint8)
+        frame.fill(int(round(t / self.frameInterval)))
+        return frame
+
+
+def _waitForQueue(queue, n):
+    for attempt in range(1000):
+        with queue._cond:
+            if len(queue._ready) >= n or queue._eof:
+                return
+            queue._cond.wait(0.01)
+
+
+class Test_FrameQueue(object):
+    def test_playInOrder(self):
+        decoder = _Decoder(0.1)
+        queue = FrameQueue(decoder.getFrame, 0.1, duration=0.45, nBuffers=3)
+        pts, frame = queue.getFrame(0.0, wait=True)
+        assert pts == 0.0 and (frame == 0).all()
+        # buffers are reused, never more than nBuffers frames decoded ahead
+        _waitForQueue(queue, 2)
+        assert queue.getStats()['queued'] == 2
+        assert queue.getFrame(0.05) is None  # frame 1 not due, repeat
+        for n in range(1, 5):
+            _waitForQueue(queue, 1)
+            pts, frame = queue.getFrame(n * 0.1 + 0.01)
+            assert (frame == n).all()
+        _waitForQueue(queue, 1)
+        assert queue.isFinished()
+        stats = queue.getStats()
+        assert stats == {'decoded': 5, 'shown': 5, 'dropped': 0, 'queued': 0}
+        queue.stop()
+
+    def test_dropLateFrames(self):
+        decoder = _Decoder(0.1)
+        queue = FrameQueue(decoder.getFrame, 0.1, duration=1.0, nBuffers=4)
+        queue.getFrame(0.0, wait=True)
+        _waitForQueue(queue, 3)
+        # frames 1 and 2 are superseded by frame 3
+        pts, frame = queue.getFrame(0.31)
+        assert (frame == 3).all()
+        assert queue.getStats()['dropped'] == 2
+        queue.stop()
+
+    def test_seek(self):
+        decoder = _Decoder(0.1, blocking=True)
+        queue = FrameQueue(decoder.getFrame, 0.1, duration=1.0, nBuffers=4)
+        decoder.semaphore.release()
+        queue.getFrame(0.0, wait=True)
+        queue.seek(0.5)
+        for n in range(4):
+            decoder.semaphore.release()
+        # frames decoded before the seek are flushed
+        pts, frame = queue.getFrame(0.5, wait=True)
+        assert pts == 0.5 and (frame == 5).all()
+        queue.stop()
+        for n in range(4):
+            decoder.semaphore.release()
+        queue._thread.join(1.0)
+        assert not queue._thread.is_alive()
@@ -0,0 +1,77 @@
+"""Test drawing static stimuli from a texture with visual.FrozenGroup
+"""
+import numpy
+import pytest
+
+from psychopy import visual
+from psychopy.tests import utils
+
+
+@utils.skip_under_travis
+class Test_FrozenGroup(object):
+    def setup_class(self):
+        self.win = visual.Window([128, 128], units='pix', autoLog=False)
+        if not visual.FrozenGroup.isSupported():
+            pytest.skip('frame buffer objects are not supported')
+
+    def teardown_class(self):
+        self.win.close()
+
+    def _frame(self, stim):
+        self.win.flip()
+        stim.draw()
+        return numpy.asarray(self.win._getFrame(buffer='back'), float)
+
+    def test_draw(self):
+        rect = visual.Rect(self.win, width=40, height=20, fillColor='red',
+                           opacity=0.5, autoLog=False)
+        text = visual.TextStim(self.win, text='abc', height=20,
+                               autoLog=False)
+        group = visual.FrozenGroup(self.win, [rect, text])
+        frozen = self._frame(group)
+        assert not group._needRender
+        # the texture gives (nearly) the same image as the stimuli
+        group.enabled = False
+        drawn = self._frame(group)
+        assert abs(frozen - drawn).max() <= 2
+
+    def test_drawAfterText(self):
+        # text sets its own blend function, which must not change how the
+        # stimuli drawn after it are rendered into the texture
+        text = visual.TextStim(self.win, text='abc', height=30,
+                               autoLog=False)
+        rect = visual.Rect(self.win, width=40, height=20, fillColor='blue',
+                           opacity=0.5, autoLog=False)
+        group = visual.FrozenGroup(self.win, [text, rect])
+        frozen = self._frame(group)
+        group.enabled = False
+        drawn = self._frame(group)
+        assert abs(frozen - drawn).max() <= 2
+
+    def test_invalidate(self):
+        rect = visual.Rect(self.win, width=40, height=20, autoLog=False)
+        group = visual.FrozenGroup(self.win, [rect])
+        group.draw()
+        assert not group._needRender
+        # setting an attribute of a member renders the group again
+        rect.pos = (10, 0)
+        assert group._needRender
+        group.draw()
+        rect.setFillColor('blue', log=False)
+        assert group._needRender
+        group.draw()
+        # but not once it has been removed
+        group.remove(rect)
+        group.draw()
+        rect.pos = (0, 0)
+        assert not group._needRender
+
+    def test_composites(self):
+        scale = visual.RatingScale(self.win, freeze=True, autoLog=False)
+        scale.draw()
+        assert scale.line in scale._frozen.stims
+        assert scale.accept not in scale._frozen.stims
+        assert not scale._frozen._needRender
+        scale.setFlipVert(True, log=False)
+        assert scale._frozen._needRender
+        scale.draw()
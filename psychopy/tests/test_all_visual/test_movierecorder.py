@@ -0,0 +1,50 @@
+"""Test streaming frames to files with visual.movierecorder
+"""
+import os
+import shutil
+from tempfile import mkdtemp
+
+import numpy
+import pytest
+from psychopy.visual.movierecorder import MovieRecorder
+
+try:
+    from PIL import Image
+except ImportError:
+    import Image
+
+
+def _frame(value, size=(8, 6)):
+    frame = numpy.zeros((size[1], size[0], 3), numpy.uint8)
+    frame[0] = value  # the bottom row
+    return frame
+
+
+class Test_MovieRecorder(object):
+    def setup(self):
+        self.temp_dir = mkdtemp(prefix='psychopy-tests-movierecorder')
+
+    def teardown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_images(self):
+        fileName = os.path.join(self.temp_dir, 'frame.png')
+        recorder = MovieRecorder(fileName, (8, 6), maxQueuedFrames=2)
+        for n in range(5):
+            recorder.addFrame(_frame(n * 10))
+        recorder.close()
+        assert recorder.nWritten == 5
+        # frames are bottom-up like OpenGL, the images top-down
+        im = numpy.array(Image.open(os.path.join(self.temp_dir,
+                                                 'frame005.png')))
+        assert im.shape == (6, 8, 3)
+        assert (im[-1] == 40).all() and (im[:-1] == 0).all()
+
+    def test_gif(self):
+        with pytest.raises(ValueError):
+            MovieRecorder(os.path.join(self.temp_dir, 'movie.gif'), (8, 6))
+
+    def test_missingEncoder(self):
+        with pytest.raises(IOError):
+            MovieRecorder(os.path.join(self.temp_dir, 'movie.mp4'), (8, 6),
+                          encoder='no-such-ffmpeg')
@@ -0,0 +1,96 @@
+"""Test decoding images in the background with visual.ImagePreloader
+"""
+import os
+import shutil
+import threading
+from tempfile import mkdtemp
+
+import numpy
+from PIL import Image
+from psychopy.visual.preload import ImagePreloader
+
+
+class _Trials(object):
+    """Minimal stand in for a TrialHandler"""
+    def __init__(self, trialList):
+        self.trialList = trialList
+
+    def getFutureTrial(self, n=1):
+        if n > len(self.trialList):
+            return None
+        return self.trialList[n - 1]
+
+
+class Test_ImagePreloader(object):
+    def setup_class(self):
+        self.temp_dir = mkdtemp(prefix='psychopy-test_preload')
+        self.files = []
+        for n, mode in enumerate(['RGB', 'L']):
+            data = numpy.zeros((4, 8, 3), numpy.uint8)
+            data[0, :] = 255  # top row white
+            fileName = os.path.join(self.temp_dir, 'im%i.png' % n)
+            Image.fromarray(data).convert(mode).save(fileName)
+            self.files.append(fileName)
+
+    def teardown_class(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_preloadTrials(self):
+        preloader = ImagePreloader(nThreads=2)
+        trials = _Trials([{'image': self.files[0], 'ori': 0},
+                          {'image': self.files[1], 'ori': 45}])
+        assert preloader.preloadTrials(trials, n=1) == [self.files[0]]
+        image = preloader.get(self.files[0], wait=True)
+        # decoded as RGBA and flipped for OpenGL (top row is now last)
+        assert image.mode == 'RGBA'
+        assert image.array.shape == (4, 8, 4)
+        assert image.array.flags['C_CONTIGUOUS']
+        assert (image.array[-1, :, :3] == 255).all()
+        assert (image.array[0, :, :3] == 0).all()
+
+        preloader.preloadTrials(trials, n=2)
+        lum = preloader.get(self.files[1], wait=True)
+        assert lum.mode == 'L'
+        assert lum.getFloatArray().dtype == numpy.float32
+        assert lum.getFloatArray().max() == 1.0
+
+        stats = preloader.getStats()
+        assert stats['decoded'] == 2 and stats['pending'] == 0
+
+    def test_notPreloaded(self):
+        preloader = ImagePreloader(nThreads=1)
+        assert preloader.get(self.files[0]) is None
+        preloader.maxBytes = 0  # nothing fits in the cache
+        preloader.preload(self.files[0])
+        assert preloader.get(self.files[0], wait=True) is None
+
+    def test_queuedAgain(self):
+        # a file cancelled and queued again is only decoded once
+        preloader = ImagePreloader(nThreads=2)
+        preloader._startThreads = lambda: None  # decode later
+        preloader.preload(self.files[0])
+        preloader.cancel()
+        preloader.preload(self.files[0])
+        del preloader._startThreads
+        preloader._startThreads()
+        assert preloader.get(self.files[0], wait=True) is not None
+        assert preloader.getStats()['decoded'] == 1
+        assert all(t.is_alive() for t in preloader._threads)
+
+    def test_deadThreadsReplaced(self):
+        preloader = ImagePreloader(nThreads=1)
+        preloader._threads = [threading.Thread(target=None)]  # not alive
+        preloader.preload(self.files[0])
+        assert preloader.get(self.files[0], wait=True) is not None
+
+    def test_changedFile(self):
+        fileName = os.path.join(self.temp_dir, 'changed.png')
+        Image.new('L', (4, 4), 0).save(fileName)
+        preloader = ImagePreloader(nThreads=1)
+        preloader.preload(fileName)
+        assert preloader.get(fileName, wait=True).size == (4, 4)
+        Image.new('L', (8, 4), 0).save(fileName)
+        os.utime(fileName, (0, 0))  # a different modification time
+        assert preloader.get(fileName) is None  # not served stale
+        preloader.preload(fileName)
+        assert preloader.get(fileName, wait=True).size == (8, 4)
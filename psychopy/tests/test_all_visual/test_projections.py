@@ -1,10 +1,11 @@
 import pyglet
 from pyglet.window import key
 from psychopy.visual import Window, shape, TextStim, GratingStim, Circle
-from psychopy.visual.windowwarp import Warper
+from psychopy.visual.windowwarp import Warper, readWarpfile, _quadIndices
 from psychopy import event, core 
 from psychopy.tests import utils
 import pytest, copy
+import numpy as np
 
 """define WindowWarp configurations, test the logic
 
@@ -154,6 +155,29 @@ class ProjectionsLinesAndCircles(object):
 
 
 
+def writeWarpfile(filename, warpdata):
+    rows, cols = warpdata.shape[:2]
+    with open(filename, 'w') as f:
+        f.write('2\n%i %i\n' % (cols, rows))
+        np.savetxt(f, warpdata.reshape(rows * cols, 5))
+
+def test_readWarpfile(tmpdir):
+    warpdata = np.random.random((4, 6, 5))
+    textfile = str(tmpdir.join('warp.data'))
+    writeWarpfile(textfile, warpdata)
+    assert np.allclose(readWarpfile(textfile), warpdata)
+    binaryfile = str(tmpdir.join('warp.npy'))
+    np.save(binaryfile, readWarpfile(textfile))
+    assert np.allclose(readWarpfile(binaryfile), warpdata)
+    with open(textfile, 'a') as f:
+        f.write('1 2 3\n')
+    with pytest.raises(ValueError):
+        readWarpfile(textfile)
+
+def test_quadIndices():
+    # the corners of each quad of a 3x2 grid, row by row
+    assert _quadIndices(3, 2).tolist() == [0, 1, 4, 3, 1, 2, 5, 4]
+
 @pytest.mark.windowwarp
 class Test_class_WindowWarp(object):
     def setup_class(self):
@@ -182,6 +206,23 @@ class Test_class_WindowWarp(object):
         self.warper.changeProjection('warpfile', warpfile="") #jayb todo
         self.draw_projection()
 
+    def test_warpfileBinary(self, tmpdir):
+        x, y = np.meshgrid(np.linspace(-1, 1, 16), np.linspace(-1, 1, 12))
+        warpdata = np.dstack([x, y, (x + 1) / 2, (y + 1) / 2, np.ones_like(x)])
+        np.save(str(tmpdir.join('warp.npy')), warpdata)
+        self.warper.changeProjection('warpfile', str(tmpdir.join('warp.npy')))
+        assert (self.warper.xgrid, self.warper.ygrid) == (16, 12)
+        assert self.warper.nverts == 15 * 11 * 4
+        self.draw_projection()
+
+    def test_meshCache(self):
+        self.warper.changeProjection('spherical', eyepoint=(0.25, 0.5))
+        mesh = Warper._meshCache.values()[-1]
+        self.warper.changeProjection('cylindrical', eyepoint=(0.75, 0.25))
+        self.warper.changeProjection('spherical', eyepoint=(0.25, 0.5))
+        assert Warper._meshCache.values()[-1] is mesh  # not created again
+        self.draw_projection(frames=10)
+
     def test_distance(self):
         self.test_spherical()
         for i in range (1, 50, 2):
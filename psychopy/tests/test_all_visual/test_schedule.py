@@ -0,0 +1,77 @@
+"""Test setting stimulus attributes per frame with visual.FrameSchedule
+"""
+import numpy
+import pytest
+
+from psychopy import visual
+from psychopy.constants import STARTED, FINISHED
+from psychopy.tests import utils
+
+
+@utils.skip_under_travis
+class Test_FrameSchedule(object):
+    def setup_class(self):
+        self.win = visual.Window([128, 128], units='norm', autoLog=False)
+
+    def teardown_class(self):
+        self.win.close()
+
+    def test_values(self):
+        grating = visual.GratingStim(self.win, autoLog=False)
+        schedule = visual.FrameSchedule(self.win)
+        schedule.add(grating, 'pos', [(x, 0) for x in range(4)], units='pix')
+        schedule.add(grating, 'ori', numpy.arange(4) * 90.0)
+        schedule.add(grating, 'phase', lambda frameN: frameN * 0.25)
+        schedule.add(grating, 'opacity', [1, 0, 1, 0])
+        # values are checked when added
+        with pytest.raises(ValueError):
+            schedule.add(grating, 'pos', [(0, 0)] * 3)
+        with pytest.raises(ValueError):
+            schedule.add(grating, 'ori', ['up'] * 4)
+        with pytest.raises(ValueError):
+            schedule.add(grating, 'ori', [0] * 4, units='deg')
+
+        schedule.start()
+        assert schedule.status == STARTED
+        for frameN in range(4):
+            assert schedule.frameN == frameN
+            assert grating.ori == frameN * 90.0
+            assert grating.opacity == (frameN + 1) % 2
+            numpy.testing.assert_allclose(grating.phase, [frameN * 0.25] * 2)
+            # pix converted to norm units
+            numpy.testing.assert_allclose(grating.pos, [frameN / 64.0, 0])
+            grating.draw()
+            self.win.flip()
+        assert schedule.status == FINISHED
+        assert schedule not in self.win._frameSchedules
+        # the same as setting them the usual way
+        rotation = grating._rotationMatrix
+        grating.ori = 270.0
+        numpy.testing.assert_allclose(grating._rotationMatrix, rotation,
+                                      atol=1e-12)
+
+    def test_scalarSizeUnits(self):
+        grating = visual.GratingStim(self.win, units='pix', autoLog=False)
+        schedule = visual.FrameSchedule(self.win)
+        # one scalar per frame, for both width and height
+        schedule.add(grating, 'size', [0.25, 0.5, 1.0], units='norm')
+        schedule.start()
+        for size in [16, 32, 64]:
+            numpy.testing.assert_allclose(grating.size, [size, size])
+            self.win.flip()
+        assert schedule.status == FINISHED
+
+    def test_late(self):
+        grating = visual.GratingStim(self.win, autoLog=False)
+        schedule = visual.FrameSchedule(self.win, nFrames=10,
+                                        timeLocked=True)
+        schedule.add(grating, 'ori', range(10))
+        schedule.start()
+        schedule._framePeriod = 0.01
+        schedule._onFlip(1.0)
+        schedule._onFlip(1.01)
+        schedule._onFlip(1.05)  # frame 2 was due at 1.02
+        assert schedule.nLate == 1
+        assert schedule.nSkipped == 3
+        assert grating.ori == schedule.frameN == 6
+        schedule.stop()
@@ -0,0 +1,73 @@
+"""Test drawing groups of shapes with visual.ShapeBatch
+"""
+import numpy
+import pytest
+
+from psychopy import visual
+from psychopy.visual import shapebatch
+from psychopy.tests import utils
+
+
+def test_fanIndices():
+    assert shapebatch._fanIndices(4).tolist() == [[0, 1, 2], [0, 2, 3]]
+    assert len(shapebatch._fanIndices(2)) == 0
+
+
+def test_lineIndices():
+    assert shapebatch._lineIndices(3, True).tolist() == \
+        [[0, 1], [1, 2], [2, 0]]
+    assert shapebatch._lineIndices(3, False).tolist() == [[0, 1], [1, 2]]
+
+
+@utils.skip_under_travis
+class Test_ShapeBatch(object):
+    def setup_class(self):
+        self.win = visual.Window([128, 128], units='pix', autoLog=False)
+
+    def teardown_class(self):
+        self.win.close()
+
+    def test_arrays(self):
+        rect = visual.Rect(self.win, width=20, height=10, fillColor='red',
+                           lineColor='white', autoLog=False)
+        line = visual.Line(self.win, start=(-30, 0), end=(30, 0),
+                           lineWidth=3, autoLog=False)
+        batch = visual.ShapeBatch(self.win, [rect, line])
+        assert len(batch) == 2 and line in batch
+        batch.draw()
+        assert len(batch._fillVerts) == 6  # the rect as 2 triangles
+        assert len(batch._lineVerts) == 6  # rect border + line
+        assert len(batch._lineRuns) == 2  # different lineWidths
+        numpy.testing.assert_allclose(batch._lineVerts[:4], rect.verticesPix,
+                                   rtol=1e-5)
+
+        # moving a shape updates its vertices in place
+        fillVerts = batch._fillVerts
+        rect.pos = (10, 5)
+        rect.opacity = 0.5
+        batch.draw()
+        assert batch._fillVerts is fillVerts
+        numpy.testing.assert_allclose(batch._lineVerts[:4], rect.verticesPix,
+                                   rtol=1e-5)
+        assert (batch._fillColors[:, 3] == 0.5).all()
+        # and the shapes still work on their own
+        assert rect.contains(10, 5)
+
+        batch.remove(line)
+        batch.draw()
+        assert len(batch._lineVerts) == 4
+        with pytest.raises(ValueError):
+            batch.remove(line)
+
+    def test_drawLikeShapes(self):
+        shapes = [visual.Circle(self.win, radius=8, pos=(x, 0),
+                                fillColor='blue', lineColor=None,
+                                autoLog=False) for x in (-40, 0, 40)]
+        for shape in shapes:
+            shape.draw()
+        single = numpy.array(self.win._getFrame(buffer='back'))
+        self.win.clearBuffer()
+        visual.ShapeBatch(self.win, shapes).draw()
+        batched = numpy.array(self.win._getFrame(buffer='back'))
+        self.win.clearBuffer()
+        assert numpy.abs(single.astype(int) - batched).mean() < 1
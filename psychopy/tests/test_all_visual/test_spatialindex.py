@@ -0,0 +1,43 @@
+"""Test hit testing many points with pointsInPolygon and SpatialIndex
+"""
+import numpy
+from psychopy import visual
+from psychopy.visual import helpers
+from psychopy.tests import utils
+
+
+def test_pointsInPolygon():
+    # a concave polygon
+    poly = numpy.array([(0, 0), (4, 0), (4, 4), (2, 1), (0, 4)])
+    points = numpy.random.uniform(-1, 5, (200, 2))
+    expected = [helpers.pointInPolygon(x, y, poly) for x, y in points]
+    assert (helpers.pointsInPolygon(points, poly) == expected).all()
+    haveMatplotlib = helpers.haveMatplotlib
+    helpers.haveMatplotlib = False  # the numpy version
+    try:
+        assert (helpers.pointsInPolygon(points, poly) == expected).all()
+    finally:
+        helpers.haveMatplotlib = haveMatplotlib
+
+
+@utils.skip_under_travis
+class Test_SpatialIndex(object):
+    def setup_class(self):
+        self.win = visual.Window([128, 128], units='pix', autoLog=False)
+
+    def teardown_class(self):
+        self.win.close()
+
+    def test_contains(self):
+        rects = [visual.Rect(self.win, width=20, height=20, pos=(x, y),
+                             ori=x, autoLog=False)
+                 for x in range(-50, 60, 25) for y in range(-50, 60, 25)]
+        index = visual.SpatialIndex(rects)
+        points = numpy.random.uniform(-64, 64, (300, 2))
+        expected = numpy.array([rect.contains(points) for rect in rects]).T
+        assert (index.contains(points) == expected).all()
+        # moved stimuli are re-indexed
+        rects[0].pos = (30, 30)
+        assert index.whichContain((30, 30))[0] is rects[0]
+        expected = numpy.array([rect.contains(points) for rect in rects]).T
+        assert (index.contains(points) == expected).all()
@@ -1,6 +1,8 @@
 from psychopy import visual, event
 from psychopy.visual import Window
-from psychopy.visual.textbox import TextBox
+from psychopy.visual.textbox import TextBox, getFontManager
+from psychopy.visual.textbox.fontmanager import FontCache, MonospaceFontAtlas
+from psychopy.tests import utils
 
 import pytest
 
@@ -27,6 +29,37 @@ class Test_textbox(object):
             self.win.flip()
             assert tb.getText() == tb.getDisplayedText() == text
 
+    @utils.skip_under_travis
+    def test_draw(self):
+        # _te_start_gl runs on every draw, frozen or not
+        self.win.units = 'norm'
+        for freeze in [False, True]:
+            tb = TextBox(self.win, text='abc', size=(1, .5), freeze=freeze)
+            tb.draw()
+            self.win.flip()
+            tb.draw()
+            self.win.flip()
+
+    def test_fontCache(self, tmpdir):
+        fm = getFontManager()
+        cache = FontCache(str(tmpdir))
+        font_info = fm.getFontsMatching(fm.getFontFamilyStyles()[0][0])[0]
+        atlas = MonospaceFontAtlas(font_info, 14, 72, cache)
+        atlas.createFontAtlas()
+        assert not atlas.from_cache
+        # a second atlas (e.g. in the next session) is loaded from disk
+        cached = MonospaceFontAtlas(font_info, 14, 72, FontCache(str(tmpdir)))
+        cached.createFontAtlas()
+        assert cached.from_cache
+        assert cached.max_tile_width == atlas.max_tile_width
+        assert cached.charcode2glyph == atlas.charcode2glyph
+        assert (cached.atlas.data == atlas.atlas.data).all()
+        # and so is the font info, unless the file changes
+        cache.setFontInfo(font_info.path, font_info)
+        cache.saveIndex()
+        info = FontCache(str(tmpdir)).getFontInfo(font_info.path)
+        assert info.asdict() == font_info.asdict()
+
     def test_something(self):
         # to-do: test visual display, char position, etc
         pass
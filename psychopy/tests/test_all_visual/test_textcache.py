@@ -0,0 +1,41 @@
+"""Test the font and text layout caches shared by TextStims
+"""
+from psychopy.visual import textcache
+
+
+class Test_textcache(object):
+    def setup(self):
+        textcache.clear()
+
+    def teardown(self):
+        textcache.clear()
+
+    def test_getFont(self):
+        loaded = []
+
+        def loadFont(name, size, bold=False, italic=False, dpi=None):
+            loaded.append(name)
+            return object()
+        font = textcache.getFont(loadFont, ['Arial', 'Helvetica'], 24)
+        assert textcache.getFont(loadFont, ['Arial', 'Helvetica'], 24) is font
+        assert textcache.getFont(loadFont, 'Arial', 24, bold=True) is not font
+        assert len(loaded) == 2
+        assert textcache.getStats()['fonts'] == 2
+
+    def test_getLayout(self):
+        created = []
+
+        def createLayout():
+            created.append(1)
+            return object()
+        key = textcache.layoutKey(u'hello', 'Arial', 24.0, False, False, 500,
+                                  'center', 'center', (1, 1, 1, 1.0))
+        layout = textcache.getLayout(key, createLayout)
+        assert textcache.getLayout(key, createLayout) is layout
+        # any change of the layout settings is a different layout
+        key2 = textcache.layoutKey(u'hello', 'Arial', 24.0, False, False, 500,
+                                   'left', 'center', (1, 1, 1, 1.0))
+        assert textcache.getLayout(key2, createLayout) is not layout
+        assert len(created) == 2
+        stats = textcache.getStats()['layouts']
+        assert stats['hits'] == 1 and stats['items'] == 2
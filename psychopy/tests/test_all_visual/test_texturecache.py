@@ -0,0 +1,53 @@
+"""Test the shared procedural texture caches of visual.texturecache
+"""
+from psychopy import visual
+from psychopy.visual import texturecache
+from psychopy.tests import utils
+
+
+def test_LRUCache():
+    evicted = []
+    cache = texturecache.LRUCache(100, onEvict=lambda k, v: evicted.append(k))
+    cache.put('a', 1, 60)
+    cache.put('b', 2, 30)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+    cache.put('c', 3, 30)
+    assert evicted == ['b']
+    assert cache.get('b') is None
+    stats = cache.getStats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['bytes'] == 90
+
+
+def test_proceduralKey():
+    params = {'sd': 3, 'fringeWidth': 0.2}
+    assert texturecache.proceduralKey('gauss', 64, params, None) == \
+        ('gauss', 64, 3, None)
+    # maskParams only matter for the textures that use them
+    assert texturecache.proceduralKey('sin', 64, params, None) == \
+        texturecache.proceduralKey('sin', 64, {}, None)
+    assert texturecache.proceduralKey('none', 64, {}, None) == \
+        texturecache.proceduralKey(None, 128, {}, None)
+    assert texturecache.proceduralKey('face.jpg', 64, {}, None) is None
+
+
+@utils.skip_under_travis
+class Test_SharedTextures(object):
+    def setup_class(self):
+        self.win = visual.Window([128, 128], autoLog=False)
+
+    def teardown_class(self):
+        self.win.close()
+
+    def test_gratingsShareMask(self):
+        before = texturecache.getStats()['glTextures']['hits']
+        gabors = [visual.GratingStim(self.win, mask='gauss', texRes=64)
+                  for n in range(3)]
+        assert gabors[0]._maskID is gabors[1]._maskID is gabors[2]._maskID
+        assert texturecache.getStats()['glTextures']['hits'] >= before + 2
+        # a different mask gets a texture of its own
+        gabors[2].mask = 'circle'
+        assert gabors[2]._maskID is not gabors[0]._maskID
+        for g in gabors:
+            g.draw()
+        self.win.flip()
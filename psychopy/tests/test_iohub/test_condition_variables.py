@@ -0,0 +1,21 @@
+""" Test condition variable table type inference for TrialHandler trial lists
+"""
+from psychopy.iohub.client import getTrialListDtype
+
+
+def testGetTrialListDtype():
+    trial_list = [
+        dict(COND='short', COUNT=1, BIG=1, RT=1, RESP=None),
+        dict(COND='x' * 300, COUNT=2, BIG=2 ** 40, RT=0.5, RESP=None),
+    ]
+    dtype = dict((d[0], d[1:]) for d in getTrialListDtype(trial_list))
+
+    # strings are sized from all rows, never below the minimum width
+    assert dtype['COND'] == ('S', 300)
+    assert dtype['RESP'] == ('S', 256)
+    # int columns are only used if every row holds an int that fits
+    assert dtype['COUNT'] == ('i4',)
+    assert dtype['BIG'] == ('i8',)
+    assert dtype['RT'] == ('f8',)
+    # column order follows the first trial
+    assert [d[0] for d in getTrialListDtype(trial_list)] == trial_list[0].keys()
@@ -0,0 +1,78 @@
+""" Test the ioHub configuration cache
+"""
+import os
+from psychopy.iohub import configcache
+
+
+def setup_module(module):
+    module._old_cache_dir = configcache.CACHE_DIRECTORY
+    module._old_enabled = configcache.enabled
+
+
+def teardown_module(module):
+    configcache.CACHE_DIRECTORY = module._old_cache_dir
+    configcache.enabled = module._old_enabled
+
+
+def testYamlCache(tmpdir):
+    configcache.CACHE_DIRECTORY = str(tmpdir.join('cache'))
+    configcache.enabled = True
+    yaml_path = str(tmpdir.join('test_config.yaml'))
+    with open(yaml_path, 'w') as f:
+        f.write("monitor_devices:\n    - Keyboard:\n        name: kb\n")
+
+    config = configcache.loadYaml(yaml_path)
+    assert config['monitor_devices'][0]['Keyboard']['name'] == 'kb'
+    assert len(os.listdir(configcache.CACHE_DIRECTORY)) == 1
+
+    # callers get their own copy of cached data
+    config['monitor_devices'] = None
+    config = configcache.loadYaml(yaml_path)
+    assert config['monitor_devices'][0]['Keyboard']['name'] == 'kb'
+
+    # a changed file must be reparsed
+    with open(yaml_path, 'w') as f:
+        f.write("monitor_devices:\n    - Keyboard:\n        name: keyboard2\n")
+    os.utime(yaml_path, (0, 0))
+    config = configcache.loadYaml(yaml_path)
+    assert config['monitor_devices'][0]['Keyboard']['name'] == 'keyboard2'
+
+    configcache.clearCache()
+    assert len(os.listdir(configcache.CACHE_DIRECTORY)) == 0
+
+
+def testUnsafeCacheDirectory(tmpdir):
+    # entries in a folder others can write to are not trusted
+    configcache.CACHE_DIRECTORY = str(tmpdir.join('shared'))
+    configcache.enabled = True
+    os.mkdir(configcache.CACHE_DIRECTORY)
+    os.chmod(configcache.CACHE_DIRECTORY, 0777)
+    key = configcache.compileKey('unsafe')
+    with open(configcache._cacheFilePath(key), 'wb') as f:
+        f.write(configcache.pickle.dumps('planted'))
+    assert configcache.getCached(key) is None
+    assert not configcache.storeCached(key, 'value')
+
+    # a new cache folder is private to the user
+    configcache.CACHE_DIRECTORY = str(tmpdir.join('private'))
+    assert configcache.storeCached(key, 'value')
+    assert os.stat(configcache.CACHE_DIRECTORY).st_mode & 0777 == 0700
+
+
+def testCompileKey():
+    key = configcache.compileKey('device_config', dict(a=1, b=dict(c=[1, 2])))
+    assert key == configcache.compileKey('device_config',
+                                         dict(b=dict(c=[1, 2]), a=1))
+    assert key != configcache.compileKey('device_config',
+                                         dict(b=dict(c=[1, 3]), a=1))
+
+
+def testStartupTimer():
+    timer = configcache.StartupTimer()
+    with timer.phase('phase1'):
+        pass
+    timer.start('phase2')
+    timer.stop('phase2')
+    assert [name for name, dur in timer.items()] == ['phase1', 'phase2']
+    assert timer.total() >= 0.0
+    assert 'phase2' in timer.report()
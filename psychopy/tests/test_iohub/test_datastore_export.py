@@ -0,0 +1,99 @@
+""" Test exporting ioHub DataStore files to CSV and Parquet
+"""
+import os
+import csv
+
+import numpy as np
+import pytest
+
+tables = pytest.importorskip('tables')
+from psychopy.iohub.datastore.export import (joinConditionVariables,
+                                             exportDataStoreFiles)
+
+EVENT_TABLE = '/data_collection/events/keyboard/KeyboardInputEvent'
+
+
+def _createDataStoreFile(path):
+    """A minimal datastore file with one keyboard event table and two trials
+    of condition variables."""
+    mapping = np.array([(22, 1, 'KeyboardPressEvent', EVENT_TABLE),
+                        (23, 1, 'KeyboardReleaseEvent', EVENT_TABLE)],
+                       dtype=[('class_id', np.uint32),
+                              ('class_type_id', np.uint32),
+                              ('class_name', 'S32'),
+                              ('table_path', 'S128')])
+    events = np.array([(1, 22, 5.0, 'a'), (1, 22, 15.0, 'b'),
+                       (1, 23, 16.0, 'b'), (1, 22, 25.0, 'c')],
+                      dtype=[('session_id', np.uint32), ('type', np.uint8),
+                             ('time', np.float64), ('key', 'S8')])
+    cv = np.array([(1, 1, 10.0, 20.0, 'A'), (1, 1, 20.0, 30.0, 'B')],
+                  dtype=[('EXPERIMENT_ID', np.uint32),
+                         ('SESSION_ID', np.uint32),
+                         ('TRIAL_START', np.float64),
+                         ('TRIAL_END', np.float64), ('COND', 'S8')])
+    hub_file = tables.openFile(path, 'w')
+    try:
+        hub_file.createTable('/', 'class_table_mapping', mapping)
+        where, name = EVENT_TABLE.rsplit('/', 1)
+        hub_file.createTable(where, name, events, createparents=True)
+        hub_file.createTable('/data_collection/condition_variables',
+                             'EXP_CV_1', cv, createparents=True)
+    finally:
+        hub_file.close()
+
+
+def testJoinConditionVariables():
+    trials_by_session = {
+        1: (np.array([10.0, 30.0]), np.array([20.0, 40.0]),
+            dict(COND=np.array(['A', 'B']), RT=np.array([1, 2]))),
+        2: (np.array([0.0]), np.array([5.0]),
+            dict(COND=np.array(['C']), RT=np.array([3]))),
+    }
+    session_ids = np.array([1, 1, 1, 1, 2, 2, 3])
+    times = np.array([5.0, 15.0, 25.0, 35.0, 4.0, 6.0, 15.0])
+
+    in_trial, (cond, rt) = joinConditionVariables(
+        session_ids, times, ['COND', 'RT'], trials_by_session)
+
+    assert in_trial.tolist() == [False, True, False, True, True, False, False]
+    assert cond.tolist() == ['', 'A', '', 'B', 'C', '', '']
+    assert rt[in_trial].tolist() == [1, 2, 3]
+    assert np.isnan(rt[~in_trial]).all()
+
+
+def testExportCSV(tmpdir):
+    hub_path = str(tmpdir.join('events.hdf5'))
+    _createDataStoreFile(hub_path)
+    output_dir = str(tmpdir.join('exported'))
+
+    results = exportDataStoreFiles([hub_path], output_dir, processes=1,
+                                   progress=False, chunk_size=2)
+    assert results == {(hub_path, 'KeyboardPressEvent'): 3,
+                       (hub_path, 'KeyboardReleaseEvent'): 1}
+
+    out_path = os.path.join(output_dir, 'events', 'KeyboardPressEvent.csv')
+    with open(out_path, 'rb') as f:
+        rows = list(csv.DictReader(f))
+    assert [r['key'] for r in rows] == ['a', 'b', 'c']
+    # condition variables of the trial each event occurred in
+    assert [r['COND'] for r in rows] == ['', 'A', 'B']
+    assert [r['TRIAL_START'] for r in rows] == ['nan', '10.0', '20.0']
+
+
+def testExportParquet(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+    hub_path = str(tmpdir.join('events.hdf5'))
+    _createDataStoreFile(hub_path)
+    output_dir = str(tmpdir.join('exported'))
+
+    results = exportDataStoreFiles([hub_path], output_dir, processes=1,
+                                   progress=False, output_format='parquet',
+                                   trial_events_only=True)
+    assert results == {(hub_path, 'KeyboardPressEvent'): 2,
+                       (hub_path, 'KeyboardReleaseEvent'): 1}
+
+    out_path = os.path.join(output_dir, 'events',
+                            'KeyboardPressEvent.parquet')
+    exported = pq.read_table(out_path).to_pydict()
+    assert list(exported['key']) == ['b', 'c']
+    assert list(exported['COND']) == ['A', 'B']
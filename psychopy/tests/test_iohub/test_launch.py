@@ -20,3 +20,36 @@ def testDefaultServerLaunch():
 
     stopHubProcess()
 
+
+@skip_under_travis
+def testStartupTimings():
+    """
+    """
+    io = startHubProcess()
+
+    timings = io.getStartupTimings()
+    client_phases = [name for name, dur in timings['client']]
+    server_phases = [name for name, dur in timings['server']]
+    assert 'wait_for_server_ready' in client_phases
+    assert 'load_config' in server_phases
+    assert 'create_device.Keyboard' in server_phases
+    for name, dur in timings['client'] + timings['server']:
+        assert dur >= 0.0
+
+    stopHubProcess()
+
+@skip_under_travis
+def testHubMetrics():
+    """
+    """
+    io = startHubProcess()
+
+    io.sendMessageEvent("metrics test")
+    io.getEvents()
+    metrics = io.getHubMetrics()
+    assert 'device_to_hub_latency' in metrics
+    assert 'hub_to_client_latency' in metrics
+    assert 'event_buffer_depth' in metrics
+    assert metrics['device_to_hub_latency']['count'] >= 1
+
+    stopHubProcess()
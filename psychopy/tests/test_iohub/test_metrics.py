@@ -0,0 +1,46 @@
+""" Test the ioHub Server metrics histograms
+"""
+import numpy as np
+from psychopy.iohub.metrics import Histogram, HubMetrics, TIME_BIN_EDGES
+
+
+def testHistogram():
+    h = Histogram(TIME_BIN_EDGES)
+    assert h.summary()['count'] == 0
+    assert h.mean() is None
+
+    values = np.linspace(0.001, 0.002, 101)
+    h.addArray(values[:50])
+    for v in values[50:]:
+        h.add(float(v))
+    assert h.count == 101
+    assert h.counts.sum() == 101
+    assert np.allclose(h.mean(), values.mean())
+    assert h.min == values[0] and h.max == values[-1]
+    # percentiles are bin lower edges, so are within one bin of exact
+    assert 0.001 <= h.percentile(50) <= 0.0015
+
+    # out of range values are counted in the first / last bin
+    h.add(0.0)
+    h.add(1000.0)
+    assert h.counts[0] == 1 and h.counts[-1] == 1
+
+    h.reset()
+    assert h.count == 0 and h.counts.sum() == 0
+
+
+def testHubMetrics():
+    m = HubMetrics()
+    m.addDevice('Keyboard')
+    m.poll_duration['Keyboard'].add(0.0005)
+    m.device_to_hub_latency.addArray([0.001, 0.002])
+    summary = m.summary(include_bins=True)
+    assert summary['poll_duration.Keyboard']['count'] == 1
+    assert summary['device_to_hub_latency']['count'] == 2
+    assert summary['hub_to_client_latency']['count'] == 0
+    assert len(summary['device_to_hub_latency']['bins']) >= 1
+    # log lines must fit in a LogEvent text field
+    for line in m.summaryLines():
+        assert len(line) <= 128
+    m.reset()
+    assert m.summary()['device_to_hub_latency']['count'] == 0
@@ -0,0 +1,82 @@
+""" Test the ValidationProcedure accuracy and precision statistics
+"""
+import numpy as np
+from psychopy.iohub.util.targetpositionsequence import (ValidationProcedure,
+                                                        TargetPosSequenceStim)
+
+STATIONARY = TargetPosSequenceStim.TARGET_STATIONARY
+
+
+def makeSamples(eye_status=0):
+    """Five monocular samples at each of two target positions; the gaze is
+    offset from the target by 1 (position 0) or 3 to 5 (position 1) pixels.
+    """
+    samples = np.zeros(10, dtype=TargetPosSequenceStim.monocular_sample_message_element)
+    samples['targ_pos_ix'] = [0] * 5 + [1] * 5
+    samples['eye_time'] = np.arange(10) * 0.1
+    samples['targ_state'] = STATIONARY
+    samples['eye_status'] = eye_status
+    samples['targ_pos_x'] = [0] * 5 + [100] * 5
+    samples['targ_pos_y'] = [0] * 5 + [-50] * 5
+    samples['eye_x'] = samples['targ_pos_x'] + [1, 1, 1, 1, 1, 3, 4, 5, 4, 3]
+    samples['eye_y'] = samples['targ_pos_y']
+    return samples
+
+
+class FakeIO(object):
+    def sendMessageEvent(self, text, category=''):
+        pass
+
+
+class FakeSequence(object):
+    TARGET_STATIONARY = STATIONARY
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def getSampleMessageData(self):
+        return [self.samples[self.samples['targ_pos_ix'] == i] for i in (0, 1)]
+
+
+def makeProcedure(samples):
+    vp = ValidationProcedure.__new__(ValidationProcedure)
+    vp.io = FakeIO()
+    vp.targetsequence = FakeSequence(samples)
+    vp.accuracy_period_start = 1.0  # use all the stationary samples
+    vp.accuracy_period_stop = -1.0
+    vp.results_in_degrees = False
+    vp.display_size = (800, 600)
+    return vp
+
+
+def testPositionStats():
+    samples = makeSamples()
+    vp = makeProcedure(samples)
+    stats = vp._calculatePositionStats(samples, 2, (('eye_x', 'eye_y'),))
+    assert stats['passed'].tolist() == [True, True]
+    assert np.allclose(stats['valid_perc'], 1.0)
+    assert np.allclose(stats['min_error'], [1, 3])
+    assert np.allclose(stats['max_error'], [1, 5])
+    assert np.allclose(stats['mean_error'], [1, 3.8])
+    assert np.allclose(stats['stdev_error'], [0, np.std([3, 4, 5, 4, 3])])
+    # the gaze of position 0 doesn't move, at position 1 it moves 1 pixel
+    # per sample
+    assert np.allclose(stats['rms_s2s_precision'], [0, 1])
+
+    # samples with missing data are not used
+    samples['eye_status'][[5, 6]] = 2
+    stats = vp._calculatePositionStats(samples, 2, (('eye_x', 'eye_y'),))
+    assert np.allclose(stats['valid_perc'], [1, 0.6])
+    assert np.allclose(stats['min_error'], [1, 3])
+    assert np.allclose(stats['mean_error'], [1, 4])
+
+
+def testAllPositionsInvalid():
+    samples = makeSamples(eye_status=2)
+    vp = makeProcedure(samples)
+    stats = vp._calculatePositionStats(samples, 2, (('eye_x', 'eye_y'),))
+    assert stats['passed'].tolist() == [False, False]
+    assert np.allclose(stats['valid_perc'], 0)
+    # nothing to plot
+    assert vp._createPlot() == (None, None)
+    assert vp.validation_results is None
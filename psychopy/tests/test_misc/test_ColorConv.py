@@ -1,4 +1,5 @@
-from psychopy.tools.colorspacetools import hsv2rgb
+from psychopy.tools.colorspacetools import (hsv2rgb, dkl2rgb, lms2rgb,
+                                            rgb2dklCart, ColorConverter)
 import numpy
 
 #We need more tests of these conversion routines. Feel free to jump in and help! ;-)
@@ -40,5 +41,58 @@ def test_HSV_RGB():
     RGB = hsv2rgb(HSV)
     assert numpy.allclose(RGB,expectedRGB,0.0001)
 
+def test_ColorConverter():
+    dkl_rgb = numpy.array([[1.0, 0.9, -0.2], [1.0, -0.4, 0.2], [1.0, 0.0, -1.1]])
+    conv = ColorConverter(dkl_rgb=dkl_rgb)
+    assert conv.calibrated == {'DKL': True, 'LMS': False}
+    dkl = numpy.random.random([20, 3]) * [180, 360, 1] - [90, 0, 0]
+    expected = dkl2rgb(dkl, dkl_rgb)
+    assert numpy.allclose(conv.dkl2rgb(dkl), expected, atol=1e-5)
+    assert conv.dkl2rgb(dkl).dtype == numpy.float32
+    # images, into an existing array or in place
+    image = dkl.reshape([4, 5, 3]).astype(numpy.float32)
+    out = numpy.empty_like(image)
+    assert conv.dkl2rgb(image, out=out) is out
+    assert numpy.allclose(out.reshape([-1, 3]), expected, atol=1e-5)
+    assert conv.dkl2rgb(image, out=image) is image
+    assert numpy.allclose(image, out)
+    assert numpy.allclose(conv.rgb2dklCart(image),
+                          rgb2dklCart(image, dkl_rgb), atol=1e-5)
+    lms = numpy.random.random([6, 3])
+    assert numpy.allclose(conv.lms2rgb(lms), lms2rgb(lms), atol=1e-5)
+    assert numpy.allclose(conv.rgb2lms(conv.lms2rgb(lms)), lms, atol=1e-5)
+
+def test_rgb2dac():
+    conv = ColorConverter()  # no monitor, so no gamma correction
+    rgb = numpy.array([[-1, 0, 1], [0.5, -0.5, 2]])
+    assert numpy.all(conv.rgb2dac(rgb) == [[0, 128, 255], [191, 64, 255]])
+    dacs = conv.rgb2dac(rgb, bits=16)
+    assert dacs.dtype == numpy.uint16
+    assert dacs[0, 2] == 65535
+
+def test_setColorPrecision():
+    from psychopy.visual.helpers import setColor
+
+    class Win(object):
+        dkl_rgb = lms_rgb = None
+        colorConverter = ColorConverter()
+        _colorConverter64 = ColorConverter(dtype=numpy.float64)
+
+    class Stim(object):
+        win = Win()
+        autoLog = False
+
+    stim = Stim()
+    # single colors are converted in double precision
+    setColor(stim, [90, 0, 1], colorSpace='dkl')
+    assert numpy.all(stim.rgb == [1.0, 1.0, 1.0])
+    assert stim.rgb.dtype == numpy.float64
+    setColor(stim, [0.1, 0.2, 0.3], colorSpace='lms')
+    assert numpy.allclose(stim.rgb, lms2rgb(numpy.array([0.1, 0.2, 0.3])),
+                          rtol=0, atol=1e-12)
+    # arrays of colors (e.g. of ElementArrayStim) in float32
+    setColor(stim, numpy.zeros([5, 3]), colorSpace='dkl')
+    assert stim.rgb.dtype == numpy.float32
+
 if __name__=='__main__':
     test_HSV_RGB()
@@ -231,4 +231,4 @@ class xxxTestPygameNorm(_baseTest):
     def setup_class(self):
         self.win = Window([128,128], winType='pygame', pos=[50,50], autoLog=False)
         assert pygame.display.get_init() == 1
-        assert event.havePygame
+        assert event._havePygame()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+from psychopy.tools import importprofile
+
+# py.test -k importprofile --cov-report term-missing --cov importprofile.py
+
+# heavy dependencies that should only be imported when first used
+lazyModules = {'psychopy.data': ['pandas', 'scipy', 'openpyxl',
+                                 'psychopy.contrib.psi'],
+               'psychopy.monitors': ['scipy']}
+
+
+def test_profileImport():
+    results = importprofile.profileImport('psychopy.data')
+    names = [name for name, cumulative, own in results]
+    assert names[0] == 'psychopy.data'  # includes everything else
+    assert 'psychopy.logging' in names
+    assert len(set(names)) == len(names)
+    for name, cumulative, own in results:
+        assert cumulative >= own - 0.001
+
+
+def test_lazyImports():
+    """a regression test of the startup time: fail if slow dependencies
+    are imported again before they are used"""
+    for moduleName, lazy in lazyModules.items():
+        results = importprofile.profileImport(moduleName)
+        loaded = set(name.split('.')[0] for name, cumul, own in results)
+        loaded.update(name for name, cumul, own in results)
+        for name in lazy:
+            assert name not in loaded, '%s imports %s' % (moduleName, name)
+
+
+def test_unusableDependencies(monkeypatch):
+    """lazily imported packages that can't be imported (e.g. are too old to
+    have the names used) are reported as missing, as if they were eager"""
+    from psychopy import data, event
+    monkeypatch.setattr(data, 'haveOpenpyxl', None)
+    monkeypatch.setitem(sys.modules, 'openpyxl.cell', None)
+    assert data._haveOpenpyxl() is False
+    monkeypatch.setattr(event, 'havePygame', None)
+    monkeypatch.setitem(sys.modules, 'pygame.event', None)
+    assert event._havePygame() is False
+
+
+def test_timeImport():
+    seconds = importprofile.timeImport('psychopy', repeats=2)
+    assert 0 < seconds < 60
+
+
+def test_report():
+    profiler = importprofile.ImportProfiler()
+    profiler.start()
+    try:
+        import psychopy.tools.importprofile  # already loaded, not recorded
+    finally:
+        profiler.stop()
+    assert profiler.getResults() == []
+    assert profiler.report().startswith('cumul (ms)')
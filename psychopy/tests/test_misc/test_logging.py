@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import StringIO
+
+from psychopy import logging
+from psychopy.tools import attributetools
+
+# py.test -k logging --cov-report term-missing --cov logging.py
+
+
+class Stim(object):
+    """A minimal stimulus, with no window to log on the flip of"""
+    def __init__(self, name):
+        self.name = name
+        self.autoLog = True
+        self.pos = [1, 2]
+
+
+class TestLogging(object):
+    def setup(self):
+        self.logger = logging._Logger(format="%(levelname)s %(message)s",
+                                      historyLength=5)
+        self.stream = StringIO.StringIO()
+        self.logFile = logging.LogFile(self.stream, level=logging.INFO,
+                                       logger=self.logger)
+
+    def teardown(self):
+        self.logger.setAsync(False)
+
+    def test_lazyMessage(self):
+        value = [1, 2]
+        msg = logging.LazyMessage("stim: pos = %r", (value,))
+        self.logger.log(msg, level=logging.EXP)
+        self.logger.log(msg, level=logging.DEBUG)  # not formatted
+        self.logger.flush()
+        assert self.stream.getvalue() == "EXP stim: pos = [1, 2]\n"
+
+    def test_lazyMessageUnicode(self, monkeypatch):
+        monkeypatch.setattr(logging, 'root', self.logger)
+        stim = Stim(name=u'caf\xe9')
+        attributetools.logAttrib(stim, log=True, attrib='pos')
+        self.logger.flush()
+        assert self.stream.getvalue() == u"EXP caf\xe9: pos = [1, 2]\n"
+
+    def test_history(self):
+        for n in range(20):
+            self.logger.log("message %i" % n, level=logging.INFO)
+        self.logger.flush()
+        assert len(self.stream.getvalue().splitlines()) == 20
+        assert [e.message for e in self.logger.flushed] == [
+            "message %i" % n for n in range(15, 20)]
+
+    def test_async(self):
+        self.logger.setAsync(True, flushInterval=0.01)
+        for n in range(100):
+            self.logger.log("message %i" % n, level=logging.INFO, t=n)
+        self.logger.flush()  # waits for the writer thread
+        lines = self.stream.getvalue().splitlines()
+        assert lines == ["INFO message %i" % n for n in range(100)]
+        assert self.logger.flushed[-1].t == 99
+        self.logger.setAsync(False)
+        self.logger.log("sync", level=logging.INFO)
+        self.logger.flush()
+        assert self.stream.getvalue().endswith("INFO sync\n")
+
+    def test_dropped(self):
+        self.logger.setAsync(True, flushInterval=10, maxQueued=10)
+        for n in range(30):
+            self.logger.log("message %i" % n, level=logging.INFO)
+        assert self.logger.getStats()['dropped'] >= 20
+        self.logger.flush()
+        lines = self.stream.getvalue().splitlines()
+        assert len(lines) == 11
+        assert "were dropped" in lines[-1]
+
+    def test_writeFailed(self, capsys):
+        self.logger.setAsync(True, flushInterval=10)
+        self.stream.close()  # writing to it raises ValueError
+        for n in range(5):
+            self.logger.log("message %i" % n, level=logging.INFO)
+        self.logger.flush()
+        self.logger.log("message 5", level=logging.INFO)
+        self.logger.flush()
+        assert self.logger.getStats()['failed'] == 6
+        assert self.logger._writer.is_alive()
+        # reported once
+        err = capsys.readouterr()[1]
+        assert err.count("failed to write") == 1
+        assert "5 log messages (ValueError" in err
@@ -145,13 +145,22 @@ def logAttrib(obj, log, attrib, value=None):
     """Logs a change of a visual attribute on the next window.flip.
     If value=None, it will take the value of self.attrib.
     """
+    # the stimulus has changed, so a visual.FrozenGroup holding it must
+    # render it again
+    for group in obj.__dict__.get('_frozenGroups', ()):
+        group.invalidate()
     # Default to autoLog if log isn't set explicitly
     if log or log is None and obj.autoLog:
         if value is None:
             value = getattr(obj, attrib)
 
-        # Log on next flip
-        message = "%s: %s = %s" % (obj.name, attrib, value.__repr__())
+        if isinstance(value, numpy.ndarray):
+            value = value.copy()  # as it may be changed in place later
+        elif isinstance(value, list):
+            value = list(value)
+        # Log on next flip, formatted only when it is written
+        message = logging.LazyMessage("%s: %s = %r",
+                                      (obj.name, attrib, value))
         try:
             obj.win.logOnFlip(message, level=logging.EXP, obj=obj)
         except AttributeError:
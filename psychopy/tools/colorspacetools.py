@@ -12,6 +12,30 @@ import numpy
 from psychopy import logging
 from psychopy.tools.coordinatetools import sph2cart
 
+# conversion matrices for generic Sony Trinitron phosphors, used when a
+# monitor has not been color-calibrated
+defaultDKL_RGB = numpy.asarray([
+    # (note that dkl has to be in cartesian coords first!)
+    # LUMIN    %L-M    %L+M-S
+    [1.0000, 1.0000, -0.1462],  # R
+    [1.0000, -0.3900, 0.2094],  # G
+    [1.0000, 0.0180, -1.0000]])  # B
+defaultLMS_RGB = numpy.asarray([
+    # L        M        S
+    [4.97068857, -4.14354132, 0.17285275],  # R
+    [-0.90913894, 2.15671326, -0.24757432],  # G
+    [-0.03976551, -0.14253782, 1.18230333]])  # B
+
+_warnedUncalibrated = set()
+
+
+def _warnUncalibrated(space):
+    """Warn (once per session) that the default matrix is used for space"""
+    if space not in _warnedUncalibrated:
+        _warnedUncalibrated.add(space)
+        logging.warning('This monitor has not been color-calibrated. '
+                        'Using default %s conversion matrix.' % space)
+
 
 def dkl2rgb(dkl, conversionMatrix=None):
     """Convert from DKL color space (Derrington, Krauskopf & Lennie) to RGB.
@@ -28,14 +52,8 @@ def dkl2rgb(dkl, conversionMatrix=None):
 
     """
     if conversionMatrix is None:
-        conversionMatrix = numpy.asarray([
-            # (note that dkl has to be in cartesian coords first!)
-            # LUMIN    %L-M    %L+M-S
-            [1.0000, 1.0000, -0.1462],  # R
-            [1.0000, -0.3900, 0.2094],  # G
-            [1.0000, 0.0180, -1.0000]])  # B
-        logging.warning('This monitor has not been color-calibrated. '
-                        'Using default DKL conversion matrix.')
+        conversionMatrix = defaultDKL_RGB
+        _warnUncalibrated('DKL')
 
     if len(dkl.shape) == 3:
         dkl_NxNx3 = dkl
@@ -77,12 +95,7 @@ def dklCart2rgb(LUM, LM, S, conversionMatrix=None):
         [LUM.reshape([-1]), LM.reshape([-1]), S.reshape([-1])])
 
     if conversionMatrix is None:
-        conversionMatrix = numpy.asarray([
-            # (note that dkl has to be in cartesian coords first!)
-            # LUMIN    %L-M    %L+M-S
-            [1.0000, 1.0000, -0.1462],  # R
-            [1.0000, -0.3900, 0.2094],  # G
-            [1.0000, 0.0180, -1.0000]])  # B
+        conversionMatrix = defaultDKL_RGB
     rgb = numpy.dot(conversionMatrix, dkl_cartesian)
     return numpy.reshape(numpy.transpose(rgb), NxNx3)
 
@@ -157,14 +170,8 @@ def lms2rgb(lms_Nx3, conversionMatrix=None):
     lms_3xN = numpy.transpose(lms_Nx3)
 
     if conversionMatrix is None:
-        cones_to_rgb = numpy.asarray([
-            # L        M        S
-            [4.97068857, -4.14354132, 0.17285275],  # R
-            [-0.90913894, 2.15671326, -0.24757432],  # G
-            [-0.03976551, -0.14253782, 1.18230333]])  # B
-
-        logging.warning('This monitor has not been color-calibrated. '
-                        'Using default LMS conversion matrix.')
+        cones_to_rgb = defaultLMS_RGB
+        _warnUncalibrated('LMS')
     else:
         cones_to_rgb = conversionMatrix
 
@@ -187,8 +194,7 @@ def rgb2dklCart(picture, conversionMatrix=None):
             [0.25145542, 0.64933633, 0.09920825],
             [0.78737943, -0.55586618, -0.23151325],
             [0.26562825, 0.63933074, -0.90495899]])
-        logging.warning('This monitor has not been color-calibrated. '
-                        'Using default DKL conversion matrix.')
+        _warnUncalibrated('DKL')
     else:
         conversionMatrix = numpy.linalg.inv(conversionMatrix)
 
@@ -227,17 +233,184 @@ def rgb2lms(rgb_Nx3, conversionMatrix=None):
     rgb_3xN = numpy.transpose(rgb_Nx3)
 
     if conversionMatrix is None:
-        cones_to_rgb = numpy.asarray([
-            # L        M        S
-            [4.97068857, -4.14354132, 0.17285275],  # R
-            [-0.90913894, 2.15671326, -0.24757432],  # G
-            [-0.03976551, -0.14253782, 1.18230333]])  # B
-
-        logging.warning('This monitor has not been color-calibrated. '
-                        'Using default LMS conversion matrix.')
+        cones_to_rgb = defaultLMS_RGB
+        _warnUncalibrated('LMS')
     else:
         cones_to_rgb = conversionMatrix
     rgb_to_cones = numpy.linalg.inv(cones_to_rgb)
 
     lms = numpy.dot(rgb_to_cones, rgb_3xN)
     return numpy.transpose(lms)  # return in the shape we received it
+
+
+class ColorConverter(object):
+    """Converts colors (arrays of N x 3, or images of H x W x 3) between the
+    color spaces of a calibrated monitor, with the conversion matrices
+    (and gamma lookup tables) prepared once.
+
+    Conversions are done in float32 (by default) and can write into an
+    existing array (`out`, which may be the input to convert in place)
+    rather than allocating a new one each time, for large images or
+    ElementArrayStim colors that change often.
+
+    :Parameters:
+        monitor : :class:`~psychopy.monitors.Monitor` or None
+            the monitor providing the conversion matrices and gamma
+            calibration (the generic matrices are used if it has none)
+        dkl_rgb, lms_rgb : 3x3 arrays or None
+            conversion matrices to use instead of those of the monitor
+        dtype :
+            the float type of the conversions
+
+    usage::
+
+        converter = ColorConverter(win.monitor)
+        rgb = converter.dkl2rgb(dklImage)  # H x W x 3 float32
+        converter.dkl2rgb(dklImage, out=rgb)  # reuse the output array
+        dacs = converter.rgb2dac(rgb, bits=16)  # gamma-corrected uint16
+    """
+
+    def __init__(self, monitor=None, dkl_rgb=None, lms_rgb=None,
+                 dtype=numpy.float32):
+        super(ColorConverter, self).__init__()
+        self.monitor = monitor
+        self.dtype = numpy.dtype(dtype)
+        if dkl_rgb is None and monitor is not None:
+            dkl_rgb = monitor.getDKL_RGB()
+        if lms_rgb is None and monitor is not None:
+            lms_rgb = monitor.getLMS_RGB()
+        self.calibrated = {}
+        self.dkl_rgb = self._matrix('DKL', dkl_rgb, defaultDKL_RGB)
+        self.lms_rgb = self._matrix('LMS', lms_rgb, defaultLMS_RGB)
+        # transposed, to multiply rows of colors (N x 3)
+        self._dkl2rgbT = numpy.ascontiguousarray(self.dkl_rgb.T)
+        self._rgb2dklT = numpy.ascontiguousarray(
+            numpy.linalg.inv(self.dkl_rgb).T.astype(self.dtype))
+        self._lms2rgbT = numpy.ascontiguousarray(self.lms_rgb.T)
+        self._rgb2lmsT = numpy.ascontiguousarray(
+            numpy.linalg.inv(self.lms_rgb).T.astype(self.dtype))
+        self._dacLUTs = {}
+
+    def _matrix(self, space, matrix, default):
+        # a missing (or all ones, as saved by MonitorCenter) matrix means
+        # the monitor has not been calibrated
+        if matrix is None or numpy.all(numpy.asarray(matrix) == 1):
+            self.calibrated[space] = False
+            matrix = default
+        else:
+            self.calibrated[space] = True
+        return numpy.asarray(matrix, dtype=self.dtype)
+
+    def _multiply(self, colors, matrixT, out):
+        """colors (..., 3) times the matrix, into out"""
+        colors = numpy.asarray(colors, dtype=self.dtype)
+        if out is None:
+            out = numpy.empty(colors.shape, self.dtype)
+        flat = colors.reshape([-1, 3])
+        outFlat = out.reshape([-1, 3])  # a view, as out is contiguous
+        if numpy.may_share_memory(flat, outFlat):
+            outFlat[...] = numpy.dot(flat, matrixT)
+        else:
+            numpy.dot(flat, matrixT, out=outFlat)
+        return out
+
+    def _checkOut(self, colors, out):
+        if out is not None and (out.dtype != self.dtype or
+                                not out.flags.c_contiguous or
+                                out.size != numpy.size(colors)):
+            raise ValueError('out must be a contiguous %s array of the shape '
+                             'of the colors' % self.dtype)
+
+    def dklCart2rgb(self, dklCart, out=None):
+        """Convert cartesian DKL colors (LUM, L-M, S) in the last axis to
+        RGB.
+        """
+        if not self.calibrated['DKL']:
+            _warnUncalibrated('DKL')
+        self._checkOut(dklCart, out)
+        return self._multiply(dklCart, self._dkl2rgbT, out)
+
+    def dkl2rgb(self, dkl, out=None):
+        """Convert DKL colors (elevation, azimuth, radius), in the last
+        axis, to RGB.
+        """
+        dkl = numpy.asarray(dkl, dtype=self.dtype)
+        self._checkOut(dkl, out)
+        flat = dkl.reshape([-1, 3])
+        angles = numpy.radians(flat[:, :2])
+        radius = flat[:, 2]
+        radiusCosElev = numpy.cos(angles[:, 0])
+        radiusCosElev *= radius
+        cart = numpy.empty_like(flat)
+        numpy.sin(angles[:, 0], out=cart[:, 0])
+        cart[:, 0] *= radius  # LUM
+        numpy.cos(angles[:, 1], out=cart[:, 1])
+        cart[:, 1] *= radiusCosElev  # L-M
+        numpy.sin(angles[:, 1], out=cart[:, 2])
+        cart[:, 2] *= radiusCosElev  # S
+        if out is None:
+            out = numpy.empty(dkl.shape, self.dtype)
+        return self.dklCart2rgb(cart, out=out)
+
+    def rgb2dklCart(self, rgb, out=None):
+        """Convert RGB colors to cartesian DKL (LUM, L-M, S).
+        """
+        if not self.calibrated['DKL']:
+            _warnUncalibrated('DKL')
+        self._checkOut(rgb, out)
+        return self._multiply(rgb, self._rgb2dklT, out)
+
+    def lms2rgb(self, lms, out=None):
+        """Convert cone space colors (L, M, S) to RGB.
+        """
+        if not self.calibrated['LMS']:
+            _warnUncalibrated('LMS')
+        self._checkOut(lms, out)
+        return self._multiply(lms, self._lms2rgbT, out)
+
+    def rgb2lms(self, rgb, out=None):
+        """Convert RGB colors to cone space (L, M, S).
+        """
+        if not self.calibrated['LMS']:
+            _warnUncalibrated('LMS')
+        self._checkOut(rgb, out)
+        return self._multiply(rgb, self._rgb2lmsT, out)
+
+    def getDacLUT(self, bits=8, size=4096):
+        """Returns the (cached) lookup table (size x 3) from evenly spaced
+        RGB values (-1 to 1) to gamma-corrected DAC values of `bits` bits,
+        using the gamma calibration of the monitor (identity if there is
+        none).
+        """
+        key = (bits, size)
+        if key not in self._dacLUTs:
+            ramp = numpy.linspace(0.0, 1.0, size)
+            lums = numpy.column_stack([ramp, ramp, ramp])
+            monitor = self.monitor
+            if (monitor is not None and
+                    monitor.getLinearizeMethod() in [1, 2, 3, 4] and
+                    (monitor.getLinearizeMethod() == 3 or
+                     monitor.getGammaGrid() is not None)):
+                lums = numpy.clip(monitor.lineariseLums(lums), 0, 1)
+            maxDac = 2**bits - 1
+            dtype = numpy.uint8 if bits <= 8 else numpy.uint16
+            self._dacLUTs[key] = numpy.round(lums * maxDac).astype(dtype)
+        return self._dacLUTs[key]
+
+    def rgb2dac(self, rgb, bits=8, out=None, size=4096):
+        """Convert RGB colors (-1 to 1) straight to gamma-corrected DAC
+        values, uint8 (bits=8) or uint16 (e.g. bits=14 or 16, for the LUT
+        mode of a BitsPlusPlus), through a lookup table of `size` entries.
+        """
+        lut = self.getDacLUT(bits, size)
+        rgb = numpy.asarray(rgb, dtype=self.dtype)
+        index = rgb + 1  # a new array for the indices
+        index *= (size - 1) / 2.0
+        index += 0.5
+        numpy.clip(index, 0, size - 1, out=index)
+        index = index.astype(numpy.intp).reshape([-1, 3])
+        result = lut[index, numpy.arange(3)]
+        if out is None:
+            return result.reshape(rgb.shape)
+        out.reshape([-1, 3])[...] = result
+        return out
@@ -0,0 +1,218 @@
+#!/usr/bin/env python2
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+"""Measure how long it takes to import modules, to find out what makes
+starting a script slow.
+
+From the command line::
+
+    python -m psychopy.tools.importprofile psychopy.visual [nRows]
+
+imports the module in a new python process and prints the modules it
+loaded, ranked by their cumulative import time (including the modules they
+imported in turn), with their own time.
+
+This file only uses the standard library (and is loaded by its path in the
+new process) so that profiling `psychopy` itself is not biased by having
+imported it already.
+"""
+
+import sys
+import os
+import time
+import json
+import subprocess
+import __builtin__
+
+# run in the new process to profile an import (this file is loaded by path)
+_bootstrap = """
+import imp, json, sys
+profiler = imp.load_source('_importprofile', %r)
+results = profiler._profileHere(%r)
+sys.stdout.write('\\n__importprofile__' + json.dumps(results))
+"""
+
+
+class ImportProfiler(object):
+    """Records the time spent importing each module while started.
+
+    Usage::
+
+        profiler = ImportProfiler()
+        profiler.start()
+        import somemodule
+        profiler.stop()
+        print profiler.report()
+    """
+
+    def __init__(self):
+        super(ImportProfiler, self).__init__()
+        self.cumulative = {}  # module name: seconds, including its imports
+        self.own = {}  # module name: seconds, excluding recorded imports
+        self.order = []  # module names in the order they were loaded
+        self._children = [0.0]  # time in recorded imports, for each level
+        self._origImport = None
+
+    def start(self):
+        """Start recording imports (replaces __builtin__.__import__)"""
+        if self._origImport is None:
+            self._origImport = __builtin__.__import__
+            __builtin__.__import__ = self._import
+
+    def stop(self):
+        """Stop recording imports"""
+        if self._origImport is not None:
+            __builtin__.__import__ = self._origImport
+            self._origImport = None
+
+    def _candidates(self, name, globals, level):
+        """The full names the module being imported could have"""
+        package = None
+        if globals:
+            package = globals.get('__package__')
+            if not package and '__name__' in globals:
+                package = globals['__name__']
+                if '__path__' not in globals:
+                    package = package.rpartition('.')[0]
+        if level > 0:
+            if not package:
+                return [name]
+            base = package.rsplit('.', level - 1)[0]
+            return [base + '.' + name if name else base]
+        elif level < 0 and package:
+            return [package + '.' + name, name]  # implicit relative import
+        return [name]
+
+    def _submodules(self, name, globals, level, fromlist):
+        """The full names of the modules in fromlist not yet loaded"""
+        for base in self._candidates(name, globals, level):
+            package = sys.modules.get(base)
+            if package is not None:
+                break
+        else:
+            return []
+        if not hasattr(package, '__path__'):
+            return []  # fromlist can only hold attributes
+        return [base + '.' + item for item in fromlist
+                if item != '*' and not hasattr(package, item) and
+                sys.modules.get(base + '.' + item) is None]
+
+    def _import(self, name, globals=None, locals=None, fromlist=None,
+                level=-1):
+        if fromlist:
+            # load the package and then each submodule in fromlist on its
+            # own, so that `from package import module` is recorded too
+            self._timedImport(name, globals, locals, None, level)
+            for fullName in self._submodules(name, globals, level, fromlist):
+                try:
+                    self._timedImport(fullName, None, None, None, 0)
+                except ImportError:
+                    pass  # an attribute, left to the real import below
+        return self._timedImport(name, globals, locals, fromlist, level)
+
+    def _timedImport(self, name, globals, locals, fromlist, level):
+        # (failed implicit relative imports leave None in sys.modules)
+        candidates = [candidate for candidate in
+                      self._candidates(name, globals, level)
+                      if sys.modules.get(candidate) is None]
+        self._children.append(0.0)
+        t0 = time.time()
+        try:
+            return self._origImport(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - t0
+            children = self._children.pop()
+            for candidate in candidates:
+                if (sys.modules.get(candidate) is not None and
+                        candidate not in self.cumulative):
+                    self.cumulative[candidate] = elapsed
+                    self.own[candidate] = elapsed - children
+                    self.order.append(candidate)
+                    self._children[-1] += elapsed
+                    break
+            else:
+                # nothing new loaded, so not a recorded import
+                self._children[-1] += children
+
+    def getResults(self):
+        """Returns a list of (moduleName, cumulative, own) times in seconds,
+        slowest first"""
+        results = [(name, self.cumulative[name], self.own[name])
+                   for name in self.order]
+        return sorted(results, key=lambda result: -result[1])
+
+    def report(self, nRows=30):
+        """Returns a table (str) of the slowest nRows imports"""
+        lines = ['%10s %10s  %s' % ('cumul (ms)', 'own (ms)', 'module')]
+        for name, cumulative, own in self.getResults()[:nRows]:
+            lines.append('%10.1f %10.1f  %s' % (cumulative * 1000,
+                                                own * 1000, name))
+        return '\n'.join(lines)
+
+
+def _profileHere(moduleName):
+    """Profile the import of moduleName in this process, returns a dict of
+    the total time and the results"""
+    profiler = ImportProfiler()
+    t0 = time.time()
+    profiler.start()
+    try:
+        __import__(moduleName)
+    finally:
+        profiler.stop()
+    return {'total': time.time() - t0, 'results': profiler.getResults()}
+
+
+def _profileInNewProcess(moduleName):
+    thisFile = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+    cmd = [sys.executable, '-c', _bootstrap % (thisFile, moduleName)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE)
+    stdout, stderr = proc.communicate()
+    if proc.returncode or '__importprofile__' not in stdout:
+        msg = "Importing %s failed:\n%s" % (moduleName, stderr)
+        raise ImportError(msg)
+    return json.loads(stdout.rpartition('__importprofile__')[2])
+
+
+def profileImport(moduleName):
+    """Import moduleName in a new python process and return a list of
+    (moduleName, cumulative, own) import times in seconds of every module
+    it loaded, slowest first.
+    """
+    results = _profileInNewProcess(moduleName)['results']
+    return [tuple(result) for result in results]
+
+
+def timeImport(moduleName, repeats=3):
+    """Returns the time (the best of repeats, in seconds) taken to import
+    moduleName in a new python process, e.g. to check for regressions in
+    the startup time.
+    """
+    return min(_profileInNewProcess(moduleName)['total']
+               for repeat in range(repeats))
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        print __doc__
+        return
+    moduleName = argv[0]
+    nRows = int(argv[1]) if len(argv) > 1 else 30
+    profile = _profileInNewProcess(moduleName)
+    profiler = ImportProfiler()
+    for name, cumulative, own in profile['results']:
+        profiler.cumulative[name] = cumulative
+        profiler.own[name] = own
+        profiler.order.append(name)
+    print 'import %s took %.1f ms' % (moduleName, profile['total'] * 1000)
+    print profiler.report(nRows)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,7 +17,7 @@ from psychopy.constants import (NOT_STARTED, STARTED, PLAYING, PAUSED,
 from .window import Window, getMsPerFrame, openWindows
 
 # non-private helpers
-from .helpers import pointInPolygon, polygonsOverlap
+from .helpers import pointInPolygon, pointsInPolygon, polygonsOverlap
 
 # absolute essentials (nearly all experiments will need these)
 from .basevisual import BaseVisualStim
@@ -26,15 +26,22 @@ from .text import TextStim
 
 from psychopy.visual import gamma  # done in window anyway
 from psychopy.visual import filters
+from psychopy.visual.preload import ImagePreloader, imagePreloader
 
 # need absolute imports within lazyImports
 
 lazyImports = """
+# tools
+from psychopy.visual.spatialindex import SpatialIndex
+from psychopy.visual.frozen import FrozenGroup
+from psychopy.visual.schedule import FrameSchedule
+
 # stimuli derived from object or MinimalStim
 from psychopy.visual.aperture import Aperture  # uses BaseShapeStim, ImageStim
 from psychopy.visual.custommouse import CustomMouse
 from psychopy.visual.elementarray import ElementArrayStim
 from psychopy.visual.ratingscale import RatingScale
+from psychopy.visual.shapebatch import ShapeBatch
 from psychopy.visual.simpleimage import SimpleImageStim
 
 # stimuli derived from BaseVisualStim
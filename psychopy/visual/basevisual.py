@@ -34,10 +34,13 @@ from psychopy.tools.attributetools import (attributeSetter, logAttrib,
 from psychopy.tools.colorspacetools import dkl2rgb, lms2rgb
 from psychopy.tools.monitorunittools import (cm2pix, deg2pix, pix2cm,
                                              pix2deg, convertToPix)
-from psychopy.visual.helpers import pointInPolygon, polygonsOverlap, setColor
+from psychopy.visual.helpers import (pointInPolygon, pointsInPolygon,
+                                     polygonsOverlap, setColor)
 from psychopy.tools.typetools import float_uint8
 from psychopy.tools.arraytools import makeRadialMatrix
 from . import globalVars
+from . import texturecache
+from .preload import imagePreloader
 
 import numpy
 from numpy import pi
@@ -520,6 +523,10 @@ class ContainerMixin(object):
             + one arg (list, tuple or array) containing two vals (x,y)
             + an object with a getPos() method that returns x,y, such
                 as a :class:`~psychopy.event.Mouse`.
+            + an array (N, 2) of points, in which case a boolean array
+                with a value per point is returned (see also
+                :class:`~psychopy.visual.SpatialIndex` for testing points
+                against many stimuli)
 
         Returns `True` if the point is within the area defined either by its
         `border` attribute (if one defined), or its `vertices` attribute if
@@ -562,6 +569,8 @@ class ContainerMixin(object):
         else:
             poly = self.verticesPix  # e.g., tesselated vertices
 
+        if numpy.ndim(xy) == 2:  # many points at once
+            return pointsInPolygon(xy, poly=poly)
         return pointInPolygon(xy[0], xy[1], poly=poly)
 
     def overlaps(self, polygon):
@@ -614,6 +623,10 @@ class TextureMixin(object):
         For grating stimuli (anything that needs multiple cycles)
         forcePOW2 should be set to be True. Otherwise the wrapping
         of the texture will not work.
+
+        Procedural textures (e.g. 'sin', 'gauss') are taken from the
+        caches in visual.texturecache where possible, and their GL texture
+        is shared by all stimuli with the same texture content.
         """
 
         # Create an intensity texture, ranging -1:1.0
@@ -635,9 +648,34 @@ class TextureMixin(object):
         allMaskParams = {'fringeWidth': 0.2, 'sd': 3}
         allMaskParams.update(maskParams)
 
+        # procedural textures are cached; if another stimulus already has
+        # the same texture on the graphics card we can simply share it
+        # (except for the no-shader RGB case, where the texture depends on
+        # the stimulus color)
+        texAttr = None
+        for attr in ('_texID', '_maskID'):
+            if getattr(stim, attr, None) is id:
+                texAttr = attr
+        cacheKey = texturecache.proceduralKey(tex, res, allMaskParams,
+                                              dataType)
+        glKey = None
+        if texAttr is not None:
+            if cacheKey is not None and (useShaders or
+                                         pixFormat != GL.GL_RGB):
+                glKey = (cacheKey, pixFormat, useShaders, interpolate)
+                if texturecache.useSharedTexture(stim, texAttr, glKey):
+                    return True  # procedural textures are all luminance
+            id = texturecache.privateTexture(stim, texAttr)
+
+        intensity = None
+        if cacheKey is not None:
+            intensity = texturecache.intensityCache.get(cacheKey)
+
         cos = numpy.cos
         sin = numpy.sin
-        if type(tex) == numpy.ndarray:
+        if intensity is not None:
+            wasLum = True
+        elif type(tex) == numpy.ndarray:
             # handle a numpy array
             # for now this needs to be an NxN intensity array
             intensity = tex.astype(numpy.float32)
@@ -779,6 +817,7 @@ class TextureMixin(object):
             intensity[artifactIdx] = 0
 
         else:
+            preloaded = None
             if type(tex) in [str, unicode, numpy.string_]:
                 # maybe tex is the name of a file:
                 if not os.path.isfile(tex):
@@ -787,15 +826,21 @@ class TextureMixin(object):
                     logging.flush()
                     msg = "Couldn't find image '%s'; check path? (tried: %s)"
                     raise OSError, msg % (tex, os.path.abspath(tex))
-                try:
-                    im = Image.open(tex)
-                    im = im.transpose(Image.FLIP_TOP_BOTTOM)
-                except IOError:
-                    msg = "Found file '%s', failed to load as an image"
-                    logging.error(msg % (tex))
-                    logging.flush()
-                    msg = "Found file '%s' [= %s], failed to load as an image"
-                    raise IOError, msg % (tex, os.path.abspath(tex))
+                # use the decoded image data if the file was preloaded
+                preloaded = imagePreloader.get(tex)
+                if preloaded is not None:
+                    im = preloaded  # has .size and .mode like an Image
+                else:
+                    try:
+                        im = Image.open(tex)
+                        im = im.transpose(Image.FLIP_TOP_BOTTOM)
+                    except IOError:
+                        msg = "Found file '%s', failed to load as an image"
+                        logging.error(msg % (tex))
+                        logging.flush()
+                        msg = ("Found file '%s' [= %s], failed to load as "
+                               "an image")
+                        raise IOError, msg % (tex, os.path.abspath(tex))
             else:
                 # can't be a file; maybe its an image already in memory?
                 try:
@@ -815,6 +860,10 @@ class TextureMixin(object):
                 maxDim = max(im.size)
                 powerOf2 = int(2**numpy.ceil(numpy.log2(maxDim)))
                 if im.size[0] != powerOf2 or im.size[1] != powerOf2:
+                    if forcePOW2 and preloaded is not None:
+                        # needs resizing, so preloaded data can't be used
+                        im = preloaded.toImage()
+                        preloaded = None
                     if not forcePOW2:
                         notSqr = True
                     elif globalVars.nImageResizes < reportNImageResizes:
@@ -831,6 +880,9 @@ class TextureMixin(object):
             if pixFormat == GL.GL_ALPHA and im.mode != 'L':
                 # we have RGB and need Lum
                 wasLum = True
+                if preloaded is not None:
+                    im = preloaded.toImage()
+                    preloaded = None
                 im = im.convert("L")  # force to intensity (need if was rgb)
             elif im.mode == 'L':  # we have lum and no need to change
                 wasLum = True
@@ -839,15 +891,27 @@ class TextureMixin(object):
             elif pixFormat == GL.GL_RGB:
                 # we want RGB and might need to convert from CMYK or Lm
                 # texture = im.tostring("raw", "RGB", 0, -1)
-                im = im.convert("RGBA")
+                if preloaded is None:  # preloaded images are already RGBA
+                    im = im.convert("RGBA")
                 wasLum = False
-            if dataType == GL.GL_FLOAT:
+            if preloaded is not None:
+                # already decoded and converted by the preloader
+                if dataType == GL.GL_FLOAT:
+                    intensity = preloaded.getFloatArray()
+                else:
+                    intensity = preloaded.array
+            elif dataType == GL.GL_FLOAT:
                 # convert from ubyte to float
                 # much faster to avoid division 2/255
                 intensity = numpy.array(im).astype(
                     numpy.float32) * 0.0078431372549019607 - 1.0
             else:
                 intensity = numpy.array(im)
+        if cacheKey is not None and cacheKey not in texturecache.intensityCache:
+            intensity = numpy.asarray(intensity)
+            intensity.flags.writeable = False  # shared, so read only
+            texturecache.intensityCache.put(cacheKey, intensity,
+                                            intensity.nbytes)
         if pixFormat == GL.GL_RGB and wasLum and dataType == GL.GL_FLOAT:
             # grating stim on good machine
             # keep as float32 -1:1
@@ -967,6 +1031,8 @@ class TextureMixin(object):
                      GL.GL_MODULATE)  # ?? do we need this - think not!
         # unbind our texture so that it doesn't affect other rendering
         GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        if glKey is not None:
+            texturecache.shareTexture(stim, texAttr, glKey, data.nbytes)
         return wasLum
 
     def clearTextures(self):
@@ -975,8 +1041,8 @@ class TextureMixin(object):
         As of v1.61.00 this is called automatically during garbage collection
         of your stimulus, so doesn't need calling explicitly by the user.
         """
-        GL.glDeleteTextures(1, self._texID)
-        GL.glDeleteTextures(1, self._maskID)
+        texturecache.releaseTexture(self, '_texID')
+        texturecache.releaseTexture(self, '_maskID')
 
     @attributeSetter
     def mask(self, value):
@@ -69,6 +69,17 @@ class BufferImageStim(ImageStim):
             other_stuff.draw() # dynamic
             myWin.flip()
 
+    With gpuCapture=True the region is copied straight into the texture on
+    the graphics card instead of being read back and uploaded again, which is
+    much faster to init. The stimulus can then be updated every frame::
+
+        composite = visual.BufferImageStim(myWin, stim=stimList,
+                                           gpuCapture=True)
+        while <conditions>:
+            composite.recapture(stim=stimList)  # e.g. after changing them
+            composite.draw()
+            myWin.flip()
+
     See coder Demos > stimuli > bufferImageStim.py for a demo, with timing stats.
 
     :Author:
@@ -78,7 +89,7 @@ class BufferImageStim(ImageStim):
     def __init__(self, win, buffer='back', rect=(-1, 1, 1, -1),
                  sqPower2=False, stim=(), interpolate=True,
                  flipHoriz=False, flipVert=False, mask='None', pos=(0, 0),
-                 name=None, autoLog=None):
+                 gpuCapture=False, name=None, autoLog=None):
         """
         :Parameters:
 
@@ -106,8 +117,14 @@ class BufferImageStim(ImageStim):
                 horizontally flip (mirror) the captured image, default = False
             flipVert :
                 vertically flip (mirror) the captured image; default = False
+            gpuCapture :
+                - False (default) = read the region back from the graphics
+                  card with glReadPixels, and upload it again as a texture
+                - True = copy the region into the texture on the graphics
+                  card (much faster). Use getCapturedImage() to read it back,
+                  e.g. to save it.
         """
-        # depends on: window._getRegionOfFrame
+        # depends on: window._getRegionOfFrame, window._copyRegionToTexture
 
         # what local vars are defined (these are the init params) for use by
         # __repr__
@@ -117,47 +134,50 @@ class BufferImageStim(ImageStim):
         self.autoLog = False  # set this False first and change later
         _clock = core.Clock()
         if stim:  # draw all stim to the back buffer
-            win.clearBuffer()
+            self._drawStim(win, stim)
             buffer = 'back'
-            if hasattr(stim, '__iter__'):
-                for stimulus in stim:
-                    try:
-                        if stimulus.win == win:
-                            stimulus.draw()
-                        else:
-                            msg = ('BufferImageStim.__init__: user '
-                                   'requested "%s" drawn in another window')
-                            logging.warning(msg % repr(stimulus))
-                    except AttributeError:
-                        msg = 'BufferImageStim.__init__: "%s" failed to draw'
-                        logging.warning(msg % repr(stimulus))
-            else:
-                raise ValueError('Stim is not iterable in BufferImageStim. '
-                                 'It should be a list of stimuli.')
-
-        # take a screenshot of the buffer using win._getRegionOfFrame():
+
         glversion = pyglet.gl.gl_info.get_version()
-        if glversion >= '2.1' and not sqPower2:
-            region = win._getRegionOfFrame(buffer=buffer, rect=rect)
+        squarePower2 = sqPower2 or glversion < '2.1'
+        if squarePower2 and not sqPower2:
+            msg = ('BufferImageStim.__init__: defaulting to square '
+                   'power-of-2 sized image (%s)')
+            logging.debug(msg % glversion)
+        self.gpuCapture = gpuCapture
+        self._captureRect = rect
+        self._captureBuffer = buffer
+        self._squarePower2 = squarePower2
+
+        if gpuCapture:
+            # the texture is created (at this size) after the ImageStim
+            horz, vert = win._getRegionBox(rect)[2:]
+            if squarePower2:
+                horz = vert = int(2**numpy.ceil(numpy.log2(max(horz, vert))))
+            texSize = numpy.array([horz, vert])
+            image = Image.new('RGBA', (2, 2))
         else:
-            if not sqPower2:
-                msg = ('BufferImageStim.__init__: defaulting to square '
-                       'power-of-2 sized image (%s)')
-                logging.debug(msg % glversion)
+            # take a screenshot of the buffer using win._getRegionOfFrame():
             region = win._getRegionOfFrame(buffer=buffer, rect=rect,
-                                           squarePower2=True)
-        if stim:
-            win.clearBuffer()
+                                           squarePower2=squarePower2)
+            texSize = numpy.array(region.size)
+            image = region
+        self._texSize = texSize
 
         # turn the RGBA region into an ImageStim() object:
         if win.units in ['norm']:
             pos *= win.size / 2.
 
-        size = region.size / win.size / 2.
+        size = texSize / win.size / 2.
         super(BufferImageStim, self).__init__(
-            win, image=region, units='pix', mask=mask, pos=pos,
+            win, image=image, units='pix', mask=mask, pos=pos,
             size=size, interpolate=interpolate, name=name, autoLog=False)
-        self.size = region.size
+        self.size = texSize
+        if gpuCapture:
+            win._copyRegionToTexture(self._texID, texSize, rect=rect,
+                                     buffer=buffer, allocate=True,
+                                     interpolate=interpolate)
+        if stim:
+            win.clearBuffer()
 
         # to improve drawing speed, move these out of draw:
         self.desiredRGB = self._getDesiredRGB(
@@ -174,6 +194,72 @@ class BufferImageStim(ImageStim):
             msg = 'BufferImageStim %s: took %.1fms to initialize'
             logging.exp(msg % (name, 1000 * _clock.getTime()))
 
+    def _drawStim(self, win, stim):
+        """Clear the back buffer and draw the stim (a list) to it"""
+        if not hasattr(stim, '__iter__'):
+            raise ValueError('Stim is not iterable in BufferImageStim. '
+                             'It should be a list of stimuli.')
+        win.clearBuffer()
+        for stimulus in stim:
+            try:
+                if stimulus.win == win:
+                    stimulus.draw()
+                else:
+                    msg = ('BufferImageStim.__init__: user '
+                           'requested "%s" drawn in another window')
+                    logging.warning(msg % repr(stimulus))
+            except AttributeError:
+                msg = 'BufferImageStim.__init__: "%s" failed to draw'
+                logging.warning(msg % repr(stimulus))
+
+    def recapture(self, stim=(), buffer=None):
+        """Capture the same region again, into the same texture.
+
+        With stim (a list), the back buffer is cleared, the stim are drawn
+        and captured, and the buffer is cleared again (as when the
+        BufferImageStim is created). Otherwise the buffer is captured as it
+        is, by default the buffer it was created from.
+
+        With gpuCapture=True this is fast enough to do on every frame.
+        """
+        win = self.win
+        if buffer is None:
+            buffer = self._captureBuffer
+        if stim:
+            self._drawStim(win, stim)
+            buffer = 'back'
+        if self.gpuCapture:
+            win._copyRegionToTexture(self._texID, self._texSize,
+                                     rect=self._captureRect, buffer=buffer)
+        else:
+            region = win._getRegionOfFrame(buffer=buffer,
+                                           rect=self._captureRect,
+                                           squarePower2=self._squarePower2)
+            self.setImage(region, log=False)
+        if stim:
+            win.clearBuffer()
+
+    def getCapturedImage(self):
+        """Returns the captured region as an RGBA PIL Image, e.g. to save
+        it. With gpuCapture=True it is read back from the graphics card.
+        """
+        if not self.gpuCapture:
+            return self.image
+        horz, vert = self._texSize
+        bufferDat = (GL.GLubyte * (4 * horz * vert))()
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        GL.glGetTexImage(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA,
+                         GL.GL_UNSIGNED_BYTE, bufferDat)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        try:
+            im = Image.fromstring(mode='RGBA', size=(horz, vert),
+                                  data=bufferDat)
+        except Exception:
+            im = Image.frombytes(mode='RGBA', size=(horz, vert),
+                                 data=bufferDat)
+        return im.transpose(Image.FLIP_TOP_BOTTOM)
+
     @attributeSetter
     def flipHoriz(self, flipHoriz):
         """If set to True then the image will be flipped horizontally
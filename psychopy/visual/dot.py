@@ -24,9 +24,10 @@ from psychopy import logging
 # (JWP has no idea why!)
 from psychopy.tools.attributetools import attributeSetter, setAttribute
 from psychopy.tools.arraytools import val2array
-from psychopy.tools.monitorunittools import cm2pix, deg2pix
+from psychopy.tools.monitorunittools import cm2pix, deg2pix, convertToPix
 from psychopy.visual.basevisual import (BaseVisualStim, ColorMixin,
                                         ContainerMixin)
+from psychopy.visual.grating import GratingStim
 
 import numpy
 from numpy import pi
@@ -54,6 +55,11 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
 
     If further customisation is required, then the DotStim should be
     subclassed and its _update_dotsXY and _newDotsXY methods overridden.
+
+    The dots are updated in place in preallocated arrays, so fields of
+    many thousands of dots can be updated on every frame. If the `element`
+    is a :class:`~psychopy.visual.GratingStim` all the elements are drawn
+    with a single call to OpenGL.
     """
 
     def __init__(self,
@@ -95,6 +101,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
                                       autoLog=False)  # set at end of init
 
         self.nDots = nDots
+        self._allocateDotArrays()
         # pos and size are ambiguous for dots so DotStim explicitly has
         # fieldPos = pos, fieldSize=size and then dotSize as additional param
         self.fieldPos = fieldPos  # self.pos is also set here
@@ -105,6 +112,8 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             self.dotSize = dotSize
         self.fieldShape = fieldShape
         self.__dict__['dir'] = dir
+        self._dotsVelocity = numpy.zeros([self.nDots, 2])
+        self._velocitySpeed = None  # the speed _dotsVelocity was set for
         self.speed = speed
         self.element = element
         self.dotLife = dotLife
@@ -139,6 +148,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         # set directions (only used when self.noiseDots='direction')
         self._dotsDir = numpy.random.rand(self.nDots) * 2 * pi
         self._dotsDir[self._signalDots] = self.dir * pi / 180
+        self._velocitySpeed = None
 
         self._update_dotsXY()
 
@@ -210,6 +220,8 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         DotStim assumes that the element uses pixels as units.
         ``None`` defaults to dots.
 
+        A :class:`~psychopy.visual.GratingStim` (with shaders) is drawn at
+        all dot positions at once, other stimuli are drawn once per dot.
         See `ElementArrayStim` for a faster implementation of this idea.
         """
         self.__dict__['element'] = element
@@ -281,6 +293,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         if self.noiseDots in ['direction', 'position']:
             self._dotsDir = numpy.random.rand(self.nDots) * 2 * pi
             self._dotsDir[self._signalDots] = self.dir * pi / 180
+        self._velocitySpeed = None
 
     def setFieldCoherence(self, val, op='', log=None):
         """Usually you can use 'stim.attribute = value' syntax instead,
@@ -300,6 +313,7 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
         # dots currently moving in the signal direction also need to update
         # their direction
         self._dotsDir[signalDots] = self.dir * pi / 180
+        self._velocitySpeed = None
 
     def setDir(self, val, op='', log=None):
         """Usually you can use 'stim.attribute = value' syntax instead,
@@ -358,6 +372,8 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
             GL.glDrawArrays(GL.GL_POINTS, 0, self.nDots)
             GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        elif self._canBatchElement():
+            self._drawElementsBatched(win)
         else:
             # we don't want to do the screen scaling twice so for each dot
             # subtract the screen centre
@@ -370,6 +386,102 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             self.element.setDepth(initialDepth)
         GL.glPopMatrix()
 
+    def _canBatchElement(self):
+        """True if the element can be drawn at all dot positions at once
+        """
+        element = self.element
+        return (isinstance(element, GratingStim) and element.useShaders and
+                numpy.shape(element.verticesPix) == (4, 2))
+
+    def _drawElementsBatched(self, win):
+        """Draw the (GratingStim) element at every dot position as one
+        array of textured quads
+        """
+        element = self.element
+        nDots = self.nDots
+        if self._elementQuads is None:
+            self._elementQuads = numpy.zeros([nDots, 4, 2], numpy.float32)
+            self._elementTexCoords = numpy.zeros([nDots, 4, 2],
+                                                 numpy.float32)
+            maskCoords = numpy.array([[1, 0], [0, 0], [0, 1], [1, 1]],
+                                     numpy.float32)
+            self._elementMaskCoords = numpy.ascontiguousarray(
+                numpy.tile(maskCoords, [nDots, 1, 1]))
+        if element._needTextureUpdate:
+            element.setTex(value=element.tex, log=False)
+
+        # the corners of the element relative to its position, and the
+        # positions each dot would set for the element, in pixels
+        zeros = numpy.zeros(2)
+        corners = element.verticesPix - convertToPix(
+            vertices=zeros, pos=element.pos, units=element.units, win=win)
+        positions = convertToPix(vertices=zeros,
+                                 pos=self.verticesPix + self.fieldPos,
+                                 units=element.units, win=win)
+        numpy.add(positions.reshape([nDots, 1, 2]),
+                  corners.reshape([1, 4, 2]), out=self._elementQuads)
+        # the element's texture coords (as in GratingStim) for every dot
+        cycles = element._cycles
+        phase = element.phase
+        L = -cycles[0] / 2 - phase[0] + 0.5
+        R = +cycles[0] / 2 - phase[0] + 0.5
+        T = +cycles[1] / 2 - phase[1] + 0.5
+        B = -cycles[1] / 2 - phase[1] + 0.5
+        self._elementTexCoords[:] = [[R, B], [L, B], [L, T], [R, T]]
+
+        win.setScale('pix')
+        GL.glPushClientAttrib(GL.GL_CLIENT_ALL_ATTRIB_BITS)
+        desiredRGB = element._getDesiredRGB(element.rgb, element.colorSpace,
+                                            element.contrast)
+        GL.glColor4f(desiredRGB[0], desiredRGB[1], desiredRGB[2],
+                     element.opacity)
+        # setup the shaderprogram
+        _prog = win._progSignedTexMask
+        GL.glUseProgram(_prog)
+        # set the texture to be texture unit 0
+        GL.glUniform1i(GL.glGetUniformLocation(_prog, "texture"), 0)
+        # mask is texture unit 1
+        GL.glUniform1i(GL.glGetUniformLocation(_prog, "mask"), 1)
+        # bind textures
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, element._maskID)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, element._texID)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+
+        GL.glClientActiveTexture(GL.GL_TEXTURE0)
+        GL.glTexCoordPointer(2, GL.GL_FLOAT, 0,
+                             self._elementTexCoords.ctypes)
+        GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        GL.glClientActiveTexture(GL.GL_TEXTURE1)
+        GL.glTexCoordPointer(2, GL.GL_FLOAT, 0,
+                             self._elementMaskCoords.ctypes)
+        GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        GL.glVertexPointer(2, GL.GL_FLOAT, 0, self._elementQuads.ctypes)
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glDrawArrays(GL.GL_QUADS, 0, nDots * 4)
+
+        # unbind the textures
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glUseProgram(0)
+        GL.glPopClientAttrib()
+
+    def _allocateDotArrays(self):
+        """Create the work arrays used to update the dots in place
+        """
+        nDots = self.nDots
+        self._dead = numpy.zeros(nDots, dtype=bool)
+        self._outside = numpy.zeros(nDots, dtype=bool)
+        self._work = numpy.zeros(nDots)
+        self._work2 = numpy.zeros([nDots, 2])
+        self._elementQuads = None  # allocated when first needed
+
     def _newDotsXY(self, nDots):
         """Returns a uniform spread of dots, according to the
         fieldShape and fieldSize
@@ -379,88 +491,112 @@ class DotStim(BaseVisualStim, ColorMixin, ContainerMixin):
             dots = self._newDots(nDots)
 
         """
-        # make more dots than we need and only use those within the circle
         if self.fieldShape == 'circle':
-            while True:
-                # repeat until we have enough; fetch twice as many as needed
-                new = numpy.random.uniform(-1, 1, [nDots * 2, 2])
-                inCircle = (numpy.hypot(new[:, 0], new[:, 1]) < 1)
-                if sum(inCircle) >= nDots:
-                    return new[inCircle, :][:nDots, :] * 0.5
+            # sample in polar coords; radius ~ sqrt(uniform) is uniform
+            # over the area of the circle
+            radius = numpy.sqrt(numpy.random.rand(nDots)) * 0.5
+            theta = numpy.random.rand(nDots) * 2 * pi
+            new = numpy.empty([nDots, 2])
+            numpy.multiply(radius, numpy.cos(theta), out=new[:, 0])
+            numpy.multiply(radius, numpy.sin(theta), out=new[:, 1])
+            return new
         else:
             return numpy.random.uniform(-0.5, 0.5, [nDots, 2])
 
+    def _updateDotsVelocity(self, dots=None):
+        """Set self._dotsVelocity (the change of xy per frame) from
+        self._dotsDir and self.speed, for all dots or those in dots
+        """
+        if dots is None:
+            dirs = self._dotsDir
+            velocity = self._dotsVelocity
+            numpy.cos(dirs, out=velocity[:, 0])
+            numpy.sin(dirs, out=velocity[:, 1])
+            velocity *= self.speed
+            self._velocitySpeed = self.speed
+        else:
+            dirs = self._dotsDir[dots]
+            self._dotsVelocity[dots, 0] = self.speed * numpy.cos(dirs)
+            self._dotsVelocity[dots, 1] = self.speed * numpy.sin(dirs)
+
     def _update_dotsXY(self):
         """The user shouldn't call this - its gets done within draw().
         """
-
+        nDots = self.nDots
+        dead = self._dead
         # Find dead dots, update positions, get new positions for
         # dead and out-of-bounds
         # renew dead dots
         if self.dotLife > 0:  # if less than zero ignore it
             # decrement. Then dots to be reborn will be negative
             self._dotsLife -= 1
-            dead = (self._dotsLife <= 0.0)
+            numpy.less_equal(self._dotsLife, 0.0, out=dead)
             self._dotsLife[dead] = self.dotLife
         else:
-            dead = numpy.zeros(self.nDots, dtype=bool)
+            dead.fill(False)
 
         # update XY based on speed and dir
         # NB self._dotsDir is in radians, but self.dir is in degs
         # update which are the noise/signal dots
+        signalDir = self.dir * pi / 180
         if self.signalDots == 'different':
             #  **up to version 1.70.00 this was the other way around,
             # not in keeping with Scase et al**
-            # noise and signal dots change identity constantly
-            numpy.random.shuffle(self._dotsDir)
-            # and then update _signalDots from that
-            self._signalDots = (self._dotsDir == (self.dir * pi / 180))
+            # noise and signal dots change identity constantly: pick a new
+            # random set of signal dots, noise dots get random directions
+            nSignal = int(round(self.coherence * nDots))
+            if nSignal == 0:
+                self._signalDots.fill(False)
+            elif nSignal == nDots:
+                self._signalDots.fill(True)
+            else:
+                rand = numpy.random.rand(nDots)
+                threshold = numpy.partition(rand, nSignal)[nSignal]
+                numpy.less(rand, threshold, out=self._signalDots)
+            noise = ~self._signalDots
+            nNoise = numpy.count_nonzero(noise)
+            self._dotsDir[self._signalDots] = signalDir
+            self._dotsDir[noise] = numpy.random.rand(nNoise) * 2 * pi
+            self._velocitySpeed = None
 
         # update the locations of signal and noise; 0 radians=East!
-        reshape = numpy.reshape
         if self.noiseDots == 'walk':
             # noise dots are ~self._signalDots
-            sig = numpy.random.rand((~self._signalDots).sum())
-            self._dotsDir[~self._signalDots] = sig * pi * 2
-            # then update all positions from dir*speed
-            cosDots = reshape(numpy.cos(self._dotsDir), (self.nDots,))
-            sinDots = reshape(numpy.sin(self._dotsDir), (self.nDots,))
-            self._verticesBase[:, 0] += self.speed * cosDots
-            self._verticesBase[:, 1] += self.speed * sinDots
-        elif self.noiseDots == 'direction':
-            # simply use the stored directions to update position
-            cosDots = reshape(numpy.cos(self._dotsDir), (self.nDots,))
-            sinDots = reshape(numpy.sin(self._dotsDir), (self.nDots,))
-            self._verticesBase[:, 0] += self.speed * cosDots
-            self._verticesBase[:, 1] += self.speed * sinDots
-        elif self.noiseDots == 'position':
-            # update signal dots
-            sd = self._signalDots
-            sdSum = self._signalDots.sum()
-            cosDots = reshape(numpy.cos(self._dotsDir[sd]), (sdSum,))
-            sinDots = reshape(numpy.sin(self._dotsDir[sd]), (sdSum,))
-            self._verticesBase[sd, 0] += self.speed * cosDots
-            self._verticesBase[sd, 1] += self.speed * sinDots
+            noise = ~self._signalDots
+            self._dotsDir[noise] = numpy.random.rand(noise.sum()) * pi * 2
+            if self._velocitySpeed != self.speed:
+                self._updateDotsVelocity()
+            else:
+                self._updateDotsVelocity(noise)
+        elif self._velocitySpeed != self.speed:
+            self._updateDotsVelocity()
+        # then update all positions from dir*speed ('position' noise dots
+        # are replaced below anyway)
+        self._verticesBase += self._dotsVelocity
+        if self.noiseDots == 'position':
             # update noise dots
-            dead = dead + (~self._signalDots)  # just create new ones
+            numpy.logical_or(dead, ~self._signalDots, out=dead)
 
         # handle boundaries of the field
+        outside = self._outside
+        work2 = self._work2
         if self.fieldShape in (None, 'square', 'sqr'):
-            dead0 = (numpy.abs(self._verticesBase[:, 0]) > 0.5)
-            dead1 = (numpy.abs(self._verticesBase[:, 1]) > 0.5)
-            dead = dead + dead0 + dead1
-
+            numpy.abs(self._verticesBase, out=work2)
+            numpy.maximum(work2[:, 0], work2[:, 1], out=self._work)
+            numpy.greater(self._work, 0.5, out=outside)
+            numpy.logical_or(dead, outside, out=dead)
         elif self.fieldShape == 'circle':
-            # transform to a normalised circle (radius = 1 all around)
-            # then to polar coords to check
-            # the normalised XY position (where radius should be < 1)
-            normXY = self._verticesBase / 0.5
+            # the normalised XY position (where radius should be < 0.5)
+            numpy.multiply(self._verticesBase, self._verticesBase, out=work2)
+            numpy.add(work2[:, 0], work2[:, 1], out=self._work)
             # add out-of-bounds to those that need replacing
-            dead = dead + (numpy.hypot(normXY[:, 0], normXY[:, 1]) > 1)
+            numpy.greater(self._work, 0.25, out=outside)
+            numpy.logical_or(dead, outside, out=dead)
 
         # update any dead dots
-        if sum(dead):
-            self._verticesBase[dead, :] = self._newDotsXY(sum(dead))
+        nDead = numpy.count_nonzero(dead)
+        if nDead:
+            self._verticesBase[dead, :] = self._newDotsXY(nDead)
 
         # update the pixel XY coordinates in pixels (using _BaseVisual class)
         self._updateVertices()
@@ -42,6 +42,10 @@ class ElementArrayStim(MinimalStim, TextureMixin):
     but in order to achieve this performance, uses several OpenGL extensions
     only available on modern graphics cards (supporting OpenGL2.0).
     See the ElementArray demo.
+
+    To change only a few of the elements (e.g. the target in a search array)
+    use :meth:`~ElementArrayStim.setElements`, which only recomputes the
+    vertices, colors and texture coordinates of those elements.
     """
 
     def __init__(self,
@@ -109,6 +113,8 @@ class ElementArrayStim(MinimalStim, TextureMixin):
         self.verticesBase = xys
         self._needVertexUpdate = True
         self._needColorUpdate = True
+        self._needTexCoordUpdate = True
+        self._allocateBuffers()
         self.useShaders = True
         self.interpolate = interpolate
         self.__dict__['fieldDepth'] = fieldDepth
@@ -164,6 +170,99 @@ class ElementArrayStim(MinimalStim, TextureMixin):
             win.winHandle.switch_to()
             globalVars.currWindow = win
 
+    def _allocateBuffers(self):
+        """Create the (float32) arrays passed to OpenGL. They are updated in
+        place, either entirely or only the rows of changed elements.
+        """
+        N = self.nElements
+        self.__dict__['verticesPix'] = numpy.zeros([N, 4, 3], numpy.float32)
+        self._RGBAs = numpy.zeros([N, 4, 4], numpy.float32)
+        self._texCoords = numpy.zeros([N, 4, 2], numpy.float32)
+        maskCoords = numpy.array([[1, 0], [0, 0], [0, 1], [1, 1]],
+                                 numpy.float32)
+        self._maskCoords = numpy.ascontiguousarray(
+            numpy.tile(maskCoords, [N, 1, 1]))
+        # indices of elements needing an update, from setElements()
+        self._dirtyVertices = []
+        self._dirtyColors = []
+        self._dirtyTexCoords = []
+
+    def setElements(self, indices, xys=None, oris=None, sizes=None,
+                    sfs=None, phases=None, colors=None, opacities=None,
+                    contrs=None, log=None):
+        """Set attributes of some of the elements only, e.g. the orientation
+        of the target in a search array::
+
+            stim.setElements([targetIndex], oris=45)
+            stim.setElements(changed, xys=newXYs[changed], opacities=0.5)
+
+        Values are given for the selected elements (or as a single value
+        for all of them). Unlike setting a whole attribute (e.g.
+        ``stim.oris = newOris``) only the vertices, colors and texture
+        coordinates of these elements are recomputed on the next draw.
+
+        colors need to be in the current colorSpace, which needs to be
+        'rgb' or 'rgb255' (use setColors() for other spaces).
+        """
+        indices = numpy.arange(self.nElements)[indices]
+        indices = numpy.atleast_1d(indices)
+        nIndices = len(indices)
+
+        def assign(attrib, value, nCols):
+            array = self.__dict__[attrib]
+            value = numpy.asarray(value, float)
+            if nCols and value.shape == (nIndices,):
+                value = value.reshape([nIndices, 1])  # same in x and y
+            array[indices] = value
+            logAttrib(self, log, attrib)
+
+        if xys is not None:
+            assign('xys', xys, 2)
+        if oris is not None:
+            assign('oris', oris, 0)
+        if sizes is not None:
+            assign('sizes', sizes, 2)
+            self._dirtyTexCoords.append(indices)
+        if xys is not None or oris is not None or sizes is not None:
+            self._dirtyVertices.append(indices)
+        if sfs is not None:
+            assign('sfs', sfs, 2)
+        if phases is not None:
+            assign('phases', phases, 2)
+        if sfs is not None or phases is not None:
+            self._dirtyTexCoords.append(indices)
+        if colors is not None:
+            if self.colorSpace not in ('rgb', 'rgb255'):
+                raise ValueError("setElements() can only set colors in the "
+                                 "'rgb' or 'rgb255' colorSpace, use "
+                                 "setColors() instead")
+            colors = numpy.asarray(colors, float)
+            if colors.shape == (nIndices,):
+                colors = colors.reshape([nIndices, 1])  # intensities
+            self.rgbs[indices] = colors
+            if getattr(self.colors, 'shape', None) == self.rgbs.shape:
+                self.colors[indices] = colors
+            logAttrib(self, log, 'colors')
+        if opacities is not None:
+            assign('opacities', opacities, 0)
+        if contrs is not None:
+            assign('contrs', contrs, 0)
+        if (colors is not None or opacities is not None or
+                contrs is not None):
+            self._dirtyColors.append(indices)
+
+    def _popDirty(self, attrib):
+        """Returns the unique indices of the elements in the dirty list
+        attrib, and empties the list
+        """
+        dirty = getattr(self, attrib)
+        if len(dirty) == 1:
+            indices = numpy.unique(dirty[0])
+        else:
+            indices = numpy.unique(numpy.concatenate(dirty))
+        del dirty[:]
+        return indices
+
     def _makeNx2(self, value, acceptedInput=('scalar', 'Nx1', 'Nx2')):
         """Helper function to change input to Nx2 arrays
         'scalar': int/float, 1x1 and 2x1.
@@ -505,10 +604,16 @@ class ElementArrayStim(MinimalStim, TextureMixin):
 
         if self._needVertexUpdate:
             self._updateVertices()
+        elif self._dirtyVertices:
+            self._updateVertices(self._popDirty('_dirtyVertices'))
         if self._needColorUpdate:
             self.updateElementColors()
+        elif self._dirtyColors:
+            self.updateElementColors(self._popDirty('_dirtyColors'))
         if self._needTexCoordUpdate:
             self.updateTextureCoords()
+        elif self._dirtyTexCoords:
+            self.updateTextureCoords(self._popDirty('_dirtyTexCoords'))
 
         # scale the drawing frame and get to centre of field
         GL.glPushMatrix()  # push before drawing, pop after
@@ -518,11 +623,11 @@ class ElementArrayStim(MinimalStim, TextureMixin):
         # GL.glLoadIdentity()
         self.win.setScale('pix')
 
-        cpcd = ctypes.POINTER(ctypes.c_double)
-        GL.glColorPointer(4, GL.GL_DOUBLE, 0,
-                          self._RGBAs.ctypes.data_as(cpcd))
-        GL.glVertexPointer(3, GL.GL_DOUBLE, 0,
-                           self.verticesPix.ctypes.data_as(cpcd))
+        cpcf = ctypes.POINTER(ctypes.c_float)
+        GL.glColorPointer(4, GL.GL_FLOAT, 0,
+                          self._RGBAs.ctypes.data_as(cpcf))
+        GL.glVertexPointer(3, GL.GL_FLOAT, 0,
+                           self.verticesPix.ctypes.data_as(cpcf))
 
         # setup the shaderprogram
         _prog = self.win._progSignedTexMask
@@ -542,10 +647,10 @@ class ElementArrayStim(MinimalStim, TextureMixin):
 
         # setup client texture coordinates first
         GL.glClientActiveTexture(GL.GL_TEXTURE0)
-        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0, self._texCoords.ctypes)
+        GL.glTexCoordPointer(2, GL.GL_FLOAT, 0, self._texCoords.ctypes)
         GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
         GL.glClientActiveTexture(GL.GL_TEXTURE1)
-        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0, self._maskCoords.ctypes)
+        GL.glTexCoordPointer(2, GL.GL_FLOAT, 0, self._maskCoords.ctypes)
         GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
 
         GL.glEnableClientState(GL.GL_COLOR_ARRAY)
@@ -569,55 +674,57 @@ class ElementArrayStim(MinimalStim, TextureMixin):
         GL.glPopClientAttrib()
         GL.glPopMatrix()
 
-    def _updateVertices(self):
-        """Sets Stim.verticesPix from fieldPos.
+    def _updateVertices(self, indices=None):
+        """Sets Stim.verticesPix from fieldPos, for all elements or only
+        for those in indices.
         """
+        if indices is None:
+            indices = slice(None)
+            # dirty elements are updated too
+            del self._dirtyVertices[:]
+        sizes = self.sizes[indices]
+        oris = self.oris[indices] * 0.017453292519943295  # to radians
+        nElements = len(oris)
 
         # Handle the orientation, size and location of
         # each element in native units
-
-        radians = 0.017453292519943295
-
-        # so we can do matrix rotation of coords we need shape=[n*4,3]
-        # but we'll convert to [n,4,3] after matrix math
-        verts = numpy.zeros([self.nElements * 4, 3], 'd')
-        wx = -self.sizes[:, 0] * numpy.cos(self.oris[:] * radians) / 2
-        wy = self.sizes[:, 0] * numpy.sin(self.oris[:] * radians) / 2
-        hx = self.sizes[:, 1] * numpy.sin(self.oris[:] * radians) / 2
-        hy = self.sizes[:, 1] * numpy.cos(self.oris[:] * radians) / 2
-
-        # X vals of each vertex relative to the element's centroid
-        verts[0::4, 0] = -wx - hx
-        verts[1::4, 0] = +wx - hx
-        verts[2::4, 0] = +wx + hx
-        verts[3::4, 0] = -wx + hx
-
-        # Y vals of each vertex relative to the element's centroid
-        verts[0::4, 1] = -wy - hy
-        verts[1::4, 1] = +wy - hy
-        verts[2::4, 1] = +wy + hy
-        verts[3::4, 1] = -wy + hy
+        cosOris = numpy.cos(oris)
+        sinOris = numpy.sin(oris)
+        wx = -sizes[:, 0] * cosOris / 2
+        wy = sizes[:, 0] * sinOris / 2
+        hx = sizes[:, 1] * sinOris / 2
+        hy = sizes[:, 1] * cosOris / 2
+
+        # X and Y vals of each vertex relative to the element's centroid
+        verts = numpy.empty([nElements, 4, 2])
+        verts[:, 0, 0] = -wx - hx
+        verts[:, 1, 0] = +wx - hx
+        verts[:, 2, 0] = +wx + hx
+        verts[:, 3, 0] = -wx + hx
+        verts[:, 0, 1] = -wy - hy
+        verts[:, 1, 1] = +wy - hy
+        verts[:, 2, 1] = +wy + hy
+        verts[:, 3, 1] = -wy + hy
 
         # set of positions across elements
-        positions = self.xys + self.fieldPos
+        positions = (self.xys[indices] + self.fieldPos).repeat(4, 0)
 
-        # depth
-        verts[:, 2] = self.depths + self.fieldDepth
         # rotate, translate, scale by units
-        if positions.shape[0] * 4 == verts.shape[0]:
-            positions = positions.repeat(4, 0)
-        verts[:, :2] = convertToPix(vertices=verts[:, :2], pos=positions,
-                                    units=self.units, win=self.win)
-        verts = verts.reshape([self.nElements, 4, 3])
-
-        # assign to self attribute; make sure it's contiguous
-        self.__dict__['verticesPix'] = numpy.require(verts,
-                                                     requirements=['C'])
+        verticesPix = self.verticesPix
+        verticesPix[indices, :, :2] = convertToPix(
+            vertices=verts.reshape([nElements * 4, 2]), pos=positions,
+            units=self.units, win=self.win).reshape([nElements, 4, 2])
+        # depth
+        depths = numpy.asarray(self.depths, float)
+        if depths.ndim:
+            depths = depths.reshape([self.nElements, 1])[indices]
+        verticesPix[indices, :, 2] = depths + self.fieldDepth
         self._needVertexUpdate = False
 
     # ----------------------------------------------------------------------
-    def updateElementColors(self):
-        """Create a new array of self._RGBAs based on self.rgbs.
+    def updateElementColors(self, indices=None):
+        """Update self._RGBAs based on self.rgbs, self.contrs and
+        self.opacities (for all elements or only those in indices).
 
         Not needed by the user (simple call setColors())
 
@@ -625,54 +732,56 @@ class ElementArrayStim(MinimalStim, TextureMixin):
         element so this function also converts them to be one for
         each vertex of each element.
         """
-        N = self.nElements
-        self._RGBAs = numpy.zeros([N, 4], 'd')
+        if indices is None:
+            indices = slice(None)
+            del self._dirtyColors[:]
+        contrs = self.contrs[indices].reshape([-1, 1])
         if self.colorSpace in ('rgb', 'dkl', 'lms', 'hsv'):
             # these spaces are 0-centred
-            self._RGBAs[:, 0:3] = (self.rgbs[:, :] *
-                self.contrs[:].reshape([N, 1]).repeat(3, 1) / 2 + 0.5)
+            rgbs = self.rgbs[indices] * contrs / 2 + 0.5
         else:
-            self._RGBAs[:, 0:3] = (self.rgbs *
-                self.contrs[:].reshape([N, 1]).repeat(3, 1) / 255.0)
-
-        self._RGBAs[:, -1] = self.opacities.reshape([N, ])
-        # repeat for the 4 vertices in the grid
-        self._RGBAs = self._RGBAs.reshape([N, 1, 4]).repeat(4, 1)
+            rgbs = self.rgbs[indices] * contrs / 255.0
+        # the same for the 4 vertices of each element
+        self._RGBAs[indices, :, 0:3] = rgbs.reshape([-1, 1, 3])
+        self._RGBAs[indices, :, 3] = self.opacities[indices].reshape([-1, 1])
 
         self._needColorUpdate = False
 
-    def updateTextureCoords(self):
-        """Create a new array of self._maskCoords
+    def updateTextureCoords(self, indices=None):
+        """Update self._texCoords (for all elements or only those in
+        indices)
         """
-
-        N = self.nElements
-        self._maskCoords = numpy.array([[1, 0], [0, 0], [0, 1], [1, 1]],
-                                       'd').reshape([1, 4, 2])
-        self._maskCoords = self._maskCoords.repeat(N, 0)
+        if indices is None:
+            indices = slice(None)
+            del self._dirtyTexCoords[:]
+        sfs = self.sfs[indices]
+        phases = self.phases[indices]
 
         # for the main texture
         # sf is dependent on size (openGL default)
         if self.units in ['norm', 'pix', 'height']:
-            L = -self.sfs[:, 0] / 2 - self.phases[:, 0] + 0.5
-            R = +self.sfs[:, 0] / 2 - self.phases[:, 0] + 0.5
-            T = +self.sfs[:, 1] / 2 - self.phases[:, 1] + 0.5
-            B = -self.sfs[:, 1] / 2 - self.phases[:, 1] + 0.5
+            halfX = sfs[:, 0] / 2
+            halfY = sfs[:, 1] / 2
         else:
             # we should scale to become independent of size
-            L = (-self.sfs[:, 0] * self.sizes[:, 0] / 2
-                 - self.phases[:, 0] + 0.5)
-            R = (+self.sfs[:, 0] * self.sizes[:, 0] / 2
-                 - self.phases[:, 0] + 0.5)
-            T = (+self.sfs[:, 1] * self.sizes[:, 1] / 2
-                 - self.phases[:, 1] + 0.5)
-            B = (-self.sfs[:, 1] * self.sizes[:, 1] / 2
-                 - self.phases[:, 1] + 0.5)
-
-        # self._texCoords=numpy.array([[1,1],[1,0],[0,0],[0,1]],
-        #           'd').reshape([1,4,2])
-        self._texCoords = (numpy.concatenate([[R, B], [L, B], [L, T], [R, T]])
-            .transpose().reshape([N, 4, 2]).astype('d'))
-        self._texCoords = numpy.ascontiguousarray(self._texCoords)
+            sizes = self.sizes[indices]
+            halfX = sfs[:, 0] * sizes[:, 0] / 2
+            halfY = sfs[:, 1] * sizes[:, 1] / 2
+        L = -halfX - phases[:, 0] + 0.5
+        R = +halfX - phases[:, 0] + 0.5
+        T = +halfY - phases[:, 1] + 0.5
+        B = -halfY - phases[:, 1] + 0.5
+
+        # corners in the same order as self._maskCoords
+        texCoords = self._texCoords
+        texCoords[indices, 0, 0] = R
+        texCoords[indices, 0, 1] = B
+        texCoords[indices, 1, 0] = L
+        texCoords[indices, 1, 1] = B
+        texCoords[indices, 2, 0] = L
+        texCoords[indices, 2, 1] = T
+        texCoords[indices, 3, 0] = R
+        texCoords[indices, 3, 1] = T
         self._needTexCoordUpdate = False
 
     @attributeSetter
@@ -1,5 +1,6 @@
 """Various useful functions for creating filters and textures
-(e.g. for PatchStim)
+(e.g. for PatchStim), and FilteredNoise to make many filtered noise textures
+at once
 """
 
 # Part of the PsychoPy library
@@ -8,8 +9,10 @@
 
 from __future__ import absolute_import
 
+import threading
+
 import numpy
-from numpy.fft import fft2, ifft2, fftshift, ifftshift
+from numpy.fft import fft2, ifft2, fftshift, ifftshift, rfft2, irfft2
 from psychopy import logging
 try:
     from PIL import Image
@@ -49,8 +52,10 @@ def makeGrating(res,
     ori *= (-numpy.pi / 180)
     phase *= (numpy.pi / 180)
     cyclesTwoPi = cycles * 2.0 * numpy.pi
-    xrange, yrange = numpy.mgrid[0.0: cyclesTwoPi: cyclesTwoPi / res,
-                                 0.0: cyclesTwoPi: cyclesTwoPi / res]
+    # a column and a row that broadcast to the res x res grid
+    steps = numpy.arange(0.0, cyclesTwoPi, cyclesTwoPi / res)
+    xrange = steps[:, numpy.newaxis]
+    yrange = steps[numpy.newaxis, :]
 
     sin, cos = numpy.sin, numpy.cos
     if gratType is "none":
@@ -192,10 +197,10 @@ def makeRadialMatrix(matrixSize, center=(0.0, 0.0), radius=1.0):
     if type(radius) in [int, float]:
         radius = [radius, radius]
 
-    # NB need to add one step length because
-    yy, xx = numpy.mgrid[0:matrixSize, 0:matrixSize]
-    xx = ((1.0 - 2.0 / matrixSize * xx) + center[0]) / radius[0]
-    yy = ((1.0 - 2.0 / matrixSize * yy) + center[1]) / radius[1]
+    # a row of x and a column of y, broadcast to the full matrix
+    steps = 1.0 - 2.0 / matrixSize * numpy.arange(matrixSize)
+    xx = ((steps + center[0]) / radius[0])[numpy.newaxis, :]
+    yy = ((steps + center[1]) / radius[1])[:, numpy.newaxis]
     rad = numpy.sqrt(numpy.power(xx, 2) + numpy.power(yy, 2))
     return rad
 
@@ -245,14 +250,35 @@ def conv2d(smaller, larger):
 
 def imfft(X):
     """Perform 2D FFT on an image and center low frequencies
+
+    X can also be a stack of images (n, rows, cols), transformed in one call
     """
-    return fftshift(fft2(X))
+    return fftshift(fft2(X), axes=(-2, -1))
 
 
 def imifft(X):
     """Inverse 2D FFT with decentering
+
+    X can also be a stack of spectra (n, rows, cols), as from imfft
     """
-    return numpy.abs(ifft2(ifftshift(X)))
+    return numpy.abs(ifft2(ifftshift(X, axes=(-2, -1))))
+
+
+_radiusGrids = {}
+
+
+def _radiusGrid(size):
+    """The (read-only, cached) distance of each pixel from the centre, in
+    the coordinates of the Butterworth filters (-0.5 to 0.5)"""
+    size = tuple(size)
+    if size not in _radiusGrids:
+        rows, cols = size
+        x = numpy.linspace(-0.5, 0.5, cols)
+        y = numpy.linspace(-0.5, 0.5, rows)
+        radius = numpy.sqrt((x**2)[numpy.newaxis] + (y**2)[:, numpy.newaxis])
+        radius.flags.writeable = False
+        _radiusGrids[size] = radius
+    return _radiusGrids[size]
 
 
 def butter2d_lp(size, cutoff, n=3):
@@ -277,13 +303,8 @@ def butter2d_lp(size, cutoff, n=3):
     if not isinstance(n, int):
         raise ValueError, 'n must be an integer >= 1'
 
-    rows, cols = size
-
-    x = numpy.linspace(-0.5, 0.5, cols)
-    y = numpy.linspace(-0.5, 0.5, rows)
-
     # An array with every pixel = radius relative to center
-    radius = numpy.sqrt((x**2)[numpy.newaxis] + (y**2)[:, numpy.newaxis])
+    radius = _radiusGrid(size)
 
     f = 1 / (1.0 + (radius / cutoff)**(2 * n))   # The filter
     return f
@@ -372,3 +393,145 @@ def butter2d_lp_elliptic(size, cutoff_x, cutoff_y, n=3,
     f = 1. / (1 + ((2 * x2 / cutoff_x)**2 + (2 * y2 / cutoff_y)**2)**n)
 
     return f
+
+
+class FilteredNoise(object):
+    """Makes stacks of filtered (Butterworth lowpass, highpass or bandpass)
+    uniform white noise textures, e.g. for noise masks.
+
+    The filter kernel is made once, on the frequencies of a real FFT, and
+    all the textures of a call are filtered together by rfft2/irfft2 on the
+    stack (split between nThreads threads). The next batch can be made on a
+    background thread while the current one is being used.
+
+    :Parameters:
+        size : int or (rows, cols)
+            the size of the textures
+        filterType : 'lowpass', 'highpass' or 'bandpass'
+        cutoff : float
+            relative cutoff frequency (0 - 1.0, 1.0 being the Nyquist
+            frequency, as butter2d_lp)
+        cutin : float
+            relative cutin frequency of the 'bandpass' filter
+        order : int
+            order of the filter, the higher the sharper the transition
+        contrast : float
+            the textures are scaled to the range -contrast to contrast
+        nThreads : int
+            threads sharing the FFTs (numpy releases the GIL during FFTs in
+            recent versions)
+        seed : int or None
+            seed of the random numbers (for reproducible textures)
+
+    Example::
+
+        noise = filters.FilteredNoise(256, 'bandpass', cutin=0.05,
+                                      cutoff=0.2)
+        textures = noise.make(100)  # (100, 256, 256), -1 to 1
+        noise.makeInBackground(100)  # for the next block
+        ...
+        textures = noise.getBackground()
+    """
+
+    def __init__(self, size, filterType='lowpass', cutoff=0.5, cutin=0.1,
+                 order=3, contrast=1.0, nThreads=1, seed=None):
+        super(FilteredNoise, self).__init__()
+        if type(size) in [int, float]:
+            size = [size, size]
+        self.size = (int(size[0]), int(size[1]))
+        self.contrast = contrast
+        self.nThreads = max(1, int(nThreads))
+        self.kernel = self._makeKernel(filterType, cutoff, cutin, order)
+        self._random = numpy.random.RandomState(seed)
+        self._thread = None
+        self._background = None
+
+    def _makeKernel(self, filterType, cutoff, cutin, order):
+        """The filter as the half spectrum of rfft2 (rows, cols // 2 + 1)
+        """
+        if not isinstance(order, int):
+            raise ValueError('order must be an integer >= 1')
+        for freq in [cutoff, cutin]:
+            if not 0 < freq <= 1.0:
+                raise ValueError('Cutoff frequency must be between 0 and 1.0')
+        rows, cols = self.size
+        fy = numpy.fft.fftfreq(rows)[:, numpy.newaxis]
+        fx = numpy.fft.fftfreq(cols)[:cols // 2 + 1]
+        fx = numpy.abs(fx)[numpy.newaxis, :]  # the Nyquist term is -0.5
+        radius = numpy.sqrt(fx**2 + fy**2)
+
+        def lowpass(cutoff):
+            return 1 / (1.0 + (radius / cutoff)**(2 * order))
+        if filterType == 'lowpass':
+            return lowpass(cutoff)
+        elif filterType == 'highpass':
+            return 1.0 - lowpass(cutoff)
+        elif filterType == 'bandpass':
+            return lowpass(cutoff) - lowpass(cutin)
+        raise ValueError('Unknown filterType %r' % filterType)
+
+    def filter(self, images):
+        """Filter a stack of images (n, rows, cols), or a single image, in
+        place and return it.
+        """
+        images = numpy.asarray(images, dtype=float)
+        if images.ndim == 2:
+            self.filter(images[numpy.newaxis])  # a view of the image
+            return images
+        chunks = numpy.array_split(numpy.arange(len(images)),
+                                   min(self.nThreads, len(images)))
+
+        def filterChunk(chunk):
+            if len(chunk):
+                stack = images[chunk[0]:chunk[-1] + 1]
+                spectra = rfft2(stack)
+                spectra *= self.kernel
+                stack[...] = irfft2(spectra, s=self.size)
+        if len(chunks) > 1:
+            threads = [threading.Thread(target=filterChunk, args=(chunk,))
+                       for chunk in chunks]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elif chunks:
+            filterChunk(chunks[0])
+        return images
+
+    def make(self, n=1):
+        """Returns n new textures as an array (n, rows, cols), each scaled
+        to the range -contrast to contrast.
+        """
+        # uniform white noise (much quicker to make than gaussian)
+        textures = self._random.random_sample((n,) + self.size)
+        textures -= 0.5
+        self.filter(textures)
+        peaks = numpy.abs(textures).max(axis=2).max(axis=1)
+        peaks[peaks == 0] = 1.0
+        textures *= (self.contrast / peaks)[:, numpy.newaxis, numpy.newaxis]
+        return textures
+
+    def makeInBackground(self, n=1):
+        """Start making n textures on a background thread, to be collected
+        with getBackground().
+        """
+        if self._thread is not None:
+            raise RuntimeError('FilteredNoise is already making textures in '
+                               'the background')
+
+        def run():
+            self._background = self.make(n)
+        self._thread = threading.Thread(target=run, name='FilteredNoise')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def getBackground(self):
+        """Returns the textures started by makeInBackground(), waiting for
+        them if they are not ready.
+        """
+        if self._thread is None:
+            raise RuntimeError('makeInBackground() has not been called')
+        self._thread.join()
+        self._thread = None
+        textures, self._background = self._background, None
+        return textures
@@ -0,0 +1,177 @@
+#!/usr/bin/env python2
+
+"""Record where the time goes in each Window.flip(), with little overhead.
+
+The FrameProfiler of a window (see Window.startFrameProfiler()) stores a
+timestamp at the end of each phase of every flip in a preallocated ring of
+the last nFrames frames, so recording allocates nothing and never slows
+down as the experiment goes on. The phases of a frame are:
+
+    - userDraw: from the end of the previous flip to the call of flip()
+      (the drawing, and anything else, done by the script)
+    - autoDraw: drawing the stimuli with autoDraw=True
+    - fboBlit: preparing to copy the framebuffer object to the back buffer
+    - renderFBO: drawing the framebuffer object (Window._renderFBO)
+    - events: dispatching the window events
+    - flip: winHandle.flip() and, with waitBlanking, waiting for the
+      vertical blank
+    - callOnFlip: the functions passed to callOnFlip()
+
+Frames whose interval (flip to flip) is longer than 1.2 frame periods
+are counted as dropped as they are recorded.
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import numpy
+
+from psychopy import core, logging
+
+phases = ('userDraw', 'autoDraw', 'fboBlit', 'renderFBO', 'events', 'flip',
+          'callOnFlip')
+
+# the timestamps recorded for each frame, the end of each phase but the
+# first (which ends at the START of the frame)
+START, AUTODRAW, FBOBLIT, RENDERFBO, EVENTS, FLIP, CALLONFLIP = range(7)
+
+
+class FrameProfiler(object):
+    """A ring of per-phase timestamps of the last nFrames frames.
+
+    :Parameters:
+        nFrames : int
+            the number of frames kept (older frames are overwritten)
+        framePeriod : float
+            the frame period (in seconds) of the screen, for detecting
+            dropped frames. None to not detect them.
+    """
+
+    def __init__(self, nFrames=3600, framePeriod=None):
+        super(FrameProfiler, self).__init__()
+        self.nFrames = int(nFrames)
+        self.framePeriod = framePeriod
+        if framePeriod:
+            self.dropThreshold = framePeriod * 1.2
+        else:
+            self.dropThreshold = numpy.inf
+        self._times = numpy.zeros((self.nFrames, len(phases)), numpy.float64)
+        self._dropped = numpy.zeros(self.nFrames, numpy.bool_)
+        self._row = self._times[0]
+        self.frameN = 0  # frames recorded so far (including overwritten)
+        self.nDropped = 0
+        self._lastFlip = numpy.nan
+
+    def mark(self, index, t=None):
+        """Record the time t (default now) as the end of a phase of the
+        current frame."""
+        if t is None:
+            t = core.getTime()
+        self._row[index] = t
+
+    def startFrame(self, t=None):
+        """Record the start of a frame (the call of Window.flip())."""
+        if t is None:
+            t = core.getTime()
+        self._row = self._times[self.frameN % self.nFrames]
+        self._row[START] = t
+        self._row[AUTODRAW:] = numpy.nan  # phases skipped stay nan
+
+    def endFrame(self, t=None):
+        """Record the end of the current frame and check whether it was
+        dropped."""
+        if t is None:
+            t = core.getTime()
+        row = self._row
+        row[CALLONFLIP] = t
+        i = self.frameN % self.nFrames
+        dropped = row[FLIP] - self._lastFlip > self.dropThreshold
+        self._dropped[i] = dropped
+        if dropped:
+            self.nDropped += 1
+        self._lastFlip = row[FLIP]
+        self.frameN += 1
+
+    def getTimestamps(self):
+        """Returns an array (nFrames, 7) of the timestamps of the recorded
+        frames, oldest first: the start of the frame and the end of each
+        phase but userDraw (nan for phases skipped in that frame, e.g.
+        fboBlit without an FBO)."""
+        if self.frameN <= self.nFrames:
+            return self._times[:self.frameN].copy()
+        first = self.frameN % self.nFrames
+        return numpy.roll(self._times, -first, axis=0)
+
+    def getDropped(self):
+        """Returns a boolean array of the recorded frames that were dropped,
+        oldest first."""
+        if self.frameN <= self.nFrames:
+            return self._dropped[:self.frameN].copy()
+        return numpy.roll(self._dropped, -(self.frameN % self.nFrames))
+
+    def getPhases(self):
+        """Returns a dict of the duration (s) of each phase (see `phases`)
+        of the recorded frames, plus their 'interval' (from the flip of the
+        previous frame). Values unknown for the oldest frame are nan."""
+        times = self.getTimestamps()
+        for index in range(AUTODRAW, len(phases)):
+            # a skipped phase took no time
+            skipped = numpy.isnan(times[:, index])
+            times[skipped, index] = times[skipped, index - 1]
+        previousEnd = numpy.empty(len(times))
+        previousEnd[1:] = times[:-1, CALLONFLIP]
+        previousFlip = numpy.empty(len(times))
+        previousFlip[1:] = times[:-1, FLIP]
+        previousEnd[:1] = previousFlip[:1] = numpy.nan
+        durations = {'userDraw': times[:, START] - previousEnd,
+                     'interval': times[:, FLIP] - previousFlip}
+        for index in range(AUTODRAW, len(phases)):
+            durations[phases[index]] = times[:, index] - times[:, index - 1]
+        return durations
+
+    def getStats(self):
+        """Returns a dict of the number of frames recorded and dropped and,
+        for each phase and the interval, a dict of its mean, median and
+        max (in ms)."""
+        stats = {'nFrames': min(self.frameN, self.nFrames),
+                 'nDropped': self.nDropped}
+        for phase, durations in self.getPhases().items():
+            durations = durations[~numpy.isnan(durations)] * 1000
+            if len(durations):
+                stats[phase] = {'mean': durations.mean(),
+                                'median': numpy.median(durations),
+                                'max': durations.max()}
+        return stats
+
+    def getHistogram(self, phase='interval', bins=50, range=None):
+        """Returns (counts, binEdges) of the histogram of the durations (in
+        ms) of a phase, as numpy.histogram()."""
+        durations = self.getPhases()[phase] * 1000
+        durations = durations[~numpy.isnan(durations)]
+        return numpy.histogram(durations, bins=bins, range=range)
+
+    def save(self, fileName):
+        """Save the recorded frames. A '.npy' fileName saves the array of
+        timestamps (see getTimestamps()) in numpy's binary format (quickest),
+        anything else saves the phase durations (in ms) as a csv file with a
+        row per frame.
+        """
+        if fileName.endswith('.npy'):
+            numpy.save(fileName, self.getTimestamps())
+        else:
+            durations = self.getPhases()
+            columns = phases + ('interval',)
+            data = numpy.column_stack([durations[c] * 1000 for c in columns] +
+                                      [self.getDropped()])
+            numpy.savetxt(fileName, data, fmt='%.3f', delimiter=',',
+                          header=','.join(columns + ('dropped',)),
+                          comments='')
+        logging.info('Saved %i frames to %s' % (len(self.getDropped()),
+                                                fileName))
+
+    def clear(self):
+        """Forget the recorded frames."""
+        self.frameN = 0
+        self.nDropped = 0
+        self._lastFlip = numpy.nan
@@ -0,0 +1,177 @@
+#!/usr/bin/env python2
+
+"""Decode movie frames on a background thread, ahead of the play clock.
+
+A FrameQueue calls getFrame(t) (e.g. VideoFileClip.get_frame) on its own
+thread for the frames at t = 0, dt, 2*dt... and copies them into a ring of
+preallocated frame buffers, so that drawing a movie only has to upload an
+already decoded frame to the graphics card. The consumer asks for the frame
+due at the current play time:
+
+    - frames whose successor is also due are dropped (never shown)
+    - if the frame due has not been decoded yet the current frame is repeated
+    - the decoder skips frames that are already too late to be shown
+
+Counts of decoded, shown and dropped frames are available from getStats().
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import threading
+from collections import deque
+
+import numpy
+
+from psychopy import logging
+
+
+class FrameQueue(object):
+    """A bounded queue of frames decoded ahead of time.
+
+    :Parameters:
+        getFrame : callable
+            getFrame(t) returns the frame at time t as an array (h, w, 3)
+        frameInterval : float
+            the time between frames (1/fps)
+        duration : float
+            frames are decoded up to (and including) this time
+        nBuffers : int
+            the number of frame buffers in the ring (at least 2: one for
+            the frame being shown and one to decode into)
+    """
+
+    def __init__(self, getFrame, frameInterval, duration, nBuffers=8):
+        super(FrameQueue, self).__init__()
+        self._getFrame = getFrame
+        self.frameInterval = float(frameInterval)
+        self.duration = duration
+        self.nBuffers = max(2, int(nBuffers))
+        # allocated when the first frame (and so its shape) is known
+        self._buffers = None
+        self._free = deque(range(self.nBuffers))
+        self._ready = deque()  # (pts, buffer index) of decoded frames
+        self._shown = None  # buffer index of the frame returned last
+        self._cond = threading.Condition()
+        # incremented by seek() so frames decoded before it are discarded
+        self._generation = 0
+        self._nextIndex = 0
+        self._playT = None
+        self._eof = False
+        self._running = True
+        self.nDecoded = 0
+        self.nShown = 0
+        self.nDropped = 0
+        self._thread = threading.Thread(target=self._decodeLoop,
+                                        name='FrameQueue')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _decodeLoop(self):
+        while True:
+            with self._cond:
+                while self._running and (self._eof or not self._free):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                generation = self._generation
+                index = self._nextIndex
+                if self._playT is not None:
+                    # don't decode frames that are already too late
+                    dueIndex = int(self._playT / self.frameInterval)
+                    if dueIndex > index:
+                        self.nDropped += dueIndex - index
+                        index = dueIndex
+                pts = index * self.frameInterval
+                if pts > self.duration:
+                    self._eof = True
+                    self._cond.notify_all()
+                    continue
+                self._nextIndex = index + 1
+                slot = self._free.popleft()
+            try:
+                frame = self._getFrame(pts)
+                if self._buffers is None:
+                    self._buffers = numpy.empty(
+                        (self.nBuffers,) + numpy.shape(frame), numpy.uint8)
+                self._buffers[slot][...] = frame
+            except Exception, err:
+                logging.error("FrameQueue failed to decode the frame at "
+                              "%.3fs: %s" % (pts, err))
+                with self._cond:
+                    self._free.append(slot)
+                    if generation == self._generation:
+                        self._eof = True
+                    self._cond.notify_all()
+                continue
+            with self._cond:
+                if generation == self._generation:
+                    self._ready.append((pts, slot))
+                    self.nDecoded += 1
+                else:  # seek() was called while decoding
+                    self._free.append(slot)
+                self._cond.notify_all()
+
+    def getFrame(self, t, wait=False):
+        """Returns (pts, frame) for the latest decoded frame due at time t
+        (pts <= t), or None if there is no new frame to show yet, in which
+        case the current frame should be repeated.
+
+        With wait=True this returns the next frame even if it is not due
+        yet, waiting for it to be decoded if necessary (e.g. for the first
+        frame after loading or seeking).
+
+        The frame array is a buffer of the queue, it stays valid until the
+        next frame is returned.
+        """
+        with self._cond:
+            self._playT = t
+            while True:
+                # frames are superseded by a later frame that is also due
+                while len(self._ready) > 1 and self._ready[1][0] <= t:
+                    self._free.append(self._ready.popleft()[1])
+                    self.nDropped += 1
+                if self._ready and (wait or self._ready[0][0] <= t):
+                    break
+                if not wait or self._eof or not self._running:
+                    return None
+                self._cond.wait()
+            pts, slot = self._ready.popleft()
+            if self._shown is not None:
+                self._free.append(self._shown)
+            self._shown = slot
+            self.nShown += 1
+            self._cond.notify_all()
+            return pts, self._buffers[slot]
+
+    def isFinished(self):
+        """True if all frames up to the duration have been returned (or
+        dropped)."""
+        with self._cond:
+            return self._eof and not self._ready
+
+    def seek(self, t):
+        """Flush the queue and continue decoding from the frame at time t.
+        """
+        with self._cond:
+            self._generation += 1
+            self._free.extend(slot for pts, slot in self._ready)
+            self._ready.clear()
+            self._nextIndex = max(0, int(round(t / self.frameInterval)))
+            self._playT = None
+            self._eof = False
+            self._cond.notify_all()
+
+    def stop(self):
+        """Stop the decoding thread (it finishes any frame in progress)."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def getStats(self):
+        """Returns a dict of the numbers of decoded, shown and dropped
+        frames, and the number of frames currently queued."""
+        with self._cond:
+            return {'decoded': self.nDecoded, 'shown': self.nShown,
+                    'dropped': self.nDropped, 'queued': len(self._ready)}
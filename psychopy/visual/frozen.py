@@ -0,0 +1,233 @@
+#!/usr/bin/env python2
+
+"""Draw a group of stimuli that rarely change from a texture, rendered once
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+# Ensure setting pyglet.options['debug_gl'] to False is done prior to any
+# other calls to pyglet or pyglet submodules, otherwise it may not get picked
+# up by the pyglet GL engine and have no effect.
+# Shaders will work but require OpenGL2.0 drivers AND PyOpenGL3.0+
+import ctypes
+import weakref
+
+import pyglet
+pyglet.options['debug_gl'] = False
+GL = pyglet.gl
+
+from psychopy import logging
+
+
+class FrozenGroup(object):
+    """Draws a group of stimuli as one texture, rendered once, rather than
+    drawing every stimulus on every frame.
+
+    The first draw() renders the stimuli (in order) into a texture the size
+    of the window, using a frame buffer object, and then draws the texture.
+    Later draws only draw the texture, until an attribute of one of the
+    stimuli is set (e.g. `stim.pos = ...` or `stim.setColor(...)`): the
+    stimuli are then rendered again at the next draw(). Call invalidate()
+    after changing a stimulus in another way (e.g. `stim.pos[0] += 1`
+    changes the array in place).
+
+    This is useful for the static parts of composite stimuli with many
+    elements (e.g. the RatingScale line, tick marks and labels), or for any
+    set of stimuli drawn unchanged for many frames::
+
+        background = visual.FrozenGroup(win, [frame, grid] + labels)
+        while True:
+            background.draw()  # as fast as drawing a single image
+            cursor.draw()
+            win.flip()
+
+    If the graphics card does not support frame buffer objects, or the
+    window blendMode is 'add', the stimuli are drawn as usual.
+    """
+
+    def __init__(self, win, stims=(), enabled=True):
+        """
+        :Parameters:
+
+            stims :
+                a list of stimuli (or other objects with a draw() method),
+                drawn in this order
+            enabled :
+                False to simply draw the stimuli every time (e.g. to
+                compare). Can be changed later.
+        """
+        super(FrozenGroup, self).__init__()
+        self.win = win
+        self.stims = []
+        self.enabled = enabled
+        self.rendering = False  # True while the group draws the stimuli
+        self._needRender = True
+        self._frameBuffer = None
+        self._texID = None
+        self._texSize = None
+        if not self.isSupported():
+            logging.debug('FrozenGroup: frame buffer objects not supported,'
+                          ' stimuli are drawn every frame')
+        for stim in stims:
+            self.append(stim)
+
+    @staticmethod
+    def isSupported():
+        """Whether the graphics card supports frame buffer objects (needed
+        to render into a texture)"""
+        return GL.gl_info.have_extension('GL_EXT_framebuffer_object')
+
+    def append(self, stim):
+        """Add a stimulus to the group (drawn last)"""
+        self.stims.append(stim)
+        # so that setting one of its attributes invalidates the group
+        # (see tools.attributetools.logAttrib)
+        groups = stim.__dict__.setdefault('_frozenGroups', weakref.WeakSet())
+        groups.add(self)
+        self._needRender = True
+
+    def remove(self, stim):
+        """Remove a stimulus from the group"""
+        self.stims.remove(stim)
+        stim.__dict__.get('_frozenGroups', set()).discard(self)
+        self._needRender = True
+
+    def invalidate(self):
+        """Render the stimuli again at the next draw(), e.g. after changing
+        one of them"""
+        if not self.rendering:  # (stimuli can update themselves in draw)
+            self._needRender = True
+
+    def draw(self):
+        """Draw the group (rendering it first if it has changed)"""
+        if (not self.enabled or self.win.blendMode != 'avg' or
+                not self.isSupported()):
+            self._drawStims()
+            return
+        texSize = (int(self.win.size[0]), int(self.win.size[1]))
+        if texSize != self._texSize:
+            self._createFrameBuffer(texSize)
+        if self._needRender:
+            self._render()
+        self._drawTexture()
+
+    def _createFrameBuffer(self, texSize):
+        self._deleteFrameBuffer()
+        self._texID = GL.GLuint()
+        GL.glGenTextures(1, ctypes.byref(self._texID))
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER,
+                           GL.GL_NEAREST)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER,
+                           GL.GL_NEAREST)
+        if self.win.useFBO:  # keep the precision of the window's buffer
+            internalFormat = GL.GL_RGBA32F_ARB
+        else:
+            internalFormat = GL.GL_RGBA8
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internalFormat,
+                        texSize[0], texSize[1], 0,
+                        GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, None)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
+        self._frameBuffer = GL.GLuint()
+        GL.glGenFramebuffersEXT(1, ctypes.byref(self._frameBuffer))
+        GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, self._frameBuffer)
+        GL.glFramebufferTexture2DEXT(GL.GL_FRAMEBUFFER_EXT,
+                                     GL.GL_COLOR_ATTACHMENT0_EXT,
+                                     GL.GL_TEXTURE_2D, self._texID, 0)
+        status = GL.glCheckFramebufferStatusEXT(GL.GL_FRAMEBUFFER_EXT)
+        self._bindWindowBuffer()
+        if status != GL.GL_FRAMEBUFFER_COMPLETE_EXT:
+            logging.error('FrozenGroup: error in framebuffer activation, '
+                          'stimuli are drawn every frame')
+            self._deleteFrameBuffer()
+            self.enabled = False
+            return
+        self._texSize = texSize
+        self._needRender = True
+
+    def _bindWindowBuffer(self):
+        if self.win.useFBO:
+            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT,
+                                    self.win.frameBuffer)
+        else:
+            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, 0)
+
+    def _render(self):
+        # saves the clear color, blend function and the window's draw buffer
+        GL.glPushAttrib(GL.GL_COLOR_BUFFER_BIT)
+        GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, self._frameBuffer)
+        GL.glDrawBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
+        GL.glClearColor(0.0, 0.0, 0.0, 0.0)
+        GL.glClear(GL.GL_COLOR_BUFFER_BIT)
+        try:
+            self._drawStims(premultiply=True)
+        finally:
+            self._bindWindowBuffer()
+            GL.glPopAttrib()
+        self._needRender = False
+
+    def _drawStims(self, premultiply=False):
+        self.rendering = True
+        try:
+            for stim in self.stims:
+                if premultiply:
+                    # render with premultiplied alpha, so that the texture
+                    # blends onto the window as the stimuli themselves would
+                    # have. Set for every stimulus, as some (e.g. pyglet
+                    # text) set the blend function themselves
+                    GL.glBlendFuncSeparate(
+                        GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA,
+                        GL.GL_ONE, GL.GL_ONE_MINUS_SRC_ALPHA)
+                stim.draw()
+        finally:
+            self.rendering = False
+
+    def _drawTexture(self):
+        GL.glMatrixMode(GL.GL_PROJECTION)
+        GL.glPushMatrix()
+        GL.glLoadIdentity()
+        GL.glMatrixMode(GL.GL_MODELVIEW)
+        GL.glPushMatrix()
+        GL.glLoadIdentity()
+
+        GL.glBlendFunc(GL.GL_ONE, GL.GL_ONE_MINUS_SRC_ALPHA)
+        GL.glColor4f(1.0, 1.0, 1.0, 1.0)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
+        GL.glBegin(GL.GL_QUADS)
+        GL.glTexCoord2f(0.0, 0.0)
+        GL.glVertex2f(-1.0, -1.0)
+        GL.glTexCoord2f(0.0, 1.0)
+        GL.glVertex2f(-1.0, 1.0)
+        GL.glTexCoord2f(1.0, 1.0)
+        GL.glVertex2f(1.0, 1.0)
+        GL.glTexCoord2f(1.0, 0.0)
+        GL.glVertex2f(1.0, -1.0)
+        GL.glEnd()
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+        GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
+
+        GL.glPopMatrix()
+        GL.glMatrixMode(GL.GL_PROJECTION)
+        GL.glPopMatrix()
+        GL.glMatrixMode(GL.GL_MODELVIEW)
+
+    def _deleteFrameBuffer(self):
+        if self._frameBuffer is not None:
+            GL.glDeleteFramebuffersEXT(1, ctypes.byref(self._frameBuffer))
+            self._frameBuffer = None
+        if self._texID is not None:
+            GL.glDeleteTextures(1, ctypes.byref(self._texID))
+            self._texID = None
+        self._texSize = None
+
+    def __del__(self):
+        try:
+            self._deleteFrameBuffer()
+        except Exception:
+            pass  # e.g. the window (and GL context) has already gone
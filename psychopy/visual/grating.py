@@ -63,6 +63,17 @@ class GratingStim(BaseVisualStim, TextureMixin, ColorMixin, ContainerMixin):
     stretched!).
     """
 
+    # with shaders, draw from vertex arrays updated in place rather than a
+    # display list recompiled whenever phase, sf, ori, pos... change.
+    # Subclasses with their own _updateListShaders() need to set this False
+    _drawWithArrays = True
+    # texture coords of the corners (as _verticesBase) for one cycle at
+    # phase 0, and the mask coords
+    _texCoordsBase = numpy.array([[0.5, -0.5], [-0.5, -0.5],
+                                  [-0.5, 0.5], [0.5, 0.5]])
+    _maskCoords = numpy.array([[1.0, 0.0], [0.0, 0.0], [0.0, 1.0],
+                               [1.0, 1.0]])
+
     def __init__(self,
                  win,
                  tex="sin",
@@ -285,13 +296,69 @@ class GratingStim(BaseVisualStim, TextureMixin, ColorMixin, ContainerMixin):
 
         if self._needTextureUpdate:
             self.setTex(value=self.tex, log=False)
-        if self._needUpdate:
-            self._updateList()
-        GL.glCallList(self._listID)
+        if self.useShaders and self._drawWithArrays:
+            self._drawArrays()
+        else:
+            if self._needUpdate:
+                self._updateList()
+            GL.glCallList(self._listID)
 
         # return the view to previous state
         GL.glPopMatrix()
 
+    def _drawArrays(self):
+        """Draw with shaders from vertex and texture coordinate arrays.
+
+        Unlike the display list, nothing needs compiling when the phase, sf,
+        ori, pos or size change: only the 4 texture coordinates are
+        recomputed (and the vertices, if needed, as for contains()).
+        """
+        # access just once because it's slower than basic property
+        vertsPix = self.verticesPix
+        texCoords = self._texCoordsBase * self._cycles - self.phase + 0.5
+
+        # setup the shaderprogram
+        _prog = self.win._progSignedTexMask
+        GL.glUseProgram(_prog)
+        # set the texture to be texture unit 0
+        GL.glUniform1i(GL.glGetUniformLocation(_prog, "texture"), 0)
+        # mask is texture unit 1
+        GL.glUniform1i(GL.glGetUniformLocation(_prog, "mask"), 1)
+        # mask
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self._maskID)
+        GL.glEnable(GL.GL_TEXTURE_2D)  # implicitly disables 1D
+        GL.glClientActiveTexture(GL.GL_TEXTURE1)
+        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0, self._maskCoords.ctypes)
+        GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        # main texture
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glClientActiveTexture(GL.GL_TEXTURE0)
+        GL.glTexCoordPointer(2, GL.GL_DOUBLE, 0, texCoords.ctypes)
+        GL.glEnableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+
+        GL.glVertexPointer(2, GL.GL_DOUBLE, 0, vertsPix.ctypes)
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glDrawArrays(GL.GL_QUADS, 0, 4)
+        GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+
+        # unbind the textures
+        GL.glDisableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        GL.glClientActiveTexture(GL.GL_TEXTURE1)
+        GL.glDisableClientState(GL.GL_TEXTURE_COORD_ARRAY)
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)  # implicitly disables 1D
+        # main texture
+        GL.glClientActiveTexture(GL.GL_TEXTURE0)
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glDisable(GL.GL_TEXTURE_2D)
+
+        GL.glUseProgram(0)
+
     def _updateListShaders(self):
         """The user shouldn't need this method since it gets called
         after every call to .set() Basically it updates the OpenGL
@@ -81,6 +81,43 @@ def pointInPolygon(x, y, poly):
     return inside
 
 
+def pointsInPolygon(points, poly):
+    """Determine which of many points are inside a polygon; returns a
+    boolean array with a value per point.
+
+    `points` is an array (N, 2) of (x, y) points, `poly` is as for
+    `pointInPolygon` (vertices, or an object with verticesPix).
+    """
+    try:  # do this using try:...except rather than hasattr() for speed
+        poly = poly.verticesPix  # we want to access this only once
+    except Exception:
+        pass
+    points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+    poly = numpy.asarray(poly, dtype=float)
+    if len(poly) < 3:
+        msg = 'pointsInPolygon expects a polygon with 3 or more vertices'
+        logging.warning(msg)
+        return numpy.zeros(len(points), bool)
+
+    if haveMatplotlib and matplotlib.__version__ > '1.2':
+        return mplPath(poly).contains_points(points)
+
+    # the ray-casting of pointInPolygon, for all the points and edges at
+    # once: points are inside if a ray crosses an odd number of edges
+    x = points[:, 0, numpy.newaxis]
+    y = points[:, 1, numpy.newaxis]
+    p1x, p1y = numpy.roll(poly, 1, axis=0).T
+    p2x, p2y = poly.T
+    sloped = p1y != p2y  # horizontal edges are never crossed
+    p1x, p1y, p2x, p2y = p1x[sloped], p1y[sloped], p2x[sloped], p2y[sloped]
+    xints = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+    crosses = ((y > numpy.minimum(p1y, p2y)) &
+               (y <= numpy.maximum(p1y, p2y)) &
+               (x <= numpy.maximum(p1x, p2x)) &
+               ((p1x == p2x) | (x <= xints)))
+    return numpy.logical_xor.reduce(crosses, axis=1)
+
+
 def polygonsOverlap(poly1, poly2):
     """Determine if two polygons intersect; can fail for very pointy polygons.
 
@@ -243,13 +280,18 @@ def setColor(obj, color, colorSpace=None, operation='',
     if colorSpace in ['rgb', 'rgb255']:
         setattr(obj, rgbAttrib, newColor)
     elif colorSpace == 'dkl':
-        if (win.dkl_rgb is None or
-                numpy.all(win.dkl_rgb == numpy.ones([3, 3]))):
-            dkl_rgb = None
+        converter = _getColorConverter(win, newColor)
+        if converter is not None:
+            # with the matrices of the window's monitor, prepared once
+            setattr(obj, rgbAttrib, converter.dkl2rgb(newColor))
         else:
-            dkl_rgb = win.dkl_rgb
-        setattr(obj, rgbAttrib, colors.dkl2rgb(
-            numpy.asarray(newColor).transpose(), dkl_rgb))
+            if (win.dkl_rgb is None or
+                    numpy.all(win.dkl_rgb == numpy.ones([3, 3]))):
+                dkl_rgb = None
+            else:
+                dkl_rgb = win.dkl_rgb
+            setattr(obj, rgbAttrib, colors.dkl2rgb(
+                numpy.asarray(newColor).transpose(), dkl_rgb))
     elif colorSpace == 'lms':
         if (win.lms_rgb is None or
                 numpy.all(win.lms_rgb == numpy.ones([3, 3]))):
@@ -263,7 +305,11 @@ def setColor(obj, color, colorSpace=None, operation='',
             lms_rgb = win.lms_rgb
         else:
             lms_rgb = win.lms_rgb
-        setattr(obj, rgbAttrib, colors.lms2rgb(newColor, lms_rgb))
+        converter = _getColorConverter(win, newColor)
+        if converter is not None:
+            setattr(obj, rgbAttrib, converter.lms2rgb(newColor))
+        else:
+            setattr(obj, rgbAttrib, colors.lms2rgb(newColor, lms_rgb))
     elif colorSpace == 'hsv':
         setattr(obj, rgbAttrib, colors.hsv2rgb(numpy.asarray(newColor)))
     else:
@@ -273,6 +319,17 @@ def setColor(obj, color, colorSpace=None, operation='',
     # if needed, set the texture too
     setTexIfNoShaders(obj)
 
+
+def _getColorConverter(win, color):
+    """The ColorConverter of the window for the color(s): float32 for
+    arrays of colors (e.g. of an ElementArrayStim), float64 for a single
+    color, which would otherwise lose precision
+    """
+    if numpy.ndim(color) > 1:
+        return getattr(win, 'colorConverter', None)
+    return getattr(win, '_colorConverter64', None)
+
+
 # set for groupFlipVert:
 immutables = {int, float, str, tuple, long, bool,
               numpy.float64, numpy.float, numpy.int, numpy.long}
@@ -35,6 +35,7 @@ from psychopy import sound
 from psychopy.tools.arraytools import val2array
 from psychopy.tools.attributetools import logAttrib, setAttribute
 from psychopy.visual.basevisual import BaseVisualStim, ContainerMixin
+from psychopy.visual.framequeue import FrameQueue
 
 from moviepy.video.io.VideoFileClip import VideoFileClip
 
@@ -76,7 +77,8 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
                  noAudio=False,
                  vframe_callback=None,
                  fps=None,
-                 interpolate=True):
+                 interpolate=True,
+                 frameBuffers=8):
         """
         :Parameters:
 
@@ -91,6 +93,9 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
             loop : bool, optional
                 Whether to start the movie over from the beginning if draw is
                 called and the movie is done.
+            frameBuffers : int
+                The number of frames decoded ahead of time, on a background
+                thread.
 
         """
         # what local vars are defined (these are the init params) for use
@@ -119,11 +124,13 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
         self.noAudio = noAudio
         self._audioStream = None
         self.useTexSubImage2D = True
+        self.frameBuffers = frameBuffers
+        self._frameQueue = None
+        self.nDroppedFrames = 0
 
         self._videoClock = Clock()
         self.loadMovie(self.filename)
         self.setVolume(volume)
-        self.nDroppedFrames = 0
 
         # size
         if size is None:
@@ -139,6 +146,9 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
             logging.exp("Created %s = %s" % (self.name, str(self)))
 
     def reset(self):
+        if getattr(self, '_frameQueue', None) is not None:
+            self._frameQueue.stop()
+            self._frameQueue = None
         self._numpyFrame = None
         self._nextFrameT = None
         self._texID = None
@@ -183,6 +193,10 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
         self._frameInterval = 1.0 / self._mov.fps
         self.duration = self._mov.duration
         self.filename = filename
+        self._frameQueue = FrameQueue(self._mov.get_frame,
+                                      self._frameInterval, self.duration,
+                                      nBuffers=self.frameBuffers)
+        self.nDroppedFrames = 0
         self._updateFrameTexture()
         logAttrib(self, log, 'movie', filename)
 
@@ -267,6 +281,15 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
         """
         return self._nextFrameT - self._frameInterval
 
+    def getFrameStats(self):
+        """Returns a dict with the numbers of frames decoded, shown and
+        dropped since the movie was loaded, and the number of frames
+        currently decoded ahead.
+        """
+        if self._frameQueue is None:
+            return {'decoded': 0, 'shown': 0, 'dropped': 0, 'queued': 0}
+        return self._frameQueue.getStats()
+
     def _updateFrameTexture(self):
         if self._nextFrameT is None:
             # movie has no current position, need to reset the clock
@@ -276,70 +299,83 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
             self._videoClock.reset()
             self._nextFrameT = 0
 
-        # only advance if next frame (half of next retrace rate)
-        if self._nextFrameT > self.duration:
-            self._onEos()
-        elif self._numpyFrame is not None:
-            if self._nextFrameT > (self._videoClock.getTime() -
-                                   self._retraceInterval / 2.0):
+        if self._numpyFrame is None:
+            # nothing shown since loading or seeking, wait for the frame
+            frame = self._frameQueue.getFrame(self._nextFrameT, wait=True)
+        elif self.status == PAUSED:
+            return None
+        else:
+            # the latest frame that is due (half of next retrace rate)
+            t = self._videoClock.getTime() - self._retraceInterval / 2.0
+            if t >= self._nextFrameT and self._frameQueue.isFinished():
+                self._onEos()
                 return None
-        self._numpyFrame = self._mov.get_frame(self._nextFrameT)
-        useSubTex = self.useTexSubImage2D
-        if self._texID is None:
-            self._texID = GL.GLuint()
-            GL.glGenTextures(1, ctypes.byref(self._texID))
-            useSubTex = False
+            frame = self._frameQueue.getFrame(t)
+            self._reportDroppedFrames()
+        if frame is None:
+            return None  # not decoded yet, so repeat the current frame
+        pts, self._numpyFrame = frame
+        self._nextFrameT = pts + self._frameInterval
 
+        if self.interpolate:
+            pixFormat = GL.GL_RGB
+        else:
+            pixFormat = GL.GL_BGR
         # bind the texture in openGL
         GL.glEnable(GL.GL_TEXTURE_2D)
-        # bind that name to the target
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
-        # makes the texture map wrap (this is actually default anyway)
-        GL.glTexParameteri(
-            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_REPEAT)
-        # data from PIL/numpy is packed, but default for GL is 4 bytes
-        GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
-        # important if using bits++ because GL_LINEAR
-        # sometimes extrapolates to pixel vals outside range
-        if self.interpolate:
-            GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+        if self._texID is None:
+            self._texID = GL.GLuint()
+            GL.glGenTextures(1, ctypes.byref(self._texID))
+            # bind that name to the target
+            GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
+            # makes the texture map wrap (this is actually default anyway)
             GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
-            if useSubTex is False:
-                GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB8,
-                                self._numpyFrame.shape[1],
-                                self._numpyFrame.shape[0], 0,
-                                GL.GL_RGB, GL.GL_UNSIGNED_BYTE,
-                                self._numpyFrame.ctypes)
+                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_REPEAT)
+            # important if using bits++ because GL_LINEAR
+            # sometimes extrapolates to pixel vals outside range
+            if self.interpolate:
+                texFilter = GL.GL_LINEAR
             else:
-                GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0,
-                                   self._numpyFrame.shape[1],
-                                   self._numpyFrame.shape[0],
-                                   GL.GL_RGB, GL.GL_UNSIGNED_BYTE,
-                                   self._numpyFrame.ctypes)
-        else:
+                texFilter = GL.GL_NEAREST
             GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
+                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, texFilter)
             GL.glTexParameteri(
-                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
-            if useSubTex is False:
-                GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB8,
-                                self._numpyFrame.shape[1],
-                                self._numpyFrame.shape[0], 0,
-                                GL.GL_BGR, GL.GL_UNSIGNED_BYTE,
-                                self._numpyFrame.ctypes)
-            else:
-                GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0,
-                                   self._numpyFrame.shape[1],
-                                   self._numpyFrame.shape[0],
-                                   GL.GL_BGR, GL.GL_UNSIGNED_BYTE,
-                                   self._numpyFrame.ctypes)
-        GL.glTexEnvi(GL.GL_TEXTURE_ENV, GL.GL_TEXTURE_ENV_MODE,
-                     GL.GL_MODULATE)  # ?? do we need this - think not!
-
-        if not self.status == PAUSED:
-            self._nextFrameT += self._frameInterval
+                GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, texFilter)
+            GL.glTexEnvi(GL.GL_TEXTURE_ENV, GL.GL_TEXTURE_ENV_MODE,
+                         GL.GL_MODULATE)  # ?? do we need this - think not!
+            useSubTex = False
+        else:
+            GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
+            useSubTex = self.useTexSubImage2D
+        # data from PIL/numpy is packed, but default for GL is 4 bytes
+        GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+        if useSubTex is False:
+            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB8,
+                            self._numpyFrame.shape[1],
+                            self._numpyFrame.shape[0], 0,
+                            pixFormat, GL.GL_UNSIGNED_BYTE,
+                            self._numpyFrame.ctypes)
+        else:
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0,
+                               self._numpyFrame.shape[1],
+                               self._numpyFrame.shape[0],
+                               pixFormat, GL.GL_UNSIGNED_BYTE,
+                               self._numpyFrame.ctypes)
+
+    def _reportDroppedFrames(self):
+        nDropped = self._frameQueue.nDropped
+        previous = self.nDroppedFrames
+        if nDropped == previous:
+            return
+        self.nDroppedFrames = nDropped
+        if nDropped < reportNDroppedFrames:
+            msg = "MovieStim3 dropped %i video frames at %.3fs"
+            logging.warning(msg % (nDropped - previous,
+                                   self._videoClock.getTime()))
+        elif previous < reportNDroppedFrames:
+            msg = ("Multiple Movie frames have occurred - "
+                   "I'll stop bothering you about them!")
+            logging.warning(msg)
 
     def draw(self, win=None):
         """Draw the current frame to a particular visual.Window (or to the
@@ -405,9 +441,12 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
     def seek(self, t):
         """Go to a specific point in time for both the audio and video streams
         """
-        # video is easy: set both times to zero and update the frame texture
+        # video: flush the frame queue and wait for the frame at t on the
+        # next update of the frame texture
+        self._frameQueue.seek(t)
+        self._numpyFrame = None
         self._nextFrameT = t
-        self._videoClock.reset(t)
+        self._videoClock.reset(-t)
         self._audioSeek(t)
 
     def _audioSeek(self, t):
@@ -431,6 +470,9 @@ class MovieStim3(BaseVisualStim, ContainerMixin):
             self.clearTextures()
         except Exception:
             pass
+        if self._frameQueue is not None:
+            self._frameQueue.stop()
+            self._frameQueue = None
         self._mov = None
         self._numpyFrame = None
         self._audioStream = None
@@ -0,0 +1,186 @@
+#!/usr/bin/env python2
+
+"""Stream the frames of a Window to a movie file (or numbered images) as
+they are drawn.
+
+Unlike Window.getMovieFrame(), which keeps every frame in memory until
+saveMovieFrames(), a MovieRecorder reads the pixels of each frame into one
+of a few preallocated buffers and hands it to a writer thread, which pipes
+the raw frames to an encoder (ffmpeg) or saves them as numbered image files.
+If the writer falls behind, reading the next frame waits for a buffer to be
+free, so memory use is bounded whatever the length of the recording.
+
+Use it through Window.startMovieRecording() / stopMovieRecording().
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import os
+import subprocess
+import tempfile
+import threading
+import Queue
+
+import pyglet
+pyglet.options['debug_gl'] = False
+GL = pyglet.gl
+
+import numpy
+
+from psychopy import logging
+
+try:
+    from PIL import Image
+except ImportError:
+    import Image
+
+# extensions of the files written by the encoder, anything else is saved
+# as numbered images by PIL
+movieExtensions = ('.mp4', '.mov', '.avi', '.mkv', '.mpg', '.mpeg', '.webm')
+
+
+class MovieRecorder(object):
+    """Writes frames to a movie or numbered image files on a background
+    thread.
+
+    :Parameters:
+        fileName : str
+            a movie (.mp4, .mov, .avi, .mkv, .mpg, .webm), encoded by
+            ffmpeg, or an image (.png, .tif, .jpg...), in which case the
+            frames are saved as fileName001.png, fileName002.png...
+        size : (width, height)
+            the size of the frames in pixels
+        fps : float
+            the frame rate of the movie
+        codec : str or None
+            the ffmpeg video codec (e.g. 'libx264', 'mpeg4'), None for the
+            default codec of the movie format
+        encoder : str
+            the ffmpeg executable
+        maxQueuedFrames : int
+            the number of frames that can wait to be written (each takes
+            width * height * 3 bytes)
+        offscreen : bool
+            whether the Window recording to it should skip showing the
+            frames on screen
+    """
+
+    def __init__(self, fileName, size, fps=30, codec=None, encoder='ffmpeg',
+                 maxQueuedFrames=8, offscreen=False):
+        super(MovieRecorder, self).__init__()
+        self.fileName = fileName
+        self.size = (int(size[0]), int(size[1]))
+        self.fps = fps
+        self.offscreen = offscreen
+        self.nFrames = 0  # frames added
+        self.nWritten = 0
+        fileRoot, fileExt = os.path.splitext(fileName)
+        if fileExt.lower() == '.gif':
+            raise ValueError("Animated GIFs can't be streamed, save the "
+                             "frames with Window.saveMovieFrames() instead")
+        self._buffers = numpy.empty(
+            (maxQueuedFrames + 1, self.size[1], self.size[0], 3), numpy.uint8)
+        self._free = Queue.Queue()
+        for index in range(len(self._buffers)):
+            self._free.put(index)
+        self._queue = Queue.Queue()
+        self._error = None
+        self._encoder = None
+        if fileExt.lower() in movieExtensions:
+            self._startEncoder(encoder, codec)
+        else:
+            self._imageNameFormat = "%s%%03d%s" % (fileRoot, fileExt)
+        self._thread = threading.Thread(target=self._writeLoop,
+                                        name='MovieRecorder')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _startEncoder(self, encoder, codec):
+        width, height = self.size
+        # the rows of GL frames are bottom-up: flip them in the encoder, and
+        # most codecs need an even width and height
+        cmd = [encoder, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+               '-s', '%ix%i' % (width, height), '-r', str(self.fps),
+               '-i', '-', '-an',
+               '-vf', 'vflip,crop=trunc(iw/2)*2:trunc(ih/2)*2',
+               '-pix_fmt', 'yuv420p']
+        if codec:
+            cmd += ['-vcodec', codec]
+        cmd.append(self.fileName)
+        self._encoderLog = tempfile.TemporaryFile()
+        try:
+            self._encoder = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                             stdout=self._encoderLog,
+                                             stderr=self._encoderLog)
+        except OSError, err:
+            msg = "Couldn't start the movie encoder %r: %s" % (encoder, err)
+            raise IOError(msg)
+
+    def _writeLoop(self):
+        while True:
+            index = self._queue.get()
+            if index is None:
+                return
+            try:
+                if self._error is None:
+                    self._writeFrame(self._buffers[index])
+                    self.nWritten += 1
+            except Exception, err:
+                self._error = err
+                logging.error("MovieRecorder failed to write frame %i of "
+                              "%s: %s" % (self.nWritten + 1, self.fileName,
+                                          err))
+            finally:
+                self._free.put(index)
+
+    def _writeFrame(self, frame):
+        if self._encoder is not None:
+            self._encoder.stdin.write(frame.data)
+        else:
+            im = Image.fromarray(frame[::-1])
+            im.save(self._imageNameFormat % (self.nWritten + 1))
+
+    def addFrame(self, frame=None, buffer='back'):
+        """Add a frame to the recording: a (height, width, 3) uint8 array
+        (with the bottom row first, as OpenGL) or, by default, the pixels
+        read from the buffer ('back' or 'front') of the current GL context.
+
+        Waits if maxQueuedFrames frames are already waiting to be written.
+        """
+        if self._error is not None:
+            raise IOError("Writing %s failed: %s" % (self.fileName,
+                                                     self._error))
+        index = self._free.get()
+        target = self._buffers[index]
+        if frame is None:
+            if buffer == 'back':
+                GL.glReadBuffer(GL.GL_BACK)
+            else:
+                GL.glReadBuffer(GL.GL_FRONT)
+            GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+            GL.glReadPixels(0, 0, self.size[0], self.size[1], GL.GL_RGB,
+                            GL.GL_UNSIGNED_BYTE, target.ctypes)
+        else:
+            target[...] = frame
+        self.nFrames += 1
+        self._queue.put(index)
+
+    def close(self):
+        """Wait for the queued frames to be written and close the movie.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self._encoder is not None:
+            self._encoder.stdin.close()
+            if self._encoder.wait() != 0:
+                self._encoderLog.seek(0)
+                msg = "The movie encoder failed to write %s: %s"
+                logging.error(msg % (self.fileName, self._encoderLog.read()))
+            self._encoderLog.close()
+        logging.info('wrote %i frames to %s' % (self.nWritten, self.fileName))
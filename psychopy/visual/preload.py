@@ -0,0 +1,252 @@
+#!/usr/bin/env python2
+
+"""Decode image files on background threads before they are needed.
+
+Setting ImageStim.image (or the tex of another stimulus) to a file name
+normally opens and decodes the file there and then, which for large images
+can take longer than a frame. Tell the preloader which files will be needed
+soon and they are decoded on a pool of threads into arrays that are ready to
+be uploaded to the graphics card; _createTexture picks them up automatically,
+so only the texture upload is left for the frame::
+
+    from psychopy.visual import imagePreloader
+
+    for trial in trials:
+        # start decoding the images of the next two trials
+        imagePreloader.preloadTrials(trials, n=2)
+        stim.image = trial['image']  # already decoded (if it was in time)
+        ...
+
+Decoded images are kept in an LRU cache limited to maxBytes.
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import os
+import threading
+import Queue
+
+try:
+    from PIL import Image
+except ImportError:
+    import Image
+import numpy
+
+from psychopy import logging
+from psychopy.visual.texturecache import LRUCache
+
+#: file extensions preloadTrials() treats as images
+imageExtensions = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+
+
+class PreloadedImage(object):
+    """A decoded image, flipped for OpenGL and stored as a contiguous
+    uint8 array with mode 'L' (luminance) or 'RGBA'.
+    """
+
+    def __init__(self, im):
+        super(PreloadedImage, self).__init__()
+        im = im.transpose(Image.FLIP_TOP_BOTTOM)
+        if im.mode != 'L':
+            im = im.convert('RGBA')
+        self.size = im.size
+        self.mode = im.mode
+        self.array = numpy.ascontiguousarray(numpy.array(im, numpy.uint8))
+        self.array.flags.writeable = False
+        self._floatArray = None
+        if self.mode == 'L':
+            # luminance images are used as float textures with shaders
+            self.getFloatArray()
+
+    @property
+    def nBytes(self):
+        nBytes = self.array.nbytes
+        if self._floatArray is not None:
+            nBytes += self._floatArray.nbytes
+        return nBytes
+
+    def getFloatArray(self):
+        """The image as float32 values in the range -1:1"""
+        if self._floatArray is None:
+            # much faster to avoid division 2/255
+            floatArray = (self.array.astype(numpy.float32) *
+                          0.0078431372549019607 - 1.0)
+            floatArray.flags.writeable = False
+            self._floatArray = floatArray
+        return self._floatArray
+
+    def toImage(self):
+        """A PIL Image of the (flipped) image data"""
+        return Image.fromarray(numpy.array(self.array), self.mode)
+
+
+def decodeImage(filename):
+    """Open and fully decode an image file, returns a PreloadedImage"""
+    return PreloadedImage(Image.open(filename))
+
+
+def _fileKey(filename):
+    """The key of a file in the cache: its absolute path, modification time
+    and size, so that a file changed on disk is decoded again
+    """
+    path = os.path.abspath(filename)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, st.st_mtime, st.st_size
+
+
+class ImagePreloader(object):
+    """Decodes image files on a pool of background threads.
+
+    :Parameters:
+        nThreads : int
+            the number of decoding threads (started on the first call
+            to preload)
+        maxBytes : int
+            the maximum size of the cache of decoded images
+    """
+
+    def __init__(self, nThreads=2, maxBytes=512 * 1024 ** 2):
+        super(ImagePreloader, self).__init__()
+        self.nThreads = nThreads
+        self._cache = LRUCache(maxBytes)
+        self._queue = Queue.Queue()
+        # file key -> [started, threading.Event] for images not decoded yet
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self.nDecoded = 0
+        self.nErrors = 0
+        self.nWaits = 0
+
+    @property
+    def maxBytes(self):
+        return self._cache.maxBytes
+
+    @maxBytes.setter
+    def maxBytes(self, value):
+        self._cache.maxBytes = value
+
+    def _startThreads(self):
+        # replace any threads that have died
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.nThreads:
+            thread = threading.Thread(target=self._decodeLoop,
+                                      name='ImagePreloader')
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _decodeLoop(self):
+        while True:
+            key, pending = self._queue.get()
+            with self._lock:
+                if self._pending.get(key) is not pending or pending[0]:
+                    # taken by get() or cancelled (and maybe queued again)
+                    continue
+                pending[0] = True
+            filename = key[0]
+            try:
+                image = decodeImage(filename)
+            except Exception, err:
+                image = None
+                logging.warning("ImagePreloader failed to decode '%s': %s" %
+                                (filename, err))
+            with self._lock:
+                if image is not None:
+                    self._cache.put(key, image, image.nBytes)
+                    self.nDecoded += 1
+                else:
+                    self.nErrors += 1
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+            pending[1].set()
+
+    def preload(self, *filenames):
+        """Queue image files to be decoded in the background. Files already
+        decoded or queued are ignored.
+        """
+        self._startThreads()
+        for filename in filenames:
+            key = _fileKey(filename)
+            with self._lock:
+                if key in self._cache or key in self._pending:
+                    continue
+                pending = self._pending[key] = [False, threading.Event()]
+            self._queue.put((key, pending))
+
+    def preloadTrials(self, trials, n=1, keys=None):
+        """Preload the images of the next n trials of a TrialHandler (or
+        anything else with a getFutureTrial() method).
+
+        Every trial value that is the name of an existing image file is
+        preloaded, or only the values of the given keys (condition names).
+        """
+        filenames = []
+        for future in range(1, n + 1):
+            trial = trials.getFutureTrial(future)
+            if trial is None:
+                break
+            for key, value in trial.items():
+                if keys is not None and key not in keys:
+                    continue
+                if (isinstance(value, basestring) and
+                        value.lower().endswith(imageExtensions) and
+                        os.path.isfile(value)):
+                    filenames.append(value)
+        self.preload(*filenames)
+        return filenames
+
+    def get(self, filename, wait=False):
+        """Returns the PreloadedImage for filename, or None if it was not
+        preloaded.
+
+        If the image is being decoded this waits for the decoding to finish.
+        If it is still queued it is taken off the queue (None is returned),
+        since decoding it straight away is quicker than waiting, unless
+        wait is True.
+        """
+        key = _fileKey(filename)
+        with self._lock:
+            image = self._cache.get(key)
+            if image is not None:
+                return image
+            pending = self._pending.get(key)
+            if pending is None:
+                return None
+            if not pending[0] and not wait:
+                del self._pending[key]
+                return None
+            self.nWaits += 1
+        pending[1].wait()
+        with self._lock:
+            return self._cache.get(key)
+
+    def cancel(self):
+        """Forget all images that are queued but not being decoded yet."""
+        with self._lock:
+            for key in self._pending.keys():
+                if not self._pending[key][0]:
+                    del self._pending[key]
+
+    def clear(self):
+        """Cancel queued images and empty the cache of decoded images."""
+        self.cancel()
+        with self._lock:
+            self._cache.clear()
+
+    def getStats(self):
+        """Returns a dict of cache and decoding statistics."""
+        with self._lock:
+            stats = self._cache.getStats()
+            stats.update(decoded=self.nDecoded, errors=self.nErrors,
+                         waits=self.nWaits, pending=len(self._pending))
+        return stats
+
+
+#: The ImagePreloader used by visual stimuli
+imagePreloader = ImagePreloader()
@@ -248,7 +248,11 @@ class RadialStim(GratingStim):
         """
 
         self.__dict__[attr] = value  # avoid recursing the attributeSetter
-        self._updateTextureCoords()
+        if attr in ('angularPhase', 'radialPhase'):
+            # only offsets the texture coords, done when next drawn
+            self._needPhaseUpdate = True
+        else:
+            self._updateTextureCoords()
         self._needUpdate = True
 
     @attributeSetter
@@ -390,6 +394,9 @@ class RadialStim(GratingStim):
             # assign vertex array
             GL.glVertexPointer(2, GL.GL_DOUBLE, 0, self.verticesPix.ctypes)
 
+            if self._needPhaseUpdate:
+                self._updateTexturePhase()
+
             # then bind main texture
             GL.glActiveTexture(GL.GL_TEXTURE0)
             GL.glBindTexture(GL.GL_TEXTURE_2D, self._texID)
@@ -440,6 +447,8 @@ class RadialStim(GratingStim):
             # the list does the texture mapping
             if self._needTextureUpdate:
                 self.setTex(value=self.tex, log=False)
+            if self._needPhaseUpdate:
+                self._updateTexturePhase()
             if self._needUpdate:
                 self._updateList()
             GL.glCallList(self._listID)
@@ -468,33 +477,43 @@ class RadialStim(GratingStim):
         self._verticesBase = vertsBase.reshape(self._nVisible, 2)
 
     def _updateTextureCoords(self):
-        """calculate texture coordinates if angularCycles or Phase change
+        """calculate texture coordinates if angularCycles or radialCycles
+        change (the phases are added by _updateTexturePhase)
         """
         pi2 = 2 * pi
         self._textureCoords = numpy.zeros([self.angularRes, 3, 2])
         # x position of inner vertex
         self._textureCoords[:, 0, 0] = (
             (self._angles + self._triangleWidth / 2) *
-            self.angularCycles / pi2 + self.angularPhase)
+            self.angularCycles / pi2)
         # y position of inner vertex
-        self._textureCoords[:, 0, 1] = 0.25 - self.radialPhase
+        self._textureCoords[:, 0, 1] = 0.25
 
         # x position of 1st outer vertex
         self._textureCoords[:, 1, 0] = (
-            self._angles * self.angularCycles / pi2 + self.angularPhase)
+            self._angles * self.angularCycles / pi2)
         # y position of 1st outer vertex
-        self._textureCoords[:, 1, 1] = (
-            0.25 + self.radialCycles - self.radialPhase)
+        self._textureCoords[:, 1, 1] = 0.25 + self.radialCycles
 
         # x position of 2nd outer vertex
         self._textureCoords[:, 2, 0] = (
             (self._angles + self._triangleWidth) *
-            self.angularCycles / pi2 + self.angularPhase)
+            self.angularCycles / pi2)
         # y position of 2nd outer vertex
-        self._textureCoords[:, 2, 1] = (
-            0.25 + self.radialCycles - self.radialPhase)
-        self._visibleTexture = self._textureCoords[
+        self._textureCoords[:, 2, 1] = 0.25 + self.radialCycles
+        self._visibleTextureBase = self._textureCoords[
             self._visible, :, :].reshape(self._nVisible, 2)
+        self._visibleTexture = numpy.empty_like(self._visibleTextureBase)
+        self._updateTexturePhase()
+
+    def _updateTexturePhase(self):
+        """Offset the texture coordinates by the angular and radial phase
+        (in place, so a drifting stimulus only does this add per frame)
+        """
+        numpy.add(self._visibleTextureBase,
+                  (self.angularPhase, -self.radialPhase),
+                  out=self._visibleTexture)
+        self._needPhaseUpdate = False
 
     def _updateMaskCoords(self):
         """calculate mask coords
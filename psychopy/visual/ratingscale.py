@@ -13,6 +13,7 @@ import numpy
 from psychopy import core, logging, event
 from psychopy.colors import isValidColor
 from psychopy.visual.circle import Circle
+from psychopy.visual.frozen import FrozenGroup
 from psychopy.visual.patch import PatchStim
 from psychopy.visual.shape import ShapeStim
 from psychopy.visual.text import TextStim
@@ -134,6 +135,7 @@ class RatingScale(MinimalStim):
                  minTime=0.4,
                  maxTime=0.0,
                  flipVert=False,
+                 freeze=False,
                  depth=0,
                  name=None,
                  autoLog=True,
@@ -276,6 +278,11 @@ class RatingScale(MinimalStim):
         flipVert :
             Whether to mirror-reverse the rating scale in the vertical
             direction.
+        freeze :
+            Whether to draw the parts of the scale that do not change (the
+            line, tick marks, labels and description) from a texture,
+            rendered once, see :class:`~psychopy.visual.FrozenGroup`.
+            Default = `False`.
     """
         # what local vars are defined (these are the init params) for use by
         # __repr__
@@ -353,6 +360,17 @@ class RatingScale(MinimalStim):
                     self.visualDisplayElements.append(item)
         if marker != 'hover':
             self.visualDisplayElements += [self.line]
+        # the accept box changes on every frame; the rest is drawn from a
+        # texture, rendered again only when an element changes
+        if self.showAccept:
+            dynamic = [self.acceptBox, self.accept]
+        else:
+            dynamic = []
+        self._dynamicElements = [e for e in self.visualDisplayElements
+                                 if e in dynamic]
+        self._frozen = FrozenGroup(win, [e for e in self.visualDisplayElements
+                                         if e not in dynamic],
+                                   enabled=freeze)
 
         # Mirror (flip) vertically if requested
         self.flipVert = False
@@ -1047,6 +1065,7 @@ class RatingScale(MinimalStim):
             self.markerYpos *= -1
             groupFlipVert([self.nearLine, self.marker] +
                           self.visualDisplayElements)
+            self._frozen.invalidate()  # positions are changed in place
         logAttrib(self, log, 'flipVert')
 
     # autoDraw and setAutoDraw are inherited from basevisual.MinimalStim
@@ -1102,7 +1121,8 @@ class RatingScale(MinimalStim):
             return
 
         # draw everything except the marker:
-        for visualElement in self.visualDisplayElements:
+        self._frozen.draw()
+        for visualElement in self._dynamicElements:
             visualElement.draw()
 
         # draw a fixed marker if the scale is being drawn after a response:
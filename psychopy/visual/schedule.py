@@ -0,0 +1,292 @@
+#!/usr/bin/env python2
+
+"""Change attributes of stimuli on every frame from precomputed values.
+
+Animating stimuli with per-frame Python code (``stim.phase = t * 2``) runs
+the attribute setter, val2array and the logging code for every attribute of
+every stimulus on every frame. A FrameSchedule takes the values for all the
+frames in advance, checks and converts them once, and then (after each
+win.flip()) writes the next frame's values straight into the stimuli::
+
+    schedule = visual.FrameSchedule(win)
+    schedule.add(grating, 'phase', numpy.arange(240) / 60.0 * 2)  # 2 Hz
+    schedule.add(grating, 'pos', lambda frameN: (frameN - 120, 0),
+                 units='pix')
+    schedule.add(fixation, 'opacity', [1, 0] * 120)  # flicker
+    schedule.start()  # applies the values for the first frame
+    while schedule.status != FINISHED:
+        grating.draw()
+        fixation.draw()
+        win.flip()  # shows a frame, then applies the next frame's values
+
+If a flip comes later than scheduled (i.e. frames were dropped), the
+schedule counts it in `nLate` and warns once. By default it then carries on
+with the next frame, later than planned. With timeLocked=True it skips the
+frames that are already due instead, so that it ends on time.
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import numpy
+
+from psychopy import logging
+from psychopy.constants import NOT_STARTED, STARTED, FINISHED
+from psychopy.tools.attributetools import attributeSetter
+from psychopy.tools.monitorunittools import convertToPix, pix2cm, pix2deg
+from psychopy.visual.basevisual import BaseVisualStim, ColorMixin
+from psychopy.visual.grating import GratingStim
+
+
+def _writePos(stim, value):
+    stim.__dict__['pos'] = value
+    stim._needVertexUpdate = True
+    stim._needUpdate = True
+
+
+def _writeSize(stim, value):
+    stim.__dict__['size'] = value
+    stim._requestedSize = value
+    stim._needVertexUpdate = True
+    stim._needUpdate = True
+    if hasattr(stim, '_calcCyclesPerStim'):
+        stim._calcCyclesPerStim()
+
+
+def _writeOri(stim, value):
+    stim.__dict__['ori'], stim._rotationMatrix = value
+    stim._needVertexUpdate = True
+    stim._needUpdate = True
+
+
+def _writeOpacity(stim, value):
+    stim.__dict__['opacity'] = value
+
+
+def _writeContrast(stim, value):
+    stim.__dict__['contrast'] = value
+
+
+def _writePhase(stim, value):
+    stim.__dict__['phase'] = value
+    stim._needUpdate = True
+
+
+def _writeSf(stim, value):
+    stim.__dict__['sf'] = value
+    stim._calcCyclesPerStim()
+    stim._needUpdate = True
+
+
+def _rotationMatrices(ori):
+    radians = numpy.asarray(ori) * 0.017453292519943295
+    sin, cos = numpy.sin(radians), numpy.cos(radians)
+    return numpy.array([[cos, -sin], [sin, cos]]).transpose(2, 0, 1)
+
+
+# attributes that can be written without calling their attributeSetter:
+# setter function: (shape of one value, writer, needs shaders)
+_directWriters = {
+    BaseVisualStim.__dict__['pos'].func: ((2,), _writePos, False),
+    BaseVisualStim.__dict__['size'].func: ((2,), _writeSize, False),
+    BaseVisualStim.__dict__['ori'].func: ((), _writeOri, False),
+    # without shaders, these rebuild the texture
+    BaseVisualStim.__dict__['opacity'].func: ((), _writeOpacity, True),
+    ColorMixin.__dict__['contrast'].func: ((), _writeContrast, True),
+    GratingStim.__dict__['phase'].func: ((2,), _writePhase, False),
+    GratingStim.__dict__['sf'].func: ((2,), _writeSf, False),
+}
+
+# convert from pix to stimulus units (from any units, see convertToPix)
+_pix2units = {
+    'pix': lambda pix, win: pix,
+    'pixels': lambda pix, win: pix,
+    'norm': lambda pix, win: pix * 2.0 / win.size,
+    'height': lambda pix, win: pix / float(win.size[1]),
+    'cm': lambda pix, win: pix2cm(pix, win.monitor),
+    'deg': lambda pix, win: pix2deg(pix, win.monitor),
+    'degs': lambda pix, win: pix2deg(pix, win.monitor),
+}
+
+
+class FrameSchedule(object):
+    """Sets attributes of stimuli to a precomputed value on every frame.
+
+    :Parameters:
+        win : Window
+            values for the next frame are applied after each win.flip()
+        nFrames : int or None
+            the number of frames. If None, it is the number of values
+            given to the first call of add()
+        timeLocked : bool
+            if True, frames that are already due when the schedule falls
+            behind are skipped, so that it ends on time. If False, no frame
+            is skipped and the schedule simply ends later.
+    """
+
+    def __init__(self, win, nFrames=None, timeLocked=False):
+        super(FrameSchedule, self).__init__()
+        self.win = win
+        self.nFrames = nFrames
+        self.timeLocked = timeLocked
+        self.status = NOT_STARTED
+        self.frameN = 0  # the frame whose values are applied
+        self.nLate = 0  # flips later than scheduled
+        self.nSkipped = 0  # frames not shown (if timeLocked)
+        self._entries = []  # (stim, writer, per-frame values)
+        self._stims = []
+        self._t0 = None
+        self._framePeriod = None
+
+    def add(self, stim, attrib, values, units=None):
+        """Schedule the values of one attribute of a stimulus.
+
+        :Parameters:
+            values :
+                one value per frame (a list or array), or a function
+                returning the value for a given frame number. Values are
+                checked, and computed for functions, now.
+            units : str or None
+                the units of the values, for 'pos' and 'size' only. They
+                are converted to the units of the stimulus now. If None, the
+                values are in the units of the stimulus.
+        """
+        if self.status == STARTED:
+            raise RuntimeError('FrameSchedule: cannot add to a schedule '
+                               'that has been started')
+        if callable(values):
+            if self.nFrames is None:
+                raise ValueError('FrameSchedule: nFrames is needed to '
+                                 'compute %s from a function' % attrib)
+            values = [values(frameN) for frameN in range(self.nFrames)]
+        if self.nFrames is None:
+            self.nFrames = len(values)
+        elif len(values) != self.nFrames:
+            msg = 'FrameSchedule: %i values of %s given for %i frames'
+            raise ValueError(msg % (len(values), attrib, self.nFrames))
+        if not hasattr(stim, attrib):
+            msg = 'FrameSchedule: %s has no attribute %s'
+            raise AttributeError(msg % (stim.__class__.__name__, attrib))
+
+        setter = getattr(type(stim), attrib, None)
+        if isinstance(setter, attributeSetter):
+            direct = _directWriters.get(setter.func)
+            needShaders = direct is not None and direct[2]
+            if needShaders and not getattr(stim, 'useShaders', True):
+                direct = None
+        else:
+            direct = None
+
+        if units is not None:
+            if attrib not in ('pos', 'size'):
+                msg = 'FrameSchedule: units are only used for pos and size'
+                raise ValueError(msg)
+            values = self._convertUnits(stim, values, units)
+        if direct is not None:
+            shape, writer, _ = direct
+            values = self._checkValues(attrib, values, shape)
+            if writer is _writeOri:
+                values = zip(values, _rotationMatrices(values))
+        elif isinstance(setter, attributeSetter):
+            # still checks each value, but skips logging
+            writer = setter.func
+        else:
+            def writer(stim, value):
+                setattr(stim, attrib, value)
+
+        self._entries.append((stim, writer, list(values)))
+        if stim not in self._stims:
+            self._stims.append(stim)
+
+    def _checkValues(self, attrib, values, shape):
+        try:
+            values = numpy.array(values, float)
+        except (TypeError, ValueError):
+            msg = 'FrameSchedule: values of %s should be numbers'
+            raise ValueError(msg % attrib)
+        if shape == (2,) and values.ndim == 1:  # a scalar for each frame
+            values = numpy.repeat(values[:, None], 2, axis=1)
+        if values.shape[1:] != shape:
+            msg = 'FrameSchedule: each value of %s should have shape %s'
+            raise ValueError(msg % (attrib, shape))
+        if not numpy.isfinite(values).all():
+            msg = 'FrameSchedule: values of %s should be finite'
+            raise ValueError(msg % attrib)
+        if shape:
+            # an array for each frame, so that one can be changed in place
+            return [numpy.array(value) for value in values]
+        return values.tolist()
+
+    def _convertUnits(self, stim, values, units):
+        toUnits = stim.units
+        if units == toUnits:
+            return values
+        if toUnits not in _pix2units:
+            msg = 'FrameSchedule: cannot convert %s to %s units'
+            raise ValueError(msg % (units, toUnits))
+        values = numpy.array(values, float)
+        if values.ndim == 1:  # a scalar for each frame; both x and y
+            values = numpy.repeat(values[:, None], 2, axis=1)
+        pix = convertToPix(values, 0, units, stim.win)
+        return _pix2units[toUnits](pix, stim.win)
+
+    def apply(self, frameN):
+        """Set the attributes of the stimuli to their values for frameN
+        (done automatically after each flip once the schedule is started)
+        """
+        for stim, writer, values in self._entries:
+            writer(stim, values[frameN])
+        for stim in self._stims:
+            # as logAttrib would have done
+            for group in stim.__dict__.get('_frozenGroups', ()):
+                group.invalidate()
+        self.frameN = frameN
+
+    def start(self):
+        """Apply the values of the first frame now, and of the next frame
+        after each win.flip()
+        """
+        if not self.nFrames:
+            raise ValueError('FrameSchedule: nothing to schedule')
+        self._framePeriod = self.win.monitorFramePeriod or 1.0 / 60
+        self._t0 = None
+        self.nLate = self.nSkipped = 0
+        self.apply(0)
+        self.status = STARTED
+        if self not in self.win._frameSchedules:
+            self.win._frameSchedules.append(self)
+
+    def stop(self):
+        """Stop applying values (the stimuli keep their current values)
+        """
+        if self in self.win._frameSchedules:
+            self.win._frameSchedules.remove(self)
+        self.status = FINISHED
+
+    def _onFlip(self, now):
+        """Called by win.flip() with the time that frameN was shown
+        """
+        if self._t0 is None:
+            self._t0 = now  # the first frame
+        nextN = self.frameN + 1
+        # refreshes since the frame should have been shown
+        lag = int(round((now - self._t0) / self._framePeriod)) - self.frameN
+        if lag > 0:
+            self.nLate += 1
+            if self.nLate == 1:
+                msg = ('FrameSchedule fell behind: frame %i was shown %i '
+                       'frame(s) late')
+                logging.warning(msg % (self.frameN, lag), t=now)
+            if self.timeLocked:
+                nextN += lag
+                self.nSkipped += min(lag, self.nFrames - self.frameN - 1)
+            else:
+                self._t0 += lag * self._framePeriod  # carry on from here
+        if nextN >= self.nFrames:
+            self.stop()
+            if self.nLate:
+                msg = 'FrameSchedule: %i of %i frames were shown late'
+                logging.warning(msg % (self.nLate, self.nFrames), t=now)
+            return
+        self.apply(nextN)
@@ -31,6 +31,7 @@ from .grating import GratingStim
 import numpy
 
 from . import shaders as _shaders
+from . import texturecache
 
 # we need a different shader program for this (3 textures)
 carrierEnvelopeMaskFrag = '''
@@ -96,6 +97,9 @@ class EnvelopeGrating(GratingStim):
     contrast is 0.5. If moddepth < 1 higher contrasts can be accomodated.
     """
 
+    # drawn by its own display list (see _updateListShaders)
+    _drawWithArrays = False
+
     def __init__(self,
                  win,
                  carrier="noise",
@@ -523,7 +527,7 @@ class EnvelopeGrating(GratingStim):
         """
         GL.glDeleteTextures(1, self._carrierID)
         GL.glDeleteTextures(1, self._envelopeID)
-        GL.glDeleteTextures(1, self._maskID)
+        texturecache.releaseTexture(self, '_maskID')
 
     def _calcEnvCyclesPerStim(self):
         """
@@ -0,0 +1,319 @@
+#!/usr/bin/env python2
+
+"""A group of shapes (ShapeStim, Rect, Polygon, Circle, Line...) drawn
+together in a few OpenGL calls."""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+# Ensure setting pyglet.options['debug_gl'] to False is done prior to any
+# other calls to pyglet or pyglet submodules, otherwise it may not get picked
+# up by the pyglet GL engine and have no effect.
+import pyglet
+pyglet.options['debug_gl'] = False
+GL = pyglet.gl
+
+from psychopy import logging
+from psychopy.visual.basevisual import MinimalStim
+from . import globalVars
+
+import numpy
+
+
+def _fanIndices(nVerts):
+    """Indices (n-2, 3) of the triangles (0, i, i+1) filling a convex
+    polygon of nVerts vertices (what GL_POLYGON draws)."""
+    if nVerts < 3:
+        return numpy.zeros((0, 3), numpy.uint32)
+    second = numpy.arange(1, nVerts - 1, dtype=numpy.uint32)
+    tris = numpy.zeros((nVerts - 2, 3), numpy.uint32)
+    tris[:, 1] = second
+    tris[:, 2] = second + 1
+    return tris
+
+
+def _lineIndices(nVerts, closed):
+    """Indices (n, 2) of the GL_LINES segments of a GL_LINE_LOOP (closed)
+    or GL_LINE_STRIP of nVerts vertices."""
+    if nVerts < 2:
+        return numpy.zeros((0, 2), numpy.uint32)
+    first = numpy.arange(nVerts, dtype=numpy.uint32)
+    segments = numpy.column_stack([first, numpy.roll(first, -1)])
+    if not closed:
+        segments = segments[:-1]
+    return segments
+
+
+class _Member(object):
+    """Where a shape of the batch is in the shared arrays, and the state it
+    was in when they were last filled."""
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.layout = None  # counts and draw settings, a change = rebuild
+        self.verts = None  # the shape's verticesPix when last copied
+        self.border = None  # and its _borderPix
+        self.colors = None
+
+
+class ShapeBatch(MinimalStim):
+    """Draws a group of shapes in a few OpenGL calls.
+
+    The vertices (in pixels) and colors of all the shapes are concatenated
+    into shared arrays: the fills are drawn as triangles by one
+    glDrawArrays() call and the outlines as segments by one glDrawElements()
+    call (more if the shapes differ in lineWidth or interpolate). This is
+    much faster than drawing hundreds of shapes one by one.
+
+    The shapes remain normal stimuli: they can be changed (pos, ori, size,
+    vertices, colors, opacity...) and used for contains() / overlaps() as
+    usual, the batch copies the vertices or colors of the shapes that
+    changed when it is next drawn. Only shapes whose number of vertices,
+    lineWidth, closeShape or interpolate changed cause the arrays to be
+    rebuilt. Don't draw the shapes themselves (or set their autoDraw) as
+    well as the batch.
+
+    Within a batch all the fills are drawn before all the outlines, so an
+    outline is never hidden by the fill of a later shape.
+
+    Example::
+
+        dots = [visual.Circle(win, radius=5, pos=xy, units='pix',
+                              fillColor='white') for xy in positions]
+        batch = visual.ShapeBatch(win, dots)
+        ...
+        dots[3].fillColor = 'red'  # updated on the next draw
+        batch.draw()
+
+    :Parameters:
+        shapes : list of BaseShapeStim
+            the shapes (BaseShapeStim, ShapeStim and their subclasses) of
+            the batch, all in the window win. More can be added with
+            add() and removed with remove().
+        depth :
+            as for other stimuli, the depth of the batch if it is
+            drawn with autoDraw.
+    """
+
+    def __init__(self, win, shapes=(), depth=0, name=None, autoLog=None,
+                 autoDraw=False):
+        # what local vars are defined (these are the init params) for use by
+        # __repr__
+        self._initParams = dir()
+        self._initParams.remove('self')
+        super(ShapeBatch, self).__init__(name=name, autoLog=False)
+        self.autoLog = False  # until all params are set
+        self.win = win
+        self.depth = depth
+        self._members = []
+        self._needRebuild = True
+        self.add(*shapes)
+        self.autoDraw = autoDraw
+
+        # set autoLog now that params have been initialised
+        wantLog = autoLog is None and self.win.autoLog
+        self.__dict__['autoLog'] = autoLog or wantLog
+        if self.autoLog:
+            logging.exp("Created %s = %s" % (self.name, str(self)))
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return (member.shape for member in self._members)
+
+    def __contains__(self, shape):
+        return any(member.shape is shape for member in self._members)
+
+    @property
+    def shapes(self):
+        """The list of shapes in the batch, in drawing order (read-only,
+        use add() and remove() to change it)."""
+        return list(self)
+
+    def add(self, *shapes):
+        """Add one or more shapes to the end of the batch."""
+        for shape in shapes:
+            if shape.win is not self.win:
+                msg = "%s can't be added to %s: it is in a different window"
+                raise ValueError(msg % (shape.name, self.name))
+            if shape in self:
+                continue
+            self._members.append(_Member(shape))
+        self._needRebuild = True
+
+    def remove(self, shape):
+        """Remove a shape from the batch."""
+        for member in self._members:
+            if member.shape is shape:
+                self._members.remove(member)
+                self._needRebuild = True
+                return
+        msg = "%s is not in %s" % (shape.name, self.name)
+        raise ValueError(msg)
+
+    def _selectWindow(self, win):
+        # don't call switch if it's already the curr window
+        if win != globalVars.currWindow and win.winType == 'pyglet':
+            win.winHandle.switch_to()
+            globalVars.currWindow = win
+
+    def _getShapeState(self, shape):
+        """Returns (fill vertices, border vertices, layout, colors) of a
+        shape as it would draw itself now."""
+        verts = shape.verticesPix  # checks whether it needs updating
+        if hasattr(shape, 'border'):
+            # ShapeStim: tesselated triangles and a separate border
+            border = shape._borderPix
+            tesselated = True
+        else:
+            border = verts
+            tesselated = False
+        nFill = 0
+        if shape.fillRGB is not None and len(verts) > 2:
+            if not tesselated:
+                nFill = 3 * (len(verts) - 2)
+            elif shape.closeShape:
+                nFill = len(verts)
+        nLine = 0
+        if shape.lineRGB is not None and shape.lineWidth:
+            nLine = len(border)
+        layout = (nFill, nLine, tesselated, bool(shape.closeShape),
+                  bool(shape.interpolate), shape.lineWidth)
+        colors = (
+            None if not nFill else tuple(
+                shape._getDesiredRGB(shape.fillRGB, shape.fillColorSpace,
+                                     shape.contrast)),
+            None if not nLine else tuple(
+                shape._getDesiredRGB(shape.lineRGB, shape.lineColorSpace,
+                                     shape.contrast)),
+            shape.opacity)
+        return verts, border, layout, colors
+
+    def _rebuild(self, states):
+        """Allocate the shared arrays and the runs of draw calls for the
+        current members."""
+        nFill = nLine = nSegments = 0
+        fillRuns = []  # [interpolate, first, count]
+        lineRuns = []  # [(interpolate, lineWidth), first, count]
+        segments = []
+        for member, (verts, border, layout, colors) in zip(self._members,
+                                                           states):
+            memberFill, memberLine = layout[:2]
+            member.layout = None  # so that its contents are copied below
+            member.fillStart = nFill
+            member.lineStart = nLine
+            interpolate = layout[4]
+            if memberFill:
+                if fillRuns and fillRuns[-1][0] == interpolate:
+                    fillRuns[-1][2] += memberFill
+                else:
+                    fillRuns.append([interpolate, nFill, memberFill])
+                nFill += memberFill
+            if memberLine:
+                memberSegments = _lineIndices(memberLine, layout[3])
+                segments.append(memberSegments + nLine)
+                lineKey = (interpolate, layout[5])
+                if lineRuns and lineRuns[-1][0] == lineKey:
+                    lineRuns[-1][2] += len(memberSegments)
+                else:
+                    lineRuns.append([lineKey, nSegments, len(memberSegments)])
+                nLine += memberLine
+                nSegments += len(memberSegments)
+        self._fillVerts = numpy.zeros((nFill, 2), numpy.float32)
+        self._fillColors = numpy.zeros((nFill, 4), numpy.float32)
+        self._lineVerts = numpy.zeros((nLine, 2), numpy.float32)
+        self._lineColors = numpy.zeros((nLine, 4), numpy.float32)
+        if segments:
+            self._segments = numpy.concatenate(segments).astype(numpy.uint32)
+        else:
+            self._segments = numpy.zeros((0, 2), numpy.uint32)
+        self._fillRuns = fillRuns
+        self._lineRuns = lineRuns
+        self._needRebuild = False
+
+    def _updateArrays(self):
+        """Copy the vertices and colors of the shapes that changed since the
+        last draw into the shared arrays (rebuilding them if needed)."""
+        states = [self._getShapeState(member.shape)
+                  for member in self._members]
+        if self._needRebuild or any(
+                member.layout != state[2]
+                for member, state in zip(self._members, states)):
+            self._rebuild(states)
+        for member, (verts, border, layout, colors) in zip(self._members,
+                                                           states):
+            new = member.layout is None
+            nFill, nLine, tesselated = layout[:3]
+            fill = slice(member.fillStart, member.fillStart + nFill)
+            line = slice(member.lineStart, member.lineStart + nLine)
+            if new or verts is not member.verts:
+                if nFill and tesselated:
+                    self._fillVerts[fill] = verts
+                elif nFill:
+                    self._fillVerts[fill] = verts[_fanIndices(len(verts))
+                                                  .ravel()]
+                if nLine and not tesselated:
+                    self._lineVerts[line] = verts
+            if nLine and tesselated and (new or border is not member.border):
+                self._lineVerts[line] = border
+            if new or colors != member.colors:
+                fillRGB, lineRGB, opacity = colors
+                if nFill:
+                    self._fillColors[fill, :3] = fillRGB
+                    self._fillColors[fill, 3] = opacity
+                if nLine:
+                    self._lineColors[line, :3] = lineRGB
+                    self._lineColors[line, 3] = opacity
+            member.layout = layout
+            member.verts = verts
+            member.border = border
+            member.colors = colors
+
+    def draw(self, win=None):
+        """Draw all the shapes of the batch (fills first, then outlines).
+        """
+        if win is None:
+            win = self.win
+        self._selectWindow(win)
+        self._updateArrays()
+
+        GL.glPushMatrix()  # push before drawing, pop after
+        win.setScale('pix')
+        # load Null textures into multitexteureARB - or they modulate glColor
+        GL.glActiveTexture(GL.GL_TEXTURE0)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+        GL.glActiveTexture(GL.GL_TEXTURE1)
+        GL.glEnable(GL.GL_TEXTURE_2D)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
+        GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glEnableClientState(GL.GL_COLOR_ARRAY)
+        if self._fillRuns:
+            GL.glVertexPointer(2, GL.GL_FLOAT, 0, self._fillVerts.ctypes)
+            GL.glColorPointer(4, GL.GL_FLOAT, 0, self._fillColors.ctypes)
+            for interpolate, first, count in self._fillRuns:
+                self._setInterpolate(interpolate)
+                GL.glDrawArrays(GL.GL_TRIANGLES, first, count)
+        if self._lineRuns:
+            GL.glVertexPointer(2, GL.GL_FLOAT, 0, self._lineVerts.ctypes)
+            GL.glColorPointer(4, GL.GL_FLOAT, 0, self._lineColors.ctypes)
+            for (interpolate, lineWidth), first, count in self._lineRuns:
+                self._setInterpolate(interpolate)
+                GL.glLineWidth(lineWidth)
+                segments = self._segments[first:first + count]
+                GL.glDrawElements(GL.GL_LINES, 2 * count, GL.GL_UNSIGNED_INT,
+                                  segments.ctypes)
+        GL.glDisableClientState(GL.GL_COLOR_ARRAY)
+        GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+        GL.glPopMatrix()
+
+    def _setInterpolate(self, interpolate):
+        if interpolate:
+            GL.glEnable(GL.GL_LINE_SMOOTH)
+            GL.glEnable(GL.GL_MULTISAMPLE)
+        else:
+            GL.glDisable(GL.GL_LINE_SMOOTH)
+            GL.glDisable(GL.GL_MULTISAMPLE)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python2
+
+"""Test many points against many stimuli at once (e.g. every eye sample of
+a frame against a set of areas of interest).
+
+A SpatialIndex keeps the bounding boxes of the outlines (verticesPix, or
+the border of shapes) of its stimuli in a uniform grid. A query looks up
+the stimuli whose box could hold each point in the grid, then tests those
+points against the outline of each stimulus in a single vectorized call.
+Stimuli are checked for moving (new vertices) at each query, and only the
+grid is rebuilt then.
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import numpy
+
+from psychopy.tools.monitorunittools import convertToPix
+from psychopy.visual.helpers import pointsInPolygon
+
+
+class SpatialIndex(object):
+    """An index of the outlines of stimuli for hit testing many points.
+
+    :Parameters:
+        stimuli : list
+            stimuli with verticesPix (any BaseVisualStim, ShapeStim...),
+            all in the same window
+        maxCells : int
+            the grid has at most maxCells x maxCells cells
+
+    Example::
+
+        aois = visual.SpatialIndex([face, house, fixation])
+        hits = aois.contains(gazeSamples)  # N x 3 booleans
+        samplesOnFace = hits[:, 0].sum()
+    """
+
+    def __init__(self, stimuli=(), maxCells=64):
+        super(SpatialIndex, self).__init__()
+        self.maxCells = maxCells
+        self.stimuli = []
+        self._polys = []
+        self._boxes = numpy.zeros((0, 4))  # xmin, ymin, xmax, ymax
+        self._needGridUpdate = True
+        self.add(*stimuli)
+
+    def __len__(self):
+        return len(self.stimuli)
+
+    def add(self, *stimuli):
+        """Add stimuli to the index (as the last columns of the results).
+        """
+        self.stimuli.extend(stimuli)
+        self._polys.extend([None] * len(stimuli))
+        self._boxes = numpy.vstack([self._boxes,
+                                    numpy.zeros((len(stimuli), 4))])
+        self._needGridUpdate = True
+
+    def remove(self, stim):
+        """Remove a stimulus from the index."""
+        index = self.stimuli.index(stim)
+        del self.stimuli[index]
+        del self._polys[index]
+        self._boxes = numpy.delete(self._boxes, index, axis=0)
+        self._needGridUpdate = True
+
+    def _updateBoxes(self):
+        """Update the bounding boxes of the stimuli whose vertices changed
+        (verticesPix is a new array whenever a stimulus is moved, resized,
+        rotated...)."""
+        for index, stim in enumerate(self.stimuli):
+            if hasattr(stim, 'border'):
+                poly = stim._borderPix  # the property updates if needed
+            else:
+                poly = stim.verticesPix
+            if poly is not self._polys[index]:
+                self._polys[index] = poly
+                self._boxes[index, :2] = poly.min(axis=0)
+                self._boxes[index, 2:] = poly.max(axis=0)
+                self._needGridUpdate = True
+        if self._needGridUpdate:
+            self._updateGrid()
+
+    def _updateGrid(self):
+        """Put each stimulus into the grid cells its box overlaps, as a
+        compressed list: the stimuli of cell c are
+        _cellStims[_cellStarts[c]:_cellStarts[c + 1]]."""
+        self._needGridUpdate = False
+        boxes = self._boxes
+        if not len(boxes):
+            self._cellStarts = numpy.zeros(2, int)
+            self._cellStims = numpy.zeros(0, int)
+            self._origin = numpy.zeros(2)
+            self._cellSize = numpy.ones(2)
+            self._nCells = numpy.ones(2, int)
+            return
+        self._origin = boxes[:, :2].min(axis=0)
+        extent = boxes[:, 2:].max(axis=0) - self._origin
+        # cells about the size of the typical stimulus
+        typical = numpy.median(boxes[:, 2:] - boxes[:, :2], axis=0)
+        typical = numpy.maximum(typical, extent / self.maxCells)
+        self._nCells = numpy.clip(numpy.ceil(extent / numpy.maximum(typical,
+                                                                    1e-9)),
+                                  1, self.maxCells).astype(int)
+        self._cellSize = numpy.maximum(extent / self._nCells, 1e-9)
+        first = self._cellOf(boxes[:, :2])
+        last = self._cellOf(boxes[:, 2:])
+        cells = []
+        stims = []
+        for index in range(len(boxes)):
+            cx, cy = numpy.mgrid[first[index, 0]:last[index, 0] + 1,
+                                 first[index, 1]:last[index, 1] + 1]
+            boxCells = (cy * self._nCells[0] + cx).ravel()
+            cells.append(boxCells)
+            stims.append(numpy.repeat(index, len(boxCells)))
+        cells = numpy.concatenate(cells)
+        stims = numpy.concatenate(stims)
+        order = numpy.argsort(cells, kind='mergesort')
+        self._cellStims = stims[order]
+        counts = numpy.bincount(cells, minlength=self._nCells.prod())
+        self._cellStarts = numpy.concatenate([[0], numpy.cumsum(counts)])
+
+    def _cellOf(self, xy):
+        """The (column, row) of the grid cell of points (N, 2), clipped to
+        the grid."""
+        cell = numpy.floor((xy - self._origin) / self._cellSize).astype(int)
+        return numpy.clip(cell, 0, self._nCells - 1)
+
+    def contains(self, points, units=None):
+        """Returns a boolean array (N, M) with True where point n is inside
+        stimulus m (as stimulus.contains(point)).
+
+        `points` is an array (N, 2) of (x, y), in the units of the window
+        by default.
+        """
+        points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+        result = numpy.zeros((len(points), len(self.stimuli)), bool)
+        if not len(points) or not self.stimuli:
+            return result
+        win = self.stimuli[0].win
+        if units is None:
+            units = win.units
+        if units != 'pix':
+            points = convertToPix(points, pos=(0, 0), units=units, win=win)
+        self._updateBoxes()
+
+        # candidate (point, stimulus) pairs from the grid cells
+        cell = self._cellOf(points)
+        cell = cell[:, 1] * self._nCells[0] + cell[:, 0]
+        starts = self._cellStarts[cell]
+        counts = self._cellStarts[cell + 1] - starts
+        pointIndices = numpy.repeat(numpy.arange(len(points)), counts)
+        offsets = numpy.arange(counts.sum()) - numpy.repeat(
+            numpy.cumsum(counts) - counts, counts)
+        stimIndices = self._cellStims[numpy.repeat(starts, counts) + offsets]
+        # ... that are within the bounding box
+        xy = points[pointIndices]
+        boxes = self._boxes[stimIndices]
+        inBox = ((xy >= boxes[:, :2]) & (xy <= boxes[:, 2:])).all(axis=1)
+        pointIndices = pointIndices[inBox]
+        stimIndices = stimIndices[inBox]
+
+        order = numpy.argsort(stimIndices, kind='mergesort')
+        pointIndices = pointIndices[order]
+        stimIndices = stimIndices[order]
+        bounds = numpy.flatnonzero(numpy.diff(stimIndices)) + 1
+        for group in numpy.split(numpy.arange(len(stimIndices)), bounds):
+            if not len(group):
+                continue
+            stim = stimIndices[group[0]]
+            candidates = pointIndices[group]
+            result[candidates, stim] = pointsInPolygon(points[candidates],
+                                                       self._polys[stim])
+        return result
+
+    def whichContain(self, point, units=None):
+        """Returns the list of stimuli containing a point (x, y)."""
+        hits = self.contains([point], units=units)[0]
+        return [self.stimuli[index] for index in numpy.flatnonzero(hits)]
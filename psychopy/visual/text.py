@@ -8,6 +8,7 @@
 # Distributed under the terms of the GNU General Public License (GPL).
 
 import os
+import imp
 import glob
 
 # Ensure setting pyglet.options['debug_gl'] to False is done prior to any
@@ -28,13 +29,17 @@ import psychopy.event
 from psychopy.tools.monitorunittools import cm2pix, deg2pix, convertToPix
 from psychopy.tools.attributetools import attributeSetter, setAttribute
 from psychopy.visual.basevisual import BaseVisualStim, ColorMixin
+from psychopy.visual import textcache
 
 import numpy
 
 try:
-    import pygame
+    # pygame is only imported when first used (by pygame windows)
+    imp.find_module('pygame')
+    from psychopy.contrib.lazy_import import lazy_import
+    lazy_import(globals(), "import pygame")
     havePygame = True
-except Exception:
+except ImportError:
     havePygame = False
 
 defaultLetterHeight = {'cm': 1.0,
@@ -96,6 +101,11 @@ class TextStim(BaseVisualStim, ColorMixin):
         (``myTextStim.text = myTextStim.text``) when you've changed the
         parameters.
 
+        Laid out text is cached and shared between TextStims, so setting
+        text that has been shown before (with the same font, height,
+        wrapWidth, alignment and color) is fast. Use
+        :meth:`~TextStim.preloadText` to lay out text in advance.
+
         In general, other attributes which merely affect the presentation of
         unchanged shapes are as fast as usual. This includes ``pos``,
         ``opacity`` etc.
@@ -204,9 +214,10 @@ class TextStim(BaseVisualStim, ColorMixin):
         """
         self.__dict__['font'] = None  # until we find one
         if self.win.winType == "pyglet":
-            self._font = pyglet.font.load(font, int(self._heightPix),
-                                          dpi=72, italic=self.italic,
-                                          bold=self.bold)
+            self._font = textcache.getFont(pyglet.font.load, font,
+                                           int(self._heightPix), dpi=72,
+                                           italic=self.italic,
+                                           bold=self.bold)
             self.__dict__['font'] = font
         else:
             if font is None or len(font) == 0:
@@ -284,15 +295,47 @@ class TextStim(BaseVisualStim, ColorMixin):
         """
         setAttribute(self, 'text', text, log)
 
+    def preloadText(self, texts):
+        """Lay out a list of strings in advance with the current font,
+        height, wrapWidth, alignment and color, e.g. the words of an RSVP
+        stream before a block. Setting the text to one of them is then fast.
+
+        Only applies to pyglet windows.
+        """
+        if self.win.winType != "pyglet":
+            return
+        for text in texts:
+            self._getPygletText(unicode(text))
+
+    def _pygletTextColor(self):
+        if self.useShaders:
+            return (1.0, 1.0, 1.0, self.opacity)
+        desiredRGB = self._getDesiredRGB(self.rgb, self.colorSpace,
+                                         self.contrast)
+        return (desiredRGB[0], desiredRGB[1], desiredRGB[2], self.opacity)
+
+    def _getPygletText(self, text):
+        """Returns the (cached) pyglet text object for text, laid out
+        with the current settings
+        """
+        color = self._pygletTextColor()
+        key = textcache.layoutKey(text, self.font, self._heightPix,
+                                  self.bold, self.italic, self._wrapWidthPix,
+                                  self.alignHoriz, self.alignVert, color)
+
+        def createText():
+            return pyglet.font.Text(
+                self._font, text,
+                halign=self.alignHoriz, valign=self.alignVert,
+                color=color,
+                width=self._wrapWidthPix)  # width of the frame
+        return textcache.getLayout(key, createText)
+
     def _setTextShaders(self, value=None):
         """Set the text to be rendered using the current font
         """
         if self.win.winType == "pyglet":
-            self._pygletTextObj = pyglet.font.Text(
-                self._font, self.text,
-                halign=self.alignHoriz, valign=self.alignVert,
-                color=(1.0, 1.0, 1.0, self.opacity),
-                width=self._wrapWidthPix)  # width of the frame
+            self._pygletTextObj = self._getPygletText(self.text)
             # self._pygletTextObj = pyglet.text.Label(
             #       self.text,self.font, int(self._heightPix),
             #      anchor_x=self.alignHoriz,
@@ -422,12 +465,7 @@ class TextStim(BaseVisualStim, ColorMixin):
         desiredRGB = self._getDesiredRGB(self.rgb, self.colorSpace,
                                          self.contrast)
         if self.win.winType == "pyglet":
-            self._pygletTextObj = pyglet.font.Text(
-                self._font, self.text,
-                halign=self.alignHoriz, valign=self.alignVert,
-                color=(desiredRGB[0], desiredRGB[1], desiredRGB[2],
-                       self.opacity),
-                width=self._wrapWidthPix)  # width of the frame
+            self._pygletTextObj = self._getPygletText(self.text)
 
             self.width = self._pygletTextObj.width
             self._fontHeightPix = self._pygletTextObj.height
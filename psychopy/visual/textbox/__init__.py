@@ -14,15 +14,16 @@ import numpy as np
 from psychopy import core, misc, colors
 import psychopy.tools.colorspacetools as colortools
 import psychopy.tools.arraytools as arraytools
+from psychopy.visual.frozen import FrozenGroup
 import pyglet
 pyglet.options['debug_gl'] = False
 from pyglet.gl import (glCallList, glFinish, glGenLists, glNewList, glViewport,
                        glMatrixMode, glLoadIdentity, glDisable, glEnable, glColorMaterial,
-                       glBlendFunc, glTranslatef, glColor4f, glRectf, glLineWidth, glBegin,
+                       glBlendFuncSeparate, glTranslatef, glColor4f, glRectf, glLineWidth, glBegin,
                        GL_LINES, glVertex2d, glEndList, glClearColor, gluOrtho2D, glOrtho,
                        glDeleteLists, GL_COMPILE, GL_PROJECTION, GL_MODELVIEW, glEnd,
                        GL_DEPTH_TEST, GL_BLEND, GL_COLOR_MATERIAL, GL_FRONT_AND_BACK,
-                       GL_AMBIENT_AND_DIFFUSE, GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+                       GL_AMBIENT_AND_DIFFUSE, GL_SRC_ALPHA, GL_ONE, GL_ONE_MINUS_SRC_ALPHA,
                        glIsEnabled, GL_LINE_SMOOTH, GLint, GLfloat, glGetIntegerv,
                        GL_LINE_WIDTH, glGetFloatv, GL_ALIASED_LINE_WIDTH_RANGE,
                        GL_SMOOTH_LINE_WIDTH_RANGE, GL_SMOOTH_LINE_WIDTH_GRANULARITY,
@@ -288,7 +289,9 @@ class TextBox(object):
                  grid_vert_justification='top',  # 'top', 'bottom', 'center'
                  autoLog=True,              # Log each time stim is updated.
                  interpolate=False,
-                 name=None
+                 name=None,
+                 freeze=False               # Draw from a texture, rendered
+                 # again only when the TextBox changes.
                  ):
         self._window = proxy(window)
 
@@ -318,6 +321,10 @@ class TextBox(object):
         self._draw_end_dlist = None
         self._draw_te_background_dlist = None
 
+        # (a proxy, so that the group does not keep the TextBox alive)
+        self._frozen = FrozenGroup(window, [proxy(self)], enabled=freeze)
+        self._frozen_dlists = None
+
         if TextBox._gl_info is None:
             TextBox._gl_info = getGLInfo()
 
@@ -949,12 +956,25 @@ class TextBox(object):
         to a call to win.flip(), the textBox will not be displayed for that
         retrace.
         """
+        if not self._frozen.rendering:
+            # the setters delete the display lists that they change, so
+            # render the TextBox again if any has been deleted
+            if self._getDisplayLists() != self._frozen_dlists:
+                self._frozen.invalidate()
+            self._frozen.draw()
+            self._frozen_dlists = self._getDisplayLists()
+            return
         self._te_start_gl()
         self._te_bakground_dlist()
         self._text_grid._text_glyphs_gl()
         self._text_grid._textgrid_lines_gl()
         self._te_end_gl()
 
+    def _getDisplayLists(self):
+        return (self._draw_start_dlist, self._draw_te_background_dlist,
+                self._draw_end_dlist, self._text_grid._text_dlist,
+                self._text_grid._gridlines_dlist)
+
     def _te_start_gl(self):
         if not self._draw_start_dlist:
             dl_index = glGenLists(1)
@@ -971,7 +991,10 @@ class TextBox(object):
             glEnable(GL_BLEND)
             glEnable(GL_COLOR_MATERIAL)
             glColorMaterial(GL_FRONT_AND_BACK, GL_AMBIENT_AND_DIFFUSE)
-            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            # blends colors as glBlendFunc does, but keeps the alpha right
+            # when the TextBox is rendered into a FrozenGroup texture
+            glBlendFuncSeparate(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA,
+                                GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
             if self._interpolate:
                 glEnable(GL_LINE_SMOOTH)
                 glEnable(GL_POLYGON_SMOOTH)
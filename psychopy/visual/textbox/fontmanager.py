@@ -8,9 +8,12 @@ Created on Sun Nov 10 12:18:45 2013
 from __future__ import print_function
 import os
 import math
+import hashlib
+import cPickle
 import numpy as np
 import unicodedata as ud
 from matplotlib import font_manager
+from psychopy import prefs, logging
 from psychopy.core import getTime
 
 try:
@@ -33,6 +36,154 @@ def nextPow2(n):
     return int(pow(2, ceil(log(n, 2))))
 
 
+def fileHash(path, block_size=2 ** 20):
+    """The sha1 hex digest of the contents of a file"""
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), ''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class FontCache(object):
+    """Stores what is slow to create for a font on disk, so that it is only
+    done once rather than every time a script starts:
+
+        - the FontInfo of each font file, which is reused until the file's
+          modification time or size changes.
+        - the rendered glyph bitmaps and metrics of each MonospaceFontAtlas,
+          keyed on the font file's hash, the size and the dpi. The bitmaps
+          are memory mapped when loaded.
+
+    By default the cache is in the fontCache folder of the user prefs
+    folder. If it cannot be written to, fonts work as without a cache.
+    """
+    version = 1  # increase if what is cached, or how it is rendered, changes
+
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.path.join(prefs.paths['userPrefsDir'],
+                                     'fontCache')
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(
+            cache_dir, 'fontIndex_v%i.pickle' % self.version)
+        self._index = None  # {path: (mtime, size, FontInfo dict or None)}
+        self._index_changed = False
+
+    def _getIndex(self):
+        if self._index is None:
+            self._index = {}
+            if os.path.isfile(self.index_path):
+                try:
+                    with open(self.index_path, 'rb') as f:
+                        self._index = cPickle.load(f)
+                except Exception as e:
+                    logging.warning('Could not load the font index %s: %s'
+                                    % (self.index_path, e))
+        return self._index
+
+    def getFontInfo(self, path):
+        """Returns the FontInfo stored for the font file at path, or None if
+        it is not a font. Raises KeyError if path is not in the index or
+        has changed since it was added.
+        """
+        stat = os.stat(path)
+        mtime, size, info = self._getIndex()[path]
+        if (mtime, size) != (stat.st_mtime, stat.st_size):
+            raise KeyError(path)
+        if info is None:
+            return None
+        return FontInfo.fromDict(info)
+
+    def setFontInfo(self, path, font_info):
+        """Add the FontInfo for the font file at path (None if it is not a
+        font) to the index. Call saveIndex() to write it to disk.
+        """
+        stat = os.stat(path)
+        if font_info is not None:
+            font_info = font_info.asdict()
+        self._getIndex()[path] = (stat.st_mtime, stat.st_size, font_info)
+        self._index_changed = True
+
+    def saveIndex(self):
+        """Write the font index to disk, if it changed"""
+        if self._index_changed:
+            self._write(self.index_path, lambda f: cPickle.dump(
+                self._index, f, cPickle.HIGHEST_PROTOCOL))
+            self._index_changed = False
+
+    def getFileHash(self, font_info):
+        """The hash of the font file of font_info, computed the first time
+        it is needed and then stored in the index"""
+        if font_info.file_hash is None:
+            font_info.file_hash = fileHash(font_info.path)
+            try:
+                self.setFontInfo(font_info.path, font_info)
+                self.saveIndex()
+            except OSError:
+                pass
+        return font_info.file_hash
+
+    def _getAtlasPaths(self, font_info, size, dpi):
+        name = '%s_%d_%d_v%i' % (self.getFileHash(font_info), size, dpi,
+                                 self.version)
+        path = os.path.join(self.cache_dir, name)
+        return path + '.npy', path + '.pickle'
+
+    def loadAtlas(self, font_info, size, dpi):
+        """Returns (bitmaps, metrics) of a saved font atlas, or None if
+        there is none. bitmaps is a read-only memory mapped array.
+        """
+        bitmap_path, metrics_path = self._getAtlasPaths(font_info, size, dpi)
+        if not os.path.isfile(metrics_path):
+            return None
+        try:
+            with open(metrics_path, 'rb') as f:
+                metrics = cPickle.load(f)
+            bitmaps = np.load(bitmap_path, mmap_mode='r')
+        except Exception as e:
+            logging.warning('Could not load the font atlas %s: %s'
+                            % (metrics_path, e))
+            return None
+        return bitmaps, metrics
+
+    def saveAtlas(self, font_info, size, dpi, bitmaps, metrics):
+        """Save the bitmaps (array) and metrics (dict) of a font atlas"""
+        bitmap_path, metrics_path = self._getAtlasPaths(font_info, size, dpi)
+        # the metrics are written last, as loadAtlas looks for them first
+        if self._write(bitmap_path, lambda f: np.save(f, bitmaps)):
+            self._write(metrics_path, lambda f: cPickle.dump(
+                metrics, f, cPickle.HIGHEST_PROTOCOL))
+
+    def clear(self):
+        """Delete all cached fonts and atlases"""
+        self._index = {}
+        self._index_changed = False
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if os.path.splitext(name)[1] in ('.npy', '.pickle', '.tmp'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def _write(self, path, writeFunc):
+        # write to a temporary file and then rename it, so that another
+        # process never loads a partly written file
+        tmp_path = '%s.%i.tmp' % (path, os.getpid())
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmp_path, 'wb') as f:
+                writeFunc(f)
+            if os.path.exists(path):
+                os.remove(path)  # (rename does not replace on Windows)
+            os.rename(tmp_path, path)
+        except (IOError, OSError) as e:
+            logging.warning('Could not write to the font cache: %s' % e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+
 class FontManager(object):
     """FontManager provides a simple API for finding and loading font files
     (.ttf) via the FreeType lib
@@ -56,7 +207,9 @@ class FontManager(object):
 
     Once a font of a given size and dpi has been created; it is cached by the
     FontManager and can be used by all TextBox instances created within the
-    experiment.
+    experiment. The font file information and the rendered fonts are also
+    stored on disk by a FontCache, so later runs of the script do not need to
+    scan the font files or render the fonts again.
 
     """
     freetype_import_error = None
@@ -65,12 +218,15 @@ class FontManager(object):
     _available_font_info = {}
     font_store = None
 
-    def __init__(self, monospace_only=True):
+    def __init__(self, monospace_only=True, font_cache=None):
         # if FontManager.freetype_import_error:
         #    raise Exception('Appears the freetype library could not load.
         #       Error: %s'%(str(FontManager.freetype_import_error)))
 
         self.load_monospace_only = monospace_only
+        if font_cache is None:
+            font_cache = FontCache()
+        self.font_cache = font_cache
         self.updateFontInfo(monospace_only)
 
     def getFontFamilyNames(self):
@@ -145,15 +301,11 @@ class FontManager(object):
         fi_list = []
         for fp in font_paths:
             if os.path.isfile(fp) and os.path.exists(fp):
-                try:
-                    face = Face(fp)
-                    if monospace_only:
-                        if face.is_fixed_width:
-                            fi_list.append(self._createFontInfo(fp, face))
-                    else:
-                        fi_list.append(self._createFontInfo(fp, face))
-                except Exception:
-                    pass
+                fi = self._getFontInfo(fp)
+                if fi is not None and (fi.monospace or not monospace_only):
+                    fi_list.append(self._addFontInfo(fi))
+        if self.font_cache:
+            self.font_cache.saveIndex()
 
         self.font_family_styles.sort()
 
@@ -214,7 +366,8 @@ class FontManager(object):
             font_atlas = fm.font_atlas_dict.get(fid)
             if font_atlas is None:
                 font_atlas = fm.font_atlas_dict.setdefault(
-                    fid, MonospaceFontAtlas(font_info, size, dpi))
+                    fid, MonospaceFontAtlas(font_info, size, dpi,
+                                            fm.font_cache))
                 font_atlas.createFontAtlas()
             if fm.font_store:
                 t1 = getTime()
@@ -260,18 +413,34 @@ class FontManager(object):
             bold = True
         return bold, italic
 
-    def _createFontInfo(self, fp, fface):
-        fns = (fface.family_name, fface.style_name)
+    def _getFontInfo(self, fp):
+        """Returns the FontInfo for the font file fp (from the font cache if
+        the file has not changed), or None if FreeType cannot load it.
+        """
+        if self.font_cache:
+            try:
+                return self.font_cache.getFontInfo(fp)
+            except KeyError:
+                pass
+        try:
+            fi = FontInfo(fp, Face(fp))
+        except Exception:
+            fi = None
+        if self.font_cache:
+            self.font_cache.setFontInfo(fp, fi)
+        return fi
+
+    def _addFontInfo(self, fi):
+        fns = (fi.family_name, fi.style_name)
         if fns in self.font_family_styles:
             pass
         else:
             self.font_family_styles.append(
-                (fface.family_name, fface.style_name))
+                (fi.family_name, fi.style_name))
 
         styles_for_font_dict = self._available_font_info.setdefault(
-            fface.family_name, {})
-        fonts_for_style = styles_for_font_dict.setdefault(fface.style_name, [])
-        fi = FontInfo(fp, fface)
+            fi.family_name, {})
+        fonts_for_style = styles_for_font_dict.setdefault(fi.style_name, [])
         fonts_for_style.append(fi)
         return fi
 
@@ -301,6 +470,15 @@ class FontInfo(object):
         self.charmap_id = face.charmap.index
         self.label = "%s_%s" % (face.family_name, face.style_name)
         self.id = self.label
+        self.file_hash = None  # see FontCache.getFileHash
+
+    @classmethod
+    def fromDict(cls, d):
+        """Create a FontInfo from the dict returned by asdict(), without
+        loading the font file"""
+        fi = cls.__new__(cls)
+        fi.__dict__.update(d)
+        return fi
 
     def getID(self):
         return self.id
@@ -315,13 +493,14 @@ class FontInfo(object):
 
 class MonospaceFontAtlas(object):
 
-    def __init__(self, font_info, size, dpi):
+    def __init__(self, font_info, size, dpi, font_cache=None):
         self.font_info = font_info
         self.size = size
         self.dpi = dpi
         self.id = self.getIdFromArgs(font_info, size, dpi)
-        self._face = Face(font_info.path)
-        self._face.set_char_size(height=self.size * 64, vres=self.dpi)
+        self.font_cache = font_cache
+        self.from_cache = False
+        self._face = None  # only loaded if the atlas needs to be rendered
 
         self.charcode2glyph = None
         self.charcode2unichr = None
@@ -342,9 +521,47 @@ class MonospaceFontAtlas(object):
         return "%s_%d_%d" % (font_info.getID(), size, dpi)
 
     def createFontAtlas(self):
+        """Render the glyphs of the font into a texture atlas (or load them
+        from the font cache) and create the display lists to draw them.
+        """
         if self.atlas:
-            self.atlas.free()
+            self.atlas.texid = None
             self.atlas = None
+        self.from_cache = self._loadCachedAtlas()
+        if not self.from_cache:
+            self._renderAtlas()
+            if self.font_cache:
+                self.font_cache.saveAtlas(self.font_info, self.size, self.dpi,
+                                          self.atlas.data, self._getMetrics())
+        self.atlas.upload()
+        self.createDisplayLists()
+        self._face = None
+
+    _metric_names = ('charcode2glyph', 'max_ascender', 'max_descender',
+                     'max_tile_width', 'max_tile_height', 'max_bitmap_size',
+                     'total_bitmap_area')
+
+    def _getMetrics(self):
+        return dict((name, getattr(self, name))
+                    for name in self._metric_names)
+
+    def _loadCachedAtlas(self):
+        if not self.font_cache:
+            return False
+        cached = self.font_cache.loadAtlas(self.font_info, self.size,
+                                           self.dpi)
+        if cached is None:
+            return False
+        bitmaps, metrics = cached
+        for name in self._metric_names:
+            setattr(self, name, metrics[name])
+        self.charcode2unichr = dict(
+            (charcode, glyph['unichar'])
+            for charcode, glyph in self.charcode2glyph.iteritems())
+        self.atlas = TextureAtlas.fromArray(bitmaps)
+        return True
+
+    def _renderAtlas(self):
         self.charcode2glyph = {}
         self.charcode2unichr = {}
         self.max_ascender = None
@@ -359,7 +576,7 @@ class MonospaceFontAtlas(object):
 
         max_w, max_h = 0, 0
         max_ascender, max_descender, max_tile_width = 0, 0, 0
-        face = self._face
+        face = self._face = Face(self.font_info.path)
         face.set_char_size(height=self.size * 64, vres=self.dpi)
 
         # Create texAtlas for glyph set.
@@ -430,9 +647,6 @@ class MonospaceFontAtlas(object):
         # resize atlas
         height = nextPow2(self.atlas.max_y + 1)
         self.atlas.resize(height)
-        self.atlas.upload()
-        self.createDisplayLists()
-        self._face = None
 
     def createDisplayLists(self):
         glyph_count = len(self.charcode2unichr)
@@ -489,7 +703,7 @@ class MonospaceFontAtlas(object):
 
     def __del__(self):
         self._face = None
-        if self.atlas.texid is not None:
+        if self.atlas is not None and self.atlas.texid is not None:
             #glDeleteTextures(1, self.atlas.texid)
             self.atlas.texid = None
             self.atlas = None
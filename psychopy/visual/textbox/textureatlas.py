@@ -65,6 +65,25 @@ class TextureAtlas(object):
         self.used = 0
         self.max_y = 0
 
+    @classmethod
+    def fromArray(cls, data):
+        '''
+        Create a full atlas holding data, e.g. a saved atlas.
+
+        Parameters
+        ----------
+
+        data : numpy array
+            (height, width, depth) ubyte data, can be a read-only memmap
+        '''
+        height, width, depth = data.shape
+        atlas = cls(width, height, depth)
+        atlas.data = data
+        atlas.nodes = [(0, height, width), ]
+        atlas.used = width * height
+        atlas.max_y = height
+        return atlas
+
     def getTextureID(self):
         return self.texid
 
@@ -0,0 +1,82 @@
+#!/usr/bin/env python2
+
+"""Caches of fonts and laid out text shared by all TextStims.
+
+Creating a pyglet text object lays out the text and looks up (and renders,
+the first time) every glyph, which can take milliseconds. Two caches avoid
+repeating that:
+
+    - fonts are kept alive in fontCache, so the glyph textures (atlas) of
+      each font are only rendered once and are shared by all stimuli using
+      that font (pyglet only keeps its few most recent fonts)
+    - layoutCache holds the laid out text objects, with their vertex and
+      texture coordinate lists, keyed on the text and everything affecting
+      its layout (font, height in pixels, wrapWidth, alignment, color)
+
+Text needed later can be laid out in advance (e.g. before a block of RSVP
+trials) with TextStim.preloadText(listOfStrings).
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+from psychopy.visual.texturecache import LRUCache
+
+# pyglet layouts store 4 vertices per glyph, each with 2 int coords, 3 float
+# texture coords and 4 byte colors
+_bytesPerGlyph = 4 * (8 + 12 + 4)
+_bytesPerLayout = 2048
+
+fontCache = {}
+layoutCache = LRUCache(maxBytes=32 * 1024 ** 2)
+
+
+def getFont(loadFont, name, size, bold=False, italic=False, dpi=72):
+    """Returns the font loaded by loadFont(name, size, bold=bold,
+    italic=italic, dpi=dpi) (e.g. pyglet.font.load), loading each font only
+    once.
+    """
+    if isinstance(name, list):
+        name = tuple(name)
+    key = (name, size, bool(bold), bool(italic), dpi)
+    font = fontCache.get(key)
+    if font is None:
+        font = loadFont(name, size, bold=bold, italic=italic, dpi=dpi)
+        fontCache[key] = font
+    return font
+
+
+def layoutKey(text, font, heightPix, bold, italic, wrapWidthPix,
+              alignHoriz, alignVert, color):
+    """Returns the layoutCache key of text laid out with these settings."""
+    if isinstance(font, list):
+        font = tuple(font)
+    return (text, font, int(heightPix), bool(bold), bool(italic),
+            float(wrapWidthPix), alignHoriz, alignVert,
+            tuple(float(c) for c in color))
+
+
+def getLayout(key, createLayout):
+    """Returns the laid out text for key from the cache, or creates it with
+    createLayout() and adds it to the cache.
+    """
+    layout = layoutCache.get(key)
+    if layout is None:
+        layout = createLayout()
+        layoutCache.put(key, layout,
+                        _bytesPerLayout + _bytesPerGlyph * len(key[0]))
+    return layout
+
+
+def getStats():
+    """Returns a dict with the number of cached fonts and the statistics of
+    the layout cache.
+    """
+    return {'fonts': len(fontCache), 'layouts': layoutCache.getStats()}
+
+
+def clear():
+    """Empties the layout and font caches."""
+    layoutCache.clear()
+    fontCache.clear()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python2
+
+"""Process-wide caches for procedural stimulus textures.
+
+Building the intensity array of a procedural texture or mask (e.g. 'sin',
+'gauss', 'raisedCos') and uploading it to the graphics card used to be
+repeated for every stimulus using it. Two caches are kept instead:
+
+    - intensityCache holds the generated intensity arrays, keyed on
+      (tex, res, maskParams, dataType)
+    - glTextureCache holds the GL texture objects of procedural textures.
+      Stimuli with identical texture content share one texture object,
+      which is reference counted and only deleted once no stimulus uses it
+      and it has dropped out of the cache.
+
+Both caches evict the least recently used entries when they hold more than
+maxBytes. Use getStats() to see how well they work and clear() to empty
+them, e.g.::
+
+    from psychopy.visual import texturecache
+    print(texturecache.getStats())
+"""
+
+# Part of the PsychoPy library
+# Copyright (C) 2015 Jonathan Peirce
+# Distributed under the terms of the GNU General Public License (GPL).
+
+import ctypes
+from collections import OrderedDict
+
+import pyglet
+GL = pyglet.gl
+
+# procedural textures that can be cached, mapped to the maskParams entry
+# they depend on (if any)
+proceduralTextures = {'none': None, 'sin': None, 'sqr': None, 'saw': None,
+                      'tri': None, 'sinXsin': None, 'sqrXsqr': None,
+                      'circle': None, 'gauss': 'sd', 'cross': None,
+                      'radRamp': None, 'raisedCos': 'fringeWidth'}
+
+
+def proceduralKey(tex, res, maskParams, dataType):
+    """Returns the cache key for a procedural texture, or None if tex is
+    not a procedural texture (e.g. an image file or a numpy array).
+
+    maskParams should be the full dict of mask parameters (with defaults
+    filled in); only the entry the texture depends on is part of the key.
+    """
+    if tex is None:
+        tex = 'none'
+    elif not isinstance(tex, basestring):
+        return None
+    elif tex == 'None':
+        tex = 'none'
+    if tex not in proceduralTextures:
+        return None
+    if tex == 'none':
+        res = 1
+    param = proceduralTextures[tex]
+    paramValue = maskParams.get(param) if param else None
+    return (str(tex), int(res), paramValue, dataType)
+
+
+class LRUCache(object):
+    """A dict-like cache that discards the least recently used items when
+    the total size of its items is more than maxBytes.
+
+    onEvict(key, value) is called for each item discarded because of size.
+    """
+
+    def __init__(self, maxBytes, onEvict=None):
+        super(LRUCache, self).__init__()
+        self.maxBytes = maxBytes
+        self.onEvict = onEvict
+        self._items = OrderedDict()  # key -> (value, nBytes)
+        self.nBytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """Returns the value for key (and marks it as recently used), or
+        None if key is not in the cache.
+        """
+        item = self._items.pop(key, None)
+        if item is None:
+            self.misses += 1
+            return None
+        self._items[key] = item
+        self.hits += 1
+        return item[0]
+
+    def put(self, key, value, nBytes):
+        self.pop(key)
+        self._items[key] = (value, nBytes)
+        self.nBytes += nBytes
+        while self.nBytes > self.maxBytes and self._items:
+            oldKey, (oldValue, oldBytes) = self._items.popitem(last=False)
+            self.nBytes -= oldBytes
+            self.evictions += 1
+            if self.onEvict is not None:
+                self.onEvict(oldKey, oldValue)
+
+    def pop(self, key):
+        """Removes key from the cache (without calling onEvict) and returns
+        its value, or None if key was not in the cache.
+        """
+        item = self._items.pop(key, None)
+        if item is None:
+            return None
+        self.nBytes -= item[1]
+        return item[0]
+
+    def clear(self):
+        """Removes all items, calling onEvict for each of them."""
+        while self._items:
+            key, (value, nBytes) = self._items.popitem(last=False)
+            if self.onEvict is not None:
+                self.onEvict(key, value)
+        self.nBytes = 0
+
+    def getStats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'items': len(self._items),
+                'bytes': self.nBytes, 'maxBytes': self.maxBytes}
+
+
+class _SharedTexture(object):
+    __slots__ = ['id', 'refCount', 'nBytes']
+
+    def __init__(self, texID, nBytes):
+        self.id = texID
+        self.refCount = 1
+        self.nBytes = nBytes
+
+
+class GLTextureCache(object):
+    """Reference counted GL texture objects, shared by content key.
+
+    Textures in use by a stimulus are never deleted. When the last stimulus
+    releases a texture it is kept in an LRU cache of unused textures (limited
+    to maxBytes), so that it can be reused by the next stimulus needing the
+    same content.
+    """
+
+    def __init__(self, maxBytes):
+        super(GLTextureCache, self).__init__()
+        self._inUse = {}
+        self._unused = LRUCache(maxBytes, onEvict=self._deleteTexture)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxBytes(self):
+        return self._unused.maxBytes
+
+    @maxBytes.setter
+    def maxBytes(self, value):
+        self._unused.maxBytes = value
+
+    def acquire(self, key):
+        """Returns the id of the texture stored for key (and adds a reference
+        to it), or None if there is no such texture.
+        """
+        tex = self._inUse.get(key)
+        if tex is None:
+            tex = self._unused.pop(key)
+            if tex is not None:
+                tex.refCount = 0
+                self._inUse[key] = tex
+        if tex is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        tex.refCount += 1
+        return tex.id
+
+    def add(self, key, texID, nBytes):
+        """Adds texture texID (with one reference) as the texture for key.
+        """
+        self._inUse[key] = _SharedTexture(texID, nBytes)
+
+    def release(self, key):
+        """Removes one reference to the texture for key."""
+        tex = self._inUse.get(key)
+        if tex is None:
+            return
+        tex.refCount -= 1
+        if tex.refCount <= 0:
+            del self._inUse[key]
+            self._unused.put(key, tex, tex.nBytes)
+
+    def _deleteTexture(self, key, tex):
+        try:
+            GL.glDeleteTextures(1, tex.id)
+        except Exception:
+            pass  # e.g. the GL context has already gone
+
+    def clear(self, deleteTextures=True):
+        """Deletes all unused textures. Textures still used by a stimulus
+        are kept unless deleteTextures is False, which makes the cache
+        forget all textures without any GL calls (use when the GL context
+        has been destroyed).
+        """
+        if deleteTextures:
+            self._unused.clear()
+        else:
+            self._unused._items.clear()
+            self._unused.nBytes = 0
+            self._inUse.clear()
+
+    def getStats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'inUse': len(self._inUse),
+                'inUseBytes': sum(t.nBytes for t in self._inUse.values()),
+                'unused': len(self._unused),
+                'unusedBytes': self._unused.nBytes,
+                'evictions': self._unused.evictions,
+                'maxBytes': self.maxBytes}
+
+
+intensityCache = LRUCache(maxBytes=64 * 1024 ** 2)
+glTextureCache = GLTextureCache(maxBytes=128 * 1024 ** 2)
+
+
+def getStats():
+    """Returns a dict with the hit / miss and size statistics of the
+    intensity array cache and the GL texture cache.
+    """
+    return {'intensity': intensityCache.getStats(),
+            'glTextures': glTextureCache.getStats()}
+
+
+def clear():
+    """Empties the intensity cache and deletes all unused GL textures."""
+    intensityCache.clear()
+    glTextureCache.clear()
+
+
+# Stimuli keep their texture ids in attributes (e.g. stim._texID). A stimulus
+# either owns the texture in an attribute (private) or it is a shared texture,
+# in which case stim._sharedTextures[attr] holds its cache key.
+
+def _sharedTextures(stim):
+    return stim.__dict__.setdefault('_sharedTextures', {})
+
+
+def _setTextureID(stim, attr, texID):
+    setattr(stim, attr, texID)
+    # display lists bind the texture id, so need rebuilding
+    stim._needUpdate = True
+
+
+def useSharedTexture(stim, attr, key):
+    """Makes stim.<attr> the shared texture for key, if there is one.
+    Returns True if it did, False if the texture needs to be created.
+    """
+    shared = _sharedTextures(stim)
+    if shared.get(attr) == key:
+        glTextureCache.hits += 1
+        return True
+    texID = glTextureCache.acquire(key)
+    if texID is None:
+        return False
+    releaseTexture(stim, attr)
+    _setTextureID(stim, attr, texID)
+    shared[attr] = key
+    return True
+
+
+def privateTexture(stim, attr):
+    """Returns a texture id that stim can upload its own content to: the
+    current stim.<attr> if that is private, otherwise a new texture.
+    """
+    shared = _sharedTextures(stim)
+    if attr in shared:
+        glTextureCache.release(shared.pop(attr))
+        texID = GL.GLuint()
+        GL.glGenTextures(1, ctypes.byref(texID))
+        _setTextureID(stim, attr, texID)
+    return getattr(stim, attr)
+
+
+def shareTexture(stim, attr, key, nBytes):
+    """Adds the texture just uploaded to stim.<attr> to the cache, so other
+    stimuli needing the same content (key) can use it.
+    """
+    glTextureCache.add(key, getattr(stim, attr), nBytes)
+    _sharedTextures(stim)[attr] = key
+
+
+def releaseTexture(stim, attr):
+    """Releases the texture in stim.<attr>; private textures are deleted,
+    shared ones lose a reference.
+    """
+    key = _sharedTextures(stim).pop(attr, None)
+    if key is not None:
+        glTextureCache.release(key)
+    else:
+        GL.glDeleteTextures(1, getattr(stim, attr))
@@ -11,6 +11,7 @@ from __future__ import absolute_import
 import sys
 import os
 import weakref
+import imp
 
 # Ensure setting pyglet.options['debug_gl'] to False is done prior to any
 # other calls to pyglet or pyglet submodules, otherwise it may not get picked
@@ -61,11 +62,17 @@ import psychopy.event
 # (JWP has no idea why!)
 from psychopy.tools.attributetools import attributeSetter, setAttribute
 from psychopy.tools.arraytools import val2array
+from psychopy.tools.colorspacetools import ColorConverter
 from psychopy import makeMovies
 from .text import TextStim
 from .grating import GratingStim
 from .helpers import setColor
 from . import globalVars
+from . import texturecache
+from . import textcache
+from .frameprofiler import (AUTODRAW, FBOBLIT, RENDERFBO, EVENTS, FLIP,
+                            FrameProfiler)
+from .movierecorder import MovieRecorder
 
 try:
     from PIL import Image
@@ -94,8 +101,11 @@ except Exception:
     havePygletMedia = False
 
 try:
-    import pygame
-except Exception:
+    # pygame is only imported when first used (by pygame windows)
+    imp.find_module('pygame')
+    from psychopy.contrib.lazy_import import lazy_import
+    lazy_import(globals(), "import pygame")
+except ImportError:
     pass
 
 global DEBUG
@@ -249,6 +259,7 @@ class Window(object):
 
         self._toLog = []
         self._toCall = []
+        self._frameSchedules = []  # started visual.FrameSchedules
         # settings for the monitor: local settings (if available) override
         # monitor
         # if we have a monitors.Monitor object (psychopy 0.54 onwards)
@@ -300,6 +311,14 @@ class Window(object):
         # load color conversion matrices
         self.dkl_rgb = self.monitor.getDKL_RGB()
         self.lms_rgb = self.monitor.getLMS_RGB()
+        self.colorConverter = ColorConverter(self.monitor,
+                                             dkl_rgb=self.dkl_rgb,
+                                             lms_rgb=self.lms_rgb)
+        # single colors are converted in double precision
+        self._colorConverter64 = ColorConverter(self.monitor,
+                                                dkl_rgb=self.dkl_rgb,
+                                                lms_rgb=self.lms_rgb,
+                                                dtype=numpy.float64)
 
         # set screen color
         self.__dict__['colorSpace'] = colorSpace
@@ -365,12 +384,14 @@ class Window(object):
         self.frameClock = core.Clock()  # from psycho/core
         self.frames = 0  # frames since last fps calc
         self.movieFrames = []  # list of captured frames (Image objects)
+        self.movieRecorder = None  # see startMovieRecording()
 
         self.recordFrameIntervals = False
         # Be able to omit the long timegap that follows each time turn it off
         self.recordFrameIntervalsJustTurnedOn = False
         self.nDroppedFrames = 0
         self.frameIntervals = []
+        self.frameProfiler = None  # see startFrameProfiler()
 
         self._toDraw = []
         self._toDrawDepths = []
@@ -493,6 +514,38 @@ class Window(object):
             self.frameIntervals = []
             self.frameClock.reset()
 
+    def startFrameProfiler(self, nFrames=3600):
+        """Start recording the time taken by each phase of every flip()
+        (drawing, FBO rendering, the flip itself, callOnFlip functions...)
+        for the last nFrames frames, with little overhead. Frames are
+        checked for being dropped as they are recorded, against the frame
+        rate measured by getActualFrameRate().
+
+        Returns the :class:`~psychopy.visual.frameprofiler.FrameProfiler`
+        (also win.frameProfiler), with methods getStats(), getHistogram()
+        and save()::
+
+            profiler = win.startFrameProfiler()
+            ...  # the time critical part of the experiment
+            win.stopFrameProfiler()
+            print profiler.getStats()['interval'], profiler.nDropped
+            profiler.save('frames.csv')
+        """
+        if self._monitorFrameRate is None:
+            self._monitorFrameRate = self.getActualFrameRate()
+            if self._monitorFrameRate is not None:
+                self.monitorFramePeriod = 1.0 / self._monitorFrameRate
+        self.frameProfiler = FrameProfiler(
+            nFrames, framePeriod=self.monitorFramePeriod or None)
+        return self.frameProfiler
+
+    def stopFrameProfiler(self):
+        """Stop recording frames, returns the FrameProfiler (if any).
+        """
+        profiler = self.frameProfiler
+        self.frameProfiler = None
+        return profiler
+
     def onResize(self, width, height):
         """A default resize event handler.
 
@@ -562,8 +615,13 @@ class Window(object):
         win.flip(clearBuffer=False)  # the screen is not cleared (so represent
                                      # the previous screen)
         """
+        profiler = self.frameProfiler
+        if profiler is not None:
+            profiler.startFrame()
         for thisStim in self._toDraw:
             thisStim.draw()
+        if profiler is not None:
+            profiler.mark(AUTODRAW)
 
         flipThisFrame = self._startOfFlip()
         if self.useFBO:
@@ -587,15 +645,26 @@ class Window(object):
                 GL.glBindTexture(GL.GL_TEXTURE_2D, self.frameTexture)
                 GL.glColor3f(1.0, 1.0, 1.0)  # glColor multiplies with texture
                 GL.glColorMask(True, True, True, True)
+                if profiler is not None:
+                    profiler.mark(FBOBLIT)
 
                 self._renderFBO()
 
                 GL.glEnable(GL.GL_BLEND)
                 self._finishFBOrender()
+                if profiler is not None:
+                    profiler.mark(RENDERFBO)
 
         # call this before flip() whether FBO was used or not
         self._afterFBOrender()
 
+        recorder = self.movieRecorder
+        swapBuffers = flipThisFrame
+        if recorder is not None and flipThisFrame:
+            recorder.addFrame(buffer='back')
+            if recorder.offscreen:
+                swapBuffers = False  # don't wait for the screen refresh
+
         if self.winType == "pyglet":
             # make sure this is current context
             if globalVars.currWindow != self:
@@ -614,11 +683,13 @@ class Window(object):
             # movie updating
             if pyglet.version < '1.2':
                 pyglet.media.dispatch_events()  # for sounds to be processed
-            if flipThisFrame:
+            if profiler is not None:
+                profiler.mark(EVENTS)
+            if swapBuffers:
                 self.winHandle.flip()
         else:
             if pygame.display.get_init():
-                if flipThisFrame:
+                if swapBuffers:
                     pygame.display.flip()
                 # keeps us in synch with system event queue
                 pygame.event.pump()
@@ -680,11 +751,18 @@ class Window(object):
 
         # get timestamp
         now = logging.defaultClock.getTime()
+        if profiler is not None:
+            profiler.mark(FLIP)
 
         # run other functions immediately after flip completes
         for callEntry in self._toCall:
             callEntry['function'](*callEntry['args'], **callEntry['kwargs'])
         del self._toCall[:]
+        # set stimuli to their scheduled values for the next frame
+        for schedule in self._frameSchedules[:]:
+            schedule._onFlip(now)
+        if profiler is not None:
+            profiler.endFrame()
 
         # do bookkeeping
         if self.recordFrameIntervals:
@@ -855,6 +933,65 @@ class Window(object):
         self.movieFrames.append(im)
         return im
 
+    def startMovieRecording(self, fileName, fps=None, offscreen=False,
+                            codec=None, encoder='ffmpeg', maxQueuedFrames=8):
+        """Record every frame drawn from now on to a movie file (or to
+        numbered images), until stopMovieRecording().
+
+        Unlike getMovieFrame(), the frames are not kept in memory: each
+        frame is read from the back buffer at the next flip() and written
+        by a background thread, piped to ffmpeg for movies.
+
+        :parameters:
+
+            fileName: a movie (.mp4, .mov, .avi, .mkv, .mpg or .webm, which
+                need ffmpeg to be installed) or an image type (e.g. .png),
+                in which case frames are saved as fileName001.png...
+
+            fps: the frame rate of the movie, by default that of the screen
+                (or 60 if it is unknown)
+
+            offscreen: if True the frames are not shown on screen, so flip()
+                doesn't wait for the screen refresh and a stimulus can be
+                rendered as fast as possible (update it by frame numbers,
+                not by clock times, in that case)
+
+            codec: the ffmpeg video codec (e.g. 'libx264'), None for the
+                default of the movie format
+
+            maxQueuedFrames: the number of frames that can wait to be
+                written before flip() waits for the writer
+
+        Returns the :class:`~psychopy.visual.movierecorder.MovieRecorder`.
+
+        Example::
+
+            win.startMovieRecording('stimulus.mp4', offscreen=True)
+            for frameN in range(600):
+                grating.phase = frameN / 60.0
+                grating.draw()
+                win.flip()
+            win.stopMovieRecording()
+        """
+        if self.movieRecorder is not None:
+            self.stopMovieRecording()
+        if fps is None:
+            fps = self._monitorFrameRate or 60
+        self.movieRecorder = MovieRecorder(
+            fileName, self.size, fps=fps, codec=codec, encoder=encoder,
+            maxQueuedFrames=maxQueuedFrames, offscreen=offscreen)
+        return self.movieRecorder
+
+    def stopMovieRecording(self):
+        """Stop recording frames and finish writing the movie started by
+        startMovieRecording() (waits for the frames still queued).
+        """
+        recorder = self.movieRecorder
+        self.movieRecorder = None
+        if recorder is not None:
+            recorder.close()
+        return recorder
+
     def _getFrame(self, buffer='front'):
         """Return the current Window as an image.
         """
@@ -976,20 +1113,10 @@ class Window(object):
         dimensions. You need to check what your hardware & OpenGL supports,
         and call _getRegionOfFrame as appropriate.
         """
-        # Ideally: rewrite using GL frame buffer object; glReadPixels == slow
-
-        x, y = self.size  # of window, not image
+        # glReadPixels is slow, see _copyRegionToTexture to avoid it
         imType = 'RGBA'  # not tested with anything else
 
-        # box corners in pix
-        box = [(rect[0] / 2. + 0.5) * x,  # Left
-               (rect[1] / -2. + 0.5) * y,  # Top
-               (rect[2] / 2. + 0.5) * x,  # Right
-               (rect[3] / -2. + 0.5) * y]  # Bottom
-        box = map(int, box)
-
-        horz = box[2] - box[0]
-        vert = box[3] - box[1]
+        left, bottom, horz, vert = self._getRegionBox(rect)
 
         if buffer == 'back':
             GL.glReadBuffer(GL.GL_BACK)
@@ -998,7 +1125,7 @@ class Window(object):
 
         # http://www.opengl.org/sdk/docs/man/xhtml/glGetTexImage.xml
         bufferDat = (GL.GLubyte * (4 * horz * vert))()
-        GL.glReadPixels(box[0], box[1], horz, vert,
+        GL.glReadPixels(left, bottom, horz, vert,
                         GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, bufferDat)
         # not right
         # GL.glGetTexImage(GL.GL_TEXTURE_1D, 0,
@@ -1027,10 +1154,80 @@ class Window(object):
 
         return region
 
+    def _getRegionBox(self, rect=(-1, 1, 1, -1)):
+        """The (left, bottom, width, height) in pix of rect, with the origin
+        at the bottom left of the window (as for glReadPixels).
+
+        The rectangle = (Left Top Right Bottom) in norm units.
+        """
+        x, y = self.size  # of window, not image
+        left = int((rect[0] / 2. + 0.5) * x)
+        top = int((rect[1] / 2. + 0.5) * y)
+        right = int((rect[2] / 2. + 0.5) * x)
+        bottom = int((rect[3] / 2. + 0.5) * y)
+        return left, bottom, right - left, top - bottom
+
+    def _copyRegionToTexture(self, texID, texSize, rect=(-1, 1, 1, -1),
+                             buffer='back', allocate=False,
+                             interpolate=True):
+        """Copy a rectangle of the window into the texture texID, without it
+        leaving the graphics card (unlike _getRegionOfFrame).
+
+        The rectangle = (Left Top Right Bottom) in norm units. It is copied
+        to the centre of the texture, of texSize (width, height) pix, which
+        needs to be at least the size of the rectangle. Use allocate=True
+        the first time (or if texSize changes) to (re)create the texture.
+        """
+        left, bottom, horz, vert = self._getRegionBox(rect)
+        texWidth, texHeight = texSize
+        GL.glBindTexture(GL.GL_TEXTURE_2D, texID)
+        if allocate:
+            if (texWidth, texHeight) == (horz, vert):
+                data = None  # all of it is about to be copied
+            else:
+                # the margins of a power-of-2 texture are transparent
+                data = numpy.zeros((texHeight, texWidth, 4), numpy.ubyte)
+                data = data.ctypes
+            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA,
+                            texWidth, texHeight, 0,
+                            GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, data)
+            if interpolate:
+                texFilter = GL.GL_LINEAR
+            else:
+                texFilter = GL.GL_NEAREST
+            # (no mipmaps, they would need updating for every copy)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER,
+                               texFilter)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER,
+                               texFilter)
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_GENERATE_MIPMAP,
+                               GL.GL_FALSE)
+
+        if buffer == 'back':
+            if self.useFBO:  # the back buffer is our frame buffer object
+                GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
+            else:
+                GL.glReadBuffer(GL.GL_BACK)
+        else:
+            if self.useFBO:
+                GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, 0)
+            GL.glReadBuffer(GL.GL_FRONT)
+
+        GL.glCopyTexSubImage2D(GL.GL_TEXTURE_2D, 0,
+                               (texWidth - horz) // 2, (texHeight - vert) // 2,
+                               left, bottom, horz, vert)
+
+        if self.useFBO and buffer != 'back':
+            GL.glBindFramebufferEXT(GL.GL_FRAMEBUFFER_EXT, self.frameBuffer)
+            GL.glReadBuffer(GL.GL_COLOR_ATTACHMENT0_EXT)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
     def close(self):
         """Close the window (and reset the Bits++ if necess).
         """
         self._closed = True
+        if self.movieRecorder is not None:
+            self.stopMovieRecording()
 
         try:
             openWindows.remove(self)
@@ -1063,6 +1260,10 @@ class Window(object):
         else:
             # pygame.quit()
             pygame.display.quit()
+        if not [ref for ref in openWindows if ref() is not None]:
+            # the GL context (and all textures in it) has gone
+            texturecache.glTextureCache.clear(deleteTextures=False)
+            textcache.clear()
 
         try:
             if self.bits is not None:
@@ -13,6 +13,8 @@ You should have received a copy of the GNU General Public License along
 with this program. If not, see http://www.gnu.org/licenses/
 """
 
+import os
+from collections import OrderedDict
 import numpy as np
 from psychopy import logging
 from OpenGL.arrays import ArrayDatatype as ADT
@@ -25,6 +27,10 @@ class Warper(object):
 
     Supports spherical, cylindrical, warpfile, or None (disabled) warps
     """
+    # meshes are cached (for all Warpers), so that switching back to an
+    # earlier projection, e.g. during calibration, is immediate
+    meshCacheSize = 16
+    _meshCache = OrderedDict()
 
     def __init__(self,
                  win,
@@ -112,6 +118,7 @@ class Warper(object):
         self.flipHorizontal = flipHorizontal
         self.flipVertical = flipVertical
         self.initDefaultWarpSize()
+        self.gl_vb = self.gl_tb = self.gl_color = None
 
         #   get the eye distance from the monitor object,
         #   but the pixel dimensions from the actual window object
@@ -194,7 +201,7 @@ class Warper(object):
         elif self.warp == 'warpfile':
             self.projectionWarpfile()
         else:
-            raise 'Unknown warp specification'
+            raise ValueError('Unknown warp specification: %r' % warp)
 
     def projectionNone(self):
         """No warp, same projection as original PsychoPy
@@ -222,33 +229,32 @@ class Warper(object):
         """Correct perspective on flat screen using either a spherical or
         cylindrical projection.
         """
-        self.nverts = (self.xgrid - 1) * (self.ygrid - 1) * 4
-
+        warp = 'cylindrical' if isCylindrical else 'spherical'
+        key = (warp, tuple(self.eyepoint), self.xgrid, self.ygrid,
+               self.mon_width_pix, self.mon_height_pix, self.mon_width_cm,
+               self.dist_cm)
+        mesh = self._getCachedMesh(key)
+        if mesh is None:
+            mesh = self._cacheMesh(key, self.xgrid, self.ygrid,
+                                   *self._sphericalMesh(isCylindrical))
+        self._useMesh(*mesh)
+
+    def _sphericalMesh(self, isCylindrical):
         # eye position in cm
         xEye = self.eyepoint[0] * self.mon_width_cm
         yEye = self.eyepoint[1] * self.mon_height_cm
 
-        # create vertex grid array, and texture coords
-        # times 4 for quads
-        vertices = np.zeros(
-            ((self.xgrid - 1) * (self.ygrid - 1) * 4, 2), dtype='float32')
-        tcoords = np.zeros(
-            ((self.xgrid - 1) * (self.ygrid - 1) * 4, 2), dtype='float32')
-
-        equalDistanceX = np.linspace(0, self.mon_width_cm, self.xgrid)
-        equalDistanceY = np.linspace(0, self.mon_height_cm, self.ygrid)
-
         # vertex coordinates
         x_c = np.linspace(-1.0, 1.0, self.xgrid)
         y_c = np.linspace(-1.0, 1.0, self.ygrid)
         x_coords, y_coords = np.meshgrid(x_c, y_c)
 
-        x = np.zeros(((self.xgrid), (self.ygrid)), dtype='float32')
-        y = np.zeros(((self.xgrid), (self.ygrid)), dtype='float32')
-
-        x[:, :] = equalDistanceX - xEye
-        y[:, :] = equalDistanceY - yEye
-        y = np.transpose(y)
+        # position (in cm) of each vertex relative to the eye, (ygrid, xgrid)
+        equalDistanceX = np.linspace(0, self.mon_width_cm, self.xgrid)
+        equalDistanceY = np.linspace(0, self.mon_height_cm, self.ygrid)
+        x, y = np.meshgrid(equalDistanceX - xEye, equalDistanceY - yEye)
+        x = x.astype('float32')
+        y = y.astype('float32')
 
         r = np.sqrt(np.square(x) + np.square(y) + np.square(self.dist_cm))
 
@@ -287,127 +293,83 @@ class Warper(object):
         u_coords = tx / self.mon_width_cm + 0.5
         v_coords = ty / self.mon_height_cm + 0.5
 
-        # loop to create quads
-        vdex = 0
-        for y in xrange(0, self.ygrid - 1):
-            for x in xrange(0, self.xgrid - 1):
-                index = y * (self.xgrid) + x
-
-                vertices[vdex + 0, 0] = x_coords[y, x]
-                vertices[vdex + 0, 1] = y_coords[y, x]
-                vertices[vdex + 1, 0] = x_coords[y, x + 1]
-                vertices[vdex + 1, 1] = y_coords[y, x + 1]
-                vertices[vdex + 2, 0] = x_coords[y + 1, x + 1]
-                vertices[vdex + 2, 1] = y_coords[y + 1, x + 1]
-                vertices[vdex + 3, 0] = x_coords[y + 1, x]
-                vertices[vdex + 3, 1] = y_coords[y + 1, x]
-
-                tcoords[vdex + 0, 0] = u_coords[y, x]
-                tcoords[vdex + 0, 1] = v_coords[y, x]
-                tcoords[vdex + 1, 0] = u_coords[y, x + 1]
-                tcoords[vdex + 1, 1] = v_coords[y, x + 1]
-                tcoords[vdex + 2, 0] = u_coords[y + 1, x + 1]
-                tcoords[vdex + 2, 1] = v_coords[y + 1, x + 1]
-                tcoords[vdex + 3, 0] = u_coords[y + 1, x]
-                tcoords[vdex + 3, 1] = v_coords[y + 1, x]
-
-                vdex += 4
-        self.createVertexAndTextureBuffers(vertices, tcoords)
+        # the four corners of each quad
+        quads = _quadIndices(self.xgrid, self.ygrid)
+        vertices = np.column_stack((x_coords.ravel(), y_coords.ravel()))
+        tcoords = np.column_stack((u_coords.ravel(), v_coords.ravel()))
+        return (vertices[quads].astype('float32'),
+                tcoords[quads].astype('float32'), None)
 
     def projectionWarpfile(self):
         """Use a warp definition file to create the projection.
             See: http://paulbourke.net/dome/warpingfisheye/
+
+        The warpfile can also be a binary .npy file (see readWarpfile()),
+        which loads much faster than the text format for fine meshes.
         """
         try:
-            fh = open(self.warpfile)
-            lines = fh.readlines()
-            fh.close()
-            filetype = int(lines[0])
-            rc = map(int, lines[1].split())
-            cols, rows = rc[0], rc[1]
-            warpdata = np.loadtxt(self.warpfile, skiprows=2)
+            key = ('warpfile', self.warpfile,
+                   os.path.getmtime(self.warpfile),
+                   os.path.getsize(self.warpfile))
+            mesh = self._getCachedMesh(key)
+            if mesh is None:
+                warpdata = readWarpfile(self.warpfile)
         except Exception:
             error = 'Unable to read warpfile: ' + self.warpfile
             logging.warning(error)
             print(error)
             return
 
-        if (cols * rows != warpdata.shape[0] or
-                warpdata.shape[1] != 5 or
-                filetype != 2):
-            error = 'warpfile data incorrect: ' + self.warpfile
-            logging.warning(error)
-            print(error)
-            return
-
-        self.xgrid = cols
-        self.ygrid = rows
-
-        self.nverts = (self.xgrid - 1) * (self.ygrid - 1) * 4
-
-        # create vertex grid array, and texture coords times 4 for quads
-        vertices = np.zeros(
-            ((self.xgrid - 1) * (self.ygrid - 1) * 4, 2), dtype='float32')
-        tcoords = np.zeros(
-            ((self.xgrid - 1) * (self.ygrid - 1) * 4, 2), dtype='float32')
-        # opacity is RGBA
-        opacity = np.ones(
-            ((self.xgrid - 1) * (self.ygrid - 1) * 4, 4), dtype='float32')
-
-        # loop to create quads
-        vdex = 0
-        for y in xrange(0, self.ygrid - 1):
-            for x in xrange(0, self.xgrid - 1):
-                index = y * (self.xgrid) + x
-
-                vertices[vdex + 0, 0] = warpdata[index, 0]  # x_coords[y,x]
-                vertices[vdex + 0, 1] = warpdata[index, 1]  # y_coords[y,x]
-                # x_coords[y,x+1]
-                vertices[vdex + 1, 0] = warpdata[index + 1, 0]
-                # y_coords[y,x+1]
-                vertices[vdex + 1, 1] = warpdata[index + 1, 1]
-                # x_coords[y+1,x+1]
-                vertices[vdex + 2, 0] = warpdata[index + cols + 1, 0]
-                # y_coords[y+1,x+1]
-                vertices[vdex + 2, 1] = warpdata[index + cols + 1, 1]
-                # x_coords[y+1,x]
-                vertices[vdex + 3, 0] = warpdata[index + cols, 0]
-                # y_coords[y+1,x]
-                vertices[vdex + 3, 1] = warpdata[index + cols, 1]
-
-                # u_coords[y,x]
-                tcoords[vdex + 0, 0] = warpdata[index, 2]
-                # v_coords[y,x]
-                tcoords[vdex + 0, 1] = warpdata[index, 3]
-                # u_coords[y,x+1]:
-                tcoords[vdex + 1, 0] = warpdata[index + 1, 2]
-                # v_coords[y,x+1]:
-                tcoords[vdex + 1, 1] = warpdata[index + 1, 3]
-                # u_coords[y+1,x+1]:
-                tcoords[vdex + 2, 0] = warpdata[index + cols + 1, 2]
-                # v_coords[y+1,x+1]:
-                tcoords[vdex + 2, 1] = warpdata[index + cols + 1, 3]
-                # u_coords[y+1,x]
-                tcoords[vdex + 3, 0] = warpdata[index + cols, 2]
-                # v_coords[y+1,x]:
-                tcoords[vdex + 3, 1] = warpdata[index + cols, 3]
-
-                opacity[vdex, 3] = warpdata[index, 4]
-                opacity[vdex + 1, 3] = warpdata[index + 1, 4]
-                opacity[vdex + 2, 3] = warpdata[index + cols + 1, 4]
-                opacity[vdex + 3, 3] = warpdata[index + cols, 4]
-
-                vdex += 4
+        if mesh is None:
+            rows, cols = warpdata.shape[:2]
+            if warpdata.shape[2] != 5 or rows < 2 or cols < 2:
+                error = 'warpfile data incorrect: ' + self.warpfile
+                logging.warning(error)
+                print(error)
+                return
+            # the four corners of each quad
+            warpdata = warpdata.reshape(rows * cols, 5)
+            quads = _quadIndices(cols, rows)
+            vertices = warpdata[quads, 0:2].astype('float32')
+            tcoords = warpdata[quads, 2:4].astype('float32')
+            # opacity is RGBA
+            opacity = np.ones((len(quads), 4), dtype='float32')
+            opacity[:, 3] = warpdata[quads, 4]
+            mesh = self._cacheMesh(key, cols, rows, vertices, tcoords,
+                                   opacity)
+        self._useMesh(*mesh)
+
+    def _getCachedMesh(self, key):
+        """The (xgrid, ygrid, vertices, tcoords, opacity) of a mesh created
+        earlier, or None"""
+        mesh = Warper._meshCache.pop(key, None)
+        if mesh is not None:
+            Warper._meshCache[key] = mesh  # now the most recently used
+        return mesh
+
+    def _cacheMesh(self, key, xgrid, ygrid, vertices, tcoords, opacity):
+        mesh = (xgrid, ygrid, vertices, tcoords, opacity)
+        Warper._meshCache[key] = mesh
+        while len(Warper._meshCache) > Warper.meshCacheSize:
+            Warper._meshCache.popitem(last=False)
+        return mesh
+
+    def _useMesh(self, xgrid, ygrid, vertices, tcoords, opacity):
+        self.xgrid = xgrid
+        self.ygrid = ygrid
+        self.nverts = len(vertices)
         self.createVertexAndTextureBuffers(vertices, tcoords, opacity)
 
     def createVertexAndTextureBuffers(self, vertices, tcoords, opacity=None):
         """Allocate hardware buffers for vertices, texture coordinates,
         and optionally opacity.
         """
-        if self.flipHorizontal:
-            vertices[:, 0] = -vertices[:, 0]
-        if self.flipVertical:
-            vertices[:, 1] = -vertices[:, 1]
+        if self.flipHorizontal or self.flipVertical:
+            # (a new array, as the original may be in the mesh cache)
+            flip = [-1 if self.flipHorizontal else 1,
+                    -1 if self.flipVertical else 1]
+            vertices = vertices * np.array(flip, 'float32')
+        self._deleteBuffers()
 
         GL.glEnableClientState(GL.GL_VERTEX_ARRAY)
 
@@ -438,3 +400,44 @@ class Warper(object):
 
         GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
         GL.glDisableClientState(GL.GL_VERTEX_ARRAY)
+
+    def _deleteBuffers(self):
+        """Free the buffers of the previous projection"""
+        for name in ('gl_vb', 'gl_tb', 'gl_color'):
+            buff = getattr(self, name, None)
+            if buff is not None:
+                GL.glDeleteBuffers(1, buff)
+                setattr(self, name, None)
+
+
+def _quadIndices(cols, rows):
+    """Indices into a (rows, cols) grid of points (flattened) of the corners
+    of each quad of the mesh, in the order they are drawn.
+    """
+    corners = np.arange(rows * cols).reshape(rows, cols)[:-1, :-1]
+    offsets = np.array([0, 1, cols + 1, cols])
+    return (corners[:, :, np.newaxis] + offsets).ravel()
+
+
+def readWarpfile(filename):
+    """Read a warp definition file, returns a float array of (rows, cols, 5)
+    with the x, y, u, v and opacity of each point of the mesh.
+
+    The file can either be in the text format of Blender and Paul Bourke
+    (see http://paulbourke.net/dome/warpingfisheye/), or a binary .npy file
+    of this array, which is much faster to load. To convert a file::
+
+        np.save('myWarp.npy', readWarpfile('myWarp.data'))
+    """
+    if filename.lower().endswith('.npy'):
+        warpdata = np.load(filename)
+        if warpdata.ndim != 3:
+            raise ValueError('warpfile data should be (rows, cols, 5)')
+        return warpdata
+    with open(filename) as f:
+        filetype = int(f.readline())
+        cols, rows = [int(n) for n in f.readline().split()[:2]]
+        warpdata = np.fromstring(f.read(), sep=' ')
+    if filetype != 2 or warpdata.size != rows * cols * 5:
+        raise ValueError('warpfile data incorrect: ' + filename)
+    return warpdata.reshape(rows, cols, 5)